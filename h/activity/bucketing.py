@@ -18,22 +18,16 @@ _ = i18n.TranslationStringFactory(__package__)
 
 
 class DocumentBucket(object):
-    def __init__(self, document, annotations=None):
+    def __init__(self, document, annotations=None, location=None):
         self.annotations = []
         self.tags = set()
         self.users = set()
-        self.uri = None
 
         self.title = document.title
 
-        presented_document = presenters.DocumentHTMLPresenter(document)
-
-        if presented_document.web_uri:
-            parsed = urlparse.urlparse(presented_document.web_uri)
-            self.uri = parsed.geturl()
-            self.domain = parsed.netloc
-        else:
-            self.domain = _("Local file")
+        if location is None:
+            location = document_location(document)
+        self.uri, self.domain = location
 
         if annotations:
             self.update(annotations)
@@ -82,14 +76,18 @@ class Timeframe(object):
     Any annotations that are added into a timeframe bucket will be further
     bucketed by their documents, within the timeframe.
 
+    ``locations`` is a dict of the :py:func:`document_location` of each
+    document, which can be shared between timeframes so that each document is
+    only presented once however many timeframes it appears in.
+
     """
 
-    def __init__(self, label, cutoff_time):
+    def __init__(self, label, cutoff_time, locations=None):
         self.label = label
         self.cutoff_time = cutoff_time
         self.document_buckets = collections.OrderedDict()
+        self._locations = {} if locations is None else locations
 
-    @newrelic.agent.function_trace()
     def append(self, annotation):
         """
         Append an annotation to its document bucket in this timeframe.
@@ -98,11 +96,15 @@ class Timeframe(object):
         timeframe, the caller is required to do that.
 
         """
-        document_bucket = self.document_buckets.get(annotation.document)
+        document = annotation.document
+        document_bucket = self.document_buckets.get(document)
 
         if document_bucket is None:
-            document_bucket = DocumentBucket(annotation.document)
-            self.document_buckets[annotation.document] = document_bucket
+            location = self._locations.get(document)
+            if location is None:
+                location = self._locations[document] = document_location(document)
+            document_bucket = DocumentBucket(document, location=location)
+            self.document_buckets[document] = document_bucket
 
         document_bucket.append(annotation)
 
@@ -134,8 +136,13 @@ class Timeframe(object):
 
 class TimeframeGenerator(object):
     def __init__(self):
+        self.locations = {}
         self.timeframes = [
-            Timeframe(_("Last 7 days"), utcnow() - datetime.timedelta(days=7))
+            Timeframe(
+                _("Last 7 days"),
+                utcnow() - datetime.timedelta(days=7),
+                locations=self.locations,
+            )
         ]
 
     @newrelic.agent.function_trace()
@@ -156,7 +163,9 @@ class TimeframeGenerator(object):
         cutoff_time = datetime.datetime(
             year=annotation.updated.year, month=annotation.updated.month, day=1
         )
-        timeframe = Timeframe(annotation.updated.strftime("%b %Y"), cutoff_time)
+        timeframe = Timeframe(
+            annotation.updated.strftime("%b %Y"), cutoff_time, locations=self.locations
+        )
         return timeframe
 
 
@@ -185,5 +194,19 @@ def bucket(annotations):
     return timeframes
 
 
+def document_location(document):
+    """
+    Return the ``(uri, domain)`` to show for ``document`` in a bucket.
+
+    If the document has no web URI it's shown as a local file with no URI.
+    """
+    web_uri = presenters.DocumentHTMLPresenter(document).web_uri
+    if not web_uri:
+        return (None, _("Local file"))
+
+    parsed = urlparse.urlparse(web_uri)
+    return (parsed.geturl(), parsed.netloc)
+
+
 def utcnow():
     return datetime.datetime.utcnow()
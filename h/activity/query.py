@@ -6,7 +6,7 @@ from collections import namedtuple
 
 import newrelic.agent
 from pyramid.httpexceptions import HTTPFound
-from sqlalchemy.orm import subqueryload
+from sqlalchemy.orm import load_only, subqueryload
 
 from h import links
 from h import presenters
@@ -21,6 +21,34 @@ from h.search import (
     TagsAggregation,
     UsersAggregation,
 )
+from h.util.cache import StaleWhileRevalidateCache
+
+
+#: The annotation columns that the activity pages use. The others, such as
+#: the arbitrarily large ``extra``, aren't loaded.
+ANNOTATION_COLUMNS = (
+    "id",
+    "created",
+    "updated",
+    "userid",
+    "groupid",
+    "_text",
+    "_text_rendered",
+    "tags",
+    "shared",
+    "_target_uri",
+    "target_selectors",
+    "references",
+    "document_id",
+)
+
+#: The document columns that the activity pages use.
+DOCUMENT_COLUMNS = ("id", "title", "web_uri")
+
+#: The tag and user facets of recent activity searches, keyed by the user and
+#: query and shared by all requests handled by this process. They're refreshed
+#: a minute after they were computed, by the next search that needs them.
+aggregation_cache = StaleWhileRevalidateCache(maxsize=1000, ttl=600, fresh_ttl=60)
 
 
 class ActivityResults(
@@ -108,12 +136,20 @@ def check_url(request, query, unparse=parser.unparse):
 
 @newrelic.agent.function_trace()
 def execute(request, query, page_size):
-    search_result = _execute_search(request, query, page_size)
+    # The facets don't change from one page of results to the next, and they
+    # don't need to be up to the second, so the terms aggregations are only
+    # run when there aren't any recent enough cached ones for this query.
+    cache_key = _aggregation_cache_key(request, query)
+    aggregations, refresh = aggregation_cache.lookup(cache_key)
+
+    search_result = _execute_search(request, query, page_size, aggregate=refresh)
+
+    if refresh:
+        aggregations = search_result.aggregations
+        aggregation_cache.set(cache_key, aggregations)
 
     result = ActivityResults(
-        total=search_result.total,
-        aggregations=search_result.aggregations,
-        timeframes=[],
+        total=search_result.total, aggregations=aggregations, timeframes=[]
     )
 
     if result.total == 0:
@@ -165,7 +201,10 @@ def aggregations_for(query):
 @newrelic.agent.function_trace()
 def fetch_annotations(session, ids):
     def load_documents(query):
-        return query.options(subqueryload(Annotation.document))
+        return query.options(
+            load_only(*ANNOTATION_COLUMNS),
+            subqueryload(Annotation.document).load_only(*DOCUMENT_COLUMNS),
+        )
 
     annotations = storage.fetch_ordered_annotations(
         session, ids, query_processor=load_documents
@@ -175,14 +214,15 @@ def fetch_annotations(session, ids):
 
 
 @newrelic.agent.function_trace()
-def _execute_search(request, query, page_size):
+def _execute_search(request, query, page_size, aggregate=True):
     # Wildcards and exact url matches are specified in the url facet so set
     # separate_wildcard_uri_keys to False.
     search = Search(request, stats=request.stats, separate_wildcard_uri_keys=False)
     search.append_modifier(AuthorityFilter(authority=request.default_authority))
     search.append_modifier(TopLevelAnnotationsFilter())
-    for agg in aggregations_for(query):
-        search.append_aggregation(agg)
+    if aggregate:
+        for agg in aggregations_for(query):
+            search.append_aggregation(agg)
 
     query = query.copy()
     page = request.params.get("page", 1)
@@ -208,5 +248,15 @@ def _fetch_groups(session, pubids):
     return session.query(Group).filter(Group.pubid.in_(pubids))
 
 
+def _aggregation_cache_key(request, query):
+    # What the aggregations count depends on which annotations the user can
+    # see, so they're cached separately for each user.
+    return (
+        request.authenticated_userid,
+        request.default_authority,
+        tuple(sorted(query.items())),
+    )
+
+
 def _single_entry(query, key):
     return len(query.getall(key)) == 1
@@ -49,9 +49,6 @@ def includeme(config):
     config.add_subscriber(
         "h.subscribers.publish_annotation_event", "h.events.AnnotationEvent"
     )
-    config.add_subscriber(
-        "h.subscribers.send_reply_notifications", "h.events.AnnotationEvent"
-    )
 
     config.add_tween("h.tweens.conditional_http_tween_factory", under=EXCVIEW)
     config.add_tween("h.tweens.redirect_tween_factory")
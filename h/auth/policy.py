@@ -23,6 +23,10 @@ AUTH_CLIENT_API_WHITELIST = [
     ("api.user", "PATCH"),
 ]
 
+#: The key in the WSGI environ under which AuthClientPolicy.check() keeps the
+#: results of the checks that it has already done for the request.
+_CHECKED_ENVIRON_KEY = "h.auth.policy.auth_client_checks"
+
 
 @interface.implementer(interfaces.IAuthenticationPolicy)
 class AuthenticationPolicy(object):
@@ -263,6 +267,17 @@ class AuthClientPolicy(object):
         :returns: additional principals for the auth_client or None
         :rtype: list or None
         """
+        # This is called by both authenticated_userid() and
+        # effective_principals(), so remember the result for the rest of the
+        # request.
+        checked = request.environ.setdefault(_CHECKED_ENVIRON_KEY, {})
+        key = (username, password, AuthClientPolicy._forwarded_userid(request))
+        if key not in checked:
+            checked[key] = AuthClientPolicy._check(username, password, request)
+        return checked[key]
+
+    @staticmethod
+    def _check(username, password, request):
         client_id = username
         client_secret = password
 
@@ -3,6 +3,7 @@
 from __future__ import unicode_literals
 import re
 
+import hashlib
 import hmac
 
 import sqlalchemy as sa
@@ -11,13 +12,26 @@ from pyramid import security
 from h.auth import role
 from h._compat import text_type
 from h.models.auth_client import GrantType, AuthClient
+from h.util.cache import VersionedCache
+from h.util.db import restore, snapshot
+
+#: The principals of each user, keyed by userid and shared by all requests
+#: handled by this process. See
+#: :py:func:`h.services.auth_token.watch_auth_changes`.
+principals_cache = VersionedCache("auth", maxsize=10000, ttl=60)
+
+#: Snapshots of auth clients whose credentials have been verified, keyed by
+#: client ID and a digest of the secret they were verified with, and shared
+#: by all requests handled by this process.
+auth_client_cache = VersionedCache("auth_client", maxsize=1000, ttl=60)
 
 
 def groupfinder(userid, request):
     """
     Return the list of additional principals for a userid, or None.
 
-    This loads the user and then calls ``principals_for_user``.
+    This loads the user and then calls ``principals_for_user``. The result is
+    cached, so later calls for the same user don't need to load it again.
 
     If `userid` identifies a valid user in the system, this function will
     return the list of additional principals for that user. If `userid` is not
@@ -31,10 +45,18 @@ def groupfinder(userid, request):
     :returns: additional principals for the user (possibly empty) or None
     :rtype: list or None
     """
-    user_service = request.find_service(name="user")
-    user = user_service.fetch(userid)
+    principals_cache.check_version(request.db)
+
+    principals = principals_cache.get(userid)
+    if principals is None:
+        user_service = request.find_service(name="user")
+        user = user_service.fetch(userid)
 
-    return principals_for_user(user)
+        principals = principals_for_user(user)
+        if principals is not None:
+            principals_cache.set(userid, principals)
+
+    return principals
 
 
 def principals_for_user(user):
@@ -110,8 +132,18 @@ def verify_auth_client(client_id, client_secret, db_session):
 
     Returns ``None`` if retrieval or any checks fail
 
+    Successful verifications are cached for a short time, so a client which
+    makes many requests with the same credentials doesn't need to be loaded
+    from the database for each one.
+
     :rtype: :py:class:`h.models.auth_client.AuthClient` or ``None``
     """
+    auth_client_cache.check_version(db_session)
+
+    cache_key = (client_id, hashlib.sha256(client_secret.encode("utf-8")).hexdigest())
+    cached = auth_client_cache.get(cache_key)
+    if cached is not None:
+        return restore(db_session, cached)
 
     # We fetch the client by its ID and then do a constant-time comparison of
     # the secret with that provided in the request.
@@ -132,6 +164,7 @@ def verify_auth_client(client_id, client_secret, db_session):
     if not hmac.compare_digest(client.secret, client_secret):
         return None
 
+    auth_client_cache.set(cache_key, snapshot(client))
     return client
 
 
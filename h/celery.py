@@ -51,6 +51,10 @@ celery.conf.update(
             "task": "h.tasks.cleanup.purge_removed_features",
             "schedule": timedelta(hours=6),
         },
+        "send-reply-notifications": {
+            "task": "h.tasks.notification.send_reply_notifications",
+            "schedule": timedelta(minutes=1),
+        },
     },
     accept_content=["json"],
     # Enable at-least-once delivery mode. This probably isn't actually what we
@@ -59,11 +63,20 @@ celery.conf.update(
     task_acks_late=True,
     worker_disable_rate_limits=True,
     task_ignore_result=True,
-    imports=("h.tasks.admin", "h.tasks.cleanup", "h.tasks.indexer", "h.tasks.mailer"),
+    imports=(
+        "h.tasks.admin",
+        "h.tasks.cleanup",
+        "h.tasks.indexer",
+        "h.tasks.mailer",
+        "h.tasks.notification",
+    ),
     task_routes={
         "h.tasks.indexer.add_annotation": "indexer",
+        "h.tasks.indexer.add_annotations": "indexer",
         "h.tasks.indexer.delete_annotation": "indexer",
+        "h.tasks.indexer.delete_annotations": "indexer",
         "h.tasks.indexer.reindex_user_annotations": "indexer",
+        "h.tasks.indexer.update_user_nipsa": "indexer",
     },
     task_serializer="json",
     task_queues=[
@@ -1,12 +1,26 @@
 # -*- coding: utf-8 -*-
 
+import json
+
 import click
+import sqlalchemy as sa
 
 from h import models
 from h.models.document import merge_documents
 from h.search.index import BatchIndexer
+from h.services.public_annotation_count import counts_maintained
 from h.util import uri
 
+#: The number of annotations moved in each transaction.
+WINDOW_SIZE = 2000
+
+#: The ``setting`` key under which the IDs of moved annotations that haven't
+#: been reindexed yet are kept, so that an interrupted move can be resumed.
+PENDING_REINDEX_KEY = u"move_uri.pending_reindex"
+
+_annotation = models.Annotation.__table__
+_document_uri = models.DocumentURI.__table__
+
 
 @click.command("move-uri")
 @click.option("--old", required=True, help="Old URI with annotations and documents.")
@@ -24,13 +38,22 @@ def move_uri(ctx, old, new):
     This will **replace** the annotation's ``target_uri`` and all the
     document uri's ``claimant``, plus the matching ``uri`` for self-claim and
     canonical uris.
+
+    Annotations are moved and reindexed a window at a time. If the command is
+    interrupted, running it again with the same arguments carries on where it
+    left off.
     """
 
     request = ctx.obj["bootstrap"]()
 
-    annotations = _fetch_annotations(request.db, old)
-    docuris_claimant = _fetch_document_uri_claimants(request.db, old)
-    docuris_uri = _fetch_document_uri_canonical_self_claim(request.db, old)
+    # Finish off any move that was interrupted before it was reindexed.
+    _reindex_pending(request)
+    request.tm.commit()
+    request.tm.begin()
+
+    annotation_ids = _fetch_annotation_ids(request.db, old, new)
+    docuris_claimant = _count_document_uri_claimants(request.db, old)
+    docuris_uri = _count_document_uri_canonical_self_claim(request.db, old)
 
     prompt = (
         "Changing all annotations and document data matching:\n"
@@ -42,9 +65,9 @@ def move_uri(ctx, old, new):
     ).format(
         old=old,
         new=new,
-        ann_count=len(annotations),
-        doc_claimant=len(docuris_claimant),
-        doc_uri=len(docuris_uri),
+        ann_count=len(annotation_ids),
+        doc_claimant=docuris_claimant,
+        doc_uri=docuris_uri,
     )
     c = click.prompt(prompt, default="n", show_default=False)
 
@@ -52,21 +75,7 @@ def move_uri(ctx, old, new):
         print("Aborted")
         return
 
-    for annotation in annotations:
-        annotation.target_uri = new
-
-    for docuri in docuris_claimant:
-        docuri.claimant = new
-
-    for docuri in docuris_uri:
-        docuri.uri = new
-
-    if annotations:
-        indexer = BatchIndexer(request.db, request.es, request)
-        ids = [a.id for a in annotations]
-        indexer.index(ids)
-
-    request.db.flush()
+    _move_document_uris(request.db, old, new)
 
     documents = models.Document.find_by_uris(request.db, [new])
     if documents.count() > 1:
@@ -74,33 +83,121 @@ def move_uri(ctx, old, new):
 
     request.tm.commit()
 
+    moved = 0
+    for start in range(0, len(annotation_ids), WINDOW_SIZE):
+        window = annotation_ids[start : start + WINDOW_SIZE]
 
-def _fetch_annotations(session, uri_):
-    return (
-        session.query(models.Annotation)
-        .filter(models.Annotation.target_uri_normalized == uri.normalize(uri_))
-        .all()
+        request.tm.begin()
+        ids = _move_annotations(request.db, window, old, new)
+        _save_pending(request.db, ids)
+        request.tm.commit()
+
+        request.tm.begin()
+        _reindex_pending(request)
+        request.tm.commit()
+
+        moved += len(ids)
+        click.echo("Moved {} of {} annotations".format(moved, len(annotation_ids)))
+
+
+def _fetch_annotation_ids(session, old, new):
+    """Return the IDs of the annotations to move from ``old`` to ``new``."""
+    query = sa.select([_annotation.c.id]).where(
+        sa.and_(
+            _annotation.c.target_uri_normalized == uri.normalize(old),
+            _annotation.c.target_uri.is_distinct_from(new),
+        )
     )
+    return [row.id for row in session.execute(query)]
 
 
-def _fetch_document_uri_claimants(session, uri_):
+def _count_document_uri_claimants(session, uri_):
     return (
         session.query(models.DocumentURI)
         .filter(models.DocumentURI.claimant_normalized == uri.normalize(uri_))
-        .all()
+        .count()
     )
 
 
-def _fetch_document_uri_canonical_self_claim(session, uri_):
+def _count_document_uri_canonical_self_claim(session, uri_):
     return (
         session.query(models.DocumentURI)
         .filter(
             models.DocumentURI.uri_normalized == uri.normalize(uri_),
             models.DocumentURI.type.in_([u"self-claim", u"rel-canonical"]),
         )
-        .all()
+        .count()
+    )
+
+
+def _move_document_uris(session, old, new):
+    old_normalized = uri.normalize(old)
+    new_normalized = uri.normalize(new)
+
+    session.execute(
+        _document_uri.update()
+        .where(_document_uri.c.claimant_normalized == old_normalized)
+        .values(claimant=new, claimant_normalized=new_normalized)
+    )
+    session.execute(
+        _document_uri.update()
+        .where(
+            sa.and_(
+                _document_uri.c.uri_normalized == old_normalized,
+                _document_uri.c.type.in_([u"self-claim", u"rel-canonical"]),
+            )
+        )
+        .values(uri=new, uri_normalized=new_normalized)
     )
 
+    # The ORM doesn't know about the updates above.
+    session.expire_all()
 
-def _fetch_documents(session, uri_):
-    return models.Document.find_by_uris(session, [uri_]).all()
+
+def _move_annotations(session, ids, old, new):
+    """
+    Move the annotations with the given IDs from ``old`` to ``new``.
+
+    Returns the IDs of the annotations that were moved, which excludes any
+    that were changed by someone else in the meantime.
+    """
+    with counts_maintained(session, ids):
+        result = session.execute(
+            _annotation.update()
+            .where(
+                sa.and_(
+                    _annotation.c.id.in_(ids),
+                    _annotation.c.target_uri_normalized == uri.normalize(old),
+                )
+            )
+            .values(target_uri=new, target_uri_normalized=uri.normalize(new))
+            .returning(_annotation.c.id)
+        )
+        moved = [row.id for row in result]
+
+    session.expire_all()
+    return moved
+
+
+def _save_pending(session, ids):
+    if ids:
+        value = json.dumps(ids, ensure_ascii=False)
+        session.merge(models.Setting(key=PENDING_REINDEX_KEY, value=value))
+        session.flush()
+
+
+def _reindex_pending(request):
+    """Reindex the moved annotations that haven't been reindexed yet."""
+    setting = request.db.query(models.Setting).get(PENDING_REINDEX_KEY)
+    if setting is None:
+        return
+
+    indexer = BatchIndexer(request.db, request.es, request)
+    ids = json.loads(setting.value)
+    for _ in range(2):
+        ids = indexer.index(ids)
+        if not ids:
+            break
+
+    request.db.delete(setting)
+    request.db.flush()
@@ -1,135 +1,494 @@
 # -*- coding: utf-8 -*-
 
-from h._compat import xrange
-from collections import namedtuple
+from collections import Counter
+import multiprocessing
 
 import click
+import sqlalchemy as sa
 
 from h import models
+from h._compat import text_type
 from h.models.document import merge_documents
 from h.search import index
+from h.services.public_annotation_count import counts_maintained
 from h.util import uri
 
+#: The number of rows normalized in each transaction.
+BATCH_SIZE = 1000
 
-class Window(namedtuple("Window", ["start", "end"])):
-    pass
+#: The number of URIs handed to each process at a time with ``--jobs``.
+_POOL_CHUNK_SIZE = 100
+
+_document_uri = models.DocumentURI.__table__
+_document_meta = models.DocumentMeta.__table__
+_annotation = models.Annotation.__table__
+
+#: A temporary table holding the new normalized values of a batch of rows.
+#: It's created afresh for each batch by :py:func:`_load_normalized`.
+_normalized = sa.table(
+    "normalized_uri",
+    sa.column("id"),
+    sa.column("claimant_normalized"),
+    sa.column("uri_normalized"),
+)
 
 
 @click.command("normalize-uris")
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Report what would be changed, without changing anything.",
+)
+@click.option(
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of processes to normalize URIs with.",
+)
 @click.pass_context
-def normalize_uris(ctx):
+def normalize_uris(ctx, dry_run, jobs):
     """
     Normalize all URIs in the database and reindex the changed annotations.
+
+    Rows are normalized in batches, each in its own transaction. Progress is
+    checkpointed after each batch, so if the command is interrupted running it
+    again carries on where it left off.
     """
+    # Start the worker processes before connecting to anything, so that they
+    # don't inherit any connections.
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    normalize = _normalizer(pool)
 
     request = ctx.obj["bootstrap"]()
 
-    normalize_document_uris(request)
-    normalize_document_meta(request)
-    normalize_annotations(request)
+    try:
+        stages = [
+            ("document URIs", normalize_document_uris),
+            ("document metadata", normalize_document_meta),
+            ("annotations", normalize_annotations),
+        ]
+        for name, stage in stages:
+            stats = stage(request, normalize=normalize, dry_run=dry_run)
+            click.echo(_report(name, stats, dry_run))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def normalize_document_uris(
+    request, normalize=None, dry_run=False, batch_size=BATCH_SIZE
+):
+    normalize = normalize or _normalizer()
+
+    def normalize_batch(session, start, end):
+        return _normalize_document_uris_batch(session, normalize, start, end)
+
+    stats = _normalize_table(
+        request, _document_uri, normalize_batch, dry_run, batch_size
+    )
 
+    # Documents that share a URI are the same document.
+    stats["documents merged"] += _merge_documents_sharing_uris(request.db)
+    _finish(request, dry_run)
 
-def normalize_document_uris(request):
-    windows = _fetch_windows(request.db, models.DocumentURI.updated)
-    request.tm.commit()
+    return stats
 
-    for window in windows:
-        request.tm.begin()
-        _normalize_document_uris_window(request.db, window)
-        request.tm.commit()
 
+def normalize_document_meta(
+    request, normalize=None, dry_run=False, batch_size=BATCH_SIZE
+):
+    normalize = normalize or _normalizer()
 
-def normalize_document_meta(request):
-    windows = _fetch_windows(request.db, models.DocumentMeta.updated)
-    request.tm.commit()
+    def normalize_batch(session, start, end):
+        return _normalize_document_meta_batch(session, normalize, start, end)
 
-    for window in windows:
-        request.tm.begin()
-        _normalize_document_meta_window(request.db, window)
-        request.tm.commit()
+    return _normalize_table(
+        request, _document_meta, normalize_batch, dry_run, batch_size
+    )
+
+
+def normalize_annotations(
+    request, normalize=None, dry_run=False, batch_size=BATCH_SIZE
+):
+    normalize = normalize or _normalizer()
+    changed_ids = set()
+
+    def normalize_batch(session, start, end):
+        stats, ids = _normalize_annotations_batch(session, normalize, start, end)
+        changed_ids.update(ids)
+        return stats
+
+    def after_commit():
+        # Reindex the annotations once their new URIs are committed.
+        if changed_ids and not dry_run:
+            request.tm.begin()
+            _reindex_annotations(request, set(changed_ids))
+            request.tm.commit()
+        changed_ids.clear()
+
+    return _normalize_table(
+        request,
+        _annotation,
+        normalize_batch,
+        dry_run,
+        batch_size,
+        after_commit=after_commit,
+    )
 
 
-def normalize_annotations(request):
-    windows = _fetch_windows(request.db, models.Annotation.updated)
+def _normalize_table(
+    request, table, normalize_batch, dry_run, batch_size, after_commit=None
+):
+    """
+    Normalize the rows of ``table`` in batches of ``batch_size``.
+
+    Each batch is normalized by ``normalize_batch`` in its own transaction.
+    The ID of the last row of each batch is saved as a checkpoint, which the
+    next run starts from if this one doesn't get to the end of the table.
+    In a dry run every transaction is rolled back and nothing is saved.
+    """
+    checkpoint_key = text_type("normalize_uris.checkpoint.{}").format(table.name)
+    start = None if dry_run else _load_checkpoint(request.db, checkpoint_key)
     request.tm.commit()
 
-    for window in windows:
+    stats = Counter()
+    while True:
         request.tm.begin()
-        ids = _normalize_annotations_window(request.db, window)
-        request.tm.commit()
 
-        request.tm.begin()
-        _reindex_annotations(request, ids)
-        request.tm.commit()
+        query = sa.select([table.c.id]).order_by(table.c.id).limit(batch_size)
+        if start is not None:
+            query = query.where(table.c.id > start)
+        ids = [row.id for row in request.db.execute(query)]
+        if not ids:
+            break
 
+        batch_stats = normalize_batch(request.db, start, ids[-1])
+        start = ids[-1]
 
-def _normalize_document_uris_window(session, window):
-    query = (
-        session.query(models.DocumentURI)
-        .filter(models.DocumentURI.updated.between(window.start, window.end))
-        .order_by(models.DocumentURI.updated.asc())
+        if dry_run:
+            request.tm.abort()
+        else:
+            _save_checkpoint(request.db, checkpoint_key, start)
+            request.tm.commit()
+
+        if after_commit is not None:
+            after_commit()
+        stats.update(batch_stats)
+
+    if not dry_run:
+        _clear_checkpoint(request.db, checkpoint_key)
+    _finish(request, dry_run)
+
+    return stats
+
+
+def _normalize_document_uris_batch(session, normalize, start, end):
+    rows = _fetch_batch(
+        session,
+        _document_uri,
+        [
+            _document_uri.c.claimant,
+            _document_uri.c.claimant_normalized,
+            _document_uri.c.uri,
+            _document_uri.c.uri_normalized,
+        ],
+        start,
+        end,
     )
+    claimants = normalize([row.claimant for row in rows])
+    uris = normalize([row.uri for row in rows])
 
-    for docuri in query:
-        documents = models.Document.find_by_uris(session, [docuri.uri])
-        if documents.count() > 1:
-            merge_documents(session, documents)
-
-        existing = session.query(models.DocumentURI).filter(
-            models.DocumentURI.id != docuri.id,
-            models.DocumentURI.document_id == docuri.document_id,
-            models.DocumentURI.claimant_normalized == uri.normalize(docuri.claimant),
-            models.DocumentURI.uri_normalized == uri.normalize(docuri.uri),
-            models.DocumentURI.type == docuri.type,
-            models.DocumentURI.content_type == docuri.content_type,
+    changed = [
+        {"id": row.id, "claimant_normalized": claimant, "uri_normalized": uri_}
+        for row, claimant, uri_ in zip(rows, claimants, uris)
+        if (claimant, uri_) != (row.claimant_normalized, row.uri_normalized)
+    ]
+
+    stats = Counter()
+    if not changed:
+        return stats
+
+    _load_normalized(session, changed, "integer")
+
+    # Merge the documents whose URIs would clash once they're normalized, so
+    # that the clashing rows belong to the same document...
+    merged = _merge_documents(session, _document_uris_clashing(session))
+    stats["documents merged"] += merged
+
+    # ...then delete the rows that would duplicate another once normalized,
+    # keeping the oldest...
+    deleted = session.execute(
+        sa.text(
+            """
+            DELETE FROM document_uri d
+            USING normalized_uri n
+            WHERE d.id = n.id
+            AND (
+                EXISTS (
+                    SELECT 1 FROM document_uri e
+                    WHERE e.claimant_normalized = n.claimant_normalized
+                    AND e.uri_normalized = n.uri_normalized
+                    AND e.type = d.type
+                    AND e.content_type = d.content_type
+                    AND e.id NOT IN (SELECT id FROM normalized_uri)
+                )
+                OR EXISTS (
+                    SELECT 1 FROM normalized_uri m
+                    JOIN document_uri e ON e.id = m.id
+                    WHERE m.claimant_normalized = n.claimant_normalized
+                    AND m.uri_normalized = n.uri_normalized
+                    AND e.type = d.type
+                    AND e.content_type = d.content_type
+                    AND m.id < n.id
+                )
+            )
+            """
         )
+    ).rowcount
+    stats["duplicates deleted"] += deleted
+
+    # ...and normalize the rest.
+    updated = session.execute(
+        sa.text(
+            """
+            UPDATE document_uri d
+            SET claimant_normalized = n.claimant_normalized,
+                uri_normalized = n.uri_normalized
+            FROM normalized_uri n
+            WHERE d.id = n.id
+            """
+        )
+    ).rowcount
+    stats["normalized"] += updated
 
-        if existing.count() > 0:
-            session.delete(docuri)
-        else:
-            docuri._claimant_normalized = uri.normalize(docuri.claimant)
-            docuri._uri_normalized = uri.normalize(docuri.uri)
+    # The ORM doesn't know about any of the above.
+    session.expire_all()
 
-        session.flush()
+    return stats
 
 
-def _normalize_document_meta_window(session, window):
-    query = (
-        session.query(models.DocumentMeta)
-        .filter(models.DocumentMeta.updated.between(window.start, window.end))
-        .order_by(models.DocumentMeta.updated.asc())
+def _normalize_document_meta_batch(session, normalize, start, end):
+    rows = _fetch_batch(
+        session,
+        _document_meta,
+        [_document_meta.c.claimant, _document_meta.c.claimant_normalized],
+        start,
+        end,
     )
+    claimants = normalize([row.claimant for row in rows])
 
-    for docmeta in query:
-        existing = session.query(models.DocumentMeta).filter(
-            models.DocumentMeta.id != docmeta.id,
-            models.DocumentMeta.claimant_normalized == uri.normalize(docmeta.claimant),
-            models.DocumentMeta.type == docmeta.type,
+    changed = [
+        {"id": row.id, "claimant_normalized": claimant, "uri_normalized": None}
+        for row, claimant in zip(rows, claimants)
+        if claimant != row.claimant_normalized
+    ]
+
+    stats = Counter()
+    if not changed:
+        return stats
+
+    _load_normalized(session, changed, "integer")
+
+    deleted = session.execute(
+        sa.text(
+            """
+            DELETE FROM document_meta d
+            USING normalized_uri n
+            WHERE d.id = n.id
+            AND (
+                EXISTS (
+                    SELECT 1 FROM document_meta e
+                    WHERE e.claimant_normalized = n.claimant_normalized
+                    AND e.type = d.type
+                    AND e.id NOT IN (SELECT id FROM normalized_uri)
+                )
+                OR EXISTS (
+                    SELECT 1 FROM normalized_uri m
+                    JOIN document_meta e ON e.id = m.id
+                    WHERE m.claimant_normalized = n.claimant_normalized
+                    AND e.type = d.type
+                    AND m.id < n.id
+                )
+            )
+            """
+        )
+    ).rowcount
+    stats["duplicates deleted"] += deleted
+
+    updated = session.execute(
+        sa.text(
+            """
+            UPDATE document_meta d
+            SET claimant_normalized = n.claimant_normalized
+            FROM normalized_uri n
+            WHERE d.id = n.id
+            """
         )
+    ).rowcount
+    stats["normalized"] += updated
 
-        if existing.count() > 0:
-            session.delete(docmeta)
-        else:
-            docmeta._claimant_normalized = uri.normalize(docmeta.claimant)
+    session.expire_all()
+
+    return stats
+
+
+def _normalize_annotations_batch(session, normalize, start, end):
+    rows = _fetch_batch(
+        session,
+        _annotation,
+        [_annotation.c.target_uri, _annotation.c.target_uri_normalized],
+        start,
+        end,
+    )
+    rows = [row for row in rows if row.target_uri is not None]
+    uris = normalize([row.target_uri for row in rows])
+
+    changed = [
+        {"id": row.id, "claimant_normalized": "", "uri_normalized": uri_}
+        for row, uri_ in zip(rows, uris)
+        if uri_ != row.target_uri_normalized
+    ]
+
+    stats = Counter()
+    if not changed:
+        return stats, set()
+
+    _load_normalized(session, changed, "uuid", id_type=_annotation.c.id.type)
+
+    ids = {row["id"] for row in changed}
+    with counts_maintained(session, ids):
+        updated = session.execute(
+            sa.text(
+                """
+                UPDATE annotation a
+                SET target_uri_normalized = n.uri_normalized
+                FROM normalized_uri n
+                WHERE a.id = n.id
+                """
+            )
+        ).rowcount
+    stats["normalized"] += updated
+
+    session.expire_all()
+
+    return stats, ids
+
+
+def _fetch_batch(session, table, columns, start, end):
+    query = sa.select([table.c.id] + columns).where(table.c.id <= end)
+    if start is not None:
+        query = query.where(table.c.id > start)
+    return session.execute(query).fetchall()
+
+
+def _load_normalized(session, rows, id_ddl, id_type=None):
+    """Load the new normalized values of ``rows`` into a temporary table."""
+    session.execute("DROP TABLE IF EXISTS pg_temp.normalized_uri")
+    session.execute(
+        "CREATE TEMPORARY TABLE normalized_uri ("
+        "id {} PRIMARY KEY, "
+        "claimant_normalized text, "
+        "uri_normalized text"
+        ") ON COMMIT DROP".format(id_ddl)
+    )
+
+    table = _normalized
+    if id_type is not None:
+        table = sa.table(
+            "normalized_uri",
+            sa.column("id", id_type),
+            sa.column("claimant_normalized"),
+            sa.column("uri_normalized"),
+        )
+    session.execute(table.insert().values(rows))
+    session.execute("ANALYZE normalized_uri")
 
-        session.flush()
+
+def _document_uris_clashing(session):
+    """
+    Return pairs of IDs of documents with URIs that clash once normalized.
+
+    Two document URIs clash if they'd have the same values for all of the
+    columns of the ``document_uri`` table's unique constraint.
+    """
+    return session.execute(
+        sa.text(
+            """
+            SELECT DISTINCT d.document_id, e.document_id
+            FROM normalized_uri n
+            JOIN document_uri d ON d.id = n.id
+            JOIN document_uri e
+                ON e.claimant_normalized = n.claimant_normalized
+                AND e.uri_normalized = n.uri_normalized
+                AND e.type = d.type
+                AND e.content_type = d.content_type
+            WHERE e.document_id != d.document_id
+            AND e.id NOT IN (SELECT id FROM normalized_uri)
+
+            UNION
+
+            SELECT DISTINCT d.document_id, e.document_id
+            FROM normalized_uri n
+            JOIN document_uri d ON d.id = n.id
+            JOIN normalized_uri m
+                ON m.claimant_normalized = n.claimant_normalized
+                AND m.uri_normalized = n.uri_normalized
+                AND m.id != n.id
+            JOIN document_uri e
+                ON e.id = m.id
+                AND e.type = d.type
+                AND e.content_type = d.content_type
+            WHERE e.document_id != d.document_id
+            """
+        )
+    ).fetchall()
 
 
-def _normalize_annotations_window(session, window):
-    query = (
-        session.query(models.Annotation)
-        .filter(models.Annotation.updated.between(window.start, window.end))
-        .order_by(models.Annotation.updated.asc())
+def _merge_documents_sharing_uris(session):
+    """Merge all documents which have a normalized URI in common."""
+    rows = session.execute(
+        sa.select(
+            [
+                _document_uri.c.uri_normalized,
+                sa.func.array_agg(sa.distinct(_document_uri.c.document_id)),
+            ]
+        )
+        .group_by(_document_uri.c.uri_normalized)
+        .having(sa.func.count(sa.distinct(_document_uri.c.document_id)) > 1)
     )
 
-    ids = set()
-    for a in query:
-        normalized = uri.normalize(a.target_uri)
-        if normalized != a.target_uri_normalized:
-            a._target_uri_normalized = normalized
-            ids.add(a.id)
+    pairs = []
+    for _, document_ids in rows:
+        pairs.extend((document_ids[0], other) for other in document_ids[1:])
+
+    return _merge_documents(session, pairs)
+
+
+def _merge_documents(session, pairs):
+    """
+    Merge each group of documents linked by the given pairs of IDs.
+
+    Returns the number of documents merged away.
+    """
+    groups = {}
+    for a, b in pairs:
+        group = groups.get(a, {a}) | groups.get(b, {b})
+        for document_id in group:
+            groups[document_id] = group
+
+    merged = 0
+    for group in {frozenset(group) for group in groups.values()}:
+        documents = (
+            session.query(models.Document)
+            .filter(models.Document.id.in_(group))
+            .order_by(models.Document.id)
+            .all()
+        )
+        merge_documents(session, documents)
+        merged += len(documents) - 1
 
-    return ids
+    return merged
 
 
 def _reindex_annotations(request, ids):
@@ -141,20 +500,56 @@ def _reindex_annotations(request, ids):
             break
 
 
-def _fetch_windows(session, column, chunksize=100):
-    updated = (
-        session.query(column)
-        .execution_options(stream_results=True)
-        .order_by(column.desc())
-        .all()
-    )
+def _normalizer(pool=None):
+    """
+    Return a function that normalizes a list of URIs.
 
-    count = len(updated)
-    windows = [
-        Window(
-            start=updated[min(x + chunksize, count) - 1].updated, end=updated[x].updated
-        )
-        for x in xrange(0, count, chunksize)
-    ]
+    The URIs are normalized with :py:func:`h.util.uri.normalize_many`, which
+    normalizes each distinct URI in a batch once without filling the
+    application's URI cache. If a process pool is given the work is split
+    between its processes.
+    """
+    if pool is None:
+        return uri.normalize_many
+
+    def normalize(uristrs):
+        uristrs = list(uristrs)
+        chunks = [
+            uristrs[i : i + _POOL_CHUNK_SIZE]
+            for i in range(0, len(uristrs), _POOL_CHUNK_SIZE)
+        ]
+        return [u for chunk in pool.map(uri.normalize_many, chunks) for u in chunk]
+
+    return normalize
+
+
+def _load_checkpoint(session, key):
+    setting = session.query(models.Setting).get(key)
+    if setting is None:
+        return None
+    return setting.value
 
-    return windows
+
+def _save_checkpoint(session, key, value):
+    session.merge(models.Setting(key=key, value=text_type(value)))
+    session.flush()
+
+
+def _clear_checkpoint(session, key):
+    session.query(models.Setting).filter_by(key=key).delete()
+
+
+def _finish(request, dry_run):
+    if dry_run:
+        request.tm.abort()
+    else:
+        request.tm.commit()
+    request.tm.begin()
+
+
+def _report(name, stats, dry_run):
+    counts = ", ".join(
+        "{} {}".format(count, label) for label, count in sorted(stats.items())
+    )
+    prefix = "Would have changed" if dry_run else "Changed"
+    return "{} {}: {}".format(prefix, name, counts or "nothing to do")
@@ -110,6 +110,13 @@ def configure(environ=None, settings=None):
     # Where should logged-out users visiting the homepage be redirected?
     settings_manager.set("h.homepage_redirect_url", "HOMEPAGE_REDIRECT_URL")
     settings_manager.set("h.proxy_auth", "PROXY_AUTH", type_=asbool)
+    # How the periodic purge tasks remove expired and deleted rows (see
+    # h.tasks.cleanup).
+    settings_manager.set("h.purge.batch_size", "PURGE_BATCH_SIZE", type_=int)
+    settings_manager.set("h.purge.batch_interval", "PURGE_BATCH_INTERVAL", type_=float)
+    settings_manager.set("h.purge.time_budget", "PURGE_TIME_BUDGET", type_=float)
+    # Share cached users and groups between requests (see h.util.cache).
+    settings_manager.set("h.shared_cache", "SHARED_CACHE", type_=asbool)
     # Sentry DSNs for frontend code should be of the public kind, lacking the
     # password component in the DSN URI.
     settings_manager.set("h.sentry_dsn_client", "SENTRY_DSN_CLIENT")
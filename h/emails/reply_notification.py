@@ -18,6 +18,60 @@ def generate(request, notification):
 
     :returns: a 4-element tuple containing: recipients, subject, text, html
     """
+    context = _reply_context(request, notification)
+
+    subject = "{user} has replied to your annotation".format(
+        user=context["reply_user_display_name"]
+    )
+    text = render(
+        "h:templates/emails/reply_notification.txt.jinja2", context, request=request
+    )
+    html = render(
+        "h:templates/emails/reply_notification.html.jinja2", context, request=request
+    )
+
+    return [notification.parent_user.email], subject, text, html
+
+
+def generate_digest(request, notifications):
+    """
+    Generate a single email for several reply notifications to the same user.
+
+    :param request: the current request
+    :type request: pyramid.request.Request
+    :param notifications: the reply notifications, which all have the same
+        ``parent_user``
+    :type notifications: list of h.notifications.reply.Notification
+
+    :returns: a 4-element tuple containing: recipients, subject, text, html
+    """
+    parent_user = notifications[0].parent_user
+    replies = [_reply_context(request, n) for n in notifications]
+
+    context = {
+        "parent_user_display_name": replies[0]["parent_user_display_name"],
+        "replies": replies,
+        "unsubscribe_url": replies[0]["unsubscribe_url"],
+    }
+
+    subject = "You have {count} new replies to your annotations".format(
+        count=len(replies)
+    )
+    text = render(
+        "h:templates/emails/reply_notification_digest.txt.jinja2",
+        context,
+        request=request,
+    )
+    html = render(
+        "h:templates/emails/reply_notification_digest.html.jinja2",
+        context,
+        request=request,
+    )
+
+    return [parent_user.email], subject, text, html
+
+
+def _reply_context(request, notification):
     document_title = notification.document.title
     if not document_title:
         document_title = notification.parent.target_uri
@@ -43,7 +97,7 @@ def generate(request, notification):
     if notification.parent_user.authority != request.default_authority:
         parent_user_url = None
 
-    context = {
+    return {
         "document_title": document_title,
         "document_url": notification.parent.target_uri,
         "parent": notification.parent,
@@ -56,18 +110,6 @@ def generate(request, notification):
         "unsubscribe_url": unsubscribe_url,
     }
 
-    subject = "{user} has replied to your annotation".format(
-        user=reply_user_display_name
-    )
-    text = render(
-        "h:templates/emails/reply_notification.txt.jinja2", context, request=request
-    )
-    html = render(
-        "h:templates/emails/reply_notification.html.jinja2", context, request=request
-    )
-
-    return [notification.parent_user.email], subject, text, html
-
 
 def _unsubscribe_token(request, user):
     serializer = request.registry.notification_serializer
@@ -19,6 +19,25 @@ def _get_subscribers(registry, event):
     return registry.adapters.subscriptions([providedBy(event)], None)
 
 
+class batched(object):
+    """
+    Mark an event subscriber as one which handles many events at once.
+
+    The decorated function takes a list of events instead of a single event.
+    When events are published by :py:class:`EventQueue` it's called once with
+    all of the queued events of each type that it subscribes to. When it's
+    notified of an event any other way it's called with just that event.
+    """
+
+    def __init__(self, subscriber):
+        self.batch = subscriber
+
+    # This takes ``*events`` rather than a single ``event`` so that Pyramid
+    # registers the subscriber itself, rather than a wrapper around it.
+    def __call__(self, *events, **kwargs):
+        return self.batch(list(events), **kwargs)
+
+
 class EventQueue(object):
     """
     EventQueue enables dispatching Pyramid events at the end of a request.
@@ -29,41 +48,67 @@ class EventQueue(object):
     `request.registry.notify` during a request, failures will not cause a
     database transaction rollback.
 
-    Events are dispatched in the order they are queued. Failure of one
-    event subscriber does not affect execution of other subscribers.
+    Events are dispatched in the order they are queued, except that
+    :py:class:`batched` subscribers are called after the other subscribers,
+    once for all of the queued events of each type. Failure of one event
+    subscriber does not affect execution of other subscribers.
     """
 
     def __init__(self, request):
         self.request = request
         self.queue = collections.deque()
 
+        # The subscribers to each type of event, so that they're only looked
+        # up once per type however many events are published.
+        self._subscribers = {}
+
         request.add_response_callback(self.response_callback)
 
     def __call__(self, event):
         self.queue.append(event)
 
     def publish_all(self):
-        while True:
-            try:
-                event = self.queue.popleft()
-            except IndexError:
-                break
-
-            # Get subscribers to event and invoke them. The normal way to do
-            # this in Pyramid is to invoke `registry.notify`, but that provides
-            # no guarantee about the order of execution and any failure causes
-            # later subscribers not to run.
-            #
-            # Here we wrap each subscriber call in an exception handler to
-            # make failure independent in non-debug environments.
-            subscribers = _get_subscribers(self.request.registry, event)
-            for subscriber in subscribers:
+        # Subscribers may queue further events, which are published in turn.
+        while self.queue:
+            batches = collections.OrderedDict()
+
+            while True:
                 try:
-                    subscriber(event)
-                except Exception:
-                    if event.request.debug:
-                        raise
-                    report_exception()
+                    event = self.queue.popleft()
+                except IndexError:
+                    break
+
+                # Get subscribers to event and invoke them. The normal way to
+                # do this in Pyramid is to invoke `registry.notify`, but that
+                # provides no guarantee about the order of execution and any
+                # failure causes later subscribers not to run.
+                for subscriber in self._get_subscribers(event):
+                    if isinstance(subscriber, batched):
+                        key = (subscriber, type(event))
+                        batches.setdefault(key, []).append(event)
+                    else:
+                        self._invoke(subscriber, event, event.request)
+
+            for (subscriber, _), events in batches.items():
+                self._invoke(subscriber.batch, events, events[0].request)
+
+    def _get_subscribers(self, event):
+        event_type = type(event)
+        if event_type not in self._subscribers:
+            self._subscribers[event_type] = _get_subscribers(
+                self.request.registry, event
+            )
+        return self._subscribers[event_type]
+
+    def _invoke(self, subscriber, arg, request):
+        # Wrap each subscriber call in an exception handler to make failure
+        # independent in non-debug environments.
+        try:
+            subscriber(arg)
+        except Exception:
+            if request.debug:
+                raise
+            report_exception()
 
     def response_callback(self, request, response):
         if request.exception is not None:
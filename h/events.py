@@ -11,6 +11,19 @@ class AnnotationEvent(object):
         self.action = action
 
 
+class AnnotationsDeletedEvent(object):
+    """
+    An event representing the bulk deletion of many annotations at once.
+
+    Unlike deleting annotations one at a time this doesn't notify the
+    annotations' realtime subscribers.
+    """
+
+    def __init__(self, request, annotation_ids):
+        self.request = request
+        self.annotation_ids = annotation_ids
+
+
 class AnnotationTransformEvent(object):
 
     """
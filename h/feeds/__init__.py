@@ -4,7 +4,18 @@
 
 from __future__ import unicode_literals
 
+from h.feeds.render import atom_entries
 from h.feeds.render import render_atom
+from h.feeds.render import render_atom_entries
 from h.feeds.render import render_rss
+from h.feeds.render import render_rss_entries
+from h.feeds.render import rss_entries
 
-__all__ = ("render_atom", "render_rss")
+__all__ = (
+    "atom_entries",
+    "render_atom",
+    "render_atom_entries",
+    "render_rss",
+    "render_rss_entries",
+    "rss_entries",
+)
@@ -74,18 +74,47 @@ def feed_from_annotations(
     :rtype: dict
 
     """
-    annotations = [presenters.AnnotationHTMLPresenter(a) for a in annotations]
+    entries = entries_from_annotations(annotations, annotation_url, annotation_api_url)
+    updated = annotations[0].updated if annotations else None
+    return feed_from_entries(
+        entries,
+        atom_url,
+        updated=updated,
+        html_url=html_url,
+        title=title,
+        subtitle=subtitle,
+    )
 
-    links = [{"rel": "self", "type": "application/atom+xml", "href": atom_url}]
 
-    if html_url:
-        links.append({"rel": "alternate", "type": "text/html", "href": html_url})
+def entries_from_annotations(annotations, annotation_url, annotation_api_url=None):
+    """Return the Atom feed entries for the given list of annotations.
+
+    :rtype: list of dicts
 
-    entries = [
+    """
+    annotations = [presenters.AnnotationHTMLPresenter(a) for a in annotations]
+    return [
         _feed_entry_from_annotation(a, annotation_url, annotation_api_url)
         for a in annotations
     ]
 
+
+def feed_from_entries(
+    entries, atom_url, updated=None, html_url=None, title=None, subtitle=None
+):
+    """Return an Atom feed of entries from :py:func:`entries_from_annotations`.
+
+    :param updated: when the newest annotation in the feed was last updated
+    :type updated: datetime.datetime
+
+    :rtype: dict
+
+    """
+    links = [{"rel": "self", "type": "application/atom+xml", "href": atom_url}]
+
+    if html_url:
+        links.append({"rel": "alternate", "type": "text/html", "href": html_url})
+
     feed = {
         "id": atom_url,
         "title": title or _("Hypothesis Stream"),
@@ -94,7 +123,7 @@ def feed_from_annotations(
         "links": links,
     }
 
-    if annotations:
-        feed["updated"] = _utc_iso8601_string(annotations[0].updated)
+    if updated is not None:
+        feed["updated"] = _utc_iso8601_string(updated)
 
     return feed
@@ -25,6 +25,26 @@ def render_atom(request, annotations, atom_url, html_url, title, subtitle):
 
     :rtype: pyramid.response.Response
 
+    """
+    return render_atom_entries(
+        request=request,
+        entries=atom_entries(request, annotations),
+        updated=annotations[0].updated if annotations else None,
+        atom_url=atom_url,
+        html_url=html_url,
+        title=title,
+        subtitle=subtitle,
+    )
+
+
+def atom_entries(request, annotations):
+    """Return the Atom feed entries for the given annotations.
+
+    The entries can be rendered, along with entries for other annotations,
+    with :py:func:`render_atom_entries`.
+
+    :rtype: list of dicts
+
     """
 
     def annotation_url(annotation):
@@ -35,11 +55,27 @@ def render_atom(request, annotations, atom_url, html_url, title, subtitle):
         """Return the JSON API URL for the given annotation."""
         return request.route_url("api.annotation", id=annotation.id)
 
-    feed = atom.feed_from_annotations(
-        annotations=annotations,
-        atom_url=atom_url,
-        annotation_url=annotation_url,
-        annotation_api_url=annotation_api_url,
+    return atom.entries_from_annotations(
+        annotations, annotation_url, annotation_api_url
+    )
+
+
+def render_atom_entries(request, entries, updated, atom_url, html_url, title, subtitle):
+    """Return a rendered Atom feed of entries from :py:func:`atom_entries`.
+
+    :param updated: When the newest annotation in the feed was last updated,
+        or None if the feed is empty
+    :type updated: datetime.datetime
+
+    The other params are as for :py:func:`render_atom`.
+
+    :rtype: pyramid.response.Response
+
+    """
+    feed = atom.feed_from_entries(
+        entries,
+        atom_url,
+        updated=updated,
         html_url=html_url,
         title=title,
         subtitle=subtitle,
@@ -72,19 +108,51 @@ def render_rss(request, annotations, rss_url, html_url, title, description):
 
     :rtype: pyramid.response.Response
 
+    """
+    return render_rss_entries(
+        request=request,
+        entries=rss_entries(request, annotations),
+        updated=annotations[0].updated if annotations else None,
+        rss_url=rss_url,
+        html_url=html_url,
+        title=title,
+        description=description,
+    )
+
+
+def rss_entries(request, annotations):
+    """Return the RSS feed items for the given annotations.
+
+    The items can be rendered, along with items for other annotations, with
+    :py:func:`render_rss_entries`.
+
+    :rtype: list of dicts
+
     """
 
     def annotation_url(annotation):
         """Return the HTML permalink URL for the given annotation."""
         return request.route_url("annotation", id=annotation.id)
 
-    feed = rss.feed_from_annotations(
-        annotations=annotations,
-        annotation_url=annotation_url,
-        rss_url=rss_url,
-        html_url=html_url,
-        title=title,
-        description=description,
+    return rss.entries_from_annotations(annotations, annotation_url)
+
+
+def render_rss_entries(
+    request, entries, updated, rss_url, html_url, title, description
+):
+    """Return a rendered RSS feed of items from :py:func:`rss_entries`.
+
+    :param updated: When the newest annotation in the feed was last updated,
+        or None if the feed is empty
+    :type updated: datetime.datetime
+
+    The other params are as for :py:func:`render_rss`.
+
+    :rtype: pyramid.response.Response
+
+    """
+    feed = rss.feed_from_entries(
+        entries, updated, rss_url, html_url, title, description
     )
 
     response = renderers.render_to_response(
@@ -59,9 +59,35 @@ def feed_from_annotations(
         feed to XML (including a list of dicts for the feed's items).
     :rtype: dict
 
+    """
+    entries = entries_from_annotations(annotations, annotation_url)
+    updated = annotations[0].updated if annotations else None
+    return feed_from_entries(entries, updated, rss_url, html_url, title, description)
+
+
+def entries_from_annotations(annotations, annotation_url):
+    """Return the RSS feed items for the given list of annotations.
+
+    :rtype: list of dicts
+
     """
     annotations = [presenters.AnnotationHTMLPresenter(a) for a in annotations]
+    return [
+        _feed_item_from_annotation(annotation, annotation_url)
+        for annotation in annotations
+    ]
+
 
+def feed_from_entries(entries, updated, rss_url, html_url, title, description):
+    """Return an RSS feed of items from :py:func:`entries_from_annotations`.
+
+    :param updated: when the newest annotation in the feed was last updated,
+        or None if the feed is empty
+    :type updated: datetime.datetime
+
+    :rtype: dict
+
+    """
     feed = {
         "title": title,
         "rss_url": rss_url,
@@ -69,13 +95,10 @@ def feed_from_annotations(
         "description": description,
         # This is called entries not items so as not to clash with the dict's
         # standard .items() method.
-        "entries": [
-            _feed_item_from_annotation(annotation, annotation_url)
-            for annotation in annotations
-        ],
+        "entries": entries,
     }
 
-    if annotations:
-        feed["pubDate"] = _pubdate_string(annotations[0].updated)
+    if updated is not None:
+        feed["pubDate"] = _pubdate_string(updated)
 
     return feed
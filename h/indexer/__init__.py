@@ -10,3 +10,7 @@ def includeme(config):
     config.add_subscriber(
         "h.indexer.subscribers.subscribe_annotation_event", "h.events.AnnotationEvent"
     )
+    config.add_subscriber(
+        "h.indexer.subscribers.subscribe_annotations_deleted_event",
+        "h.events.AnnotationsDeletedEvent",
+    )
@@ -1,11 +1,37 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
-from h.tasks.indexer import add_annotation, delete_annotation
+from collections import OrderedDict
 
+from h.eventqueue import batched
+from h.tasks.indexer import add_annotations, delete_annotations
 
-def subscribe_annotation_event(event):
-    if event.action in ["create", "update"]:
-        add_annotation.delay(event.annotation_id)
-    elif event.action == "delete":
-        delete_annotation.delay(event.annotation_id)
+#: The number of annotation IDs sent to each bulk indexing task.
+CHUNK_SIZE = 1000
+
+
+@batched
+def subscribe_annotation_event(events):
+    # Only the last thing that happened to each annotation matters.
+    actions = OrderedDict()
+    for event in events:
+        actions.pop(event.annotation_id, None)
+        actions[event.annotation_id] = event.action
+
+    added = [id_ for id_, action in actions.items() if action in ["create", "update"]]
+    deleted = [id_ for id_, action in actions.items() if action == "delete"]
+
+    for chunk in _chunks(added):
+        add_annotations.delay(chunk)
+    for chunk in _chunks(deleted):
+        delete_annotations.delay(chunk)
+
+
+def subscribe_annotations_deleted_event(event):
+    for chunk in _chunks(event.annotation_ids):
+        delete_annotations.delay(chunk)
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start : start + CHUNK_SIZE]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Add the public_annotation_count table and fill it in"""
+from __future__ import unicode_literals
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "3a9e6c7d1b2f"
+down_revision = "8bd83598ad77"
+
+
+def upgrade():
+    op.create_table(
+        "public_annotation_count",
+        sa.Column("uri_normalized", sa.UnicodeText(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), server_default="0", nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint(
+            "uri_normalized", "shard", name=op.f("pk__public_annotation_count")
+        ),
+    )
+
+    op.execute(
+        """
+        INSERT INTO public_annotation_count (uri_normalized, count)
+        SELECT a.target_uri_normalized, count(*)
+        FROM annotation a
+        WHERE a.target_uri_normalized IS NOT NULL
+          AND a.deleted IS false
+          AND a.shared IS true
+          AND a.groupid IN (SELECT pubid FROM "group" WHERE readable_by = 'world')
+          AND NOT EXISTS (
+            SELECT 1 FROM annotation_moderation m WHERE m.annotation_id = a.id
+          )
+          AND a.userid NOT IN (
+            SELECT concat('acct:', username, '@', authority)
+            FROM "user" WHERE nipsa IS true
+          )
+        GROUP BY a.target_uri_normalized
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("public_annotation_count")
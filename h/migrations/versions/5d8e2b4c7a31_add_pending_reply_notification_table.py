@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Add the pending_reply_notification table"""
+from __future__ import unicode_literals
+
+from alembic import op
+import sqlalchemy as sa
+
+from h.db import types
+
+
+revision = "5d8e2b4c7a31"
+down_revision = "7c2f5a1e9d04"
+
+
+def upgrade():
+    op.create_table(
+        "pending_reply_notification",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("annotation_id", types.URLSafeUUID, nullable=False),
+        sa.ForeignKeyConstraint(
+            ["annotation_id"],
+            ["annotation.id"],
+            name=op.f("fk__pending_reply_notification__annotation_id__annotation"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk__pending_reply_notification")),
+        sa.UniqueConstraint(
+            "annotation_id", name=op.f("uq__pending_reply_notification__annotation_id")
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("pending_reply_notification")
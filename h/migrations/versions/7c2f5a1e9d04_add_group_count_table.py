@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Add the group_count table and fill it in"""
+from __future__ import unicode_literals
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "7c2f5a1e9d04"
+down_revision = "3a9e6c7d1b2f"
+
+
+def upgrade():
+    op.create_table(
+        "group_count",
+        sa.Column("group_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), server_default="0", nullable=False),
+        sa.Column("member_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("annotation_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "shared_annotation_count", sa.Integer(), server_default="0", nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["group_id"],
+            ["group.id"],
+            name=op.f("fk__group_count__group_id__group"),
+            ondelete="cascade",
+        ),
+        sa.PrimaryKeyConstraint("group_id", "shard", name=op.f("pk__group_count")),
+    )
+
+    op.execute(
+        """
+        INSERT INTO group_count
+            (group_id, member_count, annotation_count, shared_annotation_count)
+        SELECT
+            g.id,
+            coalesce(m.count, 0),
+            coalesce(a.count, 0),
+            coalesce(a.shared_count, 0)
+        FROM "group" g
+        LEFT JOIN (
+            SELECT group_id, count(*) AS count
+            FROM user_group
+            GROUP BY group_id
+        ) m ON m.group_id = g.id
+        LEFT JOIN (
+            SELECT
+                groupid,
+                count(*) AS count,
+                count(*) FILTER (
+                    WHERE shared IS true
+                      AND coalesce(array_length("references", 1), 0) = 0
+                      AND NOT EXISTS (
+                          SELECT 1 FROM annotation_moderation am
+                          WHERE am.annotation_id = annotation.id
+                      )
+                      AND userid NOT IN (
+                          SELECT concat('acct:', username, '@', authority)
+                          FROM "user"
+                          WHERE nipsa IS true
+                      )
+                ) AS shared_count
+            FROM annotation
+            WHERE deleted IS false
+            GROUP BY groupid
+        ) a ON a.groupid = g.pubid
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("group_count")
@@ -70,8 +70,10 @@ def _fill_annotation_window_text_rendered(session, window):
         .order_by(Annotation.updated.asc())
     )
 
-    for a in query:
-        a.text_rendered = markdown.render(a.text)
+    annotations = query.all()
+    rendered = markdown.render_many([a.text for a in annotations])
+    for a, text_rendered in zip(annotations, rendered):
+        a.text_rendered = text_rendered
 
 
 def _fetch_windows(session, chunksize=100):
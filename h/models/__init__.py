@@ -31,8 +31,11 @@ from h.models.feature import Feature
 from h.models.feature_cohort import FeatureCohort
 from h.models.flag import Flag
 from h.models.group import Group
+from h.models.group_count import GroupCount
 from h.models.organization import Organization
+from h.models.pending_reply_notification import PendingReplyNotification
 from h.models.group_scope import GroupScope
+from h.models.public_annotation_count import PublicAnnotationCount
 from h.models.setting import Setting
 from h.models.subscriptions import Subscriptions
 from h.models.token import Token
@@ -54,8 +57,11 @@ __all__ = (
     "FeatureCohort",
     "Flag",
     "Group",
+    "GroupCount",
     "GroupScope",
     "Organization",
+    "PendingReplyNotification",
+    "PublicAnnotationCount",
     "Setting",
     "Subscriptions",
     "Token",
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import re
+
 import sqlalchemy as sa
-from sqlalchemy.sql import expression
 
 from h.db import Base
+from h.util.cache import VersionedCache, publish_version
+
+#: The compiled blocklist, shared by all requests handled by this process and
+#: reloaded when :py:meth:`Blocklist.changed` is called in any process.
+_matcher_cache = VersionedCache("blocklist", maxsize=1, ttl=300)
 
 
 class Blocklist(Base):
@@ -26,5 +32,80 @@ class Blocklist(Base):
     @classmethod
     def is_blocked(cls, session, uri):
         """Return True if the given URI is blocked."""
-        uri_matches = expression.literal(uri).like(cls.uri)
-        return session.query(cls).filter(uri_matches).count() > 0
+        return cls.matcher(session).matches(uri)
+
+    @classmethod
+    def matcher(cls, session):
+        """Return a :py:class:`BlocklistMatcher` for the current blocklist."""
+        _matcher_cache.check_version(session)
+
+        matcher = _matcher_cache.get("matcher")
+        if matcher is None:
+            matcher = BlocklistMatcher(uri for (uri,) in session.query(cls.uri))
+            _matcher_cache.set("matcher", matcher)
+
+        return matcher
+
+    @staticmethod
+    def changed(session):
+        """Make every process reload the blocklist after it has been edited."""
+        publish_version(session, "blocklist")
+
+
+class BlocklistMatcher(object):
+
+    """
+    Match URIs against blocklist patterns without querying the database.
+
+    The patterns have the same syntax as SQL ``LIKE`` patterns: ``%`` matches
+    any sequence of characters, ``_`` matches any single character and a
+    backslash escapes the character after it. Patterns without wildcards are
+    looked up in a set and the rest are combined into a single regex.
+    """
+
+    def __init__(self, patterns):
+        self._exact = set()
+        regexes = []
+
+        for pattern in patterns:
+            regex, is_exact = _like_to_regex(pattern)
+            if is_exact:
+                self._exact.add(_unescape(pattern))
+            else:
+                regexes.append(regex)
+
+        if regexes:
+            self._regex = re.compile("(?:{})\\Z".format("|".join(regexes)), re.DOTALL)
+        else:
+            self._regex = None
+
+    def matches(self, uri):
+        """Return True if ``uri`` matches any of the patterns."""
+        if uri in self._exact:
+            return True
+        return self._regex is not None and self._regex.match(uri) is not None
+
+
+def _like_to_regex(pattern):
+    """Return the regex for a ``LIKE`` pattern and whether it has no wildcards."""
+    parts = []
+    is_exact = True
+    chars = iter(pattern)
+
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            parts.append(".*")
+            is_exact = False
+        elif char == "_":
+            parts.append(".")
+            is_exact = False
+        else:
+            parts.append(re.escape(char))
+
+    return "".join(parts), is_exact
+
+
+def _unescape(pattern):
+    return re.sub(r"\\(.)", r"\1", pattern, flags=re.DOTALL)
@@ -2,6 +2,7 @@
 
 from __future__ import unicode_literals
 
+from collections import OrderedDict
 from datetime import datetime
 import logging
 
@@ -112,7 +113,7 @@ class Document(Base, mixins.Timestamps):
         finduris = [claimant_uri] + uris
         documents = cls.find_by_uris(session, finduris)
 
-        if documents.count() == 0:
+        if documents.first() is None:
             doc = Document(created=created, updated=updated)
             DocumentURI(
                 document=doc,
@@ -228,11 +229,15 @@ class DocumentMeta(Base, mixins.Timestamps):
         return "<DocumentMeta %s>" % self.id
 
 
-def create_or_update_document_uri(
-    session, claimant, uri, type, content_type, document, created, updated
+def create_or_update_document_uris(
+    session, document_uri_dicts, document, created, updated
 ):
     """
-    Create or update a DocumentURI with the given parameters.
+    Create or update the DocumentURIs described by the given dicts.
+
+    All of the DocumentURIs are written with a single ``INSERT ... ON CONFLICT
+    DO UPDATE`` statement against the unique constraint on
+    ``(claimant_normalized, uri_normalized, type, content_type)``.
 
     If an equivalent DocumentURI already exists in the database then its
     updated time will be updated.
@@ -248,75 +253,84 @@ def create_or_update_document_uri(
     :param session: the database session
     :type session: sqlalchemy.orm.session.Session
 
-    :param claimant: the .claimant property of the DocumentURI
-    :type claimant: unicode
-
-    :param uri: the .uri property of the DocumentURI
-    :type uri: unicode
-
-    :param type: the .type property of the DocumentURI
-    :type type: unicode
-
-    :param content_type: the .content_type property of the DocumentURI
-    :type content_type: unicode
+    :param document_uri_dicts: dicts with the ``claimant``, ``uri``, ``type``
+        and ``content_type`` of each DocumentURI
+    :type document_uri_dicts: list of dicts
 
-    :param document: the Document that the new DocumentURI will belong to, if a
-        new DocumentURI is created
+    :param document: the Document that new DocumentURIs will belong to
     :type document: h.models.Document
 
-    :param created: the time that will be used as the .created time for the new
-        DocumentURI, if a new one is created
+    :param created: the time that will be used as the .created time for new
+        DocumentURIs
     :type created: datetime.datetime
 
     :param updated: the time that will be set as the .updated time for the new
-        or existing DocumentURI
+        or existing DocumentURIs
     :type updated: datetime.datetime
 
     """
-    docuri = (
-        session.query(DocumentURI)
-        .filter(
-            DocumentURI.claimant_normalized == uri_normalize(claimant),
-            DocumentURI.uri_normalized == uri_normalize(uri),
-            DocumentURI.type == type,
-            DocumentURI.content_type == content_type,
-        )
-        .first()
-    )
-
-    if docuri is None:
-        docuri = DocumentURI(
-            claimant=claimant,
-            uri=uri,
-            type=type,
-            content_type=content_type,
-            document=document,
-            created=created,
-            updated=updated,
-        )
-        session.add(docuri)
-    elif not docuri.document == document:
-        log.warning(
-            "Found DocumentURI (id: %d)'s document_id (%d) doesn't match "
-            "given Document's id (%d)",
-            docuri.id,
-            docuri.document_id,
-            document.id,
+    rows = OrderedDict()
+    for document_uri_dict in document_uri_dicts:
+        row = {
+            "claimant": document_uri_dict["claimant"],
+            "claimant_normalized": uri_normalize(document_uri_dict["claimant"]),
+            "uri": document_uri_dict["uri"],
+            "uri_normalized": uri_normalize(document_uri_dict["uri"]),
+            "type": _or_empty(document_uri_dict["type"]),
+            "content_type": _or_empty(document_uri_dict["content_type"]),
+            "document_id": document.id,
+            "created": created,
+            "updated": updated,
+        }
+        # Postgres refuses to update the same row twice in one statement, so
+        # collapse claims that normalize to the same key.
+        key = (
+            row["claimant_normalized"],
+            row["uri_normalized"],
+            row["type"],
+            row["content_type"],
         )
-
-    docuri.updated = updated
+        rows[key] = row
+
+    if not rows:
+        return
+
+    stmt = pg.insert(DocumentURI.__table__).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            "claimant_normalized",
+            "uri_normalized",
+            "type",
+            "content_type",
+        ],
+        set_={"updated": stmt.excluded.updated},
+    ).returning(DocumentURI.__table__.c.id, DocumentURI.__table__.c.document_id)
 
     try:
-        session.flush()
+        results = session.execute(stmt).fetchall()
     except sa.exc.IntegrityError:
         raise ConcurrentUpdateError("concurrent document uri updates")
 
+    for id_, document_id in results:
+        if document_id != document.id:
+            log.warning(
+                "Found DocumentURI (id: %d)'s document_id (%d) doesn't match "
+                "given Document's id (%d)",
+                id_,
+                document_id,
+                document.id,
+            )
 
-def create_or_update_document_meta(
-    session, claimant, type, value, document, created, updated
+
+def create_or_update_document_metas(
+    session, document_meta_dicts, document, created, updated
 ):
     """
-    Create or update a DocumentMeta with the given parameters.
+    Create or update the DocumentMetas described by the given dicts.
+
+    All of the DocumentMetas are written with a single ``INSERT ... ON
+    CONFLICT DO UPDATE`` statement against the unique constraint on
+    ``(claimant_normalized, type)``.
 
     If an equivalent DocumentMeta already exists in the database then its value
     and updated time will be updated.
@@ -331,70 +345,63 @@ def create_or_update_document_meta(
     :param session: the database session
     :type session: sqlalchemy.orm.session.Session
 
-    :param claimant: the value to use for the DocumentMeta's claimant attribute
-        if a new DocumentMeta is created
-    :type claimant: unicode
-
-    :param type: the value of the new or existing DocumentMeta's type attribute
-    :type type: unicode
-
-    :param value: the value to set the new or existing DocumentMeta's value
-        attribute to
-    :type value: list of unicode strings
+    :param document_meta_dicts: dicts with the ``claimant``, ``type`` and
+        ``value`` of each DocumentMeta
+    :type document_meta_dicts: list of dicts
 
-    :param document: the value to use for the DocumentMeta's document if a new
-        DocumentMeta is created
+    :param document: the Document that new DocumentMetas will belong to
     :type document: h.models.Document
 
-    :param created: the value to use for the DocumentMeta's created attribute
-        if a new DocumentMeta is created
+    :param created: the value to use for the created attribute of new
+        DocumentMetas
     :type created: datetime.datetime
 
-    :param updated: the value to set the new or existing DocumentMeta's updated
+    :param updated: the value to set the new or existing DocumentMetas' updated
         attribute to
     :type updated: datetime.datetime
 
     """
-    existing_dm = (
-        session.query(DocumentMeta)
-        .filter(
-            DocumentMeta.claimant_normalized == uri_normalize(claimant),
-            DocumentMeta.type == type,
-        )
-        .one_or_none()
-    )
+    rows = OrderedDict()
+    for document_meta_dict in document_meta_dicts:
+        row = {
+            "claimant": document_meta_dict["claimant"],
+            "claimant_normalized": uri_normalize(document_meta_dict["claimant"]),
+            "type": document_meta_dict["type"],
+            "value": document_meta_dict["value"],
+            "document_id": document.id,
+            "created": created,
+            "updated": updated,
+        }
+        rows[(row["claimant_normalized"], row["type"])] = row
+
+        value = document_meta_dict["value"]
+        if document_meta_dict["type"] == "title" and value and not document.title:
+            document.title = value[0]
+
+    if not rows:
+        return
+
+    stmt = pg.insert(DocumentMeta.__table__).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["claimant_normalized", "type"],
+        set_={"value": stmt.excluded.value, "updated": stmt.excluded.updated},
+    ).returning(DocumentMeta.__table__.c.id, DocumentMeta.__table__.c.document_id)
 
-    if existing_dm is None:
-        session.add(
-            DocumentMeta(
-                claimant=claimant,
-                type=type,
-                value=value,
-                document=document,
-                created=created,
-                updated=updated,
-            )
-        )
-    else:
-        existing_dm.value = value
-        existing_dm.updated = updated
-        if not existing_dm.document == document:
+    try:
+        results = session.execute(stmt).fetchall()
+    except sa.exc.IntegrityError:
+        raise ConcurrentUpdateError("concurrent document meta updates")
+
+    for id_, document_id in results:
+        if document_id != document.id:
             log.warning(
                 "Found DocumentMeta (id: %d)'s document_id (%d) doesn't "
                 "match given Document's id (%d)",
-                existing_dm.id,
-                existing_dm.document_id,
+                id_,
+                document_id,
                 document.id,
             )
 
-    if type == "title" and value and not document.title:
-        document.title = value[0]
-
-    try:
-        session.flush()
-    except sa.exc.IntegrityError:
-        raise ConcurrentUpdateError("concurrent document meta updates")
-
 
 def merge_documents(session, documents, updated=None):
     """
@@ -482,33 +489,48 @@ def update_document_metadata(
         [u["uri"] for u in document_uri_dicts],
         created=created,
         updated=updated,
-    )
+    ).all()
 
-    if documents.count() > 1:
+    if len(documents) > 1:
         document = merge_documents(session, documents, updated=updated)
     else:
-        document = documents.first()
+        document = documents[0]
 
     document.updated = updated
 
-    for document_uri_dict in document_uri_dicts:
-        create_or_update_document_uri(
-            session=session,
-            document=document,
-            created=created,
-            updated=updated,
-            **document_uri_dict
-        )
+    # The upserts below are Core statements, which don't autoflush, so make
+    # sure that the document row (and any merge) has been written first.
+    try:
+        session.flush()
+    except sa.exc.IntegrityError:
+        raise ConcurrentUpdateError("concurrent document updates")
 
-    document.update_web_uri()
+    create_or_update_document_uris(
+        session=session,
+        document_uri_dicts=document_uri_dicts,
+        document=document,
+        created=created,
+        updated=updated,
+    )
 
-    for document_meta_dict in document_meta_dicts:
-        create_or_update_document_meta(
-            session=session,
-            document=document,
-            created=created,
-            updated=updated,
-            **document_meta_dict
-        )
+    create_or_update_document_metas(
+        session=session,
+        document_meta_dicts=document_meta_dicts,
+        document=document,
+        created=created,
+        updated=updated,
+    )
+
+    # The ORM doesn't know about rows written by the upserts, so reload the
+    # document's collections before computing the denormalized web_uri.
+    session.expire(document, ["document_uris", "meta"])
+    document.update_web_uri()
 
     return document
+
+
+def _or_empty(value):
+    """Return ``value``, or an empty string if it's None."""
+    if value is None:
+        return ""
+    return value
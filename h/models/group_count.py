@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sqlalchemy as sa
+
+from h.db import Base
+
+
+class GroupCount(Base):
+
+    """
+    The number of members and annotations in a group.
+
+    This is a denormalized copy of data in the ``user_group`` and
+    ``annotation`` tables which is kept up to date by
+    :py:mod:`h.services.group_count` so that groups' pages don't have to count
+    their members and annotations every time they're viewed.
+
+    Each group's counts are split across several rows, one per ``shard``,
+    whose counts are summed to give the group's counts. Changes are added to
+    a randomly chosen row, so that concurrent transactions which change the
+    counts of a busy group (such as the public group) don't all have to wait
+    to update the same row.
+    """
+
+    __tablename__ = "group_count"
+
+    group_id = sa.Column(
+        sa.Integer(), sa.ForeignKey("group.id", ondelete="cascade"), primary_key=True
+    )
+
+    #: Which of the group's rows of counts this is
+    shard = sa.Column(
+        sa.SmallInteger(),
+        primary_key=True,
+        autoincrement=False,
+        default=0,
+        server_default="0",
+    )
+
+    #: The number of members of the group (the sum of this column across the
+    #: group's rows, as with the other counts)
+    member_count = sa.Column(
+        sa.Integer(), nullable=False, default=0, server_default="0"
+    )
+
+    #: The number of annotations in the group that haven't been deleted
+    annotation_count = sa.Column(
+        sa.Integer(), nullable=False, default=0, server_default="0"
+    )
+
+    #: The number of shared top-level annotations in the group that haven't
+    #: been deleted or hidden by a moderator, and whose authors aren't
+    #: NIPSA'd: the ones that all the group's members can see
+    shared_annotation_count = sa.Column(
+        sa.Integer(), nullable=False, default=0, server_default="0"
+    )
+
+    def __repr__(self):
+        return (
+            "<GroupCount group_id=%d shard=%d member_count=%d annotation_count=%d>"
+        ) % (self.group_id, self.shard, self.member_count, self.annotation_count)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sqlalchemy as sa
+
+from h.db import Base, types
+
+
+class PendingReplyNotification(Base):
+
+    """
+    A reply whose parent's author hasn't been notified about it yet.
+
+    These are queued by :py:func:`h.storage.create_annotation` in the same
+    transaction as the reply, and sent and deleted by
+    :py:func:`h.tasks.notification.send_reply_notifications`.
+    """
+
+    __tablename__ = "pending_reply_notification"
+
+    id = sa.Column(sa.Integer, autoincrement=True, primary_key=True)
+
+    annotation_id = sa.Column(
+        types.URLSafeUUID,
+        sa.ForeignKey("annotation.id", ondelete="cascade"),
+        nullable=False,
+        unique=True,
+    )
+
+    #: The reply to notify about.
+    annotation = sa.orm.relationship("Annotation")
+
+    def __repr__(self):
+        return "<PendingReplyNotification annotation_id=%s>" % self.annotation_id
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sqlalchemy as sa
+
+from h.db import Base
+
+
+class PublicAnnotationCount(Base):
+
+    """
+    The number of publicly visible annotations on a normalized URI.
+
+    This is a denormalized copy of data in the ``annotation`` table which is
+    kept up to date by :py:mod:`h.services.public_annotation_count` so that
+    the badge can be answered without searching.
+
+    Each URI's count is split across several rows, one per ``shard``, whose
+    counts are summed to give the URI's count. Changes are added to a
+    randomly chosen row, so that concurrent transactions which annotate a
+    busy page don't all have to wait to update the same row.
+    """
+
+    __tablename__ = "public_annotation_count"
+
+    #: The normalized target URI of the annotations
+    uri_normalized = sa.Column(sa.UnicodeText(), primary_key=True)
+
+    #: Which of the URI's rows of counts this is
+    shard = sa.Column(
+        sa.SmallInteger(),
+        primary_key=True,
+        autoincrement=False,
+        default=0,
+        server_default="0",
+    )
+
+    #: This row's share of the number of public annotations with that target
+    #: URI
+    count = sa.Column(sa.Integer(), nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return "<PublicAnnotationCount uri_normalized=%s shard=%d count=%d>" % (
+            self.uri_normalized,
+            self.shard,
+            self.count,
+        )
@@ -31,43 +31,74 @@ class Notification(
     """
 
 
-def get_notification(request, annotation, action):
+def get_notifications(request, replies):
     """
-    Check if the passed annotation and action pair should send a notification.
+    Return the notifications that should be sent for newly created replies.
 
-    Checks to see if the annotation event represented by the passed annotation
-    and action should trigger a notification. If it should, this function
-    returns the relevant :py:class:`~h.notification.reply.Notification` object.
-    Otherwise, it returns None.
+    The parents, users and subscriptions of all of the replies are each
+    looked up at once, so this takes the same number of queries however many
+    replies there are.
 
     :param request: the current request object
     :type request: pyramid.request.Request
-    :param annotation: the reply annotation
-    :type annotation: h.models.Annotation
-    :param action: the event action
-    :type action: str
+    :param replies: the newly created annotations
+    :type replies: list of h.models.Annotation
 
-    :returns: a :py:class:`~h.notification.reply.Notification`, or None
+    :returns: a list of :py:class:`~h.notification.reply.Notification`
     """
-    # Only send notifications when new annotations are created
-    if action != "create":
-        return
-
-    # If the annotation doesn't have a parent, or we can't find its parent,
-    # then we can't send a notification email.
-    parent_id = annotation.parent_id
-    if parent_id is None:
-        return
-
-    # Now we know we're dealing with a reply
-    reply = annotation
+    # Don't send reply notifications to the author of the parent annotation if
+    # the reply was private.
+    #
+    # FIXME: we should be retrieving the document from the root annotation, not
+    # the reply, and dealing with the possibility that we have no document
+    # metadata.
+    replies = [
+        reply
+        for reply in replies
+        if reply.parent_id is not None and reply.shared and reply.document is not None
+    ]
+    if not replies:
+        return []
+
+    parents = storage.fetch_ordered_annotations(
+        request.db, list({reply.parent_id for reply in replies})
+    )
+    parents = {parent.id: parent for parent in parents}
+    if not parents:
+        return []
 
-    parent = storage.fetch_annotation(request.db, parent_id)
+    # Load all of the users at once, so that fetching them one at a time
+    # below hits the user service's cache.
+    user_service = request.find_service(name="user")
+    userids = {reply.userid for reply in replies}
+    userids.update(parent.userid for parent in parents.values())
+    user_service.fetch_all(list(userids))
+
+    subscribed_userids = {
+        sub.uri
+        for sub in request.db.query(Subscriptions).filter(
+            Subscriptions.active.is_(True),
+            Subscriptions.type == "reply",
+            Subscriptions.uri.in_({parent.userid for parent in parents.values()}),
+        )
+    }
+
+    notifications = []
+    for reply in replies:
+        notification = _notification(
+            reply, parents.get(reply.parent_id), user_service, subscribed_userids
+        )
+        if notification is not None:
+            notifications.append(notification)
+    return notifications
+
+
+def _notification(reply, parent, user_service, subscribed_userids):
+    # If we can't find the reply's parent, then we can't send a notification
+    # email.
     if parent is None:
         return
 
-    user_service = request.find_service(name="user")
-
     # If the parent user doesn't exist (anymore), we can't send an email.
     parent_user = user_service.fetch(parent.userid)
     if parent_user is None:
@@ -88,25 +119,9 @@ def get_notification(request, annotation, action):
     if parent_user == reply_user:
         return
 
-    # Don't send reply notifications to the author of the parent annotation if
-    # the reply was private.
-    if not reply.shared:
-        return
-
-    # FIXME: we should be retrieving the document from the root annotation, not
-    # the reply, and dealing with the possibility that we have no document
-    # metadata.
-    if reply.document is None:
-        return
-
     # Bail if there is no active 'reply' subscription for the user being
     # replied to.
-    sub = (
-        request.db.query(Subscriptions)
-        .filter_by(active=True, type="reply", uri=parent.userid)
-        .first()
-    )
-    if sub is None:
+    if parent.userid not in subscribed_userids:
         return
 
     return Notification(reply, reply_user, parent, parent_user, reply.document)
@@ -45,6 +45,14 @@ class GroupJSONPresenter(object):
             model["scopes"]["uri_patterns"] = [
                 scope.scope + "*" for scope in self.group.scopes
             ]
+        if "counts" in expand:
+            counts = self.context.counts
+            model["counts"] = {
+                "members": counts.member_count,
+                # Private annotations aren't counted, so as not to reveal how
+                # many of them other members have made.
+                "annotations": counts.shared_annotation_count,
+            }
         return model
 
     def _model(self):
@@ -70,7 +78,18 @@ class GroupsJSONPresenter(object):
         self.contexts = group_contexts
 
     def asdicts(self, expand=None):
+        if expand and "counts" in expand:
+            self._load_counts()
         return [
             GroupJSONPresenter(group_context).asdict(expand=expand)
             for group_context in self.contexts
         ]
+
+    def _load_counts(self):
+        """Fetch the counts of all the groups at once, rather than one by one."""
+        if not self.contexts:
+            return
+        svc = self.contexts[0].request.find_service(name="group_count")
+        counts = svc.counts_for([context.group for context in self.contexts])
+        for context in self.contexts:
+            context.counts = counts[context.group.id]
@@ -92,26 +92,31 @@ class Publisher(object):
 
     def publish_annotation(self, payload):
         """Publish an annotation message with the routing key 'annotation'."""
-        self._publish("annotation", payload)
+        self._publish("annotation", [payload])
+
+    def publish_annotations(self, payloads):
+        """Publish many annotation messages over a single producer."""
+        self._publish("annotation", payloads)
 
     def publish_user(self, payload):
         """Publish a user message with the routing key 'user'."""
-        self._publish("user", payload)
+        self._publish("user", [payload])
 
-    def _publish(self, routing_key, payload):
+    def _publish(self, routing_key, payloads):
         headers = {"timestamp": datetime.utcnow().isoformat() + "Z"}
         retry_policy = {"max_retries": 5, "interval_start": 0.2, "interval_step": 0.3}
 
         with producer_pool[self.connection].acquire(block=True) as producer:
-            producer.publish(
-                payload,
-                exchange=self.exchange,
-                declare=[self.exchange],
-                routing_key=routing_key,
-                headers=headers,
-                retry=True,
-                retry_policy=retry_policy,
-            )
+            for payload in payloads:
+                producer.publish(
+                    payload,
+                    exchange=self.exchange,
+                    declare=[self.exchange],
+                    routing_key=routing_key,
+                    headers=headers,
+                    retry=True,
+                    retry_policy=retry_policy,
+                )
 
 
 def get_exchange():
@@ -21,6 +21,9 @@ log = logging.getLogger(__name__)
 ES_CHUNK_SIZE = 100
 PG_WINDOW_SIZE = 2000
 
+#: How long to wait for an update by query to finish, in seconds.
+UPDATE_BY_QUERY_TIMEOUT = 300
+
 
 class Window(namedtuple("Window", ["start", "end"])):
     pass
@@ -95,6 +98,101 @@ def delete(es, annotation_id, target_index=None, refresh=False):
     )
 
 
+def delete_many(es, annotation_ids, target_index=None, chunk_size=ES_CHUNK_SIZE):
+    """
+    Mark many annotations as deleted in the search index.
+
+    This is the bulk equivalent of :py:func:`delete`.
+
+    :param es: the Elasticsearch client object to use
+    :type es: h.search.Client
+
+    :param annotation_ids: the ids of the annotations to mark as deleted
+    :type annotation_ids: iterable of str
+
+    :param target_index: the index name, uses default index if not given
+    :type target_index: unicode
+
+    :returns: the ids of the annotations which couldn't be marked as deleted
+    :rtype: set
+    """
+    if target_index is None:
+        target_index = es.index
+
+    actions = (
+        {
+            "_op_type": "index",
+            "_index": target_index,
+            "_type": es.mapping_type,
+            "_id": annotation_id,
+            "_source": {"deleted": True},
+        }
+        for annotation_id in annotation_ids
+    )
+
+    results = es_helpers.streaming_bulk(
+        es.conn, actions, chunk_size=chunk_size, raise_on_error=False
+    )
+    return {item["index"]["_id"] for ok, item in results if not ok}
+
+
+def update_user_annotations(es, userid, fields, target_index=None):
+    """
+    Update fields of all of a user's annotations in the search index.
+
+    The documents are changed in place by Elasticsearch, rather than being
+    presented and indexed again from the database, so this is suitable for
+    user-level flags such as ``nipsa`` that don't depend on the annotations.
+
+    :param es: the Elasticsearch client object to use
+    :type es: h.search.Client
+
+    :param userid: the userid whose annotations to update
+    :type userid: unicode
+
+    :param fields: the fields to set, mapped to their new values. Fields with
+        a value of ``None`` are removed from the documents.
+    :type fields: dict
+
+    :param target_index: the index name, uses default index if not given
+    :type target_index: unicode
+
+    :returns: the number of documents updated and the failures reported by
+        Elasticsearch
+    :rtype: tuple of int and list
+    """
+    if target_index is None:
+        target_index = es.index
+
+    statements = []
+    params = {}
+    for name, value in sorted(fields.items()):
+        if value is None:
+            statements.append("ctx._source.remove(params.remove_{});".format(name))
+            params["remove_" + name] = name
+        else:
+            statements.append("ctx._source.{0} = params.{0};".format(name))
+            params[name] = value
+
+    result = es.conn.update_by_query(
+        index=target_index,
+        doc_type=es.mapping_type,
+        body={
+            "query": {"term": {"user_raw": userid}},
+            "script": {
+                "source": " ".join(statements),
+                "lang": "painless",
+                "params": params,
+            },
+        },
+        # Annotations indexed in the meantime have been presented with the
+        # user's latest flags already, so they can be skipped.
+        conflicts="proceed",
+        request_timeout=UPDATE_BY_QUERY_TIMEOUT,
+    )
+    return result["updated"], result["failures"]
+
+
 class BatchIndexer(object):
     """
     A convenience class for reindexing all annotations from the database to
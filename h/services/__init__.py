@@ -42,6 +42,9 @@ def includeme(config):
         ".flag_count.flag_count_service_factory", name="flag_count"
     )
     config.register_service_factory(".group.groups_factory", name="group")
+    config.register_service_factory(
+        ".group_count.group_count_factory", name="group_count"
+    )
     config.register_service_factory(
         ".group_create.group_create_factory", name="group_create"
     )
@@ -75,6 +78,10 @@ def includeme(config):
     config.register_service_factory(
         ".organization.organization_factory", name="organization"
     )
+    config.register_service_factory(
+        ".public_annotation_count.public_annotation_count_factory",
+        name="public_annotation_count",
+    )
     config.register_service_factory(
         ".rename_user.rename_user_factory", name="rename_user"
     )
@@ -99,3 +106,74 @@ def includeme(config):
     config.add_request_method(
         ".feature.FeatureRequestProperty", name="feature", reify=True
     )
+
+    _maintain_public_annotation_counts()
+    _maintain_group_counts()
+    _watch_group_scope_changes()
+    _watch_feature_changes()
+    _watch_auth_changes()
+    _watch_auth_client_changes()
+
+    if config.registry.settings.get("h.shared_cache"):
+        _publish_shared_cache_versions()
+
+
+def _maintain_public_annotation_counts():
+    """Update the badge's public annotation counts when annotations change."""
+    from h.db import Session
+    from h.services.public_annotation_count import maintain_counts
+
+    maintain_counts(Session)
+
+
+def _maintain_group_counts():
+    """Update the groups' member and annotation counts when they change."""
+    from h.db import Session
+    from h.services.group_count import maintain_counts
+
+    maintain_counts(Session)
+
+
+def _watch_group_scope_changes():
+    """Invalidate the cached group scope indexes when scopes are edited."""
+    from h.db import Session
+    from h.services.group_scope import watch_scope_changes
+
+    watch_scope_changes(Session)
+
+
+def _watch_feature_changes():
+    """Reload the cached feature flags when they or their cohorts are edited."""
+    from h.db import Session
+    from h.services.feature import watch_feature_changes
+
+    watch_feature_changes(Session)
+
+
+def _watch_auth_changes():
+    """Invalidate the cached API tokens and principals when they change."""
+    from h.db import Session
+    from h.services.auth_token import watch_auth_changes
+
+    watch_auth_changes(Session)
+
+
+def _watch_auth_client_changes():
+    """Forget verified auth client credentials when the clients are edited."""
+    from h.db import Session
+    from h.models import AuthClient
+    from h.util.cache import publish_on_change
+
+    publish_on_change(Session, "auth_client", [AuthClient])
+
+
+def _publish_shared_cache_versions():
+    """Invalidate the shared user and group caches when those models change."""
+    from h.db import Session
+    from h.models import Group, User
+    from h.util.cache import publish_on_change
+
+    # Users' last login dates change on every login, and nothing that reads
+    # them needs them to be up to date.
+    publish_on_change(Session, "user", [User], ignore=["last_login_date"])
+    publish_on_change(Session, "group", [Group])
@@ -4,7 +4,17 @@ from __future__ import unicode_literals
 
 from datetime import datetime
 
-from h.events import AnnotationEvent
+import sqlalchemy as sa
+
+from h.events import AnnotationEvent, AnnotationsDeletedEvent
+from h.models import Annotation
+from h.services import group_count, public_annotation_count
+
+#: The number of annotations marked as deleted by each statement of a bulk
+#: deletion.
+BULK_DELETE_WINDOW_SIZE = 1000
+
+_annotation = Annotation.__table__
 
 
 class AnnotationDeleteService(object):
@@ -34,6 +44,62 @@ class AnnotationDeleteService(object):
         for ann in annotations:
             self.delete(ann)
 
+    def bulk_delete(self, *criteria):
+        """
+        Delete all the annotations matching ``criteria``.
+
+        This is for deleting a lot of annotations at once, such as all of a
+        user's or a group's. The annotations are marked as deleted a window
+        at a time without being loaded, and a single
+        :py:class:`h.events.AnnotationsDeletedEvent` is published for all of
+        them once the transaction is committed.
+
+        :param criteria: SQLAlchemy filter expressions on
+            :py:class:`h.models.Annotation`'s columns
+        :returns: the IDs of the deleted annotations
+        :rtype: list of unicode
+        """
+        session = self.request.db
+
+        # Write any pending changes before they're overtaken by the updates.
+        session.flush()
+
+        updated = datetime.utcnow()
+        deleted_ids = []
+        while True:
+            ids = [
+                row.id
+                for row in session.execute(
+                    sa.select([_annotation.c.id])
+                    .where(sa.and_(_annotation.c.deleted.is_(False), *criteria))
+                    .limit(BULK_DELETE_WINDOW_SIZE)
+                )
+            ]
+            if not ids:
+                break
+
+            with public_annotation_count.counts_maintained(session, ids):
+                with group_count.counts_maintained(session, ids):
+                    session.execute(
+                        _annotation.update()
+                        .where(_annotation.c.id.in_(ids))
+                        .values(deleted=True, updated=updated)
+                    )
+            deleted_ids.extend(ids)
+
+        if not deleted_ids:
+            return deleted_ids
+
+        # Any of the annotations that are already loaded are out of date now.
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, Annotation):
+                session.expire(obj, ["deleted", "updated"])
+
+        event = AnnotationsDeletedEvent(self.request, deleted_ids)
+        self.request.notify_after_commit(event)
+
+        return deleted_ids
+
 
 def annotation_delete_service_factory(context, request):
     return AnnotationDeleteService(request)
@@ -6,6 +6,11 @@ from webob.multidict import MultiDict
 
 from h.search import Search
 from h.search import Limiter, DeletedFilter, UserFilter, TopLevelAnnotationsFilter
+from h.util.cache import StaleWhileRevalidateCache
+
+#: The annotation counts shown on user pages, keyed by the viewing user and
+#: the user counted, and shared by all requests handled by this process.
+count_cache = StaleWhileRevalidateCache(maxsize=10000, ttl=600, fresh_ttl=60)
 
 
 class AnnotationStatsService(object):
@@ -22,7 +27,7 @@ class AnnotationStatsService(object):
         included in this count, otherwise they will not.
         """
         params = MultiDict({"limit": 0, "user": userid})
-        return self._search(params)
+        return self._cached_search(("user", userid), params)
 
     def total_user_annotation_count(self, userid):
         """
@@ -42,12 +47,14 @@ class AnnotationStatsService(object):
         search_result = search.run(params)
         return search_result.total
 
-    def group_annotation_count(self, pubid):
-        """
-        Return the count of searchable top level annotations for this group.
-        """
-        params = MultiDict({"limit": 0, "group": pubid})
-        return self._search(params)
+    def _cached_search(self, key, params):
+        # Which annotations are counted depends on who's looking.
+        key = (self.request.authenticated_userid,) + key
+        count, refresh = count_cache.lookup(key)
+        if refresh:
+            count = self._search(params)
+            count_cache.set(key, count)
+        return count
 
     def _search(self, params):
         search = Search(self.request, stats=self.request.stats)
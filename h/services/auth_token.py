@@ -2,8 +2,19 @@
 
 from __future__ import unicode_literals
 
+import hashlib
+import itertools
+
+import newrelic.agent
+import sqlalchemy as sa
+
 from h import models
 from h.auth.tokens import Token
+from h.util.cache import VersionedCache, publish_version
+
+#: Tokens which have been loaded from the database, keyed by a hash of their
+#: value and shared by all requests handled by this process.
+token_cache = VersionedCache("auth", maxsize=10000, ttl=60)
 
 
 class AuthTokenService(object):
@@ -31,7 +42,7 @@ class AuthTokenService(object):
                 return token
             return None
 
-        token = self._fetch_auth_token(token_str)
+        token = self._fetch_shared(token_str)
         self._validate_cache[token_str] = token
         if token is not None and token.is_valid():
             return token
@@ -54,6 +65,23 @@ class AuthTokenService(object):
             self._session.query(models.Token).filter_by(value=token_str).one_or_none()
         )
 
+    def _fetch_shared(self, token_str):
+        """Fetch a token from the process-wide cache or the database."""
+        token_cache.check_version(self._session)
+
+        cache_key = hashlib.sha256(token_str.encode("utf-8")).hexdigest()
+        token = token_cache.get(cache_key)
+        if token is not None:
+            # Associates the userid with a given transaction/web request, as
+            # Token does when it's first loaded.
+            newrelic.agent.add_custom_parameter("userid", token.userid)
+            return token
+
+        token = self._fetch_auth_token(token_str)
+        if token is not None:
+            token_cache.set(cache_key, token)
+        return token
+
     def _fetch_auth_token(self, token_str):
         token_model = self.fetch(token_str)
         if token_model is not None:
@@ -63,5 +91,48 @@ class AuthTokenService(object):
         return None
 
 
+def watch_auth_changes(session):
+    """
+    Invalidate the cached tokens and principals when ``session`` changes them.
+
+    This clears the caches in the "auth" namespace whenever a token is
+    revoked, refreshed or regenerated, or a user is renamed, deleted, has
+    their roles changed, or joins or leaves a group.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _publish_auth_changes):
+        sa.event.listen(session, "before_flush", _publish_auth_changes)
+
+
+def _publish_auth_changes(session, flush_context, instances):
+    for obj in itertools.chain(session.dirty, session.deleted):
+        if _changes_auth(session, obj):
+            publish_version(session, "auth")
+            return
+
+
+_USER_AUTH_ATTRS = ("_username", "authority", "admin", "staff", "groups")
+_GROUP_AUTH_ATTRS = ("pubid", "members")
+
+
+def _changes_auth(session, obj):
+    if isinstance(obj, models.Token):
+        return True
+    if isinstance(obj, models.User):
+        return _has_changes(session, obj, _USER_AUTH_ATTRS)
+    if isinstance(obj, models.Group):
+        return _has_changes(session, obj, _GROUP_AUTH_ATTRS)
+    return False
+
+
+def _has_changes(session, obj, attrs):
+    if obj in session.deleted:
+        return True
+    state = sa.inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
 def auth_token_service_factory(context, request):
     return AuthTokenService(request.db)
@@ -27,8 +27,7 @@ class DeleteGroupService(object):
         if group.pubid == "__world__":
             raise DeletePublicGroupError("Public group can not be deleted")
 
-        annotations = self.request.db.query(Annotation).filter_by(groupid=group.pubid)
-        self._annotation_delete_service.delete_annotations(annotations)
+        self._annotation_delete_service.bulk_delete(Annotation.groupid == group.pubid)
 
 
 def delete_group_service_factory(context, request):
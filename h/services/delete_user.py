@@ -59,9 +59,7 @@ class DeleteUserService(object):
         return [g for g in groups if g.pubid in groupids_with_other_user_anns]
 
     def _delete_annotations(self, user):
-        annotations = self.request.db.query(Annotation).filter_by(userid=user.userid)
-        for annotation in annotations:
-            self._annotation_delete_service.delete(annotation)
+        self._annotation_delete_service.bulk_delete(Annotation.userid == user.userid)
 
     def _delete_groups(self, groups):
         for group in groups:
@@ -2,10 +2,23 @@
 
 from __future__ import unicode_literals
 
+import itertools
 import re
 
+import sqlalchemy as sa
+
 from h import models
-from h.util.db import lru_cache_in_transaction
+from h.models.feature_cohort import (
+    FEATURECOHORT_FEATURE_TABLE,
+    FEATURECOHORT_USER_TABLE,
+)
+from h.util.cache import VersionedCache, publish_version
+
+#: A snapshot of every feature flag, shared by all requests handled by this
+#: process.
+feature_cache = VersionedCache("feature", maxsize=1, ttl=300)
+
+_SNAPSHOT_KEY = "snapshot"
 
 PARAM_PATTERN = re.compile(r"\A__feature__\[(?P<featurename>[A-Za-z0-9_-]+)\]\Z")
 
@@ -43,6 +56,9 @@ class FeatureService(object):
     and answers queries about the status of feature flags for particular
     users.
 
+    The flags are loaded once and shared by every request handled by the
+    process until :py:func:`watch_feature_changes` sees them change.
+
     :param session: the database session
     :type session: sqlalchemy.orm.session.Session
     :param overrides: the names of any overridden flags
@@ -53,8 +69,6 @@ class FeatureService(object):
         self.session = session
         self.overrides = overrides
 
-        self._cached_load = lru_cache_in_transaction(self.session)(self._load)
-
     def enabled(self, name, user=None):
         """
         Determine if the named feature is enabled for the specified `user`.
@@ -75,13 +89,21 @@ class FeatureService(object):
         Returns a dict mapping feature flag names to enabled states
         for the specified `user`.
         """
-        return {f.name: self._state(f, user=user) for f in self._cached_load()}
+        snapshot = self._snapshot()
+        cohorts = snapshot.user_cohorts(user)
+        return {f.name: self._state(f, user, cohorts) for f in snapshot.features}
+
+    def _snapshot(self):
+        """Return the feature flags, loading them if they aren't cached."""
+        feature_cache.check_version(self.session)
 
-    def _load(self):
-        """Load the feature flags from the database."""
-        return models.Feature.all(self.session)
+        snapshot = feature_cache.get(_SNAPSHOT_KEY)
+        if snapshot is None:
+            snapshot = _FeatureSnapshot.load(self.session)
+            feature_cache.set(_SNAPSHOT_KEY, snapshot)
+        return snapshot
 
-    def _state(self, feature, user=None):
+    def _state(self, feature, user, cohorts):
         # Features that are explicitly overridden are on.
         if self.overrides is not None and feature.name in self.overrides:
             return True
@@ -97,11 +119,108 @@ class FeatureService(object):
                 return True
             # If the feature is in a cohort that the user is a member of, the
             # feature is on.
-            if set(feature.cohorts) & set(user.cohorts):
+            if feature.cohorts & cohorts:
                 return True
         return False
 
 
+class _FeatureState(object):
+
+    """The state of a feature flag, detached from its database row."""
+
+    __slots__ = ("name", "everyone", "admins", "staff", "cohorts")
+
+    def __init__(self, name, everyone, admins, staff, cohorts):
+        self.name = name
+        self.everyone = everyone
+        self.admins = admins
+        self.staff = staff
+        #: A bitmask of the cohorts that the feature is enabled for.
+        self.cohorts = cohorts
+
+
+class _FeatureSnapshot(object):
+
+    """
+    The state of every feature flag and the membership of their cohorts.
+
+    Each cohort that any feature is enabled for is given a bit, and the
+    cohorts of each feature and each user are stored as bitmasks of those
+    bits. This makes checking whether a user is in any of a feature's cohorts
+    a single ``&`` rather than a query for the user's cohorts.
+    """
+
+    def __init__(self, features, user_cohorts):
+        self.features = features
+        self._user_cohorts = user_cohorts
+
+    @classmethod
+    def load(cls, session):
+        features = models.Feature.all(session)
+
+        bits = {}
+        feature_cohorts = {}
+        links = session.query(
+            FEATURECOHORT_FEATURE_TABLE.c.feature_id,
+            FEATURECOHORT_FEATURE_TABLE.c.cohort_id,
+        ).order_by(FEATURECOHORT_FEATURE_TABLE.c.cohort_id)
+        for feature_id, cohort_id in links:
+            bit = bits.setdefault(cohort_id, 1 << len(bits))
+            feature_cohorts[feature_id] = feature_cohorts.get(feature_id, 0) | bit
+
+        user_cohorts = {}
+        if bits:
+            members = session.query(
+                FEATURECOHORT_USER_TABLE.c.user_id, FEATURECOHORT_USER_TABLE.c.cohort_id
+            ).filter(FEATURECOHORT_USER_TABLE.c.cohort_id.in_(list(bits)))
+            for user_id, cohort_id in members:
+                user_cohorts[user_id] = user_cohorts.get(user_id, 0) | bits[cohort_id]
+
+        states = [
+            _FeatureState(
+                name=f.name,
+                everyone=bool(f.everyone),
+                admins=bool(f.admins),
+                staff=bool(f.staff),
+                cohorts=feature_cohorts.get(f.id, 0),
+            )
+            for f in features
+        ]
+        return cls(states, user_cohorts)
+
+    def user_cohorts(self, user):
+        """Return the bitmask of the feature cohorts that ``user`` is in."""
+        if user is None:
+            return 0
+        return self._user_cohorts.get(user.id, 0)
+
+
+def watch_feature_changes(session):
+    """
+    Invalidate the cached feature flags whenever ``session`` changes them.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _publish_feature_changes):
+        sa.event.listen(session, "before_flush", _publish_feature_changes)
+
+
+def _publish_feature_changes(session, flush_context, instances):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if _changes_features(session, obj):
+            publish_version(session, "feature")
+            return
+
+
+def _changes_features(session, obj):
+    if isinstance(obj, (models.Feature, models.FeatureCohort)):
+        return True
+    if isinstance(obj, models.User):
+        return sa.inspect(obj).attrs.cohorts.history.has_changes()
+    return False
+
+
 def feature_service_factory(context, request):
     return FeatureService(session=request.db, overrides=_feature_overrides(request))
 
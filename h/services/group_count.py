@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+
+"""
+Count the members and annotations in each group.
+
+The counts are stored per group in the ``group_count`` table, split across
+several rows per group which are summed when they're read (see
+:py:class:`h.models.GroupCount`). :py:func:`maintain_counts` keeps them up to date by applying the changes
+whenever a session flushes: users joining or leaving groups, users being
+deleted, annotations being created, deleted, shared, unshared, moved to
+another group, hidden or unhidden, and their authors being flagged or
+unflagged as NIPSA.
+"""
+
+from __future__ import unicode_literals
+
+import random
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+from h import models
+
+_PENDING_CHANGES_KEY = "h.services.group_count.pending"
+
+#: The number of rows each group's counts are split across.
+_SHARDS = 16
+
+_annotation = models.Annotation.__table__
+_count = models.GroupCount.__table__
+_group = models.Group.__table__
+_user = models.User.__table__
+
+
+class GroupCounts(
+    namedtuple(
+        "GroupCounts", ["member_count", "annotation_count", "shared_annotation_count"]
+    )
+):
+
+    """
+    The number of members and annotations in a group.
+
+    See :py:class:`h.models.GroupCount` for what each count includes.
+    """
+
+
+class GroupCountService(object):
+
+    """A service for counting the members and annotations in a group."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def counts(self, group):
+        """
+        Return the number of members and annotations in ``group``.
+
+        :type group: h.models.Group
+        :rtype: GroupCounts
+        """
+        return self.counts_for([group])[group.id]
+
+    def counts_for(self, groups):
+        """
+        Return the number of members and annotations in each of ``groups``.
+
+        :type groups: list of h.models.Group
+        :returns: a dict mapping the ID of each group to its
+            :py:class:`GroupCounts`
+        """
+        group_ids = [group.id for group in groups]
+        counts = dict.fromkeys(group_ids, GroupCounts(0, 0, 0))
+        if not group_ids:
+            return counts
+
+        rows = (
+            self.session.query(
+                models.GroupCount.group_id,
+                sa.func.sum(models.GroupCount.member_count),
+                sa.func.sum(models.GroupCount.annotation_count),
+                sa.func.sum(models.GroupCount.shared_annotation_count),
+            )
+            .filter(models.GroupCount.group_id.in_(group_ids))
+            .group_by(models.GroupCount.group_id)
+        )
+        for row in rows:
+            counts[row[0]] = GroupCounts(*[max(int(count), 0) for count in row[1:]])
+        return counts
+
+
+def maintain_counts(session):
+    """
+    Keep the group counts up to date as ``session`` is flushed.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _before_flush):
+        sa.event.listen(session, "before_flush", _before_flush)
+        sa.event.listen(session, "after_flush", _after_flush)
+
+
+@contextmanager
+def counts_maintained(session, annotation_ids):
+    """
+    Keep the counts up to date across bulk changes to some annotations.
+
+    This is the equivalent of
+    :py:func:`h.services.public_annotation_count.counts_maintained` for
+    group counts::
+
+        with counts_maintained(session, ids):
+            session.execute(annotation.update().where(...).values(...))
+
+    :param annotation_ids: the IDs of the annotations that may be changed
+    """
+    annotation_ids = set(annotation_ids)
+    before = _counted_annotations(session, annotation_ids)
+
+    yield
+
+    after = _counted_annotations(session, annotation_ids)
+    _apply_deltas(session, _annotation_deltas(before, after))
+
+
+def _before_flush(session, flush_context, instances):
+    new_annotations = []
+    annotation_ids = set()
+    memberships = {}
+    nipsa_changes = {}
+    deleted_groups = []
+
+    for obj in session.new:
+        if isinstance(obj, models.Annotation):
+            new_annotations.append(obj)
+        elif isinstance(obj, models.AnnotationModeration):
+            if obj.annotation is not None:
+                annotation_ids.add(obj.annotation.id)
+        else:
+            _add_membership_changes(obj, memberships)
+
+    for obj in session.dirty:
+        if isinstance(obj, models.Annotation):
+            annotation_ids.add(obj.id)
+        else:
+            _add_membership_changes(obj, memberships)
+            if isinstance(obj, models.User):
+                _add_nipsa_change(session, obj, nipsa_changes)
+
+    for obj in session.deleted:
+        if isinstance(obj, models.Annotation):
+            annotation_ids.add(obj.id)
+        elif isinstance(obj, models.AnnotationModeration):
+            annotation_ids.add(obj.annotation_id)
+        elif isinstance(obj, models.Group):
+            deleted_groups.append(obj)
+        elif isinstance(obj, models.User):
+            # Deleting a user deletes the memberships they had before this
+            # flush, so make sure they're loaded.
+            obj.groups
+            history = sa.inspect(obj).attrs.groups.history
+            for group in _history_items(history.unchanged, history.deleted):
+                memberships[(obj, group)] = -1
+
+    annotation_ids.discard(None)
+    if not (new_annotations or annotation_ids or memberships or nipsa_changes):
+        return
+
+    # The database still holds the pre-flush state, so this finds which of
+    # the changed annotations were counted before the flush.
+    before = _counted_annotations(session, annotation_ids)
+
+    session.info[_PENDING_CHANGES_KEY] = (
+        new_annotations,
+        annotation_ids,
+        memberships,
+        nipsa_changes,
+        deleted_groups,
+        before,
+    )
+
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_CHANGES_KEY, None)
+    if pending is None:
+        return
+
+    (
+        new_annotations,
+        annotation_ids,
+        memberships,
+        nipsa_changes,
+        deleted_groups,
+        before,
+    ) = pending
+    annotation_ids = annotation_ids | {a.id for a in new_annotations}
+
+    after = _counted_annotations(session, annotation_ids)
+    deltas = _annotation_deltas(before, after)
+
+    for (_, group), change in memberships.items():
+        deltas["member_count"][group.id] += change
+
+    # The annotations in annotation_ids have already been counted with their
+    # authors' NIPSA flags from before and after the flush.
+    for userid, nipsa in nipsa_changes.items():
+        for group_id, count in _user_shared_counts(session, userid, annotation_ids):
+            deltas["shared_annotation_count"][group_id] += -count if nipsa else count
+
+    # The counts of deleted groups are deleted along with them.
+    for group in deleted_groups:
+        for counter in deltas.values():
+            counter.pop(group.id, None)
+
+    _apply_deltas(session, deltas)
+
+
+def _add_membership_changes(obj, memberships):
+    """Add the groups ``obj`` is joining or leaving to ``memberships``."""
+    if isinstance(obj, models.Group):
+        history = sa.inspect(obj).attrs.members.history
+        pairs = [(user, obj) for user in _history_items(history.added, history.deleted)]
+    elif isinstance(obj, models.User):
+        history = sa.inspect(obj).attrs.groups.history
+        pairs = [
+            (obj, group) for group in _history_items(history.added, history.deleted)
+        ]
+    else:
+        return
+
+    # Each change shows up on both sides of the relationship if both are
+    # loaded, so it's keyed by (user, group) to only be counted once.
+    added = _history_items(history.added)
+    for user, group in pairs:
+        joined = (group if obj is user else user) in added
+        memberships[(user, group)] = 1 if joined else -1
+
+
+def _add_nipsa_change(session, user, nipsa_changes):
+    """Add ``user`` to ``nipsa_changes`` if their NIPSA flag is changing."""
+    if not sa.inspect(user).attrs.nipsa.history.added:
+        return
+    was_nipsa = session.execute(
+        sa.select([_user.c.nipsa]).where(_user.c.id == user.id)
+    ).scalar()
+    if bool(was_nipsa) != bool(user.nipsa):
+        nipsa_changes[user.userid] = bool(user.nipsa)
+
+
+def _history_items(*parts):
+    """Concatenate parts of an attribute's history, which may be ``None``."""
+    items = []
+    for part in parts:
+        items.extend(part or ())
+    return items
+
+
+def _counted_annotations(session, annotation_ids):
+    """
+    Return the groups of the annotations in ``annotation_ids`` which count.
+
+    :returns: a dict mapping the ID of each annotation that hasn't been
+        deleted to a ``(group_id, shared)`` tuple, where ``shared`` says
+        whether it counts towards the group's ``shared_annotation_count``
+    """
+    if not annotation_ids:
+        return {}
+
+    rows = session.execute(
+        sa.select(
+            [
+                _annotation.c.id,
+                _group.c.id.label("group_id"),
+                _is_shared().label("shared"),
+            ]
+        )
+        .select_from(_annotation.join(_group, _group.c.pubid == _annotation.c.groupid))
+        .where(_annotation.c.id.in_(list(annotation_ids)))
+        .where(_annotation.c.deleted.is_(False))
+    )
+    return {row.id: (row.group_id, row.shared) for row in rows}
+
+
+def _is_shared(nipsa=True):
+    """
+    Return a SQL condition matching the annotations that count as shared.
+
+    These are the shared top-level annotations which haven't been hidden by a
+    moderator. If ``nipsa`` is False the annotations of NIPSA'd users are
+    included.
+    """
+    clauses = [
+        _annotation.c.shared.is_(True),
+        sa.func.coalesce(sa.func.array_length(_annotation.c.references, 1), 0) == 0,
+        ~sa.exists().where(
+            models.AnnotationModeration.annotation_id == _annotation.c.id
+        ),
+    ]
+    if nipsa:
+        nipsa_userids = sa.select(
+            [sa.func.concat("acct:", _user.c.username, "@", _user.c.authority)]
+        ).where(_user.c.nipsa.is_(True))
+        clauses.append(~_annotation.c.userid.in_(nipsa_userids))
+    return sa.and_(*clauses)
+
+
+def _user_shared_counts(session, userid, exclude_ids):
+    """
+    Return the shared annotation counts per group that ``userid``'s NIPSA flag hides.
+
+    :param exclude_ids: the IDs of annotations not to count
+    """
+    query = (
+        sa.select([_group.c.id, sa.func.count()])
+        .select_from(_annotation.join(_group, _group.c.pubid == _annotation.c.groupid))
+        .where(_annotation.c.userid == userid)
+        .where(_annotation.c.deleted.is_(False))
+        .where(_is_shared(nipsa=False))
+        .group_by(_group.c.id)
+    )
+    if exclude_ids:
+        query = query.where(~_annotation.c.id.in_(list(exclude_ids)))
+    return session.execute(query).fetchall()
+
+
+def _annotation_deltas(before, after):
+    deltas = {
+        "member_count": Counter(),
+        "annotation_count": Counter(),
+        "shared_annotation_count": Counter(),
+    }
+    for counted, change in [(before, -1), (after, 1)]:
+        for group_id, shared in counted.values():
+            deltas["annotation_count"][group_id] += change
+            if shared:
+                deltas["shared_annotation_count"][group_id] += change
+    return deltas
+
+
+def _apply_deltas(session, deltas):
+    group_ids = set()
+    for counter in deltas.values():
+        group_ids.update(group_id for group_id, delta in counter.items() if delta)
+    if not group_ids:
+        return
+
+    # The changes are all added to the same shard, and the rows are updated
+    # in a consistent order, to avoid deadlocks between concurrent
+    # transactions that change the counts for the same groups.
+    shard = random.randrange(_SHARDS)
+    rows = [
+        dict(
+            {column: counter[group_id] for column, counter in deltas.items()},
+            group_id=group_id,
+            shard=shard,
+        )
+        for group_id in sorted(group_ids)
+    ]
+
+    stmt = pg.insert(_count).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_count.c.group_id, _count.c.shard],
+        set_={column: _count.c[column] + stmt.excluded[column] for column in deltas},
+    )
+    session.execute(stmt)
+
+
+def group_count_factory(context, request):
+    """Return a GroupCountService for the passed context and request."""
+    return GroupCountService(request.db)
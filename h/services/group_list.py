@@ -154,8 +154,9 @@ class GroupListService(object):
     def scoped_groups(self, authority, document_uri):
         if not document_uri:
             return []
-        matching_scopes = self._group_scope_service.fetch_by_scope(document_uri)
-        matching_scope_groupids = [scope.group_id for scope in matching_scopes]
+        matching_scope_groupids = self._group_scope_service.group_ids_in_scope(
+            document_uri
+        )
 
         if not matching_scope_groupids:
             return []
@@ -92,6 +92,9 @@ def group_members_factory(context, request):
 
 
 def _publish(request, event_type, groupid, userid):
+    # Flush the membership change so that the session model reflects it, and
+    # isn't served from a cached copy that predates it.
+    request.db.flush()
     request.realtime.publish_user(
         {
             "type": event_type,
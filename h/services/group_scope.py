@@ -2,8 +2,19 @@
 
 from __future__ import unicode_literals
 
-from h.models import GroupScope
+import itertools
+
+import sqlalchemy as sa
+
+from h.models import Group, GroupScope
 from h.util import group_scope as scope_util
+from h.util.cache import VersionedCache, publish_version
+
+#: Scope indexes for each origin, and the IDs of the groups that have scopes,
+#: shared by all requests handled by this process.
+scope_cache = VersionedCache("group_scope", maxsize=1000, ttl=300)
+
+_SCOPED_GROUP_IDS_KEY = "scoped_group_ids"
 
 
 class GroupScopeService(object):
@@ -17,17 +28,83 @@ class GroupScopeService(object):
         :type url: str
         :rtype: list(:class:`~h.models.group_scope.GroupScope`)
         """
+        scope_ids = [scope_id for scope_id, _ in self._match(url)]
+        if not scope_ids:
+            return []
+        return (
+            self._session.query(GroupScope).filter(GroupScope.id.in_(scope_ids)).all()
+        )
+
+    def group_ids_in_scope(self, url):
+        """Return the IDs of the groups with a scope that matches the given URL
+
+        :arg url: URL to find matching groups for
+        :type url: str
+        :rtype: set(int)
+        """
+        return {group_id for _, group_id in self._match(url)}
+
+    def is_scoped(self, group):
+        """Return True if the given group has any scopes
+
+        :type group: :class:`~h.models.group.Group`
+        :rtype: bool
+        """
+        scope_cache.check_version(self._session)
+
+        scoped_group_ids = scope_cache.get(_SCOPED_GROUP_IDS_KEY)
+        if scoped_group_ids is None:
+            query = self._session.query(GroupScope.group_id).distinct()
+            scoped_group_ids = frozenset(group_id for (group_id,) in query)
+            scope_cache.set(_SCOPED_GROUP_IDS_KEY, scoped_group_ids)
+
+        return group.id in scoped_group_ids
+
+    def _match(self, url):
+        """Return (scope ID, group ID) pairs for the scopes that match ``url``."""
         origin = scope_util.parse_origin(url)
         if not origin:
             return []
-        origin_scopes = (
-            self._session.query(GroupScope).filter(GroupScope.origin == origin).all()
+
+        scope_cache.check_version(self._session)
+
+        index = scope_cache.get(origin)
+        if index is None:
+            query = self._session.query(GroupScope).filter(GroupScope.origin == origin)
+            index = scope_util.ScopeIndex(
+                (scope.scope, (scope.id, scope.group_id)) for scope in query
+            )
+            scope_cache.set(origin, index)
+
+        return index.match(url)
+
+
+def watch_scope_changes(session):
+    """
+    Invalidate the cached scopes whenever ``session`` changes group scopes.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _publish_scope_changes):
+        sa.event.listen(session, "before_flush", _publish_scope_changes)
+
+
+def _publish_scope_changes(session, flush_context, instances):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if _changes_scopes(session, obj):
+            publish_version(session, "group_scope")
+            return
+
+
+def _changes_scopes(session, obj):
+    if isinstance(obj, GroupScope):
+        return True
+    if isinstance(obj, Group):
+        return (
+            obj in session.deleted or sa.inspect(obj).attrs.scopes.history.has_changes()
         )
-        return [
-            scope
-            for scope in origin_scopes
-            if scope_util.url_in_scope(url, [scope.scope])
-        ]
+    return False
 
 
 def group_scope_factory(context, request):
@@ -6,7 +6,12 @@ from zope.interface import implementer
 
 from h import models
 from h.interfaces import IGroupService
-from h.util.db import lru_cache_in_transaction
+from h.util.cache import VersionedCache
+from h.util.db import lru_cache_in_transaction, restore, snapshot
+
+#: Snapshots of groups, keyed by pubid, shared by all requests when the
+#: ``h.shared_cache`` setting is enabled.
+group_cache = VersionedCache("group", maxsize=10000, ttl=300)
 
 
 # Ideally this would be called the GroupService to match the nomenclature of
@@ -14,9 +19,10 @@ from h.util.db import lru_cache_in_transaction
 # FIXME: rename / split existing GroupService and rename this.
 @implementer(IGroupService)
 class GroupfinderService(object):
-    def __init__(self, session, authority):
+    def __init__(self, session, authority, shared_cache=None):
         self.session = session
         self.authority = authority
+        self.shared_cache = shared_cache
 
         self._cached_find = lru_cache_in_transaction(self.session)(self._find)
 
@@ -24,8 +30,24 @@ class GroupfinderService(object):
         return self._cached_find(id_)
 
     def _find(self, id_):
-        return self.session.query(models.Group).filter_by(pubid=id_).one_or_none()
+        if self.shared_cache is not None:
+            self.shared_cache.check_version(self.session)
+            group_snapshot = self.shared_cache.get(id_)
+            if group_snapshot is not None:
+                return restore(self.session, group_snapshot)
+
+        group = self.session.query(models.Group).filter_by(pubid=id_).one_or_none()
+
+        if self.shared_cache is not None and group is not None:
+            self.shared_cache.set(id_, snapshot(group))
+
+        return group
 
 
 def groupfinder_service_factory(context, request):
-    return GroupfinderService(request.db, request.default_authority)
+    if request.registry.settings.get("h.shared_cache"):
+        shared_cache = group_cache
+    else:
+        shared_cache = None
+
+    return GroupfinderService(request.db, request.default_authority, shared_cache)
@@ -2,7 +2,7 @@
 
 from __future__ import unicode_literals
 from h.models import User
-from h.tasks.indexer import reindex_user_annotations
+from h.tasks.indexer import update_user_nipsa
 
 
 class NipsaService(object):
@@ -60,7 +60,7 @@ class NipsaService(object):
         user.nipsa = True
         if self._flagged_userids is not None:
             self._flagged_userids.add(user.userid)
-        reindex_user_annotations.delay(user.userid)
+        update_user_nipsa.delay(user.userid)
 
     def unflag(self, user):
         """
@@ -73,7 +73,7 @@ class NipsaService(object):
         user.nipsa = False
         if self._flagged_userids is not None:
             self._flagged_userids.remove(user.userid)
-        reindex_user_annotations.delay(user.userid)
+        update_user_nipsa.delay(user.userid)
 
     def clear(self):
         """Unload the cache of flagged userids, if populated."""
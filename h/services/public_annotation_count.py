@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+"""
+Count the public annotations on each page.
+
+The counts are stored per normalized URI in the ``public_annotation_count``
+table, split across several rows per URI which are summed when they're read
+(see :py:class:`h.models.PublicAnnotationCount`). :py:func:`maintain_counts` keeps them up to date by applying the change
+in each annotation's visibility whenever a session flushes: creating, editing
+or deleting an annotation, hiding or unhiding it, and flagging or unflagging
+its author as NIPSA.
+"""
+
+from __future__ import unicode_literals
+
+import itertools
+import random
+from collections import Counter
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+from h import models, storage
+from h.models.group import ReadableBy
+from h.util.cache import TTLCache
+from h.util.uri import normalize
+
+#: Counts returned by :py:meth:`PublicAnnotationCountService.count`, keyed by
+#: normalized URI and shared by all requests handled by this process.
+count_cache = TTLCache(maxsize=10000, ttl=60)
+
+_PENDING_CHANGES_KEY = "h.services.public_annotation_count.pending"
+
+#: The number of rows each URI's count is split across.
+_SHARDS = 8
+
+#: The models whose changes can change the counts.
+_COUNTED_MODELS = (models.Annotation, models.AnnotationModeration, models.User)
+
+_annotation = models.Annotation.__table__
+_count = models.PublicAnnotationCount.__table__
+_group = models.Group.__table__
+_user = models.User.__table__
+
+
+class PublicAnnotationCountService(object):
+
+    """A service for counting the public annotations on a page."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def count(self, uri):
+        """
+        Return the number of public annotations on the page at ``uri``.
+
+        Like a search for ``uri`` this includes the annotations on any other
+        URIs which are known to refer to the same document.
+
+        :param uri: the URI of the page
+        :type uri: unicode
+
+        :rtype: int
+        """
+        cache_key = normalize(uri)
+        count = count_cache.get(cache_key)
+        if count is not None:
+            return count
+
+        uris = {normalize(u) for u in storage.expand_uri(self.session, uri)}
+        count = self.session.execute(
+            sa.select([sa.func.coalesce(sa.func.sum(_count.c.count), 0)]).where(
+                _count.c.uri_normalized.in_(uris)
+            )
+        ).scalar()
+        count = max(int(count), 0)
+
+        count_cache.set(cache_key, count)
+        return count
+
+
+def maintain_counts(session):
+    """
+    Keep the public annotation counts up to date as ``session`` is flushed.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _before_flush):
+        sa.event.listen(session, "before_flush", _before_flush)
+        sa.event.listen(session, "after_flush", _after_flush)
+
+
+@contextmanager
+def counts_maintained(session, annotation_ids):
+    """
+    Keep the counts up to date across bulk changes to some annotations.
+
+    Changes made with Core ``UPDATE`` statements bypass the session's flush
+    hooks, so code which changes annotations that way does it within this
+    context manager instead::
+
+        with counts_maintained(session, ids):
+            session.execute(annotation.update().where(...).values(...))
+
+    :param annotation_ids: the IDs of the annotations that may be changed
+    """
+    annotation_ids = set(annotation_ids)
+    before = _public_target_uris(session, annotation_ids)
+
+    yield
+
+    deltas = Counter()
+    for uri in before.values():
+        deltas[uri] -= 1
+    for uri in _public_target_uris(session, annotation_ids).values():
+        deltas[uri] += 1
+
+    _apply_deltas(session, deltas)
+
+
+def _before_flush(session, flush_context, instances):
+    changed = itertools.chain(session.new, session.dirty, session.deleted)
+    if not any(isinstance(obj, _COUNTED_MODELS) for obj in changed):
+        return
+
+    new_annotations = []
+    annotation_ids = set()
+    nipsa_changes = {}
+
+    for obj in session.new:
+        if isinstance(obj, models.Annotation):
+            new_annotations.append(obj)
+        elif isinstance(obj, models.AnnotationModeration):
+            if obj.annotation is not None:
+                annotation_ids.add(obj.annotation.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, models.Annotation):
+            annotation_ids.add(obj.id)
+        elif isinstance(obj, models.User):
+            if sa.inspect(obj).attrs.nipsa.history.added:
+                was_nipsa = session.execute(
+                    sa.select([_user.c.nipsa]).where(_user.c.id == obj.id)
+                ).scalar()
+                if bool(was_nipsa) != bool(obj.nipsa):
+                    nipsa_changes[obj.userid] = bool(obj.nipsa)
+
+    for obj in session.deleted:
+        if isinstance(obj, models.Annotation):
+            annotation_ids.add(obj.id)
+        elif isinstance(obj, models.AnnotationModeration):
+            annotation_ids.add(obj.annotation_id)
+
+    annotation_ids.discard(None)
+    if not (new_annotations or annotation_ids or nipsa_changes):
+        return
+
+    # The database still holds the pre-flush state, so this finds which of
+    # the changed annotations were public before the flush.
+    before = _public_target_uris(session, annotation_ids)
+
+    session.info[_PENDING_CHANGES_KEY] = (
+        new_annotations,
+        annotation_ids,
+        nipsa_changes,
+        before,
+    )
+
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_CHANGES_KEY, None)
+    if pending is None:
+        return
+
+    new_annotations, annotation_ids, nipsa_changes, before = pending
+    annotation_ids = annotation_ids | {a.id for a in new_annotations}
+
+    deltas = Counter()
+    for uri in before.values():
+        deltas[uri] -= 1
+    for uri in _public_target_uris(session, annotation_ids).values():
+        deltas[uri] += 1
+
+    # The annotations in annotation_ids have already been counted with their
+    # authors' NIPSA flags from before and after the flush.
+    for userid, nipsa in nipsa_changes.items():
+        for uri, count in _user_target_uri_counts(session, userid, annotation_ids):
+            deltas[uri] += -count if nipsa else count
+
+    _apply_deltas(session, deltas)
+
+
+def _is_public(nipsa=True):
+    """
+    Return a SQL condition matching the annotations that everyone can see.
+
+    If ``nipsa`` is False the annotations of NIPSA'd users are included.
+    """
+    clauses = [
+        _annotation.c.deleted.is_(False),
+        _annotation.c.shared.is_(True),
+        _annotation.c.groupid.in_(
+            sa.select([_group.c.pubid]).where(_group.c.readable_by == ReadableBy.world)
+        ),
+        ~sa.exists().where(
+            models.AnnotationModeration.annotation_id == _annotation.c.id
+        ),
+    ]
+    if nipsa:
+        nipsa_userids = sa.select(
+            [sa.func.concat("acct:", _user.c.username, "@", _user.c.authority)]
+        ).where(_user.c.nipsa.is_(True))
+        clauses.append(~_annotation.c.userid.in_(nipsa_userids))
+    return sa.and_(*clauses)
+
+
+def _public_target_uris(session, annotation_ids):
+    """Return the target URIs of the public annotations in ``annotation_ids``."""
+    if not annotation_ids:
+        return {}
+
+    rows = session.execute(
+        sa.select([_annotation.c.id, _annotation.c.target_uri_normalized])
+        .where(_annotation.c.id.in_(list(annotation_ids)))
+        .where(_is_public())
+    )
+    return {row.id: row.target_uri_normalized for row in rows}
+
+
+def _user_target_uri_counts(session, userid, exclude_ids):
+    """
+    Return the annotation counts per URI that ``userid``'s NIPSA flag hides.
+
+    :param exclude_ids: the IDs of annotations not to count
+    """
+    query = (
+        sa.select([_annotation.c.target_uri_normalized, sa.func.count()])
+        .where(_annotation.c.userid == userid)
+        .where(_is_public(nipsa=False))
+        .group_by(_annotation.c.target_uri_normalized)
+    )
+    if exclude_ids:
+        query = query.where(~_annotation.c.id.in_(list(exclude_ids)))
+    return session.execute(query).fetchall()
+
+
+def _apply_deltas(session, deltas):
+    # The changes are all added to the same shard, and the rows are updated
+    # in a consistent order, to avoid deadlocks between concurrent
+    # transactions that change the counts for the same URIs.
+    shard = random.randrange(_SHARDS)
+    rows = [
+        {"uri_normalized": uri, "shard": shard, "count": delta}
+        for uri, delta in sorted(deltas.items())
+        if uri is not None and delta != 0
+    ]
+    if not rows:
+        return
+
+    stmt = pg.insert(_count).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_count.c.uri_normalized, _count.c.shard],
+        set_={"count": _count.c.count + stmt.excluded.count},
+    )
+    session.execute(stmt)
+
+    for uri in deltas:
+        count_cache.invalidate(uri)
+
+
+def public_annotation_count_factory(context, request):
+    """Return a PublicAnnotationCountService for the passed context and request."""
+    return PublicAnnotationCountService(request.db)
@@ -2,8 +2,25 @@
 
 from __future__ import unicode_literals
 
+import json
+import logging
+
+import sqlalchemy as sa
+
 from h import models
 from h.search import index
+from h.services.public_annotation_count import counts_maintained
+
+log = logging.getLogger(__name__)
+
+#: The number of annotations moved to the new userid in each transaction.
+WINDOW_SIZE = 1000
+
+#: The prefix of the ``setting`` keys under which the progress of each
+#: user's rename is kept, so that an interrupted rename can be resumed.
+PROGRESS_KEY_PREFIX = "rename_user.progress."
+
+_annotation = models.Annotation.__table__
 
 
 class UserRenameError(Exception):
@@ -17,9 +34,10 @@ class RenameUserService(object):
     ``check`` should be called first
 
     Validates the new username and updates the User. The user's annotations
-    userid field will be updated. It accepts a reindex function that gets a
-    list of annotation ids, it is then the function's responsibility to reindex
-    these annotations in the search index.
+    userid field will be updated a window at a time. It accepts a reindex
+    function that gets a list of annotation ids, it is then the function's
+    responsibility to commit the window and reindex these annotations in the
+    search index.
 
     This also invalidates all authentication tickets, forcing the user to
     login again.
@@ -44,12 +62,32 @@ class RenameUserService(object):
         return True
 
     def rename(self, user, new_username):
+        """
+        Rename ``user`` to ``new_username`` and move their annotations.
+
+        The annotations are moved and reindexed a window at a time, with each
+        window committed by the ``reindex`` function. If the rename is
+        interrupted, calling this again for the same user carries on where it
+        left off.
+        """
         self.check(user, new_username)
 
+        progress_key = PROGRESS_KEY_PREFIX + str(user.id)
+        progress = self._load_progress(progress_key)
+
+        # Finish reindexing the last window moved before the interruption.
+        if progress["pending_reindex"]:
+            self.reindex(progress["pending_reindex"])
+
         old_userid = user.userid
         user.username = new_username
         new_userid = user.userid
 
+        # Annotations may still be left under the userids of renames that
+        # were interrupted, as well as under the user's current one.
+        old_userids = set(progress["old_userids"]) | {old_userid}
+        old_userids.discard(new_userid)
+
         # Remove auth tickets when renaming the user. We cannot just update the
         # denormalized `user_userid` of these because the previous userid values
         # will have been serialized into the session cookies stored in the
@@ -61,8 +99,36 @@ class RenameUserService(object):
         # can just update the userid.
         self._update_tokens(old_userid, new_userid)
 
-        ids = self._change_annotations(old_userid, new_userid)
-        self.reindex(ids)
+        self.session.flush()
+
+        moved = 0
+        while True:
+            ids = self._change_annotations(old_userids, new_userid)
+            if not ids:
+                break
+
+            self._save_progress(progress_key, old_userids, ids)
+
+            # This commits the window, along with the progress made so far.
+            self.reindex(ids)
+
+            moved += len(ids)
+            log.info("Moved %d annotations to %s", moved, new_userid)
+
+        self.session.query(models.Setting).filter_by(key=progress_key).delete()
+
+    def _load_progress(self, key):
+        setting = self.session.query(models.Setting).get(key)
+        if setting is None:
+            return {"old_userids": [], "pending_reindex": []}
+        return json.loads(setting.value)
+
+    def _save_progress(self, key, old_userids, pending_reindex):
+        value = {"old_userids": sorted(old_userids), "pending_reindex": pending_reindex}
+        self.session.merge(
+            models.Setting(key=key, value=json.dumps(value, ensure_ascii=False))
+        )
+        self.session.flush()
 
     def _purge_auth_tickets(self, user):
         self.session.query(models.AuthTicket).filter(
@@ -74,22 +140,45 @@ class RenameUserService(object):
             models.Token.userid == old_userid
         ).update({"userid": new_userid}, synchronize_session="fetch")
 
-    def _change_annotations(self, old_userid, new_userid):
-        annotations = self._fetch_annotations(old_userid)
-
-        ids = set()
-        for annotation in annotations:
-            annotation.userid = new_userid
-            ids.add(annotation.id)
+    def _change_annotations(self, old_userids, new_userid):
+        """
+        Move the next window of annotations to ``new_userid``.
+
+        Returns the IDs of the annotations that were moved.
+        """
+        if not old_userids:
+            return []
+
+        ids = [
+            row.id
+            for row in self.session.execute(
+                sa.select([_annotation.c.id])
+                .where(_annotation.c.userid.in_(old_userids))
+                .limit(WINDOW_SIZE)
+            )
+        ]
+        if not ids:
+            return []
+
+        with counts_maintained(self.session, ids):
+            result = self.session.execute(
+                _annotation.update()
+                .where(
+                    sa.and_(
+                        _annotation.c.id.in_(ids), _annotation.c.userid.in_(old_userids)
+                    )
+                )
+                .values(userid=new_userid)
+                .returning(_annotation.c.id)
+            )
+            moved = [row.id for row in result]
 
-        return ids
+        # Any of the annotations that are already loaded are out of date now.
+        for obj in list(self.session.identity_map.values()):
+            if isinstance(obj, models.Annotation):
+                self.session.expire(obj, ["userid"])
 
-    def _fetch_annotations(self, userid):
-        return (
-            self.session.query(models.Annotation)
-            .filter(models.Annotation.userid == userid)
-            .yield_per(100)
-        )
+        return moved
 
 
 def make_indexer(request):
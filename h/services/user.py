@@ -5,11 +5,16 @@ from __future__ import unicode_literals
 import sqlalchemy as sa
 
 from h.models import User, UserIdentity
+from h.util.cache import VersionedCache
 from h.util.user import split_user
-from h.util.db import on_transaction_end
+from h.util.db import on_transaction_end, restore, snapshot
 
 UPDATE_PREFS_ALLOWED_KEYS = set(["show_sidebar_tutorial"])
 
+#: Snapshots of users, keyed by (username, authority), shared by all requests
+#: when the ``h.shared_cache`` setting is enabled.
+user_cache = VersionedCache("user", maxsize=10000, ttl=300)
+
 
 class UserNotActivated(Exception):
     """Tried to log in to an unactivated user account."""
@@ -19,15 +24,19 @@ class UserService(object):
 
     """A service for retrieving and performing common operations on users."""
 
-    def __init__(self, default_authority, session):
+    def __init__(self, default_authority, session, shared_cache=None):
         """
         Create a new user service.
 
         :param default_authority: the default authority for users
         :param session: the SQLAlchemy session object
+        :param shared_cache: an optional cache of user snapshots shared with
+            other requests
+        :type shared_cache: h.util.cache.VersionedCache
         """
         self.default_authority = default_authority
         self.session = session
+        self.shared_cache = shared_cache
 
         # Local cache of fetched users.
         self._cache = {}
@@ -66,12 +75,16 @@ class UserService(object):
         cache_key = (username, authority)
 
         if cache_key not in self._cache:
-            self._cache[cache_key] = (
-                self.session.query(User)
-                .filter_by(username=username)
-                .filter_by(authority=authority)
-                .one_or_none()
-            )
+            user = self._fetch_shared([cache_key]).get(cache_key)
+            if user is None:
+                user = (
+                    self.session.query(User)
+                    .filter_by(username=username)
+                    .filter_by(authority=authority)
+                    .one_or_none()
+                )
+                self._share(cache_key, user)
+            self._cache[cache_key] = user
 
         return self._cache[cache_key]
 
@@ -107,6 +120,8 @@ class UserService(object):
 
         userid_tuples = set(cache_keys.keys())
         missing_tuples = userid_tuples - set(self._cache.keys())
+        self._cache.update(self._fetch_shared(missing_tuples))
+        missing_tuples = missing_tuples - set(self._cache.keys())
         missing_ids = [v for k, v in cache_keys.items() if k in missing_tuples]
 
         if missing_ids:
@@ -114,9 +129,31 @@ class UserService(object):
             for user in users:
                 cache_key = (user.username, user.authority)
                 self._cache[cache_key] = user
+                self._share(cache_key, user)
 
         return [v for k, v in self._cache.items() if k in cache_keys.keys()]
 
+    def _fetch_shared(self, cache_keys):
+        """Return the users for ``cache_keys`` that are in the shared cache."""
+        if self.shared_cache is None:
+            return {}
+
+        self.shared_cache.check_version(self.session)
+
+        users = {}
+        for cache_key in cache_keys:
+            user_snapshot = self.shared_cache.get(cache_key)
+            if user_snapshot is not None:
+                users[cache_key] = restore(self.session, user_snapshot)
+        return users
+
+    def _share(self, cache_key, user):
+        """Add ``user`` to the shared cache, if there is one."""
+        if self.shared_cache is None or user is None:
+            return
+
+        self.shared_cache.set(cache_key, snapshot(user))
+
     def fetch_by_identity(self, provider, provider_unique_id):
         """
         Fetch a user by associated identity.
@@ -176,4 +213,13 @@ class UserService(object):
 
 def user_service_factory(context, request):
     """Return a UserService instance for the passed context and request."""
-    return UserService(default_authority=request.default_authority, session=request.db)
+    if request.registry.settings.get("h.shared_cache"):
+        shared_cache = user_cache
+    else:
+        shared_cache = None
+
+    return UserService(
+        default_authority=request.default_authority,
+        session=request.db,
+        shared_cache=shared_cache,
+    )
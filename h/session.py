@@ -1,18 +1,32 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
+
+import copy
+import itertools
+
+import sqlalchemy as sa
 from pyramid.session import SignedCookieSessionFactory
 
+from h import models
 from h.security import derive_key
+from h.util.cache import TTLCache, fetch_versions, publish_version
+
+#: The groups, features and preferences in each user's session model and
+#: profile, shared by all requests handled by this process. Each entry is
+#: stored with the versions of the user, groups and features it was built
+#: from (see :py:func:`watch_profile_changes`).
+profile_cache = TTLCache(maxsize=10000, ttl=300)
+
+#: The version key for the feature flags in everyone's profiles.
+_FEATURES_KEY = "features"
 
 
 def model(request):
     session = {}
     session["csrf"] = request.session.get_csrf_token()
     session["userid"] = request.authenticated_userid
-    session["groups"] = _current_groups(request, request.default_authority)
-    session["features"] = request.feature.all()
-    session["preferences"] = _user_preferences(request.user)
+    session.update(_cached_parts(request, request.default_authority))
     return session
 
 
@@ -36,9 +50,7 @@ def profile(request, authority=None):
     profile = {}
     profile["userid"] = request.authenticated_userid
     profile["authority"] = authority
-    profile["groups"] = _current_groups(request, authority)
-    profile["features"] = request.feature.all()
-    profile["preferences"] = _user_preferences(user)
+    profile.update(_cached_parts(request, authority))
 
     profile.update(user_info(user))
 
@@ -64,6 +76,138 @@ def pop_flash(request):
     }
 
 
+def watch_profile_changes(session):
+    """
+    Invalidate the cached profiles whenever ``session`` changes their contents.
+
+    Joining or leaving a group or a feature cohort invalidates just that
+    user's profiles, and changing a group invalidates the profiles which list
+    it. Only changes to the feature flags themselves invalidate everyone's.
+
+    ``session`` may be a session or a session factory. Calling this more than
+    once for the same session has no further effect.
+    """
+    if not sa.event.contains(session, "before_flush", _publish_profile_changes):
+        sa.event.listen(session, "before_flush", _publish_profile_changes)
+
+
+def _publish_profile_changes(session, flush_context, instances):
+    keys = set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        keys.update(_changed_profile_keys(session, obj))
+
+    for key in sorted(keys):
+        publish_version(session, "profile", key)
+
+
+def _changed_profile_keys(session, obj):
+    """Return the version keys of the profiles that changing ``obj`` affects."""
+    if isinstance(obj, models.Feature):
+        return [_FEATURES_KEY]
+
+    if isinstance(obj, models.FeatureCohort):
+        keys = [_user_key(user) for user in _changed_members(obj, "members")]
+        if (
+            obj in session.new
+            or obj in session.deleted
+            or session.is_modified(obj, include_collections=False)
+            or sa.inspect(obj).attrs.features.history.has_changes()
+        ):
+            keys.append(_FEATURES_KEY)
+        return keys
+
+    if isinstance(obj, models.Group):
+        keys = [_user_key(user) for user in _changed_members(obj, "members")]
+        if obj in session.deleted or (
+            obj not in session.new
+            and session.is_modified(obj, include_collections=False)
+        ):
+            keys.append(_group_key(obj.pubid))
+        return keys
+
+    if isinstance(obj, models.User) and obj not in session.deleted:
+        attrs = sa.inspect(obj).attrs
+        if attrs.groups.history.has_changes() or attrs.cohorts.history.has_changes():
+            return [_user_key(obj)]
+
+    return []
+
+
+def _changed_members(obj, attr):
+    """Return the users added to or removed from ``obj``'s ``attr``."""
+    history = sa.inspect(obj).attrs[attr].history
+    return list(history.added or ()) + list(history.deleted or ())
+
+
+def _user_key(user):
+    return "user:{}".format(user.userid)
+
+
+def _group_key(pubid):
+    return "group:{}".format(pubid)
+
+
+def _cached_parts(request, authority):
+    """
+    Return the groups, features and preferences for the current user.
+
+    These are cached for each combination of user and authority. Changes to
+    the user's own columns (their display name or preferences, for example)
+    give them a new cache key. Other changes that affect the result publish
+    new versions of the user, groups or features they change, and a cached
+    entry is only used while the versions it was built from are current.
+
+    The result is a copy which the caller is free to change.
+    """
+    cache_key = _cache_key(request, authority)
+
+    cached = profile_cache.get(cache_key)
+    if cached is not None:
+        versions, parts = cached
+        if fetch_versions(request.db, "profile", versions) == versions:
+            return copy.deepcopy(parts)
+
+    # Read the user's and the features' versions before building the parts,
+    # so that changes made while they're being built aren't missed. Which
+    # groups' versions are needed isn't known until afterwards.
+    keys = [_FEATURES_KEY]
+    if request.user is not None:
+        keys.append(_user_key(request.user))
+    versions = fetch_versions(request.db, "profile", keys)
+
+    parts = {
+        "groups": _current_groups(request, authority),
+        "features": request.feature.all(),
+        "preferences": _user_preferences(request.user),
+    }
+    versions.update(
+        fetch_versions(
+            request.db, "profile", [_group_key(g["id"]) for g in parts["groups"]]
+        )
+    )
+    profile_cache.set(cache_key, (versions, parts))
+
+    return copy.deepcopy(parts)
+
+
+def _cache_key(request, authority):
+    user = request.user
+    if user is None:
+        user_key = None
+    else:
+        user_key = (
+            user.userid,
+            user.admin,
+            user.staff,
+            user.sidebar_tutorial_dismissed,
+        )
+
+    # Feature flags can be turned on for a single request with query params.
+    overrides = tuple(sorted(p for p in request.GET if p.startswith("__feature__")))
+
+    return (request.host_url, authority, overrides, user_key)
+
+
 def _current_groups(request, authority):
     """Return a list of the groups the current user is a member of.
 
@@ -111,3 +255,11 @@ def includeme(config):
         timeout=3600,
     )
     config.set_session_factory(factory)
+
+    _watch_profile_changes()
+
+
+def _watch_profile_changes():
+    from h.db import Session
+
+    watch_profile_changes(Session)
@@ -19,16 +19,27 @@ from __future__ import unicode_literals
 #        couple of different services at some point.
 
 from datetime import datetime
+import hashlib
+import json
 
 from pyramid import i18n
 
 from h import models, schemas
 from h.db import types
-from h.util.group_scope import url_in_scope
+from h.util.cache import TTLCache
 from h.models.document import update_document_metadata
 
 _ = i18n.TranslationStringFactory(__package__)
 
+#: Maps ``(target URI, digest of the document claims)`` to the ID
+#: of the document that those claims were last resolved to, so that repeated
+#: annotations on the same page don't re-run the document metadata upserts.
+#:
+#: Entries are validated against the database before use (a merge deletes the
+#: merged documents) and the short TTL bounds how long changes made by other
+#: processes, such as ``hypothesis move-uri``, can go unnoticed.
+document_cache = TTLCache(maxsize=10000, ttl=30)
+
 
 def fetch_annotation(session, id_):
     """
@@ -131,13 +142,15 @@ def create_annotation(request, data, group_service):
             "group: " + _("You may not create annotations " "in the specified group!")
         )
 
-    _validate_group_scope(group, data["target_uri"])
+    _validate_group_scope(
+        group, data["target_uri"], request.find_service(name="group_scope")
+    )
 
     annotation = models.Annotation(**data)
     annotation.created = created
     annotation.updated = updated
 
-    document = update_document_metadata(
+    annotation.document = _resolve_document(
         request.db,
         annotation.target_uri,
         document_meta_dicts,
@@ -145,9 +158,12 @@ def create_annotation(request, data, group_service):
         created=created,
         updated=updated,
     )
-    annotation.document = document
 
     request.db.add(annotation)
+    if annotation.references:
+        # Queue the notification to the parent's author, which is sent by a
+        # periodic task (see h.tasks.notification).
+        request.db.add(models.PendingReplyNotification(annotation=annotation))
     request.db.flush()
 
     return annotation
@@ -190,7 +206,9 @@ def update_annotation(request, id_, data, group_service):
             "group: " + _("Invalid group specified for annotation")
         )
     if data.get("target_uri", None):
-        _validate_group_scope(group, data["target_uri"])
+        _validate_group_scope(
+            group, data["target_uri"], request.find_service(name="group_scope")
+        )
 
     annotation.extra.update(data.pop("extra", {}))
 
@@ -200,14 +218,13 @@ def update_annotation(request, id_, data, group_service):
     if document:
         document_uri_dicts = document["document_uri_dicts"]
         document_meta_dicts = document["document_meta_dicts"]
-        document = update_document_metadata(
+        annotation.document = _resolve_document(
             request.db,
             annotation.target_uri,
             document_meta_dicts,
             document_uri_dicts,
             updated=updated,
         )
-        annotation.document = document
 
     return annotation
 
@@ -245,15 +262,49 @@ def expand_uri(session, uri):
     return [docuri.uri for docuri in docuris]
 
 
-def _validate_group_scope(group, target_uri):
-    # If no scopes are present, or if the group is configured to allow
-    # annotations outside of its scope, there's nothing to do here
-    if not group.scopes or group.enforce_scope is False:
+def _resolve_document(
+    session, target_uri, document_meta_dicts, document_uri_dicts, **kwargs
+):
+    """
+    Return the document for the given target URI and document claims.
+
+    If the same claims were recently resolved by this process then return the
+    cached document without re-writing any of its metadata, otherwise call
+    :py:func:`h.models.document.update_document_metadata` and cache the
+    result.
+    """
+    key = _document_cache_key(target_uri, document_meta_dicts, document_uri_dicts)
+
+    document_id = document_cache.get(key)
+    if document_id is not None:
+        document = session.query(models.Document).get(document_id)
+        if document is not None:
+            return document
+        document_cache.invalidate(key)
+
+    document = update_document_metadata(
+        session, target_uri, document_meta_dicts, document_uri_dicts, **kwargs
+    )
+    document_cache.set(key, document.id)
+    return document
+
+
+def _document_cache_key(target_uri, document_meta_dicts, document_uri_dicts):
+    claims = json.dumps(
+        {"meta": document_meta_dicts, "uris": document_uri_dicts}, sort_keys=True
+    )
+    digest = hashlib.sha1(claims.encode("utf-8")).hexdigest()
+    return (target_uri, digest)
+
+
+def _validate_group_scope(group, target_uri, group_scope_service):
+    # If the group is configured to allow annotations outside of its scope,
+    # or if no scopes are present, there's nothing to do here
+    if group.enforce_scope is False or not group_scope_service.is_scoped(group):
         return
     # The target URI must match at least one
     # of a group's defined scopes, if the group has any
-    group_scopes = [scope.scope for scope in group.scopes]
-    if not url_in_scope(target_uri, group_scopes):
+    if group.id not in group_scope_service.group_ids_in_scope(target_uri):
         raise schemas.ValidationError(
             "group scope: "
             + _("Annotations for this target URI " "are not allowed in this group")
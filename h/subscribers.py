@@ -3,10 +3,7 @@
 
 from __future__ import unicode_literals
 from h import __version__
-from h import emails
-from h import storage
-from h.notification import reply
-from h.tasks import mailer
+from h.eventqueue import batched
 
 
 def add_renderer_globals(event):
@@ -30,28 +27,15 @@ def add_renderer_globals(event):
         }
 
 
-def publish_annotation_event(event):
-    """Publish an annotation event to the message queue."""
-    data = {
-        "action": event.action,
-        "annotation_id": event.annotation_id,
-        "src_client_id": event.request.headers.get("X-Client-Id"),
-    }
-    event.request.realtime.publish_annotation(data)
-
-
-def send_reply_notifications(
-    event,
-    get_notification=reply.get_notification,
-    generate_mail=emails.reply_notification.generate,
-    send=mailer.send.delay,
-):
-    """Queue any reply notification emails triggered by an annotation event."""
-    request = event.request
-    with request.tm:
-        annotation = storage.fetch_annotation(event.request.db, event.annotation_id)
-        notification = get_notification(request, annotation, event.action)
-        if notification is None:
-            return
-        send_params = generate_mail(request, notification)
-        send(*send_params)
+@batched
+def publish_annotation_event(events):
+    """Publish annotation events to the message queue."""
+    payloads = [
+        {
+            "action": event.action,
+            "annotation_id": event.annotation_id,
+            "src_client_id": event.request.headers.get("X-Client-Id"),
+        }
+        for event in events
+    ]
+    events[0].request.realtime.publish_annotations(payloads)
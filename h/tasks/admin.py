@@ -12,9 +12,16 @@ log = get_task_logger(__name__)
 
 @celery.task
 def rename_user(user_id, new_username):
+    """
+    Rename a user and move their annotations to the new userid.
+
+    If a previous run of this task was interrupted, running it again for the
+    same user carries on with moving the annotations where it left off.
+    """
     user = celery.request.db.query(models.User).get(user_id)
     if user is None:
         raise ValueError("Could not find user with id %d" % user_id)
 
+    log.info("Renaming user %d to %s", user_id, new_username)
     svc = celery.request.find_service(name="rename_user")
     svc.rename(user, new_username)
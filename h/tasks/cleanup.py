@@ -3,6 +3,7 @@
 from __future__ import unicode_literals
 
 from datetime import datetime, timedelta
+import time
 
 from h import models
 from h.celery import celery
@@ -11,6 +12,17 @@ from h.celery import get_task_logger
 
 log = get_task_logger(__name__)
 
+#: The default number of rows removed in each transaction.
+BATCH_SIZE = 1000
+
+#: The default pause between batches, in seconds, to let replication and other
+#: transactions catch up.
+BATCH_INTERVAL = 0.1
+
+#: The default time a single run of a purge task may spend deleting rows, in
+#: seconds. Anything left over is removed by the next run.
+TIME_BUDGET = 300
+
 
 @celery.task
 def purge_deleted_annotations():
@@ -23,34 +35,86 @@ def purge_deleted_annotations():
     streamer.
     """
     cutoff = datetime.utcnow() - timedelta(minutes=10)
-    celery.request.db.query(models.Annotation).filter_by(deleted=True).filter(
-        models.Annotation.updated < cutoff
-    ).delete()
+    _purge(
+        "deleted_annotations",
+        models.Annotation,
+        models.Annotation.deleted.is_(True),
+        models.Annotation.updated < cutoff,
+    )
 
 
 @celery.task
 def purge_expired_auth_tickets():
-    celery.request.db.query(models.AuthTicket).filter(
-        models.AuthTicket.expires < datetime.utcnow()
-    ).delete()
+    _purge(
+        "expired_auth_tickets",
+        models.AuthTicket,
+        models.AuthTicket.expires < datetime.utcnow(),
+    )
 
 
 @celery.task
 def purge_expired_authz_codes():
-    celery.request.db.query(models.AuthzCode).filter(
-        models.AuthzCode.expires < datetime.utcnow()
-    ).delete()
+    _purge(
+        "expired_authz_codes",
+        models.AuthzCode,
+        models.AuthzCode.expires < datetime.utcnow(),
+    )
 
 
 @celery.task
 def purge_expired_tokens():
     now = datetime.utcnow()
-    celery.request.db.query(models.Token).filter(
-        models.Token.expires < now, models.Token.refresh_token_expires < now
-    ).delete()
+    _purge(
+        "expired_tokens",
+        models.Token,
+        models.Token.expires < now,
+        models.Token.refresh_token_expires < now,
+    )
 
 
 @celery.task
 def purge_removed_features():
     """Remove old feature flags from the database."""
     models.Feature.remove_old_flags(celery.request.db)
+
+
+def _purge(name, model, *criteria):
+    """
+    Delete the ``model`` rows matching ``criteria`` a batch at a time.
+
+    Each batch is committed separately, so that purging a large backlog of
+    rows doesn't hold locks or build up WAL in one huge transaction. The
+    batch size, the pause between batches and the time budget for the whole
+    run can be configured with the ``h.purge.*`` settings.
+    """
+    request = celery.request
+    settings = request.registry.settings
+    batch_size = int(settings.get("h.purge.batch_size", BATCH_SIZE))
+    interval = float(settings.get("h.purge.batch_interval", BATCH_INTERVAL))
+    budget = float(settings.get("h.purge.time_budget", TIME_BUDGET))
+
+    request.db.flush()
+    deadline = time.time() + budget
+    total = 0
+
+    while True:
+        ids = request.db.query(model.id).filter(*criteria).limit(batch_size)
+        deleted = (
+            request.db.query(model)
+            .filter(model.id.in_(ids.subquery()))
+            .delete(synchronize_session=False)
+        )
+        request.tm.commit()
+        request.tm.begin()
+
+        total += deleted
+        request.stats.incr("tasks.cleanup.purge_{}.deleted".format(name), deleted)
+
+        if deleted < batch_size:
+            break
+        if time.time() + interval >= deadline:
+            log.info("purge_%s ran out of time after deleting %d rows", name, total)
+            break
+        time.sleep(interval)
+
+    return total
@@ -3,7 +3,13 @@
 from __future__ import unicode_literals
 from h import models, storage
 from h.celery import celery, get_task_logger
-from h.search.index import BatchIndexer, delete, index
+from h.search.index import (
+    BatchIndexer,
+    delete,
+    delete_many,
+    index,
+    update_user_annotations,
+)
 
 log = get_task_logger(__name__)
 
@@ -26,6 +32,36 @@ def add_annotation(id_):
             add_annotation.delay(annotation.thread_root_id)
 
 
+@celery.task
+def add_annotations(ids):
+    """Index many annotations, and the threads of any replies, at once."""
+    if not ids:
+        return
+
+    references = celery.request.db.query(models.Annotation.references).filter(
+        models.Annotation.id.in_(ids)
+    )
+    thread_root_ids = {row.references[0] for row in references if row.references}
+    ids = list(ids) + sorted(thread_root_ids - set(ids))
+
+    indexer = BatchIndexer(celery.request.db, celery.request.es, celery.request)
+    errored = indexer.index(ids)
+    if errored:
+        log.warning("Failed to index annotations into ES6 %s", errored)
+
+    # If a reindex is running at the moment, add the annotations to the new
+    # index as well.
+    future_index = _current_reindex_new_name(celery.request, "reindex.new_index")
+    if future_index is not None:
+        indexer = BatchIndexer(
+            celery.request.db,
+            celery.request.es,
+            celery.request,
+            target_index=future_index,
+        )
+        indexer.index(ids)
+
+
 @celery.task
 def delete_annotation(id_):
     delete(celery.request.es, id_)
@@ -37,6 +73,18 @@ def delete_annotation(id_):
         delete(celery.request.es, id_, target_index=future_index)
 
 
+@celery.task
+def delete_annotations(ids):
+    """Mark many annotations as deleted in the search index at once."""
+    errored = delete_many(celery.request.es, ids)
+    if errored:
+        log.warning("Failed to mark annotations as deleted in ES6 %s", errored)
+
+    future_index = _current_reindex_new_name(celery.request, "reindex.new_index")
+    if future_index is not None:
+        delete_many(celery.request.es, ids, target_index=future_index)
+
+
 @celery.task
 def reindex_user_annotations(userid):
     ids = [
@@ -50,6 +98,29 @@ def reindex_user_annotations(userid):
         log.warning("Failed to re-index annotations into ES6 %s", errored)
 
 
+@celery.task
+def update_user_nipsa(userid):
+    """
+    Apply a user's current NIPSA flag to their annotations in the search index.
+
+    Only the ``nipsa`` field of the indexed annotations is changed, so this
+    is much quicker than reindexing them with ``reindex_user_annotations``.
+    """
+    nipsa_service = celery.request.find_service(name="nipsa")
+    fields = {"nipsa": True if nipsa_service.is_flagged(userid) else None}
+
+    updated, failures = update_user_annotations(celery.request.es, userid, fields)
+    log.info("Updated NIPSA flag of %d annotations by %s", updated, userid)
+    if failures:
+        log.warning("Failed to update NIPSA flag in ES6 %s", failures)
+
+    future_index = _current_reindex_new_name(celery.request, "reindex.new_index")
+    if future_index is not None:
+        update_user_annotations(
+            celery.request.es, userid, fields, target_index=future_index
+        )
+
+
 def _current_reindex_new_name(request, new_index_setting_name):
     settings = celery.request.find_service(name="settings")
     new_index = settings.get(new_index_setting_name)
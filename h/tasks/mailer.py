@@ -2,27 +2,142 @@
 """
 A module for sending email.
 
-This module defines a Celery task for sending emails in a worker process.
+This module defines Celery tasks for sending emails in a worker process.
+
+Rather than connecting to the SMTP server for every email, each worker
+process keeps a connection open and sends all its emails over it.
 """
 from __future__ import unicode_literals
 
+import copy
 import smtplib
+import time
 
 import pyramid_mailer
 import pyramid_mailer.message
+from celery import signals
+from repoze.sendmail.encoding import encode_message
 
 from h.celery import celery, get_task_logger
 
-__all__ = ("send",)
+__all__ = ("send", "send_batch")
 
 log = get_task_logger(__name__)
 
+#: The maximum number of emails sent by each ``send_batch`` task.
+BATCH_SIZE = 100
+
+#: How long the pooled SMTP connection may sit idle before it's replaced
+#: rather than reused, in seconds. SMTP servers drop idle clients after a
+#: few minutes.
+MAX_IDLE_TIME = 60
+
+
+class _SMTPConnection(object):
+    """
+    An SMTP session which is reused for all the emails a process sends.
+
+    The session is opened when the first email is sent, and reopened if the
+    server hangs up on it.
+    """
+
+    def __init__(self):
+        self._smtp = None
+        self._smtp_mailer = None
+        self._last_used = None
+
+    def send(self, smtp_mailer, fromaddr, toaddrs, message):
+        """Send ``message`` using the settings of ``smtp_mailer``."""
+        try:
+            try:
+                self._send(smtp_mailer, fromaddr, toaddrs, message)
+            except smtplib.SMTPServerDisconnected:
+                # The server hung up since we last used the session. Try once
+                # more with a new one before giving up.
+                self.close()
+                self._send(smtp_mailer, fromaddr, toaddrs, message)
+        except smtplib.SMTPRecipientsRefused:
+            # Nothing was sent but the session is still good.
+            raise
+        except Exception:
+            self.close()
+            raise
+        finally:
+            self._last_used = time.time()
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.socket.error, smtplib.SMTPException):
+            self._smtp.close()
+        self._smtp = None
+
+    def _send(self, smtp_mailer, fromaddr, toaddrs, message):
+        idle = self._last_used is not None and (
+            time.time() - self._last_used > MAX_IDLE_TIME
+        )
+        if smtp_mailer is not self._smtp_mailer or idle:
+            self.close()
+
+        if self._smtp is None:
+            self._connect(smtp_mailer, fromaddr, toaddrs, message)
+        else:
+            self._smtp.sendmail(fromaddr, toaddrs, encode_message(message))
+
+    def _connect(self, smtp_mailer, fromaddr, toaddrs, message):
+        """
+        Open a session with ``smtp_mailer`` and send ``message`` over it.
+
+        The session is opened, greeted and logged in to by
+        :py:meth:`repoze.sendmail.mailer.SMTPMailer.send` itself, but the
+        ``quit()`` it ends with is ignored so that the session stays open.
+        """
+
+        def smtp_factory():
+            self._smtp = smtp_mailer.smtp_factory()
+            self._smtp_mailer = smtp_mailer
+            return _KeepOpen(self._smtp)
+
+        mailer = copy.copy(smtp_mailer)
+        mailer.smtp_factory = smtp_factory
+        mailer.send(fromaddr, toaddrs, message)
+
+
+class _KeepOpen(object):
+    """An SMTP session which ignores requests to close it."""
+
+    def __init__(self, smtp):
+        self._smtp = smtp
+
+    def __getattr__(self, name):
+        return getattr(self._smtp, name)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+#: This worker process's SMTP session.
+connection = _SMTPConnection()
+
+
+@signals.worker_process_shutdown.connect
+def close_connection(**kwargs):
+    connection.close()
+
 
 @celery.task(bind=True, max_retries=3)
 def send(self, recipients, subject, body, html=None):
     """
     Send an email.
 
+    This is a batch of one: the email goes over the same SMTP session as
+    those sent by :py:func:`send_batch`.
+
     :param recipients: the list of email addresses to send the email to
     :type recipients: list of unicode strings
 
@@ -32,20 +147,97 @@ def send(self, recipients, subject, body, html=None):
     :param body: the body of the email
     :type body: unicode
     """
+    unsent, exc = _send_all("send", [(recipients, subject, body, html)])
+    if unsent:
+        # Exponential backoff in case the SMTP service is having problems.
+        countdown = self.default_retry_delay * 2 ** self.request.retries
+        self.retry(exc=exc, countdown=countdown)
+
+
+@celery.task(bind=True, max_retries=3)
+def send_batch(self, emails):
+    """
+    Send several emails over a single SMTP session.
+
+    If the SMTP server fails part way through, the emails which haven't been
+    sent yet are retried later.
+
+    :param emails: the emails to send, each a list of the arguments to
+        :py:func:`send`
+    :type emails: list of lists
+    """
+    unsent, exc = _send_all("send_batch", emails)
+    if unsent:
+        countdown = self.default_retry_delay * 2 ** self.request.retries
+        self.retry(args=[unsent], exc=exc, countdown=countdown)
+
+
+def batches(emails):
+    """Split ``emails`` into lists of arguments for :py:func:`send_batch`."""
+    emails = list(emails)
+    for start in range(0, len(emails), BATCH_SIZE):
+        yield emails[start : start + BATCH_SIZE]
+
+
+def _send_all(task_name, emails):
+    """
+    Send ``emails``, stopping at the first failure of the SMTP server.
+
+    :returns: the emails which weren't sent and the error which stopped them
+    """
+    request = celery.request
+    mailer = pyramid_mailer.get_mailer(request)
+    if request.debug:
+        log.info("emailing in debug mode: check the `mail/' directory")
+
+    start = time.time()
+    sent = refused = 0
+    for i, email in enumerate(emails):
+        try:
+            _send(mailer, *email)
+        except smtplib.SMTPRecipientsRefused as exc:
+            refused += 1
+            log.warning(
+                "Recipient was refused when trying to send an email. Does the user have an invalid email address?",
+                exc_info=exc,
+            )
+        except (smtplib.socket.error, smtplib.SMTPException) as exc:
+            unsent = emails[i:]
+            _report(request, task_name, sent, refused, len(unsent), start)
+            return unsent, exc
+        else:
+            sent += 1
+
+    _report(request, task_name, sent, refused, 0, start)
+    return [], None
+
+
+def _send(mailer, recipients, subject, body, html=None):
     email = pyramid_mailer.message.Message(
         subject=subject, recipients=recipients, body=body, html=html
     )
-    mailer = pyramid_mailer.get_mailer(celery.request)
-    try:
-        if celery.request.debug:
-            log.info("emailing in debug mode: check the `mail/' directory")
+
+    smtp_mailer = getattr(mailer, "smtp_mailer", None)
+    if smtp_mailer is None:
+        # The debug mailer writes emails to files rather than sending them.
         mailer.send_immediately(email)
-    except smtplib.SMTPRecipientsRefused as exc:
-        log.warning(
-            "Recipient was refused when trying to send an email. Does the user have an invalid email address?",
-            exc_info=exc,
-        )
-    except (smtplib.socket.error, smtplib.SMTPException) as exc:
-        # Exponential backoff in case the SMTP service is having problems.
-        countdown = self.default_retry_delay * 2 ** self.request.retries
-        self.retry(exc=exc, countdown=countdown)
+        return
+
+    email.sender = email.sender or mailer.default_sender
+    connection.send(smtp_mailer, email.sender, email.send_to, email.to_message())
+
+
+def _report(request, task_name, sent, refused, unsent, start):
+    duration = time.time() - start
+    log.info(
+        "Sent %d emails in %.2fs (%d refused, %d left to retry)",
+        sent,
+        duration,
+        refused,
+        unsent,
+    )
+    prefix = "tasks.mailer." + task_name
+    request.stats.incr(prefix + ".sent", sent)
+    request.stats.incr(prefix + ".refused", refused)
+    request.stats.incr(prefix + ".unsent", unsent)
+    request.stats.timing(prefix + ".duration", int(duration * 1000))
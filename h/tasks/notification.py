@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Celery tasks for notifying users about activity on their annotations.
+
+Reply notifications aren't sent as replies are created. Instead each new reply
+is queued in the ``pending_reply_notification`` table, and
+:py:func:`send_reply_notifications` runs periodically and sends the
+notifications for the queued replies, combining those to the same user into a
+single email.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import sqlalchemy as sa
+from sqlalchemy.orm import subqueryload
+
+from h import emails, models
+from h.celery import celery, get_task_logger
+from h.notification import reply
+from h.tasks import mailer
+
+__all__ = ("send_reply_notifications",)
+
+log = get_task_logger(__name__)
+
+#: The most queued replies to notify about in one run. Any others are left
+#: for the next run.
+PAGE_SIZE = 1000
+
+#: The key of the PostgreSQL advisory lock held while notifications are sent,
+#: so that overlapping runs don't send the same notifications.
+LOCK_KEY = 0x7265706C79  # "reply"
+
+
+@celery.task
+def send_reply_notifications():
+    """Send notifications for the replies queued since the last run."""
+    request = celery.request
+
+    # The lock is released when the task's transaction ends, after the
+    # replies it notified about have been removed from the queue.
+    locked = request.db.execute(
+        sa.select([sa.func.pg_try_advisory_xact_lock(LOCK_KEY)])
+    ).scalar()
+    if not locked:
+        log.info("Reply notifications are already being sent")
+        return
+
+    pending = (
+        request.db.query(
+            models.PendingReplyNotification.id,
+            models.PendingReplyNotification.annotation_id,
+        )
+        .order_by(models.PendingReplyNotification.id)
+        .limit(PAGE_SIZE)
+        .all()
+    )
+    if not pending:
+        return
+
+    replies = (
+        request.db.query(models.Annotation)
+        .options(subqueryload(models.Annotation.document))
+        .filter(
+            models.Annotation.id.in_([p.annotation_id for p in pending]),
+            models.Annotation.deleted.is_(False),
+            models.Annotation.shared.is_(True),
+        )
+        .order_by(models.Annotation.created)
+    )
+    notifications = reply.get_notifications(request, replies.all())
+
+    by_user = OrderedDict()
+    for notification in notifications:
+        by_user.setdefault(notification.parent_user.id, []).append(notification)
+
+    messages = []
+    for user_notifications in by_user.values():
+        if len(user_notifications) == 1:
+            email = emails.reply_notification.generate(request, user_notifications[0])
+        else:
+            email = emails.reply_notification.generate_digest(
+                request, user_notifications
+            )
+        messages.append(email)
+
+    for batch in mailer.batches(messages):
+        mailer.send_batch.delay(batch)
+
+    request.db.query(models.PendingReplyNotification).filter(
+        models.PendingReplyNotification.id.in_([p.id for p in pending])
+    ).delete(synchronize_session=False)
+
+    log.info(
+        "Sent %d reply notifications in %d emails", len(notifications), len(by_user)
+    )
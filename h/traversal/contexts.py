@@ -21,6 +21,7 @@ the view callable as the ``context`` argument.
 """
 from __future__ import unicode_literals
 
+from pyramid.decorator import reify
 from pyramid.security import DENY_ALL
 from pyramid.security import Allow
 from pyramid.security import principals_allowed_by_permission
@@ -140,6 +141,10 @@ class GroupContext(object):
     def links(self):
         return self.links_service.get_all(self.group)
 
+    @reify
+    def counts(self):
+        return self.request.find_service(name="group_count").counts(self.group)
+
     @property
     def organization(self):
         if self.group.organization is not None:
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+"""Process-wide caches that outlive a single request or transaction."""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import threading
+import time
+import uuid
+import weakref
+
+import sqlalchemy
+
+#: Live :py:class:`VersionedCache` instances, grouped by namespace.
+_versioned_caches = {}
+
+#: The :py:class:`_ChangePublisher` listening for each session's flushes,
+#: keyed by the session or session factory passed to
+#: :py:func:`publish_on_change`.
+_change_publishers = weakref.WeakKeyDictionary()
+
+
+class TTLCache(object):
+    """
+    A size- and time-bounded LRU cache.
+
+    Unlike :py:class:`h.util.db.lru_cache_in_transaction` the contents of a
+    ``TTLCache`` are not cleared when the database transaction ends, so a
+    single instance can be shared by all requests handled by a process. Only
+    store plain values (IDs, strings, tuples, etc) in it, never ORM objects,
+    which are bound to the session that loaded them.
+
+    Entries expire ``ttl`` seconds after they were set (or never, if ``ttl``
+    is None) and the least recently used entries are evicted once the cache
+    holds more than ``maxsize`` of them.
+
+    Example::
+
+        cache = TTLCache(maxsize=1000, ttl=30)
+
+        cache.set('foo', 42)
+        cache.get('foo')  # => 42
+        cache.get('bar')  # => None
+        cache.invalidate('foo')
+        cache.get('foo')  # => None
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for ``key``, or ``default`` if it isn't cached."""
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                return default
+
+            if expires is not None and expires <= self._timer():
+                return default
+
+            # Re-insert the entry to mark it as the most recently used.
+            self._data[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        """Cache ``value`` under ``key``, evicting old entries if necessary."""
+        with self._lock:
+            self._data.pop(key, None)
+            expires = None if self.ttl is None else self._timer() + self.ttl
+            self._data[key] = (expires, value)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove ``key`` from the cache if it's present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class StaleWhileRevalidateCache(TTLCache):
+    """
+    A :py:class:`TTLCache` that keeps serving entries while they're refreshed.
+
+    Entries are fresh for ``fresh_ttl`` seconds after they're set, then stale
+    until they expire ``ttl`` seconds after they were set. Rather than have
+    every request that finds an entry stale recompute it at once,
+    :py:meth:`lookup` asks just one caller to refresh it and gives everyone
+    else the stale value in the meantime. If the refresh hasn't been stored
+    within another ``fresh_ttl`` seconds (because it failed, say) the next
+    caller is asked instead.
+
+    Example::
+
+        value, refresh = cache.lookup(key)
+        if refresh:
+            value = compute()
+            cache.set(key, value)
+    """
+
+    def __init__(self, maxsize=1024, ttl=600, fresh_ttl=60, timer=time.time):
+        super(StaleWhileRevalidateCache, self).__init__(
+            maxsize=maxsize, ttl=ttl, timer=timer
+        )
+        self.fresh_ttl = fresh_ttl
+        self._refreshing = {}
+
+    def lookup(self, key):
+        """
+        Return a ``(value, refresh)`` tuple for ``key``.
+
+        ``value`` is the cached value, or None if there isn't one. ``refresh``
+        is True if the caller should compute a new value and :py:meth:`set` it.
+        """
+        entry = super(StaleWhileRevalidateCache, self).get(key)
+        now = self._timer()
+
+        with self._lock:
+            if entry is None:
+                self._refreshing.pop(key, None)
+                return (None, True)
+
+            fresh_until, value = entry
+            if now < fresh_until:
+                return (value, False)
+
+            claimed_at = self._refreshing.get(key)
+            if claimed_at is not None and now - claimed_at < self.fresh_ttl:
+                return (value, False)
+
+            if len(self._refreshing) >= self.maxsize:
+                # Forget refreshes that were abandoned long ago.
+                self._refreshing = {
+                    k: t
+                    for k, t in self._refreshing.items()
+                    if now - t < self.fresh_ttl
+                }
+            self._refreshing[key] = now
+            return (value, True)
+
+    def get(self, key, default=None):
+        """Return the value for ``key``, stale or not, or ``default``."""
+        entry = super(StaleWhileRevalidateCache, self).get(key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def set(self, key, value):
+        """Cache ``value`` under ``key`` as a fresh entry."""
+        with self._lock:
+            self._refreshing.pop(key, None)
+        entry = (self._timer() + self.fresh_ttl, value)
+        super(StaleWhileRevalidateCache, self).set(key, entry)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._refreshing.pop(key, None)
+        super(StaleWhileRevalidateCache, self).invalidate(key)
+
+    def clear(self):
+        with self._lock:
+            self._refreshing.clear()
+        super(StaleWhileRevalidateCache, self).clear()
+
+
+class VersionedCache(TTLCache):
+    """
+    A :py:class:`TTLCache` which is emptied when its namespace's version changes.
+
+    The version of each namespace is stored in the ``setting`` table so that
+    it's shared by every process using the database. Code that changes the
+    data behind a cache publishes a new version with :py:func:`publish_version`
+    and every cache in that namespace drops its contents when it next calls
+    :py:meth:`check_version`.
+
+    To avoid querying the database for every lookup the version is only
+    re-read every ``poll_interval`` seconds, so other processes may serve
+    stale entries for up to that long after a change. Caches in the process
+    that published the new version are cleared immediately.
+    """
+
+    def __init__(
+        self, namespace, maxsize=1024, ttl=60, poll_interval=5, timer=time.time
+    ):
+        super(VersionedCache, self).__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+        self.namespace = namespace
+        self.poll_interval = poll_interval
+        self._version = None
+        self._checked_at = None
+
+        _versioned_caches.setdefault(namespace, weakref.WeakSet()).add(self)
+
+    def check_version(self, session):
+        """Clear the cache if a new version of its namespace was published."""
+        now = self._timer()
+        if self._checked_at is not None and now - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = now
+
+        version = session.execute(
+            sqlalchemy.text("SELECT value FROM setting WHERE key = :key"),
+            {"key": _version_key(self.namespace)},
+        ).scalar()
+
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+
+def publish_version(session, namespace, key=None):
+    """
+    Invalidate every :py:class:`VersionedCache` in ``namespace``.
+
+    If ``key`` is given only the version of that key within ``namespace`` is
+    changed, as read by :py:func:`fetch_versions`, and the namespace's
+    :py:class:`VersionedCache` instances are left alone.
+
+    A new version is written as part of ``session``'s current transaction, so
+    caches in other processes are only invalidated if it's committed.
+    """
+    session.execute(
+        sqlalchemy.text(
+            "INSERT INTO setting (key, value, created, updated) "
+            "VALUES (:key, :value, now(), now()) "
+            "ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, updated = excluded.updated"
+        ),
+        {"key": _version_key(namespace, key), "value": uuid.uuid4().hex},
+    )
+
+    if key is None:
+        for cache in list(_versioned_caches.get(namespace, ())):
+            cache.clear()
+
+
+def fetch_versions(session, namespace, keys):
+    """
+    Return the current version of each of ``keys`` within ``namespace``.
+
+    This is for caches whose entries depend on a few of many separately
+    versioned things, such as a single user's data, rather than on a whole
+    namespace. A cache stores the versions alongside each entry and the entry
+    is still good as long as these versions haven't changed.
+
+    :returns: a dict mapping each key to its version, or to None if no version
+        of it has been published
+    """
+    versions = dict.fromkeys(keys)
+    if not versions:
+        return versions
+
+    setting_keys = {_version_key(namespace, key): key for key in versions}
+    rows = session.execute(
+        sqlalchemy.text("SELECT key, value FROM setting WHERE key IN :keys"),
+        {"keys": tuple(setting_keys)},
+    )
+    for setting_key, version in rows:
+        versions[setting_keys[setting_key]] = version
+    return versions
+
+
+def clear_versioned_caches():
+    """
+    Empty every :py:class:`VersionedCache` in this process.
+
+    This is for when the database has been changed without publishing new
+    versions, for example when it's wiped between tests.
+    """
+    for caches in list(_versioned_caches.values()):
+        for cache in list(caches):
+            cache.clear()
+
+
+def publish_on_change(session, namespace, classes, ignore=()):
+    """
+    Publish a new version of ``namespace`` when ``classes`` are changed.
+
+    Listens for flushes of ``session`` (a session or a session factory) and
+    calls :py:func:`publish_version` whenever the flush changes the columns
+    of, or deletes, an instance of one of the model ``classes``. Newly added
+    instances don't invalidate anything, since the caches only hold objects
+    that already existed.
+
+    :param ignore: the names of attributes whose changes shouldn't publish a
+        new version, because the caches can serve out of date values of them
+        (such as a user's last login date)
+    """
+    publisher = _change_publishers.get(session)
+    if publisher is None:
+        publisher = _change_publishers[session] = _ChangePublisher()
+        sqlalchemy.event.listen(session, "before_flush", publisher)
+    publisher.add(namespace, classes, ignore)
+
+
+class _ChangePublisher(object):
+    """The flush listener for one session registered by :py:func:`publish_on_change`."""
+
+    def __init__(self):
+        # Lists of (classes, ignore) tuples keyed by namespace.
+        self._namespaces = {}
+
+    def add(self, namespace, classes, ignore):
+        self._namespaces.setdefault(namespace, []).append(
+            (tuple(classes), frozenset(ignore))
+        )
+
+    def __call__(self, session, flush_context, instances):
+        for namespace, watched in sorted(self._namespaces.items()):
+            changed = any(
+                isinstance(obj, classes) and _is_changed(obj, ignore)
+                for obj in session.dirty
+                for classes, ignore in watched
+            )
+            deleted = any(
+                isinstance(obj, classes)
+                for obj in session.deleted
+                for classes, _ in watched
+            )
+
+            if changed or deleted:
+                publish_version(session, namespace)
+
+
+def _is_changed(obj, ignore):
+    """
+    Return True if ``obj`` has unflushed changes to anything but ``ignore``.
+
+    Like ``session.is_modified(obj, include_collections=False)`` this looks at
+    the object's columns and many-to-one relationships.
+    """
+    state = sqlalchemy.inspect(obj)
+    for prop in state.mapper.attrs:
+        if prop.key in ignore or getattr(prop, "uselist", False):
+            continue
+        if state.attrs[prop.key].history.has_changes():
+            return True
+    return False
+
+
+def _version_key(namespace, key=None):
+    if key is None:
+        return "cache_version.{}".format(namespace)
+    return "cache_version.{}.{}".format(namespace, key)
@@ -8,6 +8,7 @@ except ImportError:
     from backports.functools_lru_cache import lru_cache
 
 import sqlalchemy
+from sqlalchemy.orm import make_transient_to_detached
 
 
 class lru_cache_in_transaction(object):  # noqa: N801
@@ -78,3 +79,43 @@ def on_transaction_end(session):
         return func
 
     return decorate
+
+
+def snapshot(obj):
+    """
+    Return a copy of the column values of the ORM object ``obj``.
+
+    Unlike the object itself the snapshot isn't bound to a session, so it can
+    be kept in a cache that is shared between requests and turned back into
+    an object with :py:func:`restore`. Relationships aren't included in the
+    snapshot and will be lazy-loaded from the restored object as usual.
+    """
+    mapper = sqlalchemy.inspect(obj).mapper
+    values = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+    return (mapper.class_, values)
+
+
+def restore(session, snapshot):
+    """
+    Return the ORM object for a :py:func:`snapshot`, without querying the DB.
+
+    If an object with the same identity is already in the ``session`` that
+    object is returned unchanged. Otherwise a new persistent object is added
+    to the session with the snapshot's values.
+    """
+    cls, values = snapshot
+    mapper = sqlalchemy.inspect(cls)
+
+    identity_key = mapper.identity_key_from_primary_key(
+        [values[mapper.get_property_by_column(col).key] for col in mapper.primary_key]
+    )
+    existing = session.identity_map.get(identity_key)
+    if existing is not None:
+        return existing
+
+    obj = mapper.class_manager.new_instance()
+    for key, value in values.items():
+        setattr(obj, key, value)
+    make_transient_to_detached(obj)
+    session.add(obj)
+    return obj
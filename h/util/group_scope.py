@@ -2,6 +2,8 @@
 
 from __future__ import unicode_literals
 
+from collections import defaultdict
+
 from h._compat import urlparse
 
 
@@ -20,6 +22,53 @@ def url_in_scope(url, scope_urls):
     return any((url.startswith(scope_url) for scope_url in scope_urls))
 
 
+class ScopeIndex(object):
+    """
+    An index for finding which of many scope URLs a URL is in.
+
+    A URL is in a scope if it begins with the scope URL, as in
+    :py:func:`url_in_scope`. Rather than testing the URL against every scope
+    in turn, the index looks up each prefix of the URL that is as long as one
+    of the scopes, so the cost grows with the number of distinct scope lengths
+    instead of the number of scopes.
+
+    Example::
+
+        index = ScopeIndex([("http://foo.com/a/", 1), ("http://foo.com/b/", 2)])
+
+        index.match("http://foo.com/a/page.html")  # => [1]
+    """
+
+    def __init__(self, scopes):
+        """
+        Create an index of ``scopes``.
+
+        :arg scopes: (scope URL, value) pairs to index
+        :type scopes: iterable of tuples
+        """
+        self._values = defaultdict(list)
+        for scope_url, value in scopes:
+            self._values[scope_url].append(value)
+        self._lengths = sorted(set(len(scope_url) for scope_url in self._values))
+
+    def match(self, url):
+        """
+        Return the values of all the scopes that ``url`` is in.
+
+        :arg url: URL string in question
+        :rtype: list
+        """
+        matches = []
+        for length in self._lengths:
+            if length > len(url):
+                break
+            matches.extend(self._values.get(url[:length], ()))
+        return matches
+
+    def __len__(self):
+        return len(self._values)
+
+
 def parse_scope_from_url(url):
     """
     Return a tuple representing the origin and path of a URL
@@ -2,6 +2,7 @@
 
 from __future__ import unicode_literals
 
+import hashlib
 import re
 from functools import partial
 
@@ -9,6 +10,8 @@ import bleach
 import mistune
 from bleach.linkifier import LinkifyFilter
 
+from h.util.cache import TTLCache
+
 LINK_REL = "nofollow noopener"
 
 MARKDOWN_TAGS = [
@@ -56,6 +59,8 @@ ALLOWED_ATTRIBUTES.update(MARKDOWN_ATTRIBUTES)
 cleaner = None
 # Singleton instance of the Markdown instance
 markdown = None
+# Cache of rendered and sanitized HTML, keyed by a digest of the Markdown text
+render_cache = TTLCache(maxsize=4096, ttl=None)
 
 
 class MathMarkdown(mistune.Markdown):
@@ -95,10 +100,35 @@ class MathRenderer(mistune.Renderer):
 
 
 def render(text):
-    if text is not None:
+    if text is None:
+        return None
+
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    html = render_cache.get(key)
+    if html is None:
         render = _get_markdown()
-        return sanitize(render(text))
-    return None
+        html = sanitize(render(text))
+        render_cache.set(key, html)
+    return html
+
+
+def render_many(texts):
+    """
+    Render each of the given Markdown texts to sanitized HTML.
+
+    Identical texts are only rendered once.
+
+    :type texts: iterable of unicode
+    :returns: the rendered HTML, in the same order as ``texts``
+    :rtype: list of unicode
+    """
+    rendered = {}
+    result = []
+    for text in texts:
+        if text not in rendered:
+            rendered[text] = render(text)
+        result.append(rendered[text])
+    return result
 
 
 def sanitize(text):
@@ -64,6 +64,11 @@ elsewhere in the Hypothesis application. URI expansion is handled by
 """
 import re
 
+try:
+    from functools import lru_cache
+except ImportError:
+    from backports.functools_lru_cache import lru_cache
+
 from h._compat import (
     PY2,
     url_quote,
@@ -100,6 +105,16 @@ BLACKLISTED_QUERY_PARAMS = [
     )
 ]
 
+# All of the BLACKLISTED_QUERY_PARAMS combined into a single regex, so that
+# each query parameter name only needs to be matched once.
+BLACKLISTED_QUERY_PARAMS_RE = re.compile(
+    "|".join("(?:{})".format(patt.pattern) for patt in BLACKLISTED_QUERY_PARAMS)
+)
+
+# The maximum number of URIs whose normalized form is remembered by
+# :py:func:`normalize`.
+NORMALIZE_CACHE_SIZE = 16384
+
 # From RFC3986. The ABNF for path segments is
 #
 #   path-abempty  = *( "/" segment )
@@ -135,13 +150,44 @@ UNRESERVED_QUERY_VALUE = "-._~:@!$'()*,="
 VIA_PREFIX = "https://via.hypothes.is/"
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize(uristr):
     """
     Translate the given URI into a normalized form.
 
+    The results are memoized, as the same handful of URIs tend to be
+    normalized over and over again.
+
     :type uristr: unicode
     :rtype: unicode
     """
+    return _normalize(uristr)
+
+
+def normalize_many(uristrs):
+    """
+    Translate each of the given URIs into a normalized form.
+
+    This is meant for bulk operations over many distinct URIs. Duplicates
+    within ``uristrs`` are only normalized once, but unlike
+    :py:func:`normalize` the results aren't added to the process-wide cache,
+    so a big batch doesn't evict the URIs that the application keeps seeing.
+
+    :type uristrs: iterable of unicode
+    :returns: the normalized URIs, in the same order as ``uristrs``
+    :rtype: list of unicode
+    """
+    normalized = {}
+    result = []
+    for uristr in uristrs:
+        if uristr not in normalized:
+            normalized[uristr] = _normalize(uristr)
+        result.append(normalized[uristr])
+    return result
+
+
+def _normalize(uristr):
+    """Translate the given URI into a normalized form, bypassing the cache."""
 
     # In Python 2 functions in urllib expect a byte string whereas in Python 3
     # some functions in urllib work with a byte string or unicode but
@@ -292,4 +338,4 @@ def _normalize_queryvalue(value):
 
 def _blacklisted_query_param(s):
     """Return True if the given string matches any BLACKLISTED_QUERY_PARAMS."""
-    return any(re.match(patt, s) for patt in BLACKLISTED_QUERY_PARAMS)
+    return BLACKLISTED_QUERY_PARAMS_RE.match(s) is not None
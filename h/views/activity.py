@@ -167,11 +167,11 @@ class GroupSearchController(SearchController):
                 ]
                 moderators = sorted(moderators, key=lambda k: k["username"].lower())
 
-        group_annotation_count = self._get_total_annotations_in_group(
-            result, self.request
-        )
-
-        result["stats"] = {"annotation_count": group_annotation_count}
+        counts = self.request.find_service(name="group_count").counts(self.group)
+        result["stats"] = {
+            "annotation_count": self._get_total_annotations_in_group(result, counts),
+            "member_count": counts.member_count,
+        }
         result["group"] = {
             "created": utc_us_style_date(self.group.created),
             "description": self.group.description,
@@ -221,18 +221,19 @@ class GroupSearchController(SearchController):
 
         return result
 
-    def _get_total_annotations_in_group(self, result, request):
+    def _get_total_annotations_in_group(self, result, counts):
         """
         Get number of annotations in group.
 
-        If the search result already has this number don't run a query, just re-use it.
+        If the search result already has this number don't run a query, just
+        re-use it. Otherwise use the group's shared top-level annotation count,
+        which is kept up to date as annotations change rather than counted.
+        Like an unfiltered search, this leaves out annotations hidden by a
+        moderator and those by NIPSA'd users.
         """
-        group_annotation_count = result["search_results"].total
         if len(self.parsed_query_params) > 1:
-            group_annotation_count = self.request.find_service(
-                name="annotation_stats"
-            ).group_annotation_count(self.group.pubid)
-        return group_annotation_count
+            return counts.shared_annotation_count
+        return result["search_results"].total
 
     @view_config(request_method="POST", request_param="group_join")
     def join(self):
@@ -39,6 +39,8 @@ def badge_add(request):
         request.db.rollback()
         msg = _("{uri} is already blocked.").format(uri=uri)
         request.session.flash(msg, "error")
+    else:
+        models.Blocklist.changed(request.db)
 
     index = request.route_path("admin.badge")
     return httpexceptions.HTTPSeeOther(location=index)
@@ -54,6 +56,7 @@ def badge_add(request):
 def badge_remove(request):
     uri = request.params["remove"]
     request.db.query(models.Blocklist).filter_by(uri=uri).delete()
+    models.Blocklist.changed(request.db)
 
     index = request.route_path("admin.badge")
     return httpexceptions.HTTPSeeOther(location=index)
@@ -10,7 +10,6 @@ from h import form  # noqa F401
 from h import i18n
 from h import models
 from h import paginator
-from h.models.annotation import Annotation
 from h.models.group_scope import GroupScope
 from h.models.organization import Organization
 from h.schemas.forms.admin.group import CreateAdminGroupSchema
@@ -141,6 +140,7 @@ class GroupEditViews(object):
         self.list_org_svc = request.find_service(name="list_organizations")
         self.user_svc = request.find_service(name="user")
         self.group_update_svc = self.request.find_service(name="group_update")
+        self.group_count_svc = self.request.find_service(name="group_count")
         self.group_members_svc = self.request.find_service(name="group_members")
 
         self.organizations = {
@@ -229,17 +229,13 @@ class GroupEditViews(object):
         )
 
     def _template_context(self):
-        num_annotations = (
-            self.request.db.query(Annotation)
-            .filter_by(groupid=self.group.pubid)
-            .count()
-        )
+        counts = self.group_count_svc.counts(self.group)
         return {
             "form": self.form.render(),
             "pubid": self.group.pubid,
             "group_name": self.group.name,
-            "annotation_count": num_annotations,
-            "member_count": len(self.group.members),
+            "annotation_count": counts.annotation_count,
+            "member_count": counts.member_count,
         }
 
 
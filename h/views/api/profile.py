@@ -2,6 +2,9 @@
 
 from __future__ import unicode_literals
 
+import hashlib
+import json
+
 from pyramid.httpexceptions import HTTPBadRequest
 
 from h import session as h_session
@@ -19,7 +22,7 @@ from h.views.api.config import api_config
 )
 def profile(request):
     authority = request.params.get("authority")
-    return h_session.profile(request, authority)
+    return _conditional(request, h_session.profile(request, authority))
 
 
 @api_config(
@@ -66,3 +69,16 @@ def update_preferences(request):
         raise HTTPBadRequest(str(e))
 
     return h_session.profile(request)
+
+
+def _conditional(request, profile):
+    """
+    Tag the response with an ETag for ``profile``.
+
+    Clients that send the ETag back in an ``If-None-Match`` header get an
+    empty "304 Not Modified" response if their profile hasn't changed.
+    """
+    serialized = json.dumps(profile, sort_keys=True).encode("utf-8")
+    request.response.etag = hashlib.md5(serialized).hexdigest()
+    request.response.conditional_response = True
+    return profile
@@ -3,23 +3,9 @@
 from __future__ import unicode_literals
 
 from pyramid import httpexceptions
-from webob.multidict import MultiDict
 
-from h import models, search
+from h import models
 from h.util.view import json_view
-from h.util.uri import normalize
-
-
-def _has_uri_ever_been_annotated(db, uri):
-    """Return `True` if a given URI has ever been annotated."""
-
-    # This check is written with SQL directly to guarantee an efficient query
-    # and minimize SQLAlchemy overhead. We query `document_uri.uri_normalized`
-    # instead of `annotation.target_uri_normalized` because there is an existing
-    # index on `uri_normalized`.
-    query = "SELECT EXISTS(SELECT 1 FROM document_uri WHERE uri_normalized = :uri)"
-    result = db.execute(query, {"uri": normalize(uri)}).first()
-    return result[0] is True
 
 
 @json_view(route_name="badge")
@@ -38,19 +24,13 @@ def badge(request):
     if not uri:
         raise httpexceptions.HTTPBadRequest()
 
-    # Do a cheap check to see if this URI has ever been annotated. If not,
-    # and most haven't, then we can skip the costs of a blocklist lookup or
-    # search request. In addition to the Elasticsearch query, the search request
-    # involves several DB queries to expand URIs and enumerate group IDs
-    # readable by the current user.
-    if not _has_uri_ever_been_annotated(request.db, uri):
-        count = 0
-    elif models.Blocklist.is_blocked(request.db, uri):
+    # The count comes from a table of precomputed per-URI counts rather than
+    # a search, so it doesn't involve Elasticsearch or expanding the groups
+    # readable by the current user. Most URIs have never been annotated, so
+    # only check the blocklist when there's something to hide.
+    count = request.find_service(name="public_annotation_count").count(uri)
+
+    if count and models.Blocklist.is_blocked(request.db, uri):
         count = 0
-    else:
-        query = MultiDict({"uri": uri, "limit": 0})
-        s = search.Search(request, stats=request.stats)
-        result = s.run(query)
-        count = result.total
 
     return {"total": count}
@@ -2,17 +2,57 @@
 
 from __future__ import unicode_literals
 
+from calendar import timegm
+from collections import namedtuple
+import hashlib
+import time
+
+from pyramid.response import Response
 from pyramid.view import view_config
 from pyramid import i18n
 from webob.multidict import MultiDict
 
 from h import search
-from h.feeds import render_atom, render_rss
+from h.feeds import atom_entries, render_atom_entries, render_rss_entries, rss_entries
+from h.search.query import LIMIT_DEFAULT, LIMIT_MAX
 from h.storage import fetch_ordered_annotations
+from h.util.cache import TTLCache
 
 
 _ = i18n.TranslationStringFactory(__package__)
 
+#: Rendered feeds, keyed by the feed and its query params and shared by all
+#: requests handled by this process.
+feed_cache = TTLCache(maxsize=1000, ttl=600)
+
+#: How long a cached feed is served before checking for new annotations, in
+#: seconds. Feed readers polling more often than this all get the cached feed.
+REFRESH_INTERVAL = 30
+
+#: How long a cached feed is updated with new annotations before it's rendered
+#: from scratch, in seconds. Annotations which are deleted, hidden or made
+#: private stay in the feed until then.
+REBUILD_INTERVAL = 300
+
+#: Query params which change which annotations come first in a feed. Feeds
+#: with these are rendered from scratch when they're refreshed.
+_ORDERING_PARAMS = ("sort", "order", "search_after", "offset")
+
+_CachedFeed = namedtuple(
+    "_CachedFeed",
+    [
+        "annotation_ids",
+        "entries",
+        "newest",
+        "body",
+        "content_type",
+        "charset",
+        "etag",
+        "built_at",
+        "checked_at",
+    ],
+)
+
 
 def _annotations(request):
     """Return the annotations from the search API."""
@@ -21,28 +61,194 @@ def _annotations(request):
     return fetch_ordered_annotations(request.db, result.annotation_ids)
 
 
+def _new_annotation_ids(request, since):
+    """
+    Return the IDs of the annotations updated after ``since``, newest first.
+
+    This returns the oldest of them if there are more than fit in the feed.
+
+    Annotations that take a while to be indexed may be missed, if another
+    annotation updated after them was indexed first. They'll be included
+    when the feed is next rendered from scratch.
+    """
+    params = MultiDict(request.params)
+    params["sort"] = "updated"
+    params["order"] = "asc"
+    params["search_after"] = _timestamp_ms(since)
+    params["limit"] = _limit(request)
+
+    s = search.Search(request, stats=request.stats)
+    return list(reversed(s.run(params).annotation_ids))
+
+
+def _feed(request, entries, render):
+    """
+    Return the feed of the annotations matching the request.
+
+    ``entries(annotations)`` returns the feed entries for a list of
+    annotations and ``render(entries, updated)`` renders them as a feed.
+
+    Feeds are cached, and rather than being rendered from scratch every time
+    they're polled the entries of any new annotations that belong in them are
+    added to the top of the cached entries.
+    """
+    if request.authenticated_userid is not None:
+        # Logged in users' feeds can include annotations only they can see.
+        annotations = _annotations(request)
+        return render(entries(annotations), _newest(annotations))
+
+    key = (
+        request.matched_route.name,
+        request.host_url,
+        tuple(sorted(request.params.items())),
+    )
+    cached = feed_cache.get(key)
+    now = time.time()
+
+    if cached is None:
+        cached = _build(entries, render, _annotations(request), now)
+        feed_cache.set(key, cached)
+    elif now - cached.checked_at >= REFRESH_INTERVAL:
+        cached = _refresh(request, entries, render, cached, now)
+        feed_cache.set(key, cached)
+
+    response = Response(
+        body=cached.body, content_type=cached.content_type, charset=cached.charset
+    )
+    response.etag = cached.etag
+    response.last_modified = cached.newest
+    response.conditional_response = True
+    return response
+
+
+def _refresh(request, entries, render, cached, now):
+    """Return ``cached`` updated with any annotations that are new since."""
+    if (
+        cached.newest is None
+        or any(p in request.params for p in _ORDERING_PARAMS)
+        or now - cached.built_at >= REBUILD_INTERVAL
+    ):
+        return _build(entries, render, _annotations(request), now)
+
+    limit = _limit(request)
+    new_ids = _new_annotation_ids(request, cached.newest)
+    if len(new_ids) >= limit:
+        # There may be newer ones which didn't fit, and none of the cached
+        # annotations would be left anyway.
+        return _build(entries, render, _annotations(request), now)
+
+    if not new_ids:
+        return cached._replace(checked_at=now)
+
+    # Newly updated annotations move to the top of the feed, pushing the
+    # oldest ones off the end.
+    new_annotations = fetch_ordered_annotations(request.db, new_ids)
+    new_ids = [a.id for a in new_annotations]
+    kept = [
+        (id_, entry)
+        for id_, entry in zip(cached.annotation_ids, cached.entries)
+        if id_ not in new_ids
+    ]
+    annotation_ids = new_ids + [id_ for id_, _ in kept]
+    feed_entries = entries(new_annotations) + [entry for _, entry in kept]
+    newest = max([cached.newest] + [a.updated for a in new_annotations])
+
+    return _render(
+        render,
+        annotation_ids[:limit],
+        feed_entries[:limit],
+        newest,
+        cached.built_at,
+        now,
+    )
+
+
+def _build(entries, render, annotations, now):
+    """Return a feed of ``annotations`` rendered from scratch."""
+    return _render(
+        render,
+        [a.id for a in annotations],
+        entries(annotations),
+        _newest(annotations),
+        now,
+        now,
+    )
+
+
+def _render(render, annotation_ids, entries, newest, built_at, now):
+    response = render(entries, newest)
+    return _CachedFeed(
+        annotation_ids=annotation_ids,
+        entries=entries,
+        newest=newest,
+        body=response.body,
+        content_type=response.content_type,
+        charset=response.charset,
+        etag=hashlib.md5(response.body).hexdigest(),
+        built_at=built_at,
+        checked_at=now,
+    )
+
+
+def _newest(annotations):
+    """Return when the newest of ``annotations`` was updated."""
+    return max([a.updated for a in annotations]) if annotations else None
+
+
+def _limit(request):
+    """Return the number of annotations in the requested feed."""
+    try:
+        limit = int(request.params.get("limit", LIMIT_DEFAULT))
+    except ValueError:
+        return LIMIT_DEFAULT
+    if limit < 0:
+        return LIMIT_DEFAULT
+    return min(limit, LIMIT_MAX)
+
+
+def _timestamp_ms(timestamp):
+    return timegm(timestamp.utctimetuple()) * 1000 + timestamp.microsecond // 1000
+
+
 @view_config(route_name="stream_atom")
 def stream_atom(request):
     """An Atom feed of the /stream page."""
-    return render_atom(
-        request=request,
-        annotations=_annotations(request),
-        atom_url=request.route_url("stream_atom"),
-        html_url=request.route_url("stream"),
-        title=request.registry.settings.get("h.feed.title"),
-        subtitle=request.registry.settings.get("h.feed.subtitle"),
-    )
+
+    def entries(annotations):
+        return atom_entries(request, annotations)
+
+    def render(entries, updated):
+        return render_atom_entries(
+            request=request,
+            entries=entries,
+            updated=updated,
+            atom_url=request.route_url("stream_atom"),
+            html_url=request.route_url("stream"),
+            title=request.registry.settings.get("h.feed.title"),
+            subtitle=request.registry.settings.get("h.feed.subtitle"),
+        )
+
+    return _feed(request, entries, render)
 
 
 @view_config(route_name="stream_rss")
 def stream_rss(request):
     """An RSS feed of the /stream page."""
-    return render_rss(
-        request=request,
-        annotations=_annotations(request),
-        rss_url=request.route_url("stream_rss"),
-        html_url=request.route_url("stream"),
-        title=request.registry.settings.get("h.feed.title") or _("Hypothesis Stream"),
-        description=request.registry.settings.get("h.feed.description")
-        or _("The Web. Annotated"),
-    )
+
+    def entries(annotations):
+        return rss_entries(request, annotations)
+
+    def render(entries, updated):
+        return render_rss_entries(
+            request=request,
+            entries=entries,
+            updated=updated,
+            rss_url=request.route_url("stream_rss"),
+            html_url=request.route_url("stream"),
+            title=request.registry.settings.get("h.feed.title")
+            or _("Hypothesis Stream"),
+            description=request.registry.settings.get("h.feed.description")
+            or _("The Web. Annotated"),
+        )
+
+    return _feed(request, entries, render)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks for hot code paths.
+
+These aren't run as part of the test suite. Run all of them with::
+
+    tox -e py27-bench
+
+or just some of them with, for example::
+
+    tox -e py27-bench -- uri
+"""
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+
+def bench(label, func, number=10000, repeat=3):
+    """Time ``func()`` and print the best time per call."""
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    print("  {:<56} {:>10.2f} us/call".format(label, best / number * 1e6))
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+
+import importlib
+import sys
+
+#: The modules in this package that contain benchmarks. Each one must have a
+#: ``run()`` function.
+BENCHMARKS = ["activity", "auth", "markdown", "uri"]
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            sys.exit("Unknown benchmark: {}".format(name))
+        print(name)
+        importlib.import_module("tests.bench." + name).run()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
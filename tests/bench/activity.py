@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for :py:mod:`h.activity.bucketing`."""
+from __future__ import unicode_literals
+
+import datetime
+
+from h.activity import bucketing
+from h.models import Annotation, Document
+from tests.bench import bench
+
+
+def _annotations(count, documents):
+    """Return ``count`` annotations spread over ``documents`` and a year."""
+    now = datetime.datetime.utcnow()
+    docs = [
+        Document(
+            title="Document {}".format(i), web_uri="https://example.com/{}".format(i)
+        )
+        for i in range(documents)
+    ]
+    return [
+        Annotation(
+            userid="acct:user{}@example.com".format(i % 10),
+            tags=["tag{}".format(i % 7)],
+            updated=now - datetime.timedelta(days=i * 365 // count),
+            document=docs[i % documents],
+        )
+        for i in range(count)
+    ]
+
+
+def run():
+    for count, documents in [(20, 5), (200, 40), (200, 200)]:
+        annotations = _annotations(count, documents)
+        bench(
+            "bucket, {} annotations on {} documents".format(count, documents),
+            lambda: bucketing.bucket(annotations),
+            number=100,
+        )
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for authenticating publisher API requests.
+
+These time :py:class:`h.auth.policy.AuthClientPolicy` authenticating a
+request from an auth client on behalf of a forwarded user, the way that
+publisher integrations call the API. Unlike the other benchmarks they need a
+database, which is set with ``TEST_DATABASE_URL`` as for the tests.
+"""
+from __future__ import unicode_literals
+
+import base64
+import os
+
+from pyramid import testing
+
+from h import db, models
+from h.auth import util
+from h.auth.policy import AuthClientPolicy
+from h.models.auth_client import GrantType
+from h.services.user import UserService
+from tests.bench import bench
+
+DATABASE_URL = os.environ.get(
+    "TEST_DATABASE_URL", "postgresql://postgres@localhost/htest"
+)
+
+AUTHORITY = "publisher.example.com"
+
+
+def run():
+    engine = db.make_engine({"sqlalchemy.url": DATABASE_URL})
+    db.init(engine, should_create=True, authority=AUTHORITY)
+
+    session = db.Session(bind=engine)
+    client = models.AuthClient(
+        authority=AUTHORITY,
+        secret="benchmark-secret",
+        grant_type=GrantType.client_credentials,
+    )
+    user = models.User(
+        username="benchmark", authority=AUTHORITY, email="bench@example.com"
+    )
+    session.add_all([client, user])
+    session.commit()
+
+    try:
+        _run(engine, client.id, client.secret, user.userid)
+    finally:
+        session.delete(client)
+        session.delete(user)
+        session.commit()
+        session.close()
+        engine.dispose()
+
+
+def _run(engine, client_id, client_secret, userid):
+    policy = AuthClientPolicy()
+    credentials = "{}:{}".format(client_id, client_secret).encode("utf-8")
+    headers = {
+        "Authorization": "Basic " + base64.b64encode(credentials).decode("ascii"),
+        "X-Forwarded-User": userid,
+    }
+
+    def authenticate():
+        # Each request gets its own session, as it would in the app.
+        session = db.Session(bind=engine)
+        user_service = UserService(AUTHORITY, session)
+        request = testing.DummyRequest(headers=dict(headers), db=session)
+        request.find_service = lambda name: user_service
+        try:
+            policy.authenticated_userid(request)
+            policy.effective_principals(request)
+        finally:
+            session.close()
+
+    def authenticate_unverified():
+        util.auth_client_cache.clear()
+        authenticate()
+
+    bench("forwarded user, client not verified yet", authenticate_unverified, 1000)
+    bench("forwarded user, client already verified", authenticate, 1000)
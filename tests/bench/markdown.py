@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for :py:mod:`h.util.markdown`."""
+from __future__ import unicode_literals
+
+from h.util import markdown
+from tests.bench import bench
+
+#: Annotation bodies with the shapes that we most commonly see.
+TEXTS = {
+    "short": "I _really_ like this **paragraph**.",
+    "math": (
+        "The identity $$e^{i\\pi} + 1 = 0$$ follows from Euler's formula, "
+        "since \\(e^{ix} = \\cos x + i \\sin x\\)."
+    ),
+    "links": " ".join(
+        "See https://example.com/page/{0} and [this](https://example.org/{0}).".format(
+            i
+        )
+        for i in range(20)
+    ),
+    "long": "\n\n".join(
+        "> Quoted paragraph {0}.\n\n"
+        "Some *commentary* on paragraph {0}, with `code` and a list:\n\n"
+        "- first item\n- second item\n- third item".format(i)
+        for i in range(50)
+    ),
+}
+
+
+def run():
+    for shape, text in sorted(TEXTS.items()):
+
+        def render_uncached():
+            markdown.render_cache.clear()
+            markdown.render(text)
+
+        bench("uncached render, {}".format(shape), render_uncached, number=100)
+
+    for shape, text in sorted(TEXTS.items()):
+        markdown.render(text)
+        bench("cached render, {}".format(shape), lambda: markdown.render(text))
+
+    texts = [TEXTS["short"], TEXTS["links"]] * 50
+
+    def render_many_uncached():
+        markdown.render_cache.clear()
+        markdown.render_many(texts)
+
+    bench("render_many, 100 texts, 2 distinct", render_many_uncached, number=10)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for :py:mod:`h.util.uri`."""
+from __future__ import unicode_literals
+
+from h.util import uri
+from tests.bench import bench
+
+#: URLs with the shapes that we most commonly see in annotations.
+URLS = {
+    "plain": "https://example.com/articles/2019/05/some-article-title",
+    "trailing slash": "http://example.com/foo/bar/",
+    "tracking params": (
+        "https://www.example.com/news/story.html?utm_source=twitter"
+        "&utm_medium=social&utm_campaign=spring&gclid=abc123&id=42"
+    ),
+    "long query": "https://example.com/search?"
+    + "&".join("param{0}=value{0}".format(i) for i in range(30)),
+    "via proxy": "https://via.hypothes.is/https://example.com/page.html",
+    "unicode": "http://example.com/wiki/Γειά_σου_κόσμε?q=你好世界",
+    "pdf fingerprint": "urn:x-pdf:c83fa94bd1d522276a32f81682a43d29",
+    "doi": "doi:10.1000/182",
+}
+
+
+def run():
+    for shape, url in sorted(URLS.items()):
+        bench("uncached normalize, {}".format(shape), lambda: uri._normalize(url))
+
+    uri.normalize.cache_clear()
+    for url in URLS.values():
+        uri.normalize(url)
+    for shape, url in sorted(URLS.items()):
+        bench("cached normalize, {}".format(shape), lambda: uri.normalize(url))
+
+    batch = ["{}&n={}".format(URLS["tracking params"], i) for i in range(1000)]
+    bench(
+        "normalize_many, 1000 distinct URLs",
+        lambda: uri.normalize_many(batch),
+        number=10,
+    )
+    bench(
+        "normalize_many, 1000 copies of one URL",
+        lambda: uri.normalize_many([URLS["plain"]] * 1000),
+        number=10,
+    )
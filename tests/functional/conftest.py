@@ -30,8 +30,10 @@ TEST_SETTINGS = {
 @pytest.fixture
 def app(pyramid_app, db_engine):
     from h import db
+    from h.util.cache import clear_versioned_caches
 
     _clean_database(db_engine)
+    clear_versioned_caches()
     db.init(db_engine, authority=text_type(TEST_SETTINGS["h.authority"]))
 
     return TestApp(pyramid_app)
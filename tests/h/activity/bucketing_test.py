@@ -69,6 +69,14 @@ class TestDocumentBucket(object):
         bucket = bucketing.DocumentBucket(document)
         assert bucket.domain == "www.example.com"
 
+    def test_init_uses_the_location_if_given(self, document):
+        bucket = bucketing.DocumentBucket(
+            document, location=("http://example.com", "example.com")
+        )
+
+        assert bucket.uri == "http://example.com"
+        assert bucket.domain == "example.com"
+
     def test_init_sets_domain_to_local_file_when_no_uri_is_set(
         self, db_session, document
     ):
@@ -318,6 +326,24 @@ class TestBucket(object):
             timeframe_with("Mar 1968", {document: expected_bucket_3}),
         ]
 
+    def test_it_presents_each_document_once(self, patch):
+        document_location = patch("h.activity.bucketing.document_location")
+        document_location.return_value = ("http://example.com", "example.com")
+        results = [
+            factories.Annotation(),
+            factories.Annotation(updated=FIFTH_NOVEMBER_1969),
+            factories.Annotation(updated=THIRD_MARCH_1968),
+        ]
+        document = factories.Document()
+        for annotation in results:
+            annotation.document = document
+
+        timeframes = bucketing.bucket(results)
+
+        document_location.assert_called_once_with(document)
+        for timeframe in timeframes:
+            assert timeframe.document_buckets[document].uri == "http://example.com"
+
     def test_recent_and_older_annotations_together(self):
         results = [
             factories.Annotation(target_uri="http://example1.com"),
@@ -8,7 +8,13 @@ import mock
 from pyramid.httpexceptions import HTTPFound
 from webob.multidict import MultiDict
 
-from h.activity.query import execute, extract, check_url, fetch_annotations
+from h.activity.query import (
+    aggregation_cache,
+    execute,
+    extract,
+    check_url,
+    fetch_annotations,
+)
 
 
 class TestExtract(object):
@@ -278,6 +284,39 @@ class TestExecute(object):
         UsersAggregation.assert_called_once_with(limit=50)
         search.append_aggregation.assert_called_with(UsersAggregation.return_value)
 
+    def test_it_reuses_recent_aggregations_for_the_same_query(
+        self, pyramid_request, search
+    ):
+        execute(pyramid_request, MultiDict(group="foo"), self.PAGE_SIZE)
+        search.append_aggregation.reset_mock()
+        pyramid_request.params["page"] = "2"
+
+        result = execute(pyramid_request, MultiDict(group="foo"), self.PAGE_SIZE)
+
+        assert not search.append_aggregation.called
+        assert result.aggregations == mock.sentinel.aggregations
+
+    def test_it_runs_the_aggregations_for_a_different_query(
+        self, pyramid_request, search
+    ):
+        execute(pyramid_request, MultiDict(group="foo"), self.PAGE_SIZE)
+        search.append_aggregation.reset_mock()
+
+        execute(pyramid_request, MultiDict(group="bar"), self.PAGE_SIZE)
+
+        assert search.append_aggregation.called
+
+    def test_it_runs_the_aggregations_for_a_different_user(
+        self, pyramid_config, pyramid_request, search
+    ):
+        execute(pyramid_request, MultiDict(group="foo"), self.PAGE_SIZE)
+        search.append_aggregation.reset_mock()
+        pyramid_config.testing_securitypolicy("acct:someone@example.com")
+
+        execute(pyramid_request, MultiDict(group="foo"), self.PAGE_SIZE)
+
+        assert search.append_aggregation.called
+
     def test_it_limits_the_search_results_to_one_pages_worth(
         self, pyramid_request, search
     ):
@@ -651,6 +690,23 @@ class TestFetchAnnotations(object):
 
         assert annotations == result
 
+    def test_it_only_loads_the_columns_that_activity_pages_use(
+        self, db_session, factories
+    ):
+        ids = [factories.Annotation().id]
+        db_session.flush()
+        db_session.expunge_all()
+
+        (annotation,) = fetch_annotations(db_session, ids)
+
+        assert "extra" not in annotation.__dict__
+        assert "_text_rendered" in annotation.__dict__
+
+
+@pytest.fixture(autouse=True)
+def clear_aggregation_cache():
+    aggregation_cache.clear()
+
 
 @pytest.fixture
 def pyramid_request(pyramid_request):
@@ -660,6 +660,26 @@ class TestAuthClientAuthenticationPolicy(object):
         )
         assert principals == principals_for_auth_client_user.return_value
 
+    def test_check_remembers_the_result_for_the_request(
+        self, pyramid_request, verify_auth_client, user_service
+    ):
+        pyramid_request.headers["X-Forwarded-User"] = "acct:flop@woebang.baz"
+
+        first = AuthClientPolicy.check("someusername", "somepassword", pyramid_request)
+        second = AuthClientPolicy.check("someusername", "somepassword", pyramid_request)
+
+        assert verify_auth_client.call_count == 1
+        assert user_service.fetch.call_count == 1
+        assert second == first
+
+    def test_check_rechecks_different_credentials(
+        self, pyramid_request, verify_auth_client
+    ):
+        AuthClientPolicy.check("someusername", "somepassword", pyramid_request)
+        AuthClientPolicy.check("someusername", "otherpassword", pyramid_request)
+
+        assert verify_auth_client.call_count == 2
+
     @pytest.fixture
     def user_service(self, pyramid_config):
         service = mock.create_autospec(UserService, spec_set=True, instance=True)
@@ -16,6 +16,7 @@ from h._compat import text_type
 from h.models.auth_client import GrantType
 from h.models import AuthClient
 from h.services.user import UserService
+from h.util.cache import publish_on_change
 
 FakeUser = namedtuple("FakeUser", ["authority", "admin", "staff", "groups"])
 FakeGroup = namedtuple("FakeGroup", ["pubid"])
@@ -34,6 +35,30 @@ class TestGroupfinder(object):
         principals_for_user.assert_called_once_with(user_service.fetch.return_value)
         assert result == principals_for_user.return_value
 
+    def test_it_caches_the_principals(
+        self, pyramid_request, user_service, principals_for_user
+    ):
+        util.groupfinder("acct:bob@example.org", pyramid_request)
+
+        result = util.groupfinder("acct:bob@example.org", pyramid_request)
+
+        assert user_service.fetch.call_count == 1
+        assert result == principals_for_user.return_value
+
+    def test_it_does_not_cache_unknown_users(
+        self, pyramid_request, user_service, principals_for_user
+    ):
+        principals_for_user.return_value = None
+
+        util.groupfinder("acct:bob@example.org", pyramid_request)
+        util.groupfinder("acct:bob@example.org", pyramid_request)
+
+        assert user_service.fetch.call_count == 2
+
+    @pytest.fixture(autouse=True)
+    def clear_principals_cache(self):
+        util.principals_cache.clear()
+
 
 @pytest.mark.parametrize(
     "user,principals",
@@ -348,6 +373,48 @@ class TestVerifyAuthClient(object):
 
         assert principals is None
 
+    def test_it_caches_verified_clients(self, db_session, factories):
+        client = factories.ConfidentialAuthClient(
+            grant_type=GrantType.client_credentials
+        )
+        db_session.flush()
+        util.verify_auth_client(client.id, client.secret, db_session)
+        db_session.expunge_all()
+
+        with mock.patch.object(db_session, "query") as query:
+            result = util.verify_auth_client(client.id, client.secret, db_session)
+
+        assert not query.called
+        assert result.id == client.id
+        assert result.authority == client.authority
+
+    def test_it_does_not_cache_failed_verifications(self, db_session, factories):
+        client = factories.ConfidentialAuthClient(
+            grant_type=GrantType.client_credentials
+        )
+        db_session.flush()
+        util.verify_auth_client(client.id, client.secret, db_session)
+
+        assert util.verify_auth_client(client.id, "wrong", db_session) is None
+
+    def test_it_forgets_clients_when_they_change(self, db_session, factories):
+        publish_on_change(db_session, "auth_client", [AuthClient])
+        client = factories.ConfidentialAuthClient(
+            grant_type=GrantType.client_credentials
+        )
+        db_session.flush()
+        secret = client.secret
+        util.verify_auth_client(client.id, secret, db_session)
+
+        client.secret = "rotated"
+        db_session.flush()
+
+        assert util.verify_auth_client(client.id, secret, db_session) is None
+
+    @pytest.fixture(autouse=True)
+    def clear_auth_client_cache(self):
+        util.auth_client_cache.clear()
+
     @pytest.fixture
     def pyramid_request(self, pyramid_request, db_session):
         pyramid_request.db = mock.create_autospec(
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+
+from h import models
+from h.cli.commands import move_uri as move_uri_cli
+
+
+class TestMoveURI(object):
+    def test_it_moves_annotations(self, invoke, annotations):
+        result = invoke()
+
+        assert result.exit_code == 0
+        for annotation in annotations:
+            assert annotation.target_uri == u"https://example.org/new"
+            assert annotation.target_uri_normalized == "httpx://example.org/new"
+
+    def test_it_leaves_other_annotations_alone(self, invoke, db_session, factories):
+        annotation = factories.Annotation(target_uri=u"https://example.org/other")
+        db_session.flush()
+
+        invoke()
+
+        assert annotation.target_uri == u"https://example.org/other"
+
+    def test_it_moves_the_annotations_a_window_at_a_time(
+        self, invoke, annotations, monkeypatch
+    ):
+        monkeypatch.setattr("h.cli.commands.move_uri.WINDOW_SIZE", 2)
+
+        result = invoke()
+
+        assert "Moved 2 of 3 annotations" in result.output
+        assert "Moved 3 of 3 annotations" in result.output
+
+    def test_it_moves_document_uris(self, invoke, db_session, factories):
+        docuri = factories.DocumentURI(
+            claimant=u"https://example.org/old",
+            uri=u"https://example.org/old",
+            type=u"self-claim",
+        )
+        db_session.flush()
+
+        invoke()
+
+        assert docuri.claimant == u"https://example.org/new"
+        assert docuri.uri == u"https://example.org/new"
+
+    def test_it_reindexes_the_moved_annotations(
+        self, invoke, annotations, BatchIndexer
+    ):
+        invoke()
+
+        indexed = BatchIndexer.return_value.index.call_args[0][0]
+        assert sorted(indexed) == sorted(a.id for a in annotations)
+
+    def test_it_reindexes_annotations_left_over_from_an_interrupted_move(
+        self, invoke, db_session, BatchIndexer
+    ):
+        db_session.add(
+            models.Setting(key=move_uri_cli.PENDING_REINDEX_KEY, value=u'["abc"]')
+        )
+        db_session.flush()
+
+        invoke()
+
+        BatchIndexer.return_value.index.assert_called_once_with(["abc"])
+        assert db_session.query(models.Setting).count() == 0
+
+    def test_it_does_nothing_if_not_confirmed(self, invoke, annotations):
+        result = invoke(confirm="n")
+
+        assert "Aborted" in result.output
+        for annotation in annotations:
+            assert annotation.target_uri == u"https://example.org/old"
+
+    @pytest.fixture
+    def invoke(self, cli, cliconfig):
+        def invoke(confirm="y"):
+            return cli.invoke(
+                move_uri_cli.move_uri,
+                [
+                    u"--old",
+                    u"https://example.org/old",
+                    u"--new",
+                    u"https://example.org/new",
+                ],
+                input="{}\n".format(confirm),
+                obj=cliconfig,
+            )
+
+        return invoke
+
+    @pytest.fixture
+    def annotations(self, db_session, factories):
+        annotations = factories.Annotation.create_batch(
+            3, target_uri=u"https://example.org/old"
+        )
+        db_session.flush()
+        return annotations
+
+
+@pytest.fixture
+def BatchIndexer(patch):
+    BatchIndexer = patch("h.cli.commands.move_uri.BatchIndexer")
+    BatchIndexer.return_value.index.return_value = set()
+    return BatchIndexer
+
+
+@pytest.fixture
+def cliconfig(pyramid_request, BatchIndexer):
+    pyramid_request.tm = mock.Mock()
+    pyramid_request.es = mock.Mock()
+    return {"bootstrap": mock.Mock(return_value=pyramid_request)}
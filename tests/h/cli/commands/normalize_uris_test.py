@@ -192,6 +192,149 @@ def test_it_skips_reindexing_unaltered_annotations(req, index, factories, db_ses
     indexer.index.assert_called_once_with(set([annotation_2.id]))
 
 
+def test_it_normalizes_in_batches(req):
+    docuris = [
+        models.DocumentURI(
+            _claimant="http://example.org/{}".format(i),
+            _claimant_normalized="http://example.org/{}".format(i),
+            _uri="http://example.org/{}".format(i),
+            _uri_normalized="http://example.org/{}".format(i),
+            type="self-claim",
+        )
+        for i in range(5)
+    ]
+    req.db.add(models.Document(document_uris=docuris))
+    req.db.flush()
+
+    stats = normalize_uris.normalize_document_uris(req, batch_size=2)
+
+    assert stats["normalized"] == 5
+    assert req.tm.commit.call_count >= 3
+    for i, docuri in enumerate(docuris):
+        assert docuri.uri_normalized == "httpx://example.org/{}".format(i)
+
+
+def test_it_deletes_duplicates_in_earlier_batches(req):
+    docuri_1 = models.DocumentURI(
+        claimant="http://example.org/", uri="http://example.org/", type="self-claim"
+    )
+    docuri_2 = models.DocumentURI(
+        _claimant="https://example.org/",
+        _claimant_normalized="https://example.org",
+        _uri="https://example.org/",
+        _uri_normalized="https://example.org",
+        type="self-claim",
+    )
+    req.db.add(models.Document(document_uris=[docuri_1, docuri_2]))
+    req.db.flush()
+
+    normalize_uris.normalize_document_uris(req, batch_size=1)
+
+    assert req.db.query(models.DocumentURI).count() == 1
+
+
+def test_it_merges_documents_whose_uris_clash_once_normalized(req):
+    docuri_1 = models.DocumentURI(
+        claimant="http://example.org/", uri="http://example.org/", type="self-claim"
+    )
+    docuri_2 = models.DocumentURI(
+        _claimant="https://example.org/",
+        _claimant_normalized="https://example.org",
+        _uri="https://example.org/",
+        _uri_normalized="https://example.org",
+        type="self-claim",
+    )
+    req.db.add_all(
+        [
+            models.Document(document_uris=[docuri_1]),
+            models.Document(document_uris=[docuri_2]),
+        ]
+    )
+    req.db.flush()
+
+    stats = normalize_uris.normalize_document_uris(req)
+
+    assert stats["documents merged"] == 1
+    assert req.db.query(models.Document).count() == 1
+    assert req.db.query(models.DocumentURI).count() == 1
+
+
+def test_it_starts_from_the_checkpoint(req):
+    docuri_1 = models.DocumentURI(
+        _claimant="http://example.org/",
+        _claimant_normalized="http://example.org",
+        _uri="http://example.org/",
+        _uri_normalized="http://example.org",
+        type="self-claim",
+    )
+    docuri_2 = models.DocumentURI(
+        _claimant="http://example.net/",
+        _claimant_normalized="http://example.net",
+        _uri="http://example.net/",
+        _uri_normalized="http://example.net",
+        type="self-claim",
+    )
+    req.db.add(models.Document(document_uris=[docuri_1, docuri_2]))
+    req.db.flush()
+    req.db.add(
+        models.Setting(
+            key="normalize_uris.checkpoint.document_uri", value="{}".format(docuri_1.id)
+        )
+    )
+    req.db.flush()
+
+    normalize_uris.normalize_document_uris(req)
+
+    assert docuri_1.uri_normalized == "http://example.org"
+    assert docuri_2.uri_normalized == "httpx://example.net"
+    assert req.db.query(models.Setting).count() == 0
+
+
+def test_a_dry_run_rolls_back_each_batch(req):
+    req.db.add(
+        models.Document(
+            document_uris=[
+                models.DocumentURI(
+                    _claimant="http://example.org/",
+                    _claimant_normalized="http://example.org",
+                    _uri="http://example.org/",
+                    _uri_normalized="http://example.org",
+                    type="self-claim",
+                )
+            ]
+        )
+    )
+    req.db.flush()
+
+    stats = normalize_uris.normalize_document_uris(req, dry_run=True)
+
+    assert stats["normalized"] == 1
+    assert req.tm.abort.called
+    assert req.db.query(models.Setting).count() == 0
+
+
+def test_a_dry_run_does_not_reindex_annotations(req, index, factories, db_session):
+    annotation = factories.Annotation(userid="luke", target_uri="http://example.org/")
+    annotation._target_uri_normalized = "http://example.org"
+    db_session.flush()
+
+    normalize_uris.normalize_annotations(req, dry_run=True)
+
+    assert not index.BatchIndexer.called
+
+
+def test_the_normalizer_normalizes_uris(monkeypatch):
+    monkeypatch.setattr(normalize_uris, "_POOL_CHUNK_SIZE", 2)
+    pool = mock.Mock(spec_set=["map"])
+    pool.map.side_effect = lambda func, chunks: [func(chunk) for chunk in chunks]
+    uris = ["http://example.com/", "https://example.org/", "http://example.com/"]
+    expected = ["httpx://example.com", "httpx://example.org", "httpx://example.com"]
+
+    assert normalize_uris._normalizer()(uris) == expected
+    assert normalize_uris._normalizer(pool)(uris) == expected
+    assert pool.map.call_count == 1
+
+
 @pytest.fixture
 def req(pyramid_request):
     pyramid_request.tm = mock.MagicMock()
@@ -11,6 +11,8 @@ from h.config import configure
     [
         (None, None, "h.db_session_checks", True),
         ("DB_SESSION_CHECKS", "False", "h.db_session_checks", False),
+        ("SHARED_CACHE", "true", "h.shared_cache", True),
+        ("PURGE_BATCH_SIZE", "500", "h.purge.batch_size", 500),
         ("SECRET_KEY", "dont_tell_anyone", "secret_key", b"dont_tell_anyone"),
         ("SECRET_SALT", "best_with_pepper", "secret_salt", b"best_with_pepper"),
         # There are many other settings that can be updated from env vars.
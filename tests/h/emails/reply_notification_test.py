@@ -7,7 +7,7 @@ import datetime
 import mock
 import pytest
 
-from h.emails.reply_notification import generate
+from h.emails.reply_notification import generate, generate_digest
 from h.models import Annotation
 from h.models import Document
 from h.notification.reply import Notification
@@ -207,80 +207,165 @@ class TestGenerate(object):
         html_renderer.assert_(**expected_context)
         text_renderer.assert_(**expected_context)
 
-    @pytest.fixture
-    def document(self, db_session):
-        doc = Document(title="My fascinating page")
-        db_session.add(doc)
-        db_session.flush()
-        return doc
 
-    @pytest.fixture
-    def html_renderer(self, pyramid_config):
-        return pyramid_config.testing_add_renderer(
-            "h:templates/emails/reply_notification.html.jinja2"
-        )
+@pytest.mark.usefixtures("routes", "token_serializer")
+class TestGenerateDigest(object):
+    def test_calls_renderers_with_the_context_of_each_reply(
+        self, notifications, pyramid_request, digest_renderers, links
+    ):
+        generate_digest(pyramid_request, notifications)
+
+        for renderer in digest_renderers:
+            renderer.assert_(
+                parent_user_display_name="Patricia Demylus",
+                unsubscribe_url="http://example.com/unsub/FAKETOKEN",
+            )
+            replies = renderer.replies
+            assert [r["reply"] for r in replies] == [n.reply for n in notifications]
+            assert replies[0]["reply_url"] == links.incontext_link.return_value
+
+    def test_returns_parent_email_as_recipients(
+        self, notifications, pyramid_request, digest_renderers
+    ):
+        recipients, _, _, _ = generate_digest(pyramid_request, notifications)
 
-    @pytest.fixture
-    def links(self, patch):
-        return patch("h.emails.reply_notification.links")
+        assert recipients == ["pat@ric.ia"]
 
-    @pytest.fixture
-    def notification(self, reply, reply_user, parent, parent_user, document):
-        return Notification(
-            reply=reply,
-            reply_user=reply_user,
-            parent=parent,
-            parent_user=parent_user,
-            document=document,
-        )
+    def test_returns_subject_with_number_of_replies(
+        self, notifications, pyramid_request, digest_renderers
+    ):
+        _, subject, _, _ = generate_digest(pyramid_request, notifications)
 
-    @pytest.fixture
-    def parent(self):
-        common = {
-            "id": "foo123",
-            "created": datetime.datetime.utcnow(),
-            "updated": datetime.datetime.utcnow(),
-            "text": "Foo is true",
-        }
-        return Annotation(target_uri="http://example.org/", **common)
+        assert subject == "You have 2 new replies to your annotations"
 
-    @pytest.fixture
-    def parent_user(self, factories):
-        return factories.User(
-            username="patricia", email="pat@ric.ia", display_name="Patricia Demylus"
-        )
+    def test_jinja_templates_render(
+        self, notifications, pyramid_config, pyramid_request
+    ):
+        """Ensure that the jinja templates don't contain syntax errors"""
+        pyramid_config.include("pyramid_jinja2")
+        pyramid_config.add_jinja2_extension("h.jinja_extensions.Filters")
 
-    @pytest.fixture
-    def reply(self):
-        common = {
-            "id": "bar456",
-            "created": datetime.datetime.utcnow(),
-            "updated": datetime.datetime.utcnow(),
-            "text": "No it is not!",
-        }
-        return Annotation(target_uri="http://example.org/", **common)
+        _, _, text, html = generate_digest(pyramid_request, notifications)
 
-    @pytest.fixture
-    def reply_user(self, factories):
-        return factories.User(
-            username="ron", email="ron@thesmiths.com", display_name="Ron Burgundy"
-        )
+        assert "No it is not!" in text
+        assert "No it is not!" in html
 
     @pytest.fixture
-    def routes(self, pyramid_config):
-        pyramid_config.add_route("annotation", "/ann/{id}")
-        pyramid_config.add_route("stream.user_query", "/stream/user/{user}")
-        pyramid_config.add_route("unsubscribe", "/unsub/{token}")
+    def digest_renderers(self, pyramid_config):
+        return [
+            pyramid_config.testing_add_renderer(
+                "h:templates/emails/reply_notification_digest.html.jinja2"
+            ),
+            pyramid_config.testing_add_renderer(
+                "h:templates/emails/reply_notification_digest.txt.jinja2"
+            ),
+        ]
 
     @pytest.fixture
-    def text_renderer(self, pyramid_config):
-        return pyramid_config.testing_add_renderer(
-            "h:templates/emails/reply_notification.txt.jinja2"
+    def notifications(self, notification, reply_user, parent, parent_user, document):
+        other_reply = Annotation(
+            id="baz789",
+            created=datetime.datetime.utcnow(),
+            updated=datetime.datetime.utcnow(),
+            target_uri="http://example.org/",
+            text="Yes it is!",
         )
-
-    @pytest.fixture
-    def token_serializer(self, pyramid_config):
-        serializer = mock.Mock(spec_set=["dumps"])
-        serializer.dumps.return_value = "FAKETOKEN"
-        pyramid_config.registry.notification_serializer = serializer
-        return serializer
+        return [
+            notification,
+            Notification(
+                reply=other_reply,
+                reply_user=reply_user,
+                parent=parent,
+                parent_user=parent_user,
+                document=document,
+            ),
+        ]
+
+
+@pytest.fixture
+def document(db_session):
+    doc = Document(title="My fascinating page")
+    db_session.add(doc)
+    db_session.flush()
+    return doc
+
+
+@pytest.fixture
+def html_renderer(pyramid_config):
+    return pyramid_config.testing_add_renderer(
+        "h:templates/emails/reply_notification.html.jinja2"
+    )
+
+
+@pytest.fixture
+def links(patch):
+    return patch("h.emails.reply_notification.links")
+
+
+@pytest.fixture
+def notification(reply, reply_user, parent, parent_user, document):
+    return Notification(
+        reply=reply,
+        reply_user=reply_user,
+        parent=parent,
+        parent_user=parent_user,
+        document=document,
+    )
+
+
+@pytest.fixture
+def parent():
+    common = {
+        "id": "foo123",
+        "created": datetime.datetime.utcnow(),
+        "updated": datetime.datetime.utcnow(),
+        "text": "Foo is true",
+    }
+    return Annotation(target_uri="http://example.org/", **common)
+
+
+@pytest.fixture
+def parent_user(factories):
+    return factories.User(
+        username="patricia", email="pat@ric.ia", display_name="Patricia Demylus"
+    )
+
+
+@pytest.fixture
+def reply():
+    common = {
+        "id": "bar456",
+        "created": datetime.datetime.utcnow(),
+        "updated": datetime.datetime.utcnow(),
+        "text": "No it is not!",
+    }
+    return Annotation(target_uri="http://example.org/", **common)
+
+
+@pytest.fixture
+def reply_user(factories):
+    return factories.User(
+        username="ron", email="ron@thesmiths.com", display_name="Ron Burgundy"
+    )
+
+
+@pytest.fixture
+def routes(pyramid_config):
+    pyramid_config.add_route("annotation", "/ann/{id}")
+    pyramid_config.add_route("stream.user_query", "/stream/user/{user}")
+    pyramid_config.add_route("unsubscribe", "/unsub/{token}")
+
+
+@pytest.fixture
+def text_renderer(pyramid_config):
+    return pyramid_config.testing_add_renderer(
+        "h:templates/emails/reply_notification.txt.jinja2"
+    )
+
+
+@pytest.fixture
+def token_serializer(pyramid_config):
+    serializer = mock.Mock(spec_set=["dumps"])
+    serializer.dumps.return_value = "FAKETOKEN"
+    pyramid_config.registry.notification_serializer = serializer
+    return serializer
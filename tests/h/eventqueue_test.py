@@ -82,6 +82,67 @@ class TestEventQueue(object):
             queue.publish_all()
         assert str(excinfo.value) == "boom!"
 
+    def test_publish_all_calls_batched_subscribers_once_with_all_events(
+        self, pyramid_request, pyramid_config
+    ):
+        batch_subscriber = mock.Mock()
+        pyramid_config.add_subscriber(eventqueue.batched(batch_subscriber), DummyEvent)
+        queue = eventqueue.EventQueue(pyramid_request)
+        events = [DummyEvent(pyramid_request), DummyEvent(pyramid_request)]
+        for event in events:
+            queue(event)
+
+        queue.publish_all()
+
+        batch_subscriber.assert_called_once_with(events)
+
+    def test_publish_all_calls_batched_subscribers_after_the_others(
+        self, pyramid_request, pyramid_config, subscriber
+    ):
+        calls = []
+        subscriber.side_effect = lambda event: calls.append("single")
+        pyramid_config.add_subscriber(
+            eventqueue.batched(lambda events: calls.append("batch")), DummyEvent
+        )
+        queue = eventqueue.EventQueue(pyramid_request)
+        queue(DummyEvent(pyramid_request))
+        queue(DummyEvent(pyramid_request))
+
+        queue.publish_all()
+
+        assert calls == ["single", "single", "batch"]
+
+    def test_publish_all_publishes_events_queued_by_subscribers(
+        self, pyramid_request, subscriber
+    ):
+        queue = eventqueue.EventQueue(pyramid_request)
+        first_event = DummyEvent(pyramid_request)
+        second_event = DummyEvent(pyramid_request)
+        subscriber.side_effect = (
+            lambda event: queue(second_event) if event is first_event else None
+        )
+        queue(first_event)
+
+        queue.publish_all()
+
+        assert subscriber.call_args_list == [
+            mock.call(first_event),
+            mock.call(second_event),
+        ]
+
+    def test_publish_all_looks_up_subscribers_once_per_event_type(
+        self, pyramid_request, patch
+    ):
+        _get_subscribers = patch("h.eventqueue._get_subscribers")
+        _get_subscribers.return_value = []
+        queue = eventqueue.EventQueue(pyramid_request)
+        queue(DummyEvent(pyramid_request))
+        queue(DummyEvent(pyramid_request))
+
+        queue.publish_all()
+
+        assert _get_subscribers.call_count == 1
+
     def test_response_callback_skips_publishing_events_on_exception(
         self, publish_all, pyramid_request
     ):
@@ -118,3 +179,13 @@ class TestEventQueue(object):
         pyramid_request.debug = False
         pyramid_request.exception = None
         return pyramid_request
+
+
+class TestBatched(object):
+    def test_it_calls_the_subscriber_with_a_list_of_one_event(self):
+        subscriber = mock.Mock()
+        event = mock.sentinel.event
+
+        eventqueue.batched(subscriber)(event, foo="bar")
+
+        subscriber.assert_called_once_with([event], foo="bar")
@@ -268,3 +268,20 @@ def test_feed_updated():
     )
 
     assert feed["updated"] == "2015-03-11T10:45:54.537626+00:00"
+
+
+def test_feed_from_entries():
+    entries = [{"id": "entry"}]
+
+    feed = atom.feed_from_entries(
+        entries, "atom_url", updated=datetime(2015, 3, 11, 10, 45, 54, 537626)
+    )
+
+    assert feed["entries"] == entries
+    assert feed["updated"] == "2015-03-11T10:45:54.537626+00:00"
+
+
+def test_feed_from_entries_without_entries():
+    feed = atom.feed_from_entries([], "atom_url")
+
+    assert "updated" not in feed
@@ -204,3 +204,20 @@ def test_feed_from_annotations_pubDate():
     )
 
     assert feed["pubDate"] == "Wed, 11 Mar 2015 10:45:54 -0000"
+
+
+def test_feed_from_entries():
+    entries = [{"guid": "item"}]
+
+    feed = rss.feed_from_entries(
+        entries, datetime.datetime(2015, 3, 11, 10, 45, 54), "", "", "", ""
+    )
+
+    assert feed["entries"] == entries
+    assert feed["pubDate"] == "Wed, 11 Mar 2015 10:45:54 -0000"
+
+
+def test_feed_from_entries_without_entries():
+    feed = rss.feed_from_entries([], None, "", "", "", "")
+
+    assert "pubDate" not in feed
@@ -1,43 +1,99 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
+import mock
 import pytest
 
 from h import events
 from h.indexer import subscribers
 
 
-@pytest.mark.usefixtures("add_annotation", "delete_annotation")
+@pytest.mark.usefixtures("add_annotations", "delete_annotations")
 class TestSubscribeAnnotationEvent(object):
     @pytest.mark.parametrize("action", ["create", "update"])
-    def test_it_enqueues_add_annotation_celery_task(
-        self, action, add_annotation, delete_annotation, pyramid_request
+    def test_it_enqueues_add_annotations_celery_task(
+        self, action, add_annotations, delete_annotations, pyramid_request
     ):
-        event = events.AnnotationEvent(
-            pyramid_request, {"id": "test_annotation_id"}, action
-        )
+        event = events.AnnotationEvent(pyramid_request, "test_annotation_id", action)
 
         subscribers.subscribe_annotation_event(event)
 
-        add_annotation.delay.assert_called_once_with(event.annotation_id)
-        assert not delete_annotation.delay.called
+        add_annotations.delay.assert_called_once_with(["test_annotation_id"])
+        assert not delete_annotations.delay.called
 
-    def test_it_enqueues_delete_annotation_celery_task_for_delete(
-        self, add_annotation, delete_annotation, pyramid_request
+    def test_it_enqueues_delete_annotations_celery_task_for_delete(
+        self, add_annotations, delete_annotations, pyramid_request
     ):
-        event = events.AnnotationEvent(
-            pyramid_request, {"id": "test_annotation_id"}, "delete"
-        )
+        event = events.AnnotationEvent(pyramid_request, "test_annotation_id", "delete")
 
         subscribers.subscribe_annotation_event(event)
 
-        delete_annotation.delay.assert_called_once_with(event.annotation_id)
-        assert not add_annotation.delay.called
+        delete_annotations.delay.assert_called_once_with(["test_annotation_id"])
+        assert not add_annotations.delay.called
 
-    @pytest.fixture
-    def add_annotation(self, patch):
-        return patch("h.indexer.subscribers.add_annotation")
+    def test_it_enqueues_one_task_for_many_events(
+        self, add_annotations, delete_annotations, pyramid_request
+    ):
+        batch = [
+            events.AnnotationEvent(pyramid_request, "a", "create"),
+            events.AnnotationEvent(pyramid_request, "b", "update"),
+            events.AnnotationEvent(pyramid_request, "c", "delete"),
+        ]
+
+        subscribers.subscribe_annotation_event.batch(batch)
+
+        add_annotations.delay.assert_called_once_with(["a", "b"])
+        delete_annotations.delay.assert_called_once_with(["c"])
+
+    def test_it_only_acts_on_the_last_event_for_each_annotation(
+        self, add_annotations, delete_annotations, pyramid_request
+    ):
+        batch = [
+            events.AnnotationEvent(pyramid_request, "a", "create"),
+            events.AnnotationEvent(pyramid_request, "a", "delete"),
+        ]
+
+        subscribers.subscribe_annotation_event.batch(batch)
+
+        assert not add_annotations.delay.called
+        delete_annotations.delay.assert_called_once_with(["a"])
+
+    def test_it_enqueues_tasks_in_chunks(
+        self, add_annotations, monkeypatch, pyramid_request
+    ):
+        monkeypatch.setattr("h.indexer.subscribers.CHUNK_SIZE", 2)
+        batch = [
+            events.AnnotationEvent(pyramid_request, id_, "create")
+            for id_ in ["a", "b", "c"]
+        ]
+
+        subscribers.subscribe_annotation_event.batch(batch)
+
+        assert add_annotations.delay.call_args_list == [
+            mock.call(["a", "b"]),
+            mock.call(["c"]),
+        ]
 
     @pytest.fixture
-    def delete_annotation(self, patch):
-        return patch("h.indexer.subscribers.delete_annotation")
+    def add_annotations(self, patch):
+        return patch("h.indexer.subscribers.add_annotations")
+
+
+class TestSubscribeAnnotationsDeletedEvent(object):
+    def test_it_enqueues_delete_annotations_celery_tasks_in_chunks(
+        self, delete_annotations, monkeypatch, pyramid_request
+    ):
+        monkeypatch.setattr("h.indexer.subscribers.CHUNK_SIZE", 2)
+        event = events.AnnotationsDeletedEvent(pyramid_request, ["a", "b", "c"])
+
+        subscribers.subscribe_annotations_deleted_event(event)
+
+        assert delete_annotations.delay.call_args_list == [
+            mock.call(["a", "b"]),
+            mock.call(["c"]),
+        ]
+
+
+@pytest.fixture
+def delete_annotations(patch):
+    return patch("h.indexer.subscribers.delete_annotations")
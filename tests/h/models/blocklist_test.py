@@ -2,7 +2,10 @@
 
 from __future__ import unicode_literals
 
+import pytest
+
 from h import models
+from h.models.blocklist import BlocklistMatcher, _matcher_cache
 
 
 def test_is_blocked(db_session):
@@ -22,3 +25,56 @@ def test_is_blocked_with_wildcards(db_session):
     assert models.Blocklist.is_blocked(db_session, "http://example.com/")
     assert models.Blocklist.is_blocked(db_session, "http://example.com/bar")
     assert models.Blocklist.is_blocked(db_session, "http://example.com/foo")
+
+
+def test_is_blocked_does_not_query_again_until_blocklist_changes(db_session):
+    db_session.add(models.Blocklist(uri="http://example.com"))
+    db_session.flush()
+    assert models.Blocklist.is_blocked(db_session, "http://example.com")
+
+    db_session.add(models.Blocklist(uri="http://example.org"))
+    db_session.flush()
+    assert not models.Blocklist.is_blocked(db_session, "http://example.org")
+
+    models.Blocklist.changed(db_session)
+    assert models.Blocklist.is_blocked(db_session, "http://example.org")
+
+
+class TestBlocklistMatcher(object):
+    @pytest.mark.parametrize(
+        "pattern,uri,matches",
+        [
+            ("http://example.com", "http://example.com", True),
+            ("http://example.com", "http://example.com/", False),
+            ("http://example.com", "HTTP://EXAMPLE.COM", False),
+            ("%//example.com%", "https://example.com/foo", True),
+            ("%//example.com%", "https://example.org/foo", False),
+            ("http://example.com/_", "http://example.com/a", True),
+            ("http://example.com/_", "http://example.com/ab", False),
+            ("http://example.com/?q=(a|b)*", "http://example.com/?q=(a|b)*", True),
+            ("http://example.com/?q=(a|b)*", "http://example.com/?q=a", False),
+            ("http://example.com/100\\%", "http://example.com/100%", True),
+            ("http://example.com/100\\%", "http://example.com/1000", False),
+            ("http://example.com/a\\_b", "http://example.com/a_b", True),
+            ("http://example.com/a\\_b", "http://example.com/axb", False),
+            ("%example%", "http://exa\nmple.com/example", True),
+        ],
+    )
+    def test_matches_like_sql(self, pattern, uri, matches):
+        assert BlocklistMatcher([pattern]).matches(uri) is matches
+
+    def test_matches_any_pattern(self):
+        matcher = BlocklistMatcher(["http://a.com", "%//b.com%", "%//c.com%"])
+
+        assert matcher.matches("http://a.com")
+        assert matcher.matches("http://b.com/foo")
+        assert matcher.matches("http://c.com/bar")
+        assert not matcher.matches("http://d.com")
+
+    def test_matches_nothing_when_empty(self):
+        assert not BlocklistMatcher([]).matches("http://example.com")
+
+
+@pytest.fixture(autouse=True)
+def matcher_cache():
+    _matcher_cache.clear()
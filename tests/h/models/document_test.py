@@ -318,7 +318,7 @@ class TestDocumentURI(object):
 
 
 @pytest.mark.usefixtures("log")
-class TestCreateOrUpdateDocumentURI(object):
+class TestCreateOrUpdateDocumentURIs(object):
     def test_it_updates_the_existing_DocumentURI_if_there_is_one(self, db_session):
         claimant = "http://example.com/example_claimant.html"
         uri = "http://example.com/example_uri.html"
@@ -337,19 +337,25 @@ class TestCreateOrUpdateDocumentURI(object):
             updated=updated,
         )
         db_session.add(document_uri)
+        db_session.flush()
 
         now_ = now()
-        document.create_or_update_document_uri(
+        document.create_or_update_document_uris(
             session=db_session,
-            claimant=claimant,
-            uri=uri,
-            type=type_,
-            content_type=content_type,
+            document_uri_dicts=[
+                {
+                    "claimant": claimant,
+                    "uri": uri,
+                    "type": type_,
+                    "content_type": content_type,
+                }
+            ],
             document=document_,
             created=now_,
             updated=now_,
         )
 
+        db_session.refresh(document_uri)
         assert document_uri.created == created
         assert document_uri.updated == now_
         assert (
@@ -379,13 +385,18 @@ class TestCreateOrUpdateDocumentURI(object):
                 updated=updated,
             )
         )
+        db_session.flush()
 
-        document.create_or_update_document_uri(
+        document.create_or_update_document_uris(
             session=db_session,
-            claimant=claimant,
-            uri=uri,
-            type=type_,
-            content_type=content_type,
+            document_uri_dicts=[
+                {
+                    "claimant": claimant,
+                    "uri": uri,
+                    "type": type_,
+                    "content_type": content_type,
+                }
+            ],
             document=document_,
             created=now(),
             updated=now(),
@@ -404,25 +415,85 @@ class TestCreateOrUpdateDocumentURI(object):
         assert document_uri.created > created
         assert document_uri.updated > updated
 
-    def test_it_skips_denormalizing_http_s_uri_to_document(self, db_session):
-        document_ = document.Document(web_uri="http://example.com/first_uri.html")
+    def test_it_writes_many_DocumentURIs_in_one_statement(self, db_session):
+        document_ = document.Document()
+        db_session.add(document_)
+        db_session.flush()
+        statements = []
+
+        @sa.event.listens_for(db_session.bind, "before_cursor_execute")
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        try:
+            document.create_or_update_document_uris(
+                session=db_session,
+                document_uri_dicts=[
+                    {
+                        "claimant": "http://example.com/claimant",
+                        "uri": "http://example.com/uri_{}".format(i),
+                        "type": "rel-alternate",
+                        "content_type": "",
+                    }
+                    for i in range(10)
+                ],
+                document=document_,
+                created=now(),
+                updated=now(),
+            )
+        finally:
+            sa.event.remove(db_session.bind, "before_cursor_execute", record)
+
+        assert len(statements) == 1
+        assert (
+            db_session.query(document.DocumentURI)
+            .filter_by(document_id=document_.id)
+            .count()
+            == 10
+        )
+
+    def test_it_collapses_claims_that_normalize_to_the_same_uri(self, db_session):
+        document_ = document.Document()
         db_session.add(document_)
+        db_session.flush()
 
-        document.create_or_update_document_uri(
+        document.create_or_update_document_uris(
             session=db_session,
-            claimant="http://example.com/example_claimant.html",
-            uri="http://example.com/second_uri.html",
-            type="self-claim",
-            content_type="",
+            document_uri_dicts=[
+                {
+                    "claimant": "http://example.com/claimant",
+                    "uri": uri,
+                    "type": "rel-alternate",
+                    "content_type": "",
+                }
+                for uri in ["http://example.com/foo", "http://example.com/foo/"]
+            ],
             document=document_,
             created=now(),
             updated=now(),
         )
 
-        document_ = db_session.query(document.Document).get(document_.id)
-        assert document_.web_uri == "http://example.com/first_uri.html"
+        assert (
+            db_session.query(document.DocumentURI)
+            .filter_by(document_id=document_.id)
+            .count()
+            == 1
+        )
+
+    def test_it_does_nothing_if_there_are_no_dicts(self):
+        session = mock_db_session()
 
-    def test_it_logs_a_warning_if_document_ids_differ(self, log):
+        document.create_or_update_document_uris(
+            session=session,
+            document_uri_dicts=[],
+            document=mock_document(),
+            created=now(),
+            updated=now(),
+        )
+
+        assert not session.execute.called
+
+    def test_it_logs_a_warning_if_document_ids_differ(self, db_session, log):
         """
         It should log a warning on Document objects mismatch.
 
@@ -430,56 +501,67 @@ class TestCreateOrUpdateDocumentURI(object):
         different to the given document it shoulg log a warning.
 
         """
-        session = mock_db_session()
-
-        # existing_document_uri.document won't be equal to the given document.
-        existing_document_uri = mock.Mock(document=mock_document())
-        session.query.return_value.filter.return_value.first.return_value = (
-            existing_document_uri
+        claimant = "http://example.com/example_claimant.html"
+        uri = "http://example.com/example_uri.html"
+        db_session.add(
+            document.DocumentURI(
+                claimant=claimant,
+                uri=uri,
+                type="self-claim",
+                content_type="",
+                document=document.Document(),
+            )
         )
+        other_document = document.Document()
+        db_session.add(other_document)
+        db_session.flush()
 
-        document.create_or_update_document_uri(
-            session=session,
-            claimant="http://example.com/example_claimant.html",
-            uri="http://example.com/example_uri.html",
-            type="self-claim",
-            content_type=None,
-            document=mock_document(),
+        document.create_or_update_document_uris(
+            session=db_session,
+            document_uri_dicts=[
+                {
+                    "claimant": claimant,
+                    "uri": uri,
+                    "type": "self-claim",
+                    "content_type": None,
+                }
+            ],
+            document=other_document,
             created=now(),
             updated=now(),
         )
 
         assert log.warning.call_count == 1
 
-    def test_raises_retryable_error_when_flush_fails(self, db_session, monkeypatch):
-        document_ = document.Document()
-
-        def err():
-            raise sa.exc.IntegrityError(None, None, None)
-
-        monkeypatch.setattr(db_session, "flush", err)
+    def test_raises_retryable_error_when_execute_fails(self):
+        session = mock_db_session()
+        session.execute.side_effect = sa.exc.IntegrityError(None, None, None)
 
         with pytest.raises(transaction.interfaces.TransientError):
-            with db_session.no_autoflush:  # prevent premature IntegrityError
-                document.create_or_update_document_uri(
-                    session=db_session,
-                    claimant="http://example.com",
-                    uri="http://example.org",
-                    type="rel-canonical",
-                    content_type="text/html",
-                    document=document_,
-                    created=now(),
-                    updated=now(),
-                )
+            document.create_or_update_document_uris(
+                session=session,
+                document_uri_dicts=[
+                    {
+                        "claimant": "http://example.com",
+                        "uri": "http://example.org",
+                        "type": "rel-canonical",
+                        "content_type": "text/html",
+                    }
+                ],
+                document=mock_document(),
+                created=now(),
+                updated=now(),
+            )
 
 
-class TestCreateOrUpdateDocumentMeta(object):
+@pytest.mark.usefixtures("log")
+class TestCreateOrUpdateDocumentMetas(object):
     def test_it_creates_a_new_DocumentMeta_if_there_is_no_existing_one(
         self, db_session
     ):
         claimant = "http://example.com/claimant"
         type_ = "title"
-        value = "the title"
+        value = ["the title"]
         document_ = document.Document()
         created = yesterday()
         updated = now()
@@ -497,18 +579,19 @@ class TestCreateOrUpdateDocumentMeta(object):
                 updated=updated,
             )
         )
+        db_session.flush()
 
-        document.create_or_update_document_meta(
+        document.create_or_update_document_metas(
             session=db_session,
-            claimant=claimant,
-            type=type_,
-            value=value,
+            document_meta_dicts=[{"claimant": claimant, "type": type_, "value": value}],
             document=document_,
             created=created,
             updated=updated,
         )
 
-        document_meta = db_session.query(document.DocumentMeta).all()[-1]
+        document_meta = (
+            db_session.query(document.DocumentMeta).filter_by(type=type_).one()
+        )
         assert document_meta.claimant == claimant
         assert document_meta.type == type_
         assert document_meta.value == value
@@ -519,8 +602,9 @@ class TestCreateOrUpdateDocumentMeta(object):
     def test_it_updates_an_existing_DocumentMeta_if_there_is_one(self, db_session):
         claimant = "http://example.com/claimant"
         type_ = "title"
-        value = "the title"
+        value = ["the title"]
         document_ = document.Document()
+        other_document = document.Document()
         created = yesterday()
         updated = now()
         document_meta = document.DocumentMeta(
@@ -531,20 +615,22 @@ class TestCreateOrUpdateDocumentMeta(object):
             created=created,
             updated=updated,
         )
-        db_session.add(document_meta)
+        db_session.add_all([document_meta, other_document])
+        db_session.flush()
 
         new_updated = now()
-        document.create_or_update_document_meta(
+        document.create_or_update_document_metas(
             session=db_session,
-            claimant=claimant,
-            type=type_,
-            value="new value",
-            document=document.Document(),  # This should be ignored.
+            document_meta_dicts=[
+                {"claimant": claimant, "type": type_, "value": ["new value"]}
+            ],
+            document=other_document,  # This should be ignored.
             created=now(),  # This should be ignored.
             updated=new_updated,
         )
 
-        assert document_meta.value == "new value"
+        db_session.refresh(document_meta)
+        assert document_meta.value == ["new value"]
         assert document_meta.updated == new_updated
         assert document_meta.created == created, "It shouldn't update created"
         assert document_meta.document == document_, "It shouldn't update document"
@@ -552,75 +638,91 @@ class TestCreateOrUpdateDocumentMeta(object):
             len(db_session.query(document.DocumentMeta).all()) == 1
         ), "It shouldn't have added any new objects to the db"
 
-    def test_it_denormalizes_title_to_document_when_none(self, db_session):
-        claimant = "http://example.com/claimant"
-        type_ = "title"
+    @pytest.mark.parametrize("title", [None, ""])
+    def test_it_denormalizes_title_to_document_when_not_set(self, db_session, title):
         value = ["the title"]
-        document_ = document.Document(title=None)
-        created = yesterday()
-        updated = now()
+        document_ = document.Document(title=title)
         db_session.add(document_)
+        db_session.flush()
 
-        document.create_or_update_document_meta(
+        document.create_or_update_document_metas(
             session=db_session,
-            claimant=claimant,
-            type=type_,
-            value=value,
+            document_meta_dicts=[
+                {
+                    "claimant": "http://example.com/claimant",
+                    "type": "title",
+                    "value": value,
+                }
+            ],
             document=document_,
-            created=created,
-            updated=updated,
+            created=yesterday(),
+            updated=now(),
         )
 
         document_ = db_session.query(document.Document).get(document_.id)
         assert document_.title == value[0]
 
-    def test_it_denormalizes_title_to_document_when_empty(self, db_session):
-        claimant = "http://example.com/claimant"
-        type_ = "title"
-        value = ["the title"]
-        document_ = document.Document(title="")
-        created = yesterday()
-        updated = now()
+    def test_it_skips_denormalizing_title_to_document_when_already_set(
+        self, db_session
+    ):
+        document_ = document.Document(title="foobar")
         db_session.add(document_)
+        db_session.flush()
 
-        document.create_or_update_document_meta(
+        document.create_or_update_document_metas(
             session=db_session,
-            claimant=claimant,
-            type=type_,
-            value=value,
+            document_meta_dicts=[
+                {
+                    "claimant": "http://example.com/claimant",
+                    "type": "title",
+                    "value": ["the title"],
+                }
+            ],
             document=document_,
-            created=created,
-            updated=updated,
+            created=yesterday(),
+            updated=now(),
         )
 
         document_ = db_session.query(document.Document).get(document_.id)
-        assert document_.title == value[0]
+        assert document_.title == "foobar"
 
-    def test_it_skips_denormalizing_title_to_document_when_already_set(
-        self, db_session
-    ):
-        claimant = "http://example.com/claimant"
-        type_ = "title"
-        value = ["the title"]
-        document_ = document.Document(title="foobar")
-        created = yesterday()
-        updated = now()
+    def test_the_last_duplicate_claim_wins(self, db_session):
+        document_ = document.Document()
         db_session.add(document_)
+        db_session.flush()
 
-        document.create_or_update_document_meta(
+        document.create_or_update_document_metas(
             session=db_session,
-            claimant=claimant,
-            type=type_,
-            value=value,
+            document_meta_dicts=[
+                {
+                    "claimant": "http://example.com/claimant",
+                    "type": "title",
+                    "value": [value],
+                }
+                for value in ["first", "second"]
+            ],
             document=document_,
-            created=created,
-            updated=updated,
+            created=yesterday(),
+            updated=now(),
         )
 
-        document_ = db_session.query(document.Document).get(document_.id)
-        assert document_.title == "foobar"
+        document_meta = db_session.query(document.DocumentMeta).one()
+        assert document_meta.value == ["second"]
+
+    def test_it_does_nothing_if_there_are_no_dicts(self):
+        session = mock_db_session()
 
-    def test_it_logs_a_warning(self, log):
+        document.create_or_update_document_metas(
+            session=session,
+            document_meta_dicts=[],
+            document=mock_document(),
+            created=yesterday(),
+            updated=now(),
+        )
+
+        assert not session.execute.called
+
+    def test_it_logs_a_warning(self, db_session, log):
         """
         It should warn on document mismatches.
 
@@ -628,45 +730,49 @@ class TestCreateOrUpdateDocumentMeta(object):
         Document.
 
         """
-        session = mock_db_session()
-        document_one = mock_document()
-        document_two = mock_document()
-        existing_document_meta = mock_document_meta(document=document_one)
-        session.query.return_value.filter.return_value.one_or_none.return_value = (
-            existing_document_meta
+        claimant = "http://example.com/claimant"
+        db_session.add(
+            document.DocumentMeta(
+                claimant=claimant,
+                type="title",
+                value=["old value"],
+                document=document.Document(),
+            )
         )
+        other_document = document.Document()
+        db_session.add(other_document)
+        db_session.flush()
 
-        document.create_or_update_document_meta(
-            session=session,
-            claimant="http://example.com/claimant",
-            type="title",
-            value="new value",
-            document=document_two,
+        document.create_or_update_document_metas(
+            session=db_session,
+            document_meta_dicts=[
+                {"claimant": claimant, "type": "title", "value": ["new value"]}
+            ],
+            document=other_document,
             created=yesterday(),
             updated=now(),
         )
 
         assert log.warning.call_count == 1
 
-    def test_raises_retryable_error_when_flush_fails(self, db_session, monkeypatch):
-        document_ = document.Document()
-
-        def err():
-            raise sa.exc.IntegrityError(None, None, None)
-
-        monkeypatch.setattr(db_session, "flush", err)
+    def test_raises_retryable_error_when_execute_fails(self):
+        session = mock_db_session()
+        session.execute.side_effect = sa.exc.IntegrityError(None, None, None)
 
         with pytest.raises(transaction.interfaces.TransientError):
-            with db_session.no_autoflush:  # prevent premature IntegrityError
-                document.create_or_update_document_meta(
-                    session=db_session,
-                    claimant="http://example.com",
-                    type="title",
-                    value="My Title",
-                    document=document_,
-                    created=now(),
-                    updated=now(),
-                )
+            document.create_or_update_document_metas(
+                session=session,
+                document_meta_dicts=[
+                    {
+                        "claimant": "http://example.com",
+                        "type": "title",
+                        "value": ["My Title"],
+                    }
+                ],
+                document=mock_document(),
+                created=now(),
+                updated=now(),
+            )
 
 
 @pytest.mark.usefixtures("merge_data")
@@ -821,6 +927,9 @@ class TestMergeDocuments(object):
         return (master, duplicate_1, duplicate_2)
 
 
+@pytest.mark.usefixtures(
+    "create_or_update_document_uris", "create_or_update_document_metas"
+)
 class TestUpdateDocumentMetadata(object):
     def test_it_uses_the_target_uri_to_get_the_document(
         self, annotation, Document, session
@@ -871,9 +980,8 @@ class TestUpdateDocumentMetadata(object):
         self, annotation, Document, merge_documents, session
     ):
         """If it finds more than one document it calls merge_documents()."""
-        Document.find_or_create_by_uris.return_value = mock.Mock(
-            count=mock.Mock(return_value=3)
-        )
+        documents = [mock_document(), mock_document(), mock_document()]
+        Document.find_or_create_by_uris.return_value.all.return_value = documents
 
         document.update_document_metadata(
             session,
@@ -885,27 +993,20 @@ class TestUpdateDocumentMetadata(object):
         )
 
         merge_documents.assert_called_once_with(
-            session,
-            Document.find_or_create_by_uris.return_value,
-            updated=annotation.updated,
-        )
-
-    def test_it_calls_first(self, annotation, session, Document):
-        """If it finds only one document it calls first()."""
-        Document.find_or_create_by_uris.return_value = mock.Mock(
-            count=mock.Mock(return_value=1)
+            session, documents, updated=annotation.updated
         )
 
+    def test_it_fetches_the_documents_once(self, annotation, session, Document):
         document.update_document_metadata(session, annotation, [], [])
 
-        Document.find_or_create_by_uris.return_value.first.assert_called_once_with()
+        Document.find_or_create_by_uris.return_value.all.assert_called_once_with()
 
     def test_it_updates_document_updated(
         self, annotation, Document, merge_documents, session
     ):
         yesterday_ = "yesterday"
         document_ = merge_documents.return_value = mock.Mock(updated=yesterday_)
-        Document.find_or_create_by_uris.return_value.first.return_value = document_
+        Document.find_or_create_by_uris.return_value.all.return_value = [document_]
 
         document.update_document_metadata(
             session,
@@ -918,12 +1019,44 @@ class TestUpdateDocumentMetadata(object):
 
         assert document_.updated == annotation.updated
 
-    def test_it_saves_all_the_document_uris(
-        self, session, annotation, Document, create_or_update_document_uri
+    def test_it_flushes_the_document_before_upserting(
+        self, annotation, create_or_update_document_uris, Document, session
     ):
-        """It creates or updates a DocumentURI for each document URI dict."""
-        Document.find_or_create_by_uris.return_value.count.return_value = 1
+        def assert_flushed(**kwargs):
+            session.flush.assert_called_once_with()
 
+        create_or_update_document_uris.side_effect = assert_flushed
+
+        document.update_document_metadata(
+            session,
+            annotation.target_uri,
+            [],
+            [],
+            annotation.created,
+            annotation.updated,
+        )
+
+        assert create_or_update_document_uris.called
+
+    def test_it_raises_retryable_error_when_flush_fails(
+        self, annotation, Document, session
+    ):
+        session.flush.side_effect = sa.exc.IntegrityError(None, None, None)
+
+        with pytest.raises(transaction.interfaces.TransientError):
+            document.update_document_metadata(
+                session,
+                annotation.target_uri,
+                [],
+                [],
+                annotation.created,
+                annotation.updated,
+            )
+
+    def test_it_saves_all_the_document_uris(
+        self, session, annotation, Document, create_or_update_document_uris
+    ):
+        """It creates or updates the DocumentURIs for all document URI dicts."""
         document_uri_dicts = [
             {
                 "uri": "http://example.com/example_1",
@@ -937,12 +1070,6 @@ class TestUpdateDocumentMetadata(object):
                 "type": "type",
                 "content_type": None,
             },
-            {
-                "uri": "http://example.com/example_3",
-                "claimant": "http://example.com/claimant",
-                "type": "type",
-                "content_type": None,
-            },
         ]
 
         document.update_document_metadata(
@@ -954,22 +1081,17 @@ class TestUpdateDocumentMetadata(object):
             annotation.updated,
         )
 
-        assert create_or_update_document_uri.call_count == 3
-        for doc_uri_dict in document_uri_dicts:
-            create_or_update_document_uri.assert_any_call(
-                session=session,
-                document=Document.find_or_create_by_uris.return_value.first.return_value,
-                created=annotation.created,
-                updated=annotation.updated,
-                **doc_uri_dict
-            )
+        create_or_update_document_uris.assert_called_once_with(
+            session=session,
+            document_uri_dicts=document_uri_dicts,
+            document=Document.find_or_create_by_uris.return_value.all.return_value[0],
+            created=annotation.created,
+            updated=annotation.updated,
+        )
 
-    def test_it_updates_document_web_uri(
-        self, annotation, Document, factories, session
-    ):
+    def test_it_updates_document_web_uri(self, annotation, Document, session):
         document_ = mock.Mock(web_uri=None)
-        Document.find_or_create_by_uris.return_value.count.return_value = 1
-        Document.find_or_create_by_uris.return_value.first.return_value = document_
+        Document.find_or_create_by_uris.return_value.all.return_value = [document_]
 
         document.update_document_metadata(
             session,
@@ -980,14 +1102,13 @@ class TestUpdateDocumentMetadata(object):
             annotation.updated,
         )
 
+        session.expire.assert_called_once_with(document_, ["document_uris", "meta"])
         document_.update_web_uri.assert_called_once_with()
 
     def test_it_saves_all_the_document_metas(
-        self, annotation, create_or_update_document_meta, Document, session
+        self, annotation, create_or_update_document_metas, Document, session
     ):
-        """It creates or updates a DocumentMeta for each document meta dict."""
-        Document.find_or_create_by_uris.return_value.count.return_value = 1
-
+        """It creates or updates the DocumentMetas for all document meta dicts."""
         document_meta_dicts = [
             {
                 "claimant": "http://example.com/claimant",
@@ -999,11 +1120,6 @@ class TestUpdateDocumentMetadata(object):
                 "value": "bar",
                 "claimant": "http://example.com/claimant",
             },
-            {
-                "type": "site title",
-                "value": "gar",
-                "claimant": "http://example.com/claimant",
-            },
         ]
 
         document.update_document_metadata(
@@ -1015,21 +1131,15 @@ class TestUpdateDocumentMetadata(object):
             annotation.updated,
         )
 
-        assert create_or_update_document_meta.call_count == 3
-        for document_meta_dict in document_meta_dicts:
-            create_or_update_document_meta.assert_any_call(
-                session=session,
-                document=Document.find_or_create_by_uris.return_value.first.return_value,
-                created=annotation.created,
-                updated=annotation.updated,
-                **document_meta_dict
-            )
-
-    def test_it_returns_a_document(
-        self, annotation, create_or_update_document_meta, Document, session
-    ):
-        Document.find_or_create_by_uris.return_value.count.return_value = 1
+        create_or_update_document_metas.assert_called_once_with(
+            session=session,
+            document_meta_dicts=document_meta_dicts,
+            document=Document.find_or_create_by_uris.return_value.all.return_value[0],
+            created=annotation.created,
+            updated=annotation.updated,
+        )
 
+    def test_it_returns_a_document(self, annotation, Document, session):
         result = document.update_document_metadata(
             session,
             annotation.target_uri,
@@ -1039,24 +1149,28 @@ class TestUpdateDocumentMetadata(object):
             annotation.updated,
         )
 
-        assert result == Document.find_or_create_by_uris.return_value.first.return_value
+        assert (
+            result == Document.find_or_create_by_uris.return_value.all.return_value[0]
+        )
 
     @pytest.fixture
     def annotation(self):
         return mock.Mock(spec=models.Annotation())
 
     @pytest.fixture
-    def create_or_update_document_meta(self, patch):
-        return patch("h.models.document.create_or_update_document_meta")
+    def create_or_update_document_metas(self, patch):
+        return patch("h.models.document.create_or_update_document_metas")
 
     @pytest.fixture
-    def create_or_update_document_uri(self, patch):
-        return patch("h.models.document.create_or_update_document_uri")
+    def create_or_update_document_uris(self, patch):
+        return patch("h.models.document.create_or_update_document_uris")
 
     @pytest.fixture
     def Document(self, patch):
         Document = patch("h.models.document.Document")
-        Document.find_or_create_by_uris.return_value.count.return_value = 1
+        Document.find_or_create_by_uris.return_value.all.return_value = [
+            mock.Mock(web_uri=None)
+        ]
         return Document
 
     @pytest.fixture
@@ -1068,6 +1182,52 @@ class TestUpdateDocumentMetadata(object):
         return mock.Mock(spec=db_session)
 
 
+class TestUpdateDocumentMetadataIntegration(object):
+    def test_it_writes_the_metadata_in_a_constant_number_of_statements(
+        self, db_session
+    ):
+        target_uri = "http://example.com/paper.pdf"
+
+        def run(claims):
+            statements = []
+
+            @sa.event.listens_for(db_session.bind, "before_cursor_execute")
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            try:
+                document.update_document_metadata(
+                    db_session,
+                    target_uri,
+                    [
+                        {
+                            "claimant": target_uri,
+                            "type": "highwire.{}".format(i),
+                            "value": ["value"],
+                        }
+                        for i in range(claims)
+                    ],
+                    [
+                        {
+                            "claimant": target_uri,
+                            "uri": "http://example.com/alternate_{}".format(i),
+                            "type": "rel-alternate",
+                            "content_type": "",
+                        }
+                        for i in range(claims)
+                    ],
+                )
+                db_session.flush()
+            finally:
+                sa.event.remove(db_session.bind, "before_cursor_execute", record)
+            return len(statements)
+
+        # Create the document first so that both runs below take the same path.
+        run(1)
+
+        assert run(2) == run(20)
+
+
 def now():
     return datetime.datetime.now()
 
@@ -1086,6 +1246,9 @@ def mock_db_session():
         def query(self, cls):
             pass
 
+        def execute(self, stmt):
+            pass
+
         def flush(self):
             pass
 
@@ -1097,25 +1260,6 @@ def mock_document():
     return mock.Mock(spec=document.Document())
 
 
-def mock_document_meta(document=None):
-
-    # We define a class to use as the mock spec here because we can't use the
-    # real DocumentMeta class because that class may be patched in the tests
-    # that are calling this function (so we'd end up using a mock object as a
-    # spec instead, and get completely the wrong spec).
-    class DocumentMeta(object):
-        def __init__(self):
-            self.type = None
-            self.value = None
-            self.created = None
-            self.updated = None
-            self.document = document
-            self.id = None
-            self.document_id = None
-
-    return mock.Mock(spec=DocumentMeta())
-
-
 @pytest.fixture
 def log(patch):
     return patch("h.models.document.log")
@@ -9,7 +9,7 @@ from h.models import Annotation
 from h.models import Document, DocumentMeta
 from h.models import Subscriptions
 from h.notification.reply import Notification
-from h.notification.reply import get_notification
+from h.notification.reply import get_notifications
 from h.services.user import UserService
 
 FIXTURE_DATA = {
@@ -29,13 +29,13 @@ FIXTURE_DATA = {
 
 
 @pytest.mark.usefixtures(
-    "authz_policy", "fetch_annotation", "subscription", "user_service"
+    "authz_policy", "fetch_ordered_annotations", "subscription", "user_service"
 )
-class TestGetNotification(object):
+class TestGetNotifications(object):
     def test_returns_correct_params_when_subscribed(
         self, parent, pyramid_request, reply, user_service
     ):
-        result = get_notification(pyramid_request, reply, "create")
+        [result] = get_notifications(pyramid_request, [reply])
 
         assert isinstance(result, Notification)
         assert result.reply == reply
@@ -44,26 +44,51 @@ class TestGetNotification(object):
         assert result.parent_user == user_service.fetch(parent.userid)
         assert result.document == reply.document
 
-    def test_returns_none_when_action_is_not_create(self, pyramid_request, reply):
-        assert get_notification(pyramid_request, reply, "update") is None
-        assert get_notification(pyramid_request, reply, "delete") is None
-        assert get_notification(pyramid_request, reply, "frobnicate") is None
+    def test_returns_a_notification_for_each_reply(
+        self, db_session, parent, pyramid_request, reply
+    ):
+        data = dict(FIXTURE_DATA["reply"])
+        del data["id"]
+        other_reply = Annotation(**data)
+        other_reply.target_uri = reply.target_uri
+        other_reply.references = [parent.id]
+        other_reply.document = reply.document
+        db_session.add(other_reply)
+        db_session.flush()
+
+        result = get_notifications(pyramid_request, [reply, other_reply])
+
+        assert [n.reply for n in result] == [reply, other_reply]
+
+    def test_looks_up_parents_and_users_once(
+        self, fetch_ordered_annotations, parent, pyramid_request, reply, user_service
+    ):
+        get_notifications(pyramid_request, [reply, reply])
+
+        fetch_ordered_annotations.assert_called_once_with(
+            pyramid_request.db, [parent.id]
+        )
+        assert user_service.fetch_all.call_count == 1
+        assert sorted(user_service.fetch_all.call_args[0][0]) == [
+            "acct:elephant@safari.net",
+            "acct:giraffe@safari.net",
+        ]
 
     def test_returns_none_when_annotation_is_not_reply(self, pyramid_request, reply):
         reply.references = None
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_parent_does_not_exist(
         self, annotations, parent, pyramid_request, reply
     ):
         del annotations[parent.id]
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_parent_user_does_not_exist(
         self, factories, pyramid_request, reply, user_service
@@ -71,9 +96,9 @@ class TestGetNotification(object):
         users = {"acct:elephant@safari.net": factories.User()}
         user_service.fetch.side_effect = users.get
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_parent_user_has_no_email_address(
         self, factories, pyramid_request, reply, user_service
@@ -84,7 +109,7 @@ class TestGetNotification(object):
         }
         user_service.fetch.side_effect = users.get
 
-        assert get_notification(pyramid_request, reply, "create") is None
+        assert get_notifications(pyramid_request, [reply]) == []
 
     def test_returns_none_when_reply_user_does_not_exist(
         self, factories, pyramid_request, reply, user_service
@@ -99,43 +124,43 @@ class TestGetNotification(object):
         users = {"acct:giraffe@safari.net": factories.User()}
         user_service.fetch.side_effect = users.get
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_reply_by_same_user(self, parent, pyramid_request, reply):
         parent.userid = "acct:elephant@safari.net"
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_parent_user_cannot_read_reply(
         self, pyramid_request, reply
     ):
         reply.shared = False
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_subscription_inactive(
         self, pyramid_request, reply, subscription
     ):
         subscription.active = False
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     def test_returns_none_when_subscription_absent(
         self, db_session, parent, pyramid_request, reply
     ):
         db_session.query(Subscriptions).delete()
 
-        result = get_notification(pyramid_request, reply, "create")
+        result = get_notifications(pyramid_request, [reply])
 
-        assert result is None
+        assert result == []
 
     @pytest.fixture
     def annotations(self):
@@ -148,10 +173,14 @@ class TestGetNotification(object):
         pyramid_config.set_authorization_policy(ACLAuthorizationPolicy())
 
     @pytest.fixture
-    def fetch_annotation(self, patch, annotations):
-        fetch_annotation = patch("h.notification.reply.storage.fetch_annotation")
-        fetch_annotation.side_effect = lambda _, id: annotations.get(id)
-        return fetch_annotation
+    def fetch_ordered_annotations(self, patch, annotations):
+        fetch_ordered_annotations = patch(
+            "h.notification.reply.storage.fetch_ordered_annotations"
+        )
+        fetch_ordered_annotations.side_effect = lambda _, ids: [
+            annotations[id_] for id_ in ids if id_ in annotations
+        ]
+        return fetch_ordered_annotations
 
     @pytest.fixture
     def parent(self, annotations):
@@ -6,6 +6,7 @@ import pytest
 import mock
 
 from h.presenters.group_json import GroupJSONPresenter, GroupsJSONPresenter
+from h.services.group_count import GroupCounts, GroupCountService
 from h.services.group_links import GroupLinksService
 from h import traversal
 
@@ -171,6 +172,28 @@ class TestGroupJSONPresenter(object):
         # it can't if there are no scopes
         assert model["scopes"]["enforced"] is False
 
+    def test_it_expands_counts(self, factories, GroupContext, group_count_svc):
+        group = factories.Group()
+        group_count_svc.counts.return_value = GroupCounts(
+            member_count=3, annotation_count=8, shared_annotation_count=5
+        )
+        presenter = GroupJSONPresenter(GroupContext(group))
+
+        model = presenter.asdict(expand=["counts"])
+
+        group_count_svc.counts.assert_called_once_with(group)
+        assert model["counts"] == {"members": 3, "annotations": 5}
+
+    def test_it_does_not_count_by_default(
+        self, factories, GroupContext, group_count_svc
+    ):
+        presenter = GroupJSONPresenter(GroupContext(factories.Group()))
+
+        model = presenter.asdict()
+
+        assert "counts" not in model
+        assert not group_count_svc.counts.called
+
     def test_it_ignores_unrecognized_expands(self, factories, GroupContext):
         group = factories.OpenGroup(
             name="My Group", pubid="mygroup", organization=factories.Organization()
@@ -223,6 +246,34 @@ class TestGroupsJSONPresenter(object):
         for group_model in result:
             assert "links" in group_model
 
+    def test_asdicts_fetches_all_the_counts_at_once(
+        self, factories, group_count_svc, GroupContexts
+    ):
+        groups = [factories.Group(), factories.OpenGroup()]
+        group_count_svc.counts_for.return_value = {
+            groups[0].id: GroupCounts(3, 8, 5),
+            groups[1].id: GroupCounts(1, 2, 2),
+        }
+        presenter = GroupsJSONPresenter(GroupContexts(groups))
+
+        result = presenter.asdicts(expand=["counts"])
+
+        group_count_svc.counts_for.assert_called_once_with(groups)
+        assert not group_count_svc.counts.called
+        assert [group["counts"] for group in result] == [
+            {"members": 3, "annotations": 5},
+            {"members": 1, "annotations": 2},
+        ]
+
+    def test_asdicts_does_not_count_by_default(
+        self, factories, group_count_svc, GroupContexts
+    ):
+        presenter = GroupsJSONPresenter(GroupContexts([factories.Group()]))
+
+        presenter.asdicts()
+
+        assert not group_count_svc.counts_for.called
+
 
 @pytest.fixture
 def links_svc(pyramid_config):
@@ -231,6 +282,13 @@ def links_svc(pyramid_config):
     return svc
 
 
+@pytest.fixture
+def group_count_svc(pyramid_config):
+    svc = mock.create_autospec(GroupCountService, spec_set=True, instance=True)
+    pyramid_config.register_service(svc, name="group_count")
+    return svc
+
+
 @pytest.fixture
 def GroupContext(pyramid_request, links_svc):
     def resource_factory(group):
@@ -126,6 +126,20 @@ class TestPublisher(object):
             retry_policy=retry_policy,
         )
 
+    def test_publish_annotations(self, producer_pool, pyramid_request):
+        payloads = [
+            {"action": "create", "annotation": {"id": "foo"}},
+            {"action": "delete", "annotation": {"id": "bar"}},
+        ]
+        pool = producer_pool.__getitem__.return_value
+        producer = pool.acquire.return_value.__enter__.return_value
+
+        publisher = realtime.Publisher(pyramid_request)
+        publisher.publish_annotations(payloads)
+
+        pool.acquire.assert_called_once_with(block=True)
+        assert [c[0][0] for c in producer.publish.call_args_list] == payloads
+
     def test_publish_user(self, matchers, producer_pool, pyramid_request, retry_policy):
         payload = {"action": "create", "user": {"id": "foobar"}}
         producer = producer_pool["foobar"].acquire().__enter__()
@@ -402,6 +402,67 @@ class TestDelete(object):
         assert get_indexed_ann(annotation.id).get("deleted") is True
 
 
+class TestDeleteMany(object):
+    def test_annotations_are_marked_deleted(
+        self, es_client, factories, get_indexed_ann, index
+    ):
+        annotations = [
+            factories.Annotation.build(id="test_annotation_id_1"),
+            factories.Annotation.build(id="test_annotation_id_2"),
+        ]
+        for annotation in annotations:
+            index(annotation)
+
+        errored = h.search.index.delete_many(es_client, [a.id for a in annotations])
+
+        assert errored == set()
+        for annotation in annotations:
+            assert get_indexed_ann(annotation.id).get("deleted") is True
+
+
+class TestUpdateUserAnnotations(object):
+    def test_it_sets_fields_of_the_users_annotations(
+        self, es_client, factories, get_indexed_ann, index
+    ):
+        annotation = factories.Annotation.build(userid="acct:jeannie@example.com")
+        index(annotation)
+
+        updated, failures = h.search.index.update_user_annotations(
+            es_client, "acct:jeannie@example.com", {"nipsa": True}
+        )
+
+        assert (updated, failures) == (1, [])
+        assert get_indexed_ann(annotation.id)["nipsa"] is True
+
+    def test_it_removes_fields_set_to_None(
+        self, es_client, factories, get_indexed_ann, index
+    ):
+        annotation = factories.Annotation.build(userid="acct:jeannie@example.com")
+        index(annotation)
+        h.search.index.update_user_annotations(
+            es_client, "acct:jeannie@example.com", {"nipsa": True}
+        )
+        es_client.conn.indices.refresh(index=es_client.index)
+
+        h.search.index.update_user_annotations(
+            es_client, "acct:jeannie@example.com", {"nipsa": None}
+        )
+
+        assert "nipsa" not in get_indexed_ann(annotation.id)
+
+    def test_it_leaves_other_users_annotations_alone(
+        self, es_client, factories, get_indexed_ann, index
+    ):
+        annotation = factories.Annotation.build(userid="acct:bob@example.com")
+        index(annotation)
+
+        h.search.index.update_user_annotations(
+            es_client, "acct:jeannie@example.com", {"nipsa": True}
+        )
+
+        assert "nipsa" not in get_indexed_ann(annotation.id)
+
+
 class TestBatchIndexer(object):
     def test_it_indexes_all_annotations(
         self, batch_indexer, factories, get_indexed_ann
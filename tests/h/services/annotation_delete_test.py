@@ -2,10 +2,13 @@
 
 from __future__ import unicode_literals
 
+import datetime as datetime_
+
 import pytest
 import mock
 
-from h.events import AnnotationEvent
+from h.events import AnnotationEvent, AnnotationsDeletedEvent
+from h.models import Annotation
 from h.services.annotation_delete import annotation_delete_service_factory
 
 
@@ -51,6 +54,60 @@ class TestAnnotationDeleteService(object):
         svc.delete.mock_calls == [mock.call(anns[0]), mock.call(anns[1])]
 
 
+class TestBulkDelete(object):
+    def test_it_marks_the_matching_annotations_as_deleted(
+        self, svc, db_session, factories
+    ):
+        user = factories.User()
+        annotations = factories.Annotation.create_batch(3, userid=user.userid)
+        other = factories.Annotation()
+        db_session.flush()
+
+        svc.bulk_delete(Annotation.userid == user.userid)
+
+        assert all(a.deleted for a in annotations)
+        assert not other.deleted
+
+    def test_it_deletes_a_window_at_a_time(
+        self, svc, db_session, factories, monkeypatch
+    ):
+        monkeypatch.setattr("h.services.annotation_delete.BULK_DELETE_WINDOW_SIZE", 2)
+        user = factories.User()
+        annotations = factories.Annotation.create_batch(5, userid=user.userid)
+        db_session.flush()
+
+        ids = svc.bulk_delete(Annotation.userid == user.userid)
+
+        assert sorted(ids) == sorted(a.id for a in annotations)
+        assert all(a.deleted for a in annotations)
+
+    def test_it_updates_the_updated_field(self, svc, db_session, factories, datetime):
+        datetime.utcnow.return_value = datetime_.datetime(2018, 6, 1)
+        annotation = factories.Annotation()
+        db_session.flush()
+
+        svc.bulk_delete(Annotation.id == annotation.id)
+
+        assert annotation.updated == datetime_.datetime(2018, 6, 1)
+
+    def test_it_publishes_a_single_event(
+        self, svc, db_session, factories, pyramid_request
+    ):
+        annotations = factories.Annotation.create_batch(2, groupid="foo")
+        db_session.flush()
+
+        svc.bulk_delete(Annotation.groupid == "foo")
+
+        event = pyramid_request.notify_after_commit.call_args[0][0]
+        assert pyramid_request.notify_after_commit.call_count == 1
+        assert isinstance(event, AnnotationsDeletedEvent)
+        assert sorted(event.annotation_ids) == sorted(a.id for a in annotations)
+
+    def test_it_does_nothing_if_nothing_matches(self, svc, pyramid_request):
+        assert svc.bulk_delete(Annotation.groupid == "foo") == []
+        assert not pyramid_request.notify_after_commit.called
+
+
 @pytest.fixture
 def annotation(factories):
     return lambda factories=factories: factories.Annotation()
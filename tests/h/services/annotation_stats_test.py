@@ -7,6 +7,7 @@ import pytest
 
 from h.services.annotation_stats import AnnotationStatsService
 from h.services.annotation_stats import annotation_stats_factory
+from h.services.annotation_stats import count_cache
 from h.search import Search
 from h.search import Limiter, DeletedFilter, UserFilter, TopLevelAnnotationsFilter
 
@@ -77,33 +78,23 @@ class TestAnnotationStatsService(object):
 
         assert anns == 3
 
-    def test_group_annotation_count_calls_search_with_request_and_stats(
-        self, svc, search, pyramid_request
-    ):
-        svc.group_annotation_count("groupid")
-
-        search.assert_called_with(pyramid_request, stats=pyramid_request.stats)
-
-    def test_group_annotation_count_calls_run_with_groupid_and_limit(self, svc, search):
-        svc.group_annotation_count("groupid")
+    def test_user_annotation_count_caches_the_count(self, svc, search):
+        search.return_value.run.return_value.total = 3
+        svc.user_annotation_count("userid")
+        search.return_value.run.return_value.total = 4
 
-        search.return_value.run.assert_called_with({"limit": 0, "group": "groupid"})
+        assert svc.user_annotation_count("userid") == 3
 
-    def test_group_annotation_count_excludes_replies(
-        self, svc, search, top_level_annotation_filter
+    def test_counts_are_cached_separately_for_each_viewer(
+        self, pyramid_config, svc, search
     ):
-        svc.group_annotation_count("groupid")
-
-        search.return_value.append_modifier.assert_called_with(
-            top_level_annotation_filter.return_value
-        )
-
-    def test_group_annotation_count_returns_total(self, svc, search):
         search.return_value.run.return_value.total = 3
+        svc.user_annotation_count("userid")
+        search.return_value.run.return_value.total = 4
 
-        anns = svc.group_annotation_count("groupid")
+        pyramid_config.testing_securitypolicy("acct:someone@example.com")
 
-        assert anns == 3
+        assert svc.user_annotation_count("userid") == 4
 
 
 class TestAnnotationStatsFactory(object):
@@ -119,6 +110,11 @@ class TestAnnotationStatsFactory(object):
         assert svc.request == request
 
 
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    count_cache.clear()
+
+
 @pytest.fixture
 def svc(pyramid_request):
     return AnnotationStatsService(request=pyramid_request)
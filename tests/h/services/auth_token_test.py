@@ -8,6 +8,8 @@ import pytest
 
 from h.services.auth_token import AuthTokenService
 from h.services.auth_token import auth_token_service_factory
+from h.services.auth_token import token_cache
+from h.services.auth_token import watch_auth_changes
 
 
 class TestAuthTokenService(object):
@@ -51,6 +53,22 @@ class TestAuthTokenService(object):
 
         assert result is None
 
+    def test_validate_shares_tokens_between_services(self, db_session, factories):
+        token_model = factories.DeveloperToken(expires=self.time(1))
+        AuthTokenService(db_session).validate(token_model.value)
+        db_session.delete(token_model)
+        db_session.flush()
+
+        result = AuthTokenService(db_session).validate(token_model.value)
+
+        assert result.userid == token_model.userid
+
+    def test_validate_does_not_share_missing_tokens(self, db_session, factories):
+        AuthTokenService(db_session).validate("abcde123")
+        factories.DeveloperToken(value="abcde123")
+
+        assert AuthTokenService(db_session).validate("abcde123") is not None
+
     def test_fetch_returns_database_model(self, svc, token):
         assert svc.fetch(token.value) == token
 
@@ -70,6 +88,74 @@ class TestAuthTokenService(object):
         return datetime.datetime.utcnow() + datetime.timedelta(days=days_delta)
 
 
+class TestWatchAuthChanges(object):
+    def test_revoking_a_token_invalidates_it(self, db_session, factories):
+        token_model = factories.DeveloperToken()
+        AuthTokenService(db_session).validate(token_model.value)
+
+        db_session.delete(token_model)
+        db_session.flush()
+
+        assert AuthTokenService(db_session).validate(token_model.value) is None
+
+    def test_regenerating_a_token_invalidates_it(self, db_session, factories):
+        token_model = factories.DeveloperToken()
+        old_value = token_model.value
+        AuthTokenService(db_session).validate(old_value)
+
+        token_model.value = "new-value"
+        db_session.flush()
+
+        assert AuthTokenService(db_session).validate(old_value) is None
+
+    def test_renaming_a_user_publishes_a_new_version(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+
+        user.username = "renamed"
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "auth")
+
+    def test_joining_a_group_publishes_a_new_version(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        group = factories.Group()
+        db_session.flush()
+
+        group.members.append(user)
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "auth")
+
+    def test_it_ignores_other_user_changes(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+
+        user.display_name = "Changed"
+        db_session.flush()
+
+        assert not publish_version.called
+
+    @pytest.fixture(autouse=True)
+    def watch(self, db_session):
+        watch_auth_changes(db_session)
+
+    @pytest.fixture
+    def publish_version(self, patch):
+        return patch("h.services.auth_token.publish_version")
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+
+
 @pytest.mark.usefixtures("pyramid_settings")
 class TestAuthTokenServiceFactory(object):
     def test_it_returns_service(self, pyramid_request):
@@ -10,6 +10,7 @@ from h.services.delete_group import (
     DeleteGroupService,
     DeletePublicGroupError,
 )
+from h.models import Annotation
 from h.services.annotation_delete import AnnotationDeleteService
 
 
@@ -33,18 +34,11 @@ class TestDeleteGroupService(object):
         self, svc, factories, pyramid_request, annotation_delete_service
     ):
         group = factories.Group()
-        annotations = [
-            factories.Annotation(groupid=group.pubid).id,
-            factories.Annotation(groupid=group.pubid).id,
-        ]
 
         svc.delete(group)
 
-        deleted_anns = [
-            ann.id
-            for ann in annotation_delete_service.delete_annotations.call_args[0][0]
-        ]
-        assert sorted(deleted_anns) == sorted(annotations)
+        criterion = annotation_delete_service.bulk_delete.call_args[0][0]
+        assert criterion.compare(Annotation.groupid == group.pubid)
 
 
 @pytest.mark.usefixtures("annotation_delete_service")
@@ -24,16 +24,11 @@ class TestDeleteUserService(object):
         self, factories, pyramid_request, svc, annotation_delete_service
     ):
         user = factories.User(username="bob")
-        anns = [
-            factories.Annotation(userid=user.userid),
-            factories.Annotation(userid=user.userid),
-        ]
 
         svc.delete(user)
 
-        annotation_delete_service.delete.assert_has_calls(
-            [mock.call(anns[0]), mock.call(anns[1])], any_order=True
-        )
+        criterion = annotation_delete_service.bulk_delete.call_args[0][0]
+        assert criterion.compare(Annotation.userid == user.userid)
 
     def test_delete_deletes_user(self, db_session, factories, pyramid_request, svc):
         user = factories.User()
@@ -10,7 +10,9 @@ from h.services.feature import (
     FeatureRequestProperty,
     FeatureService,
     UnknownFeatureError,
+    feature_cache,
     feature_service_factory,
+    watch_feature_changes,
 )
 
 
@@ -156,10 +158,51 @@ class TestFeatureService(object):
             "on-for-cohort": False,
         }
 
+    def test_all_caches_the_features_between_services(self, db_session, features):
+        FeatureService(db_session).all()
+
+        FeatureService(db_session).all()
+
+        assert features.call_count == 1
+
+    def test_all_does_not_query_the_users_cohorts(self, cohort, db_session, factories):
+        user = factories.User(cohorts=[cohort])
+        svc = FeatureService(db_session)
+        svc.all(user=user)
+        db_session.expire(user)
+
+        assert svc.all(user=user)["on-for-cohort"] is True
+        assert "cohorts" not in user.__dict__
+
+    def test_all_reloads_the_features_when_they_change(
+        self, db_session, features, factories
+    ):
+        watch_feature_changes(db_session)
+        svc = FeatureService(db_session)
+        svc.all()
+
+        features.return_value[0].everyone = True
+        db_session.flush()
+
+        assert svc.all()["foo"] is True
+
+    def test_all_reloads_the_features_when_a_user_joins_a_cohort(
+        self, cohort, db_session, factories
+    ):
+        watch_feature_changes(db_session)
+        user = factories.User()
+        svc = FeatureService(db_session)
+        svc.all(user=user)
+
+        user.cohorts.append(cohort)
+        db_session.flush()
+
+        assert svc.all(user=user)["on-for-cohort"] is True
+
     @pytest.fixture
     def features(self, cohort, factories, patch):
-        model = patch("h.services.feature.models.Feature")
-        model.all.return_value = [
+        all_features = patch("h.services.feature.models.Feature.all")
+        all_features.return_value = [
             factories.Feature(name="foo"),
             factories.Feature(name="bar"),
             factories.Feature(name="on-for-everyone", everyone=True),
@@ -167,12 +210,18 @@ class TestFeatureService(object):
             factories.Feature(name="on-for-admins", admins=True),
             factories.Feature(name="on-for-cohort", cohorts=[cohort]),
         ]
+        return all_features
 
     @pytest.fixture
     def cohort(self):
         return models.FeatureCohort(name="cohort")
 
 
+@pytest.fixture(autouse=True)
+def clear_feature_cache():
+    feature_cache.clear()
+
+
 class TestFeatureServiceFactory(object):
     def test_passes_session(self, pyramid_request):
         svc = feature_service_factory(None, pyramid_request)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+from h.models import AnnotationModeration, Group, GroupCount, User
+from h.services.group_count import (
+    GroupCounts,
+    GroupCountService,
+    counts_maintained,
+    group_count_factory,
+    maintain_counts,
+)
+
+
+class TestGroupCountService(object):
+    def test_counts_returns_0_for_groups_with_no_counts(self, factories, svc):
+        group = factories.OpenGroup()
+
+        assert svc.counts(group) == GroupCounts(0, 0, 0)
+
+    def test_counts_returns_the_stored_counts(self, db_session, factories, svc):
+        group = factories.OpenGroup()
+        db_session.add(
+            GroupCount(
+                group_id=group.id,
+                member_count=3,
+                annotation_count=2,
+                shared_annotation_count=1,
+            )
+        )
+        db_session.flush()
+
+        assert svc.counts(group) == GroupCounts(3, 2, 1)
+
+    def test_counts_sums_the_counts_of_each_shard(self, db_session, factories, svc):
+        group = factories.OpenGroup()
+        db_session.add_all(
+            [
+                GroupCount(group_id=group.id, shard=0, member_count=3),
+                GroupCount(group_id=group.id, shard=5, member_count=-1),
+            ]
+        )
+        db_session.flush()
+
+        assert svc.counts(group).member_count == 2
+
+    def test_counts_are_never_negative(self, db_session, factories, svc):
+        group = factories.OpenGroup()
+        db_session.add(GroupCount(group_id=group.id, member_count=-1))
+        db_session.flush()
+
+        assert svc.counts(group).member_count == 0
+
+    def test_counts_for_returns_the_counts_of_each_group(
+        self, db_session, factories, svc
+    ):
+        groups = [factories.OpenGroup(), factories.OpenGroup()]
+        db_session.add(
+            GroupCount(
+                group_id=groups[0].id,
+                member_count=3,
+                annotation_count=2,
+                shared_annotation_count=1,
+            )
+        )
+        db_session.flush()
+
+        assert svc.counts_for(groups) == {
+            groups[0].id: GroupCounts(3, 2, 1),
+            groups[1].id: GroupCounts(0, 0, 0),
+        }
+
+    def test_counts_for_returns_an_empty_dict_for_no_groups(self, svc):
+        assert svc.counts_for([]) == {}
+
+    @pytest.fixture
+    def svc(self, db_session):
+        return GroupCountService(db_session)
+
+
+class TestMaintainCounts(object):
+    def test_it_counts_the_members_of_new_groups(self, counts, factories):
+        group = factories.Group()
+
+        assert counts(group).member_count == 1
+
+    def test_it_ignores_new_users_and_groups_with_unloaded_memberships(
+        self, counts, db_session, factories
+    ):
+        user = User(username="bob", authority="example.com")
+        group = Group(name="Bob's group", authority="example.com", creator=user)
+        db_session.add_all([user, group])
+        db_session.flush()
+
+        assert counts(group).member_count == 0
+
+    def test_it_counts_users_joining_groups(self, counts, db_session, factories):
+        group = factories.Group()
+
+        group.members.append(factories.User())
+        db_session.flush()
+
+        assert counts(group).member_count == 2
+
+    def test_it_counts_users_leaving_groups(self, counts, db_session, factories):
+        group = factories.Group()
+
+        group.members.remove(group.creator)
+        db_session.flush()
+
+        assert counts(group).member_count == 0
+
+    def test_it_counts_changes_made_from_the_users_side_once(
+        self, counts, db_session, factories
+    ):
+        group = factories.Group()
+        user = factories.User()
+        user.groups
+
+        user.groups.append(group)
+        db_session.flush()
+
+        assert counts(group).member_count == 2
+
+    def test_it_uncounts_deleted_users(self, counts, db_session, factories):
+        user = factories.User()
+        group = factories.OpenGroup(members=[user])
+
+        db_session.delete(user)
+        db_session.flush()
+
+        assert counts(group).member_count == 0
+
+    def test_it_ignores_deleted_groups(self, counts, db_session, factories):
+        group = factories.Group()
+        group.members.append(factories.User())
+        db_session.flush()
+
+        db_session.delete(group)
+        db_session.flush()
+
+        assert db_session.query(GroupCount).count() == 0
+
+    def test_it_counts_new_annotations(self, counts, factories, group):
+        factories.Annotation(groupid=group.pubid, shared=True)
+        factories.Annotation(groupid=group.pubid, shared=False)
+
+        assert counts(group).annotation_count == 2
+        assert counts(group).shared_annotation_count == 1
+
+    def test_it_does_not_count_replies_as_shared(self, counts, factories, group):
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+
+        factories.Annotation(
+            groupid=group.pubid, shared=True, references=[annotation.id]
+        )
+
+        assert counts(group).annotation_count == 2
+        assert counts(group).shared_annotation_count == 1
+
+    def test_it_counts_annotations_that_are_shared(
+        self, counts, db_session, factories, group
+    ):
+        annotation = factories.Annotation(groupid=group.pubid, shared=False)
+
+        annotation.shared = True
+        db_session.flush()
+
+        assert counts(group).shared_annotation_count == 1
+
+    def test_it_uncounts_deleted_annotations(
+        self, counts, db_session, factories, group
+    ):
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+
+        annotation.deleted = True
+        db_session.flush()
+
+        assert counts(group) == GroupCounts(0, 0, 0)
+
+    def test_it_moves_annotations_whose_group_changes(
+        self, counts, db_session, factories, group
+    ):
+        other_group = factories.OpenGroup()
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+
+        annotation.groupid = other_group.pubid
+        db_session.flush()
+
+        assert counts(group).annotation_count == 0
+        assert counts(other_group).annotation_count == 1
+
+    def test_it_uncounts_hidden_annotations(self, counts, db_session, factories, group):
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+
+        annotation.moderation = AnnotationModeration()
+        db_session.flush()
+
+        assert counts(group).annotation_count == 1
+        assert counts(group).shared_annotation_count == 0
+
+    def test_it_counts_unhidden_annotations(self, counts, db_session, factories, group):
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+        annotation.moderation = AnnotationModeration()
+        db_session.flush()
+
+        annotation.moderation = None
+        db_session.flush()
+
+        assert counts(group).shared_annotation_count == 1
+
+    def test_it_updates_counts_when_users_are_nipsad(
+        self, counts, db_session, factories, group
+    ):
+        user = factories.User()
+        for _ in range(2):
+            factories.Annotation(groupid=group.pubid, shared=True, userid=user.userid)
+
+        user.nipsa = True
+        db_session.flush()
+        assert counts(group).annotation_count == 2
+        assert counts(group).shared_annotation_count == 0
+
+        user.nipsa = False
+        db_session.flush()
+        assert counts(group).shared_annotation_count == 2
+
+    def test_counts_maintained_applies_bulk_updates(
+        self, counts, db_session, factories, group
+    ):
+        annotation = factories.Annotation(groupid=group.pubid, shared=True)
+        table = annotation.__table__
+
+        with counts_maintained(db_session, [annotation.id]):
+            db_session.execute(
+                table.update().where(table.c.id == annotation.id).values(deleted=True)
+            )
+
+        assert counts(group).annotation_count == 0
+
+    @pytest.fixture
+    def counts(self, db_session):
+        maintain_counts(db_session)
+        return GroupCountService(db_session).counts
+
+    @pytest.fixture
+    def group(self, counts, factories):
+        return factories.OpenGroup()
+
+
+class TestGroupCountFactory(object):
+    def test_it_returns_the_service(self, pyramid_request):
+        svc = group_count_factory(None, pyramid_request)
+
+        assert isinstance(svc, GroupCountService)
+        assert svc.session == pyramid_request.db
@@ -61,7 +61,7 @@ class TestListGroupsRequestGroups(object):
     ):
         svc.request_groups(authority=default_authority)
 
-        assert group_scope_service.fetch_by_scope.call_count == 0
+        assert group_scope_service.group_ids_in_scope.call_count == 0
 
     def test_it_returns_private_groups_if_user(
         self, svc, user, default_authority, sample_groups
@@ -146,17 +146,17 @@ class TestPrivateGroups(object):
 
 
 class TestScopedGroups(object):
-    def test_it_fetches_matching_scopes_from_group_scope_service(
+    def test_it_fetches_matching_groups_from_group_scope_service(
         self, svc, default_authority, document_uri, group_scope_service
     ):
         svc.scoped_groups(default_authority, document_uri)
 
-        group_scope_service.fetch_by_scope.assert_called_once_with(document_uri)
+        group_scope_service.group_ids_in_scope.assert_called_once_with(document_uri)
 
     def test_it_returns_empty_list_if_no_matching_scopes(
         self, svc, default_authority, document_uri, sample_groups, group_scope_service
     ):
-        group_scope_service.fetch_by_scope.return_value = []
+        group_scope_service.group_ids_in_scope.return_value = set()
 
         results = svc.scoped_groups(default_authority, document_uri)
 
@@ -178,16 +178,6 @@ class TestScopedGroups(object):
 
         assert sample_groups["other_authority"] not in results
 
-    def test_it_de_dupes_groups(
-        self, svc, sample_groups, document_uri, default_authority
-    ):
-        results = svc.scoped_groups(default_authority, document_uri)
-
-        # The mocked GroupScope service returns the scope for the "open"
-        # group twice, but the group only appears once in the results
-        assert sample_groups["open"] in results
-        assert len(results) == 2
-
 
 class TestWorldGroup(object):
     def test_it_returns_world_group_if_one_exists_for_authority(
@@ -280,14 +270,14 @@ def sample_groups(factories, other_authority, document_uri, default_authority, u
 
 
 @pytest.fixture
-def group_scope_service(pyramid_config, sample_groups):
+def group_scope_service(pyramid_config, db_session, sample_groups):
     service = mock.create_autospec(GroupScopeService, spec_set=True, instance=True)
-    service.fetch_by_scope.return_value = [
-        sample_groups["open"].scopes[0],
-        sample_groups["open"].scopes[0],  # This verifies that the groups are de-duped
-        sample_groups["restricted"].scopes[0],
-        sample_groups["other_authority"].scopes[0],
-    ]
+    db_session.flush()
+    service.group_ids_in_scope.return_value = {
+        sample_groups["open"].id,
+        sample_groups["restricted"].id,
+        sample_groups["other_authority"].id,
+    }
     pyramid_config.register_service(service, name="group_scope")
     return service
 
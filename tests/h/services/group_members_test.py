@@ -5,7 +5,9 @@ from __future__ import unicode_literals
 import mock
 import pytest
 
+from h import session
 from h.models import User, GroupScope
+from h.services.group_list import GroupListService
 from h.services.group_members import GroupMembersService
 from h.services.group_members import group_members_factory
 from h.services.user import UserService
@@ -200,6 +202,32 @@ class TestFactory(object):
             }
         )
 
+    def test_the_published_session_model_includes_a_joined_group(
+        self, db_session, factories, pyramid_config, pyramid_request, user_service
+    ):
+        user = factories.User()
+        group = factories.Group()
+        db_session.flush()
+        pyramid_config.testing_securitypolicy(user.userid)
+        pyramid_config.add_route("group_read", "/groups/{pubid}/{slug}")
+        pyramid_config.register_service(
+            GroupListService(db_session, pyramid_request.default_authority, None),
+            name="group_list",
+        )
+        pyramid_request.user = user
+        pyramid_request.realtime = mock.Mock(spec_set=["publish_user"])
+        user_service.fetch.return_value = user
+        session.watch_profile_changes(db_session)
+        # Cache the user's session model from before they join the group.
+        session.model(pyramid_request)
+        group_members_service = group_members_factory(None, pyramid_request)
+
+        group_members_service.member_join(group, user.userid)
+
+        published = pyramid_request.realtime.publish_user.call_args[0][0]
+        groups = published["session_model"]["groups"]
+        assert group.pubid in [g["id"] for g in groups]
+
 
 @pytest.fixture
 def usr_group_members_service(pyramid_request, db_session):
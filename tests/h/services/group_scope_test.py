@@ -4,7 +4,12 @@ from __future__ import unicode_literals
 
 import pytest
 
-from h.services.group_scope import group_scope_factory, GroupScopeService
+from h.services.group_scope import (
+    group_scope_factory,
+    scope_cache,
+    watch_scope_changes,
+    GroupScopeService,
+)
 
 
 class TestFetchByScope(object):
@@ -16,18 +21,6 @@ class TestFetchByScope(object):
 
         assert scopes == []
 
-    def test_it_only_returns_scopes_that_pass_util_scope_test(
-        self, svc, scope_util, sample_scopes
-    ):
-        scope_util.url_in_scope.return_value = False
-        scope_util.parse_origin.return_value = "http://foo.com"
-
-        # All sample_scopes match this URL, but fail the `url_in_scope` test
-        scopes = svc.fetch_by_scope("http://foo.com")
-
-        assert scope_util.url_in_scope.call_count == len(sample_scopes)
-        assert scopes == []
-
     def test_it_returns_list_of_matching_scopes(self, svc, document_uri, sample_scopes):
         results = svc.fetch_by_scope(document_uri)
 
@@ -36,6 +29,68 @@ class TestFetchByScope(object):
         assert "http://foo.com" in matching_scope_scopes
         assert "http://foo.com/bar/" in matching_scope_scopes
 
+    def test_it_returns_empty_list_if_no_scopes_match(self, svc, sample_scopes):
+        assert svc.fetch_by_scope("http://foo.org/bar/foo.html") == []
+
+
+class TestGroupIdsInScope(object):
+    def test_it_returns_ids_of_groups_with_matching_scopes(
+        self, svc, document_uri, sample_scopes
+    ):
+        group_ids = svc.group_ids_in_scope(document_uri)
+
+        assert group_ids == {sample_scopes[0].group_id, sample_scopes[1].group_id}
+
+    def test_it_returns_empty_set_if_origin_not_parseable(self, svc, scope_util):
+        scope_util.parse_origin.return_value = None
+
+        assert svc.group_ids_in_scope("foo") == set()
+
+    def test_it_caches_the_scopes_for_each_origin(
+        self, svc, document_uri, sample_scopes, factories
+    ):
+        svc.group_ids_in_scope(document_uri)
+        new_scope = factories.GroupScope(scope="http://foo.com/bar/foo")
+
+        assert new_scope.group_id not in svc.group_ids_in_scope(document_uri)
+
+    def test_it_reloads_the_scopes_when_they_change(
+        self, db_session, svc, document_uri, sample_scopes, factories
+    ):
+        watch_scope_changes(db_session)
+        svc.group_ids_in_scope(document_uri)
+        new_scope = factories.GroupScope(scope="http://foo.com/bar/foo")
+
+        assert new_scope.group_id in svc.group_ids_in_scope(document_uri)
+
+    def test_it_reloads_the_scopes_when_a_group_loses_its_scopes(
+        self, db_session, svc, document_uri, sample_scopes
+    ):
+        watch_scope_changes(db_session)
+        svc.group_ids_in_scope(document_uri)
+
+        group = sample_scopes[0].group
+        group.scopes = []
+        db_session.flush()
+
+        assert group.id not in svc.group_ids_in_scope(document_uri)
+
+
+class TestIsScoped(object):
+    def test_it_returns_True_if_the_group_has_scopes(self, svc, factories):
+        group = factories.GroupScope().group
+
+        assert svc.is_scoped(group)
+
+    def test_it_returns_False_if_the_group_has_no_scopes(
+        self, db_session, svc, factories
+    ):
+        factories.GroupScope()
+        group = factories.OpenGroup()
+        db_session.flush()
+
+        assert not svc.is_scoped(group)
+
 
 class TestGroupScopeFactory(object):
     def test_it_returns_group_scope_service_instance(self, pyramid_request):
@@ -44,6 +99,11 @@ class TestGroupScopeFactory(object):
         assert isinstance(svc, GroupScopeService)
 
 
+@pytest.fixture(autouse=True)
+def clear_scope_cache():
+    scope_cache.clear()
+
+
 @pytest.fixture
 def svc(db_session, pyramid_request):
     pyramid_request.db = db_session
@@ -2,10 +2,15 @@
 
 from __future__ import unicode_literals
 
+import mock
 import pytest
+import sqlalchemy
 
+from h.models import Group
+from h.services.groupfinder import group_cache
 from h.services.groupfinder import groupfinder_service_factory
 from h.services.groupfinder import GroupfinderService
+from h.util.cache import VersionedCache
 
 
 class TestGroupfinderService(object):
@@ -29,6 +34,48 @@ class TestGroupfinderService(object):
         return GroupfinderService(db_session, "example.com")
 
 
+class TestGroupfinderServiceSharedCache(object):
+    def test_find_restores_groups_from_the_shared_cache(
+        self, db_session, factories, shared_cache
+    ):
+        group = factories.Group()
+        db_session.flush()
+        pubid = group.pubid
+        GroupfinderService(db_session, "example.com", shared_cache).find(pubid)
+        db_session.expunge_all()
+        statements = []
+
+        @sqlalchemy.event.listens_for(db_session.bind, "before_cursor_execute")
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        try:
+            svc = GroupfinderService(db_session, "example.com", shared_cache)
+            result = svc.find(pubid)
+        finally:
+            sqlalchemy.event.remove(db_session.bind, "before_cursor_execute", record)
+
+        assert isinstance(result, Group)
+        assert result.pubid == pubid
+        assert statements == []
+
+    def test_find_does_not_cache_missing_groups(self, db_session, shared_cache):
+        GroupfinderService(db_session, "example.com", shared_cache).find("bogus")
+
+        assert not shared_cache
+
+    def test_find_checks_the_shared_cache_version(self, db_session, shared_cache):
+        GroupfinderService(db_session, "example.com", shared_cache).find("bogus")
+
+        shared_cache.check_version.assert_called_once_with(db_session)
+
+    @pytest.fixture
+    def shared_cache(self):
+        cache = VersionedCache("test", poll_interval=60)
+        cache.check_version = mock.Mock()
+        return cache
+
+
 class TestGroupfinderServiceFactory(object):
     def test_returns_groupfinder_service(self, pyramid_request):
         svc = groupfinder_service_factory(None, pyramid_request)
@@ -44,3 +91,15 @@ class TestGroupfinderServiceFactory(object):
         svc = groupfinder_service_factory(None, pyramid_request)
 
         assert svc.authority == pyramid_request.default_authority
+
+    def test_does_not_share_cache_by_default(self, pyramid_request):
+        svc = groupfinder_service_factory(None, pyramid_request)
+
+        assert svc.shared_cache is None
+
+    def test_shares_cache_if_enabled(self, pyramid_request):
+        pyramid_request.registry.settings["h.shared_cache"] = True
+
+        svc = groupfinder_service_factory(None, pyramid_request)
+
+        assert svc.shared_cache is group_cache
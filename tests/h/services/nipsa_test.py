@@ -8,7 +8,7 @@ from h.services.nipsa import NipsaService
 from h.services.nipsa import nipsa_factory
 
 
-@pytest.mark.usefixtures("users", "reindex_user_annotations")
+@pytest.mark.usefixtures("users", "update_user_nipsa")
 class TestNipsaService(object):
     def test_fetch_all_flagged_userids_returns_set_of_userids(self, db_session):
         svc = NipsaService(db_session)
@@ -41,16 +41,12 @@ class TestNipsaService(object):
         assert svc.is_flagged("acct:dominic@example.com")
         assert users["dominic"].nipsa is True
 
-    def test_flag_triggers_reindex_job(
-        self, db_session, users, reindex_user_annotations
-    ):
+    def test_flag_triggers_nipsa_update_job(self, db_session, users, update_user_nipsa):
         svc = NipsaService(db_session)
 
         svc.flag(users["dominic"])
 
-        reindex_user_annotations.delay.assert_called_once_with(
-            "acct:dominic@example.com"
-        )
+        update_user_nipsa.delay.assert_called_once_with("acct:dominic@example.com")
 
     def test_unflag_sets_nipsa_false(self, db_session, users):
         svc = NipsaService(db_session)
@@ -60,16 +56,14 @@ class TestNipsaService(object):
         assert not svc.is_flagged("acct:renata@example.com")
         assert users["renata"].nipsa is False
 
-    def test_unflag_triggers_reindex_job(
-        self, db_session, users, reindex_user_annotations
+    def test_unflag_triggers_nipsa_update_job(
+        self, db_session, users, update_user_nipsa
     ):
         svc = NipsaService(db_session)
 
         svc.unflag(users["renata"])
 
-        reindex_user_annotations.delay.assert_called_once_with(
-            "acct:renata@example.com"
-        )
+        update_user_nipsa.delay.assert_called_once_with("acct:renata@example.com")
 
     def test_fetch_all_flagged_userids_caches_lookup(self, db_session, users):
         svc = NipsaService(db_session)
@@ -119,8 +113,8 @@ def test_nipsa_factory(pyramid_request):
 
 
 @pytest.fixture
-def reindex_user_annotations(patch):
-    return patch("h.services.nipsa.reindex_user_annotations")
+def update_user_nipsa(patch):
+    return patch("h.services.nipsa.update_user_nipsa")
 
 
 @pytest.fixture
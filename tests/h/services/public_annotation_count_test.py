@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+import sqlalchemy as sa
+
+from h.models import AnnotationModeration, PublicAnnotationCount
+from h.services.public_annotation_count import (
+    PublicAnnotationCountService,
+    count_cache,
+    counts_maintained,
+    maintain_counts,
+    public_annotation_count_factory,
+)
+
+
+class TestPublicAnnotationCountService(object):
+    def test_count_returns_0_for_unknown_uris(self, svc):
+        assert svc.count("http://example.com/unknown") == 0
+
+    def test_count_returns_the_stored_count(self, db_session, svc):
+        db_session.add(
+            PublicAnnotationCount(uri_normalized="httpx://example.com", count=3)
+        )
+        db_session.flush()
+
+        assert svc.count("http://example.com/") == 3
+
+    def test_count_sums_the_counts_of_each_shard(self, db_session, svc):
+        db_session.add_all(
+            [
+                PublicAnnotationCount(
+                    uri_normalized="httpx://example.com", shard=0, count=3
+                ),
+                PublicAnnotationCount(
+                    uri_normalized="httpx://example.com", shard=5, count=-1
+                ),
+            ]
+        )
+        db_session.flush()
+
+        assert svc.count("http://example.com/") == 2
+
+    def test_count_includes_equivalent_uris(self, db_session, factories, svc):
+        document = factories.Document()
+        for uri in ["http://example.com/a", "http://example.com/b"]:
+            factories.DocumentURI(document=document, uri=uri, type="rel-alternate")
+        db_session.add_all(
+            [
+                PublicAnnotationCount(uri_normalized="httpx://example.com/a", count=1),
+                PublicAnnotationCount(uri_normalized="httpx://example.com/b", count=2),
+            ]
+        )
+        db_session.flush()
+
+        assert svc.count("http://example.com/a") == 3
+
+    def test_count_caches_counts(self, db_session, svc):
+        svc.count("http://example.com")
+        db_session.add(
+            PublicAnnotationCount(uri_normalized="httpx://example.com", count=3)
+        )
+        db_session.flush()
+
+        assert svc.count("http://example.com") == 0
+
+    @pytest.fixture
+    def svc(self, db_session):
+        return PublicAnnotationCountService(db_session)
+
+
+class TestMaintainCounts(object):
+    def test_it_counts_new_public_annotations(self, count, factories):
+        factories.Annotation(target_uri="http://example.com", shared=True)
+        factories.Annotation(target_uri="http://example.com", shared=True)
+
+        assert count("http://example.com") == 2
+
+    def test_it_ignores_private_annotations(self, count, factories):
+        factories.Annotation(target_uri="http://example.com", shared=False)
+
+        assert count("http://example.com") == 0
+
+    def test_it_ignores_annotations_in_private_groups(self, count, factories):
+        group = factories.Group()
+
+        factories.Annotation(
+            target_uri="http://example.com", shared=True, groupid=group.pubid
+        )
+
+        assert count("http://example.com") == 0
+
+    def test_it_counts_annotations_made_public(self, count, db_session, factories):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=False)
+
+        annotation.shared = True
+        db_session.flush()
+
+        assert count("http://example.com") == 1
+
+    def test_it_uncounts_deleted_annotations(self, count, db_session, factories):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=True)
+
+        annotation.deleted = True
+        db_session.flush()
+
+        assert count("http://example.com") == 0
+
+    def test_it_moves_annotations_whose_target_changes(
+        self, count, db_session, factories
+    ):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=True)
+
+        annotation.target_uri = "http://example.org"
+        db_session.flush()
+
+        assert count("http://example.com") == 0
+        assert count("http://example.org") == 1
+
+    def test_it_uncounts_hidden_annotations(self, count, db_session, factories):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=True)
+
+        annotation.moderation = AnnotationModeration()
+        db_session.flush()
+
+        assert count("http://example.com") == 0
+
+    def test_it_counts_unhidden_annotations(self, count, db_session, factories):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=True)
+        annotation.moderation = AnnotationModeration()
+        db_session.flush()
+
+        annotation.moderation = None
+        db_session.flush()
+
+        assert count("http://example.com") == 1
+
+    def test_it_updates_counts_when_users_are_nipsad(
+        self, count, db_session, factories
+    ):
+        user = factories.User()
+        for _ in range(2):
+            factories.Annotation(
+                target_uri="http://example.com", shared=True, userid=user.userid
+            )
+
+        user.nipsa = True
+        db_session.flush()
+        assert count("http://example.com") == 0
+
+        user.nipsa = False
+        db_session.flush()
+        assert count("http://example.com") == 2
+
+    def test_it_does_not_query_annotations_when_none_change(
+        self, count, db_session, factories
+    ):
+        group = factories.Group()
+        db_session.flush()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sa.event.listen(db_session.bind, "before_cursor_execute", record)
+        try:
+            group.name = "Renamed"
+            db_session.flush()
+        finally:
+            sa.event.remove(db_session.bind, "before_cursor_execute", record)
+
+        assert statements
+        assert not [s for s in statements if "annotation" in s]
+
+    def test_counts_maintained_applies_bulk_updates(self, count, db_session, factories):
+        annotation = factories.Annotation(target_uri="http://example.com", shared=True)
+        table = annotation.__table__
+
+        with counts_maintained(db_session, [annotation.id]):
+            db_session.execute(
+                table.update()
+                .where(table.c.id == annotation.id)
+                .values(target_uri_normalized="httpx://example.org")
+            )
+
+        assert count("http://example.com") == 0
+        assert count("http://example.org") == 1
+
+    @pytest.fixture
+    def count(self, db_session):
+        maintain_counts(db_session)
+
+        def count(uri):
+            rows = db_session.query(PublicAnnotationCount).filter_by(
+                uri_normalized=uri.replace("http:", "httpx:")
+            )
+            return sum(row.count for row in rows)
+
+        return count
+
+
+class TestPublicAnnotationCountFactory(object):
+    def test_it_returns_the_service(self, pyramid_request):
+        svc = public_annotation_count_factory(None, pyramid_request)
+
+        assert isinstance(svc, PublicAnnotationCountService)
+        assert svc.session == pyramid_request.db
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    count_cache.clear()
@@ -2,13 +2,20 @@
 
 from __future__ import unicode_literals
 
+import json
+
 from h._compat import xrange
 
 import mock
 import pytest
 
 from h import models
-from h.services.rename_user import make_indexer, RenameUserService, UserRenameError
+from h.services.rename_user import (
+    make_indexer,
+    PROGRESS_KEY_PREFIX,
+    RenameUserService,
+    UserRenameError,
+)
 
 
 class TestRenameUserService(object):
@@ -89,11 +96,71 @@ class TestRenameUserService(object):
         userids = [ann.userid for ann in db_session.query(models.Annotation)]
         assert set([user.userid]) == set(userids)
 
+    def test_rename_leaves_other_users_annotations_alone(
+        self, service, user, annotations, db_session, factories
+    ):
+        other = factories.Annotation(userid="acct:someone@example.com")
+        db_session.flush()
+
+        service.rename(user, "panda")
+
+        assert other.userid == "acct:someone@example.com"
+
     def test_rename_reindexes_the_users_annotations(
         self, service, user, annotations, indexer
     ):
         service.rename(user, "panda")
-        indexer.assert_called_once_with({ann.id for ann in annotations})
+
+        indexer.assert_called_once_with(mock.ANY)
+        assert sorted(indexer.call_args[0][0]) == sorted(a.id for a in annotations)
+
+    def test_rename_moves_the_annotations_a_window_at_a_time(
+        self, service, user, annotations, indexer, monkeypatch
+    ):
+        monkeypatch.setattr("h.services.rename_user.WINDOW_SIZE", 3)
+
+        service.rename(user, "panda")
+
+        assert [len(call[0][0]) for call in indexer.call_args_list] == [3, 3, 2]
+
+    def test_rename_resumes_an_interrupted_rename(
+        self, service, user, db_session, factories, indexer
+    ):
+        # An earlier rename to "zebra" was interrupted after renaming the user
+        # but before moving this annotation.
+        annotation = factories.Annotation(userid="acct:zebra@example.com")
+        progress = {"old_userids": ["acct:zebra@example.com"], "pending_reindex": []}
+        db_session.add(self.progress(user, progress))
+        db_session.flush()
+
+        service.rename(user, "panda")
+
+        assert annotation.userid == user.userid
+        indexer.assert_called_once_with([annotation.id])
+
+    def test_rename_reindexes_annotations_left_over_from_an_interrupted_rename(
+        self, service, user, db_session, indexer
+    ):
+        progress = {"old_userids": [], "pending_reindex": ["abc"]}
+        db_session.add(self.progress(user, progress))
+        db_session.flush()
+
+        service.rename(user, "panda")
+
+        indexer.assert_called_once_with(["abc"])
+
+    def test_rename_removes_its_progress_when_it_is_done(
+        self, service, user, annotations, db_session
+    ):
+        service.rename(user, "panda")
+
+        assert db_session.query(models.Setting).count() == 0
+
+    def progress(self, user, value):
+        return models.Setting(
+            key=PROGRESS_KEY_PREFIX + str(user.id),
+            value=json.dumps(value, ensure_ascii=False),
+        )
 
     @pytest.fixture
     def indexer(self):
@@ -2,10 +2,20 @@
 
 from __future__ import unicode_literals
 
+import contextlib
+
+import mock
 import pytest
+import sqlalchemy
 
 from h.models import User
-from h.services.user import UserNotActivated, UserService, user_service_factory
+from h.services.user import (
+    UserNotActivated,
+    UserService,
+    user_cache,
+    user_service_factory,
+)
+from h.util.cache import VersionedCache
 
 
 @pytest.mark.usefixtures("users")
@@ -174,6 +184,80 @@ class TestUserService(object):
         return users
 
 
+@pytest.mark.usefixtures("users")
+class TestUserServiceSharedCache(object):
+    def test_fetch_adds_users_to_the_shared_cache(self, svc, shared_cache):
+        svc.fetch("acct:jacqui@foo.com")
+
+        assert shared_cache.get(("jacqui", "foo.com")) is not None
+
+    def test_fetch_restores_users_from_the_shared_cache(
+        self, db_session, svc, shared_cache, other_svc
+    ):
+        svc.fetch("acct:jacqui@foo.com")
+        db_session.expunge_all()
+
+        with no_queries(db_session):
+            user = other_svc.fetch("acct:jacqui@foo.com")
+
+        assert user.username == "jacqui"
+        assert user in db_session
+
+    def test_fetch_does_not_cache_missing_users(self, svc, shared_cache):
+        svc.fetch("acct:bogus@foo.com")
+
+        assert not shared_cache
+
+    def test_fetch_all_uses_the_shared_cache(
+        self, db_session, svc, shared_cache, other_svc
+    ):
+        svc.fetch_all(["acct:jacqui@foo.com", "acct:steve@example.com"])
+        db_session.expunge_all()
+
+        with no_queries(db_session):
+            result = other_svc.fetch_all(
+                ["acct:jacqui@foo.com", "acct:steve@example.com"]
+            )
+
+        assert sorted(u.username for u in result) == ["jacqui", "steve"]
+
+    def test_fetch_checks_the_shared_cache_version(self, svc, shared_cache):
+        svc.fetch("acct:jacqui@foo.com")
+
+        shared_cache.check_version.assert_called_once_with(svc.session)
+
+    @pytest.fixture
+    def shared_cache(self):
+        cache = VersionedCache("test", poll_interval=60)
+        cache.check_version = mock.Mock()
+        return cache
+
+    @pytest.fixture
+    def svc(self, db_session, shared_cache):
+        return UserService(
+            default_authority="example.com",
+            session=db_session,
+            shared_cache=shared_cache,
+        )
+
+    @pytest.fixture
+    def other_svc(self, db_session, shared_cache):
+        return UserService(
+            default_authority="example.com",
+            session=db_session,
+            shared_cache=shared_cache,
+        )
+
+    @pytest.fixture
+    def users(self, factories, db_session):
+        users = [
+            factories.User(username="jacqui", authority="foo.com"),
+            factories.User(username="steve", authority="example.com"),
+        ]
+        db_session.flush()
+        return users
+
+
 class TestUserServiceFactory(object):
     def test_returns_user_service(self, pyramid_request):
         svc = user_service_factory(None, pyramid_request)
@@ -191,3 +275,31 @@ class TestUserServiceFactory(object):
         svc = user_service_factory(None, pyramid_request)
 
         assert svc.session == pyramid_request.db
+
+    def test_does_not_share_cache_by_default(self, pyramid_request):
+        svc = user_service_factory(None, pyramid_request)
+
+        assert svc.shared_cache is None
+
+    def test_shares_cache_if_enabled(self, pyramid_request):
+        pyramid_request.registry.settings["h.shared_cache"] = True
+
+        svc = user_service_factory(None, pyramid_request)
+
+        assert svc.shared_cache is user_cache
+
+
+@contextlib.contextmanager
+def no_queries(session):
+    statements = []
+
+    @sqlalchemy.event.listens_for(session.bind, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    try:
+        yield
+    finally:
+        sqlalchemy.event.remove(session.bind, "before_cursor_execute", record)
+
+    assert statements == []
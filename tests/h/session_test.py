@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 import pytest
 import mock
 
+from h import models
 from h import session
 from h.services.group_list import GroupListService
 
@@ -256,6 +257,167 @@ class TestProfileWithScopedGroups(object):
         assert profile["groups"][0]["url"]
 
 
+class TestProfileCache(object):
+    def test_it_caches_the_groups_features_and_preferences(self, authenticated_request):
+        svc = authenticated_request.find_service(name="group_list")
+        first = session.profile(authenticated_request)
+
+        second = session.profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 1
+        for key in ["groups", "features", "preferences"]:
+            assert second[key] == first[key]
+
+    def test_it_shares_the_cache_between_model_and_profile(self, authenticated_request):
+        svc = authenticated_request.find_service(name="group_list")
+
+        session.model(authenticated_request)
+        session.profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 1
+
+    def test_it_caches_separately_for_each_authority(self, unauthenticated_request):
+        svc = unauthenticated_request.find_service(name="group_list")
+
+        session.profile(unauthenticated_request)
+        session.profile(unauthenticated_request, "foo.com")
+
+        assert svc.session_groups.call_count == 2
+
+    def test_it_caches_separately_for_feature_overrides(self, unauthenticated_request):
+        svc = unauthenticated_request.find_service(name="group_list")
+
+        session.profile(unauthenticated_request)
+        unauthenticated_request.GET = {"__feature__[foo]": ""}
+        session.profile(unauthenticated_request)
+
+        assert svc.session_groups.call_count == 2
+
+    def test_it_recomputes_the_profile_when_the_users_preferences_change(
+        self, authenticated_request
+    ):
+        authenticated_request.set_sidebar_tutorial_dismissed(False)
+        session.profile(authenticated_request)
+
+        authenticated_request.set_sidebar_tutorial_dismissed(True)
+        preferences = session.profile(authenticated_request)["preferences"]
+
+        assert preferences == {}
+
+    def test_it_recomputes_the_profile_when_the_users_version_changes(
+        self, authenticated_request
+    ):
+        svc = authenticated_request.find_service(name="group_list")
+        session.profile(authenticated_request)
+
+        authenticated_request.versions[
+            "cache_version.profile.user:acct:user@example.com"
+        ] = "new"
+        session.profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 2
+
+    def test_it_recomputes_the_profile_when_a_groups_version_changes(
+        self, authenticated_request, factories
+    ):
+        group = factories.Group()
+        svc = authenticated_request.find_service(name="group_list")
+        svc.session_groups.return_value = [group]
+        session.profile(authenticated_request)
+
+        authenticated_request.versions[
+            "cache_version.profile.group:" + group.pubid
+        ] = "new"
+        session.profile(authenticated_request)
+
+        assert svc.session_groups.call_count == 2
+
+    def test_it_returns_a_copy_of_the_cached_profile(self, authenticated_request):
+        session.profile(authenticated_request)["features"]["foo"] = True
+
+        assert "foo" not in session.profile(authenticated_request)["features"]
+
+    def test_it_does_not_cache_the_csrf_token(self, authenticated_request):
+        session.model(authenticated_request)
+        authenticated_request.session.get_csrf_token = lambda: "__NEW_CSRF__"
+
+        assert session.model(authenticated_request)["csrf"] == "__NEW_CSRF__"
+
+
+class TestWatchProfileChanges(object):
+    def test_it_publishes_when_a_user_joins_a_group(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        group = factories.Group()
+        db_session.flush()
+        session.watch_profile_changes(db_session)
+
+        user.groups.append(group)
+        db_session.flush()
+
+        publish_version.assert_called_once_with(
+            db_session, "profile", "user:" + user.userid
+        )
+
+    def test_it_publishes_when_a_group_is_renamed(
+        self, db_session, factories, publish_version
+    ):
+        group = factories.Group()
+        db_session.flush()
+        session.watch_profile_changes(db_session)
+
+        group.name = "Renamed"
+        db_session.flush()
+
+        publish_version.assert_called_once_with(
+            db_session, "profile", "group:" + group.pubid
+        )
+
+    def test_it_publishes_when_a_feature_changes(self, db_session, publish_version):
+        feature = models.Feature(name="foo")
+        db_session.add(feature)
+        db_session.flush()
+        session.watch_profile_changes(db_session)
+
+        feature.everyone = True
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "profile", "features")
+
+    def test_it_publishes_when_a_user_joins_a_cohort(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        cohort = models.FeatureCohort(name="cohort")
+        db_session.add(cohort)
+        db_session.flush()
+        session.watch_profile_changes(db_session)
+
+        user.cohorts.append(cohort)
+        db_session.flush()
+
+        publish_version.assert_called_once_with(
+            db_session, "profile", "user:" + user.userid
+        )
+
+    def test_it_does_not_publish_for_other_user_changes(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        session.watch_profile_changes(db_session)
+
+        user.display_name = "Changed"
+        db_session.flush()
+
+        assert not publish_version.called
+
+    @pytest.fixture
+    def publish_version(self, patch):
+        return patch("h.session.publish_version")
+
+
 class TestUserInfo(object):
     def test_returns_user_info_object(self, factories):
         user = factories.User.build(display_name="Jane Doe")
@@ -281,16 +443,26 @@ class FakeRequest(object):
         if userid is None:
             self.user = None
         else:
-            self.user = mock.Mock(groups=[], authority=user_authority)
+            self.user = mock.Mock(groups=[], authority=user_authority, userid=userid)
 
         self.feature = fake_feature
         self.route_url = mock.Mock(return_value="/group/a")
         self.session = mock.Mock(get_csrf_token=lambda: "__CSRF__")
+        self.db = mock.Mock(spec_set=["execute"])
+        self.db.execute.side_effect = self._fetch_versions
+        self.versions = {}
+        self.GET = {}
+        self.host_url = "http://example.com"
 
         self._group_list_service = mock.create_autospec(
             GroupListService, spec_set=True, instance=True
         )
 
+    def _fetch_versions(self, query, params):
+        return [
+            (key, self.versions[key]) for key in params["keys"] if key in self.versions
+        ]
+
     def set_features(self, feature_dict):
         self.feature.flags = feature_dict
 
@@ -306,6 +478,11 @@ class FakeRequest(object):
             )
 
 
+@pytest.fixture(autouse=True)
+def clear_profile_cache():
+    session.profile_cache.clear()
+
+
 @pytest.fixture
 def authority():
     return "example.com"
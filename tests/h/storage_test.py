@@ -12,14 +12,14 @@ from h.models.document import Document, DocumentURI
 
 from h import storage
 from h.schemas import ValidationError
+from h.services.group_scope import GroupScopeService, scope_cache
 
 
 class FakeGroup(object):
-    def __acl__(self):
-        return []
+    id = None
+    enforce_scope = True
 
-    @property
-    def scopes(self):
+    def __acl__(self):
         return []
 
 
@@ -294,24 +294,55 @@ class TestCreateAnnotation(object):
 
         assert models.Annotation.return_value in pyramid_request.db.added
 
+    def test_it_queues_a_notification_for_replies(
+        self,
+        fetch_annotation,
+        models,
+        pyramid_config,
+        pyramid_request,
+        group_service,
+        fake_db_session,
+    ):
+        pyramid_request.db = fake_db_session
+        fetch_annotation.return_value.groupid = "test-group"
+        pyramid_config.testing_securitypolicy(
+            "acct:foo@example.com", groupids=["group:test-group"]
+        )
+        data = self.annotation_data()
+        data["references"] = ["parent_annotation_id"]
+
+        storage.create_annotation(pyramid_request, data, group_service)
+
+        models.PendingReplyNotification.assert_called_once_with(
+            annotation=models.Annotation.return_value
+        )
+        assert models.PendingReplyNotification.return_value in pyramid_request.db.added
+
+    def test_it_does_not_queue_a_notification_for_top_level_annotations(
+        self, models, pyramid_request, group_service, fake_db_session
+    ):
+        pyramid_request.db = fake_db_session
+        models.Annotation.return_value.references = []
+
+        storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+
+        assert not models.PendingReplyNotification.called
+
     def test_it_updates_the_document_metadata_from_the_annotation(
         self, models, pyramid_request, datetime, group_service, update_document_metadata
     ):
         annotation_data = self.annotation_data()
-        annotation_data["document"][
-            "document_meta_dicts"
-        ] = mock.sentinel.document_meta_dicts
-        annotation_data["document"][
-            "document_uri_dicts"
-        ] = mock.sentinel.document_uri_dicts
+        document = annotation_data["document"]
 
         storage.create_annotation(pyramid_request, annotation_data, group_service)
 
         update_document_metadata.assert_called_once_with(
             pyramid_request.db,
             models.Annotation.return_value.target_uri,
-            mock.sentinel.document_meta_dicts,
-            mock.sentinel.document_uri_dicts,
+            document["document_meta_dicts"],
+            document["document_uri_dicts"],
             created=datetime.utcnow(),
             updated=datetime.utcnow(),
         )
@@ -328,6 +359,57 @@ class TestCreateAnnotation(object):
 
         assert ann.document == document
 
+    def test_it_reuses_the_cached_document_for_identical_claims(
+        self, models, pyramid_request, group_service, update_document_metadata
+    ):
+        storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+        update_document_metadata.reset_mock()
+
+        ann = storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+
+        assert not update_document_metadata.called
+        pyramid_request.db.query.assert_called_with(models.Document)
+        pyramid_request.db.query.return_value.get.assert_called_with(
+            update_document_metadata.return_value.id
+        )
+        assert ann.document == pyramid_request.db.query.return_value.get.return_value
+
+    def test_it_does_not_reuse_the_cached_document_for_different_claims(
+        self, models, pyramid_request, group_service, update_document_metadata
+    ):
+        storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+        update_document_metadata.reset_mock()
+        data = self.annotation_data()
+        data["document"]["document_meta_dicts"] = [
+            {"claimant": "http://example.com", "type": "title", "value": ["Title"]}
+        ]
+
+        storage.create_annotation(pyramid_request, data, group_service)
+
+        assert update_document_metadata.call_count == 1
+
+    def test_it_ignores_cached_documents_that_no_longer_exist(
+        self, models, pyramid_request, group_service, update_document_metadata
+    ):
+        storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+        update_document_metadata.reset_mock()
+        # The cached document has been merged into another one.
+        pyramid_request.db.query.return_value.get.return_value = None
+
+        storage.create_annotation(
+            pyramid_request, self.annotation_data(), group_service
+        )
+
+        assert update_document_metadata.call_count == 1
+
     def test_it_returns_the_annotation(self, models, pyramid_request, group_service):
         annotation = storage.create_annotation(
             pyramid_request, self.annotation_data(), group_service
@@ -528,12 +610,7 @@ class TestUpdateAnnotation(object):
         group_service,
     ):
         annotation = pyramid_request.db.query.return_value.get.return_value
-        annotation_data["document"][
-            "document_meta_dicts"
-        ] = mock.sentinel.document_meta_dicts
-        annotation_data["document"][
-            "document_uri_dicts"
-        ] = mock.sentinel.document_uri_dicts
+        document = annotation_data["document"]
 
         storage.update_annotation(
             pyramid_request, "test_annotation_id", annotation_data, group_service
@@ -542,8 +619,8 @@ class TestUpdateAnnotation(object):
         update_document_metadata.assert_called_once_with(
             pyramid_request.db,
             annotation.target_uri,
-            mock.sentinel.document_meta_dicts,
-            mock.sentinel.document_uri_dicts,
+            document["document_meta_dicts"],
+            document["document_uri_dicts"],
             updated=datetime.utcnow(),
         )
 
@@ -601,6 +678,13 @@ class TestUpdateAnnotation(object):
         }
 
 
+@pytest.fixture(autouse=True)
+def document_cache():
+    storage.document_cache.clear()
+    yield storage.document_cache
+    storage.document_cache.clear()
+
+
 @pytest.fixture
 def fetch_annotation(patch):
     return patch("h.storage.fetch_annotation")
@@ -643,9 +727,17 @@ def scoped_open_group(factories):
 
 
 @pytest.fixture
-def group_service(pyramid_config, factories):
+def group_service(pyramid_config, factories, group_scope_service):
     open_group = factories.OpenGroup()
     group_service = mock.Mock(spec_set=["find"])
     group_service.find.return_value = open_group
     pyramid_config.register_service(group_service, iface="h.interfaces.IGroupService")
     return group_service
+
+
+@pytest.fixture
+def group_scope_service(pyramid_config, db_session):
+    scope_cache.clear()
+    group_scope_service = GroupScopeService(db_session)
+    pyramid_config.register_service(group_scope_service, name="group_scope")
+    return group_scope_service
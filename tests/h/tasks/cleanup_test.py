@@ -50,6 +50,44 @@ class TestPurgeDeletedAnnotations(object):
         else:
             assert db_session.query(Annotation).count() == 1
 
+    def test_it_purges_a_batch_at_a_time(self, celery, db_session, factories):
+        celery.request.registry.settings["h.purge.batch_size"] = 2
+        factories.Annotation.create_batch(5, deleted=True, updated=datetime(2018, 1, 1))
+
+        purge_deleted_annotations()
+
+        assert db_session.query(Annotation).count() == 0
+        assert celery.request.tm.commit.call_count == 3
+
+    def test_it_pauses_between_batches(self, celery, factories, time):
+        celery.request.registry.settings["h.purge.batch_size"] = 2
+        factories.Annotation.create_batch(3, deleted=True, updated=datetime(2018, 1, 1))
+
+        purge_deleted_annotations()
+
+        time.sleep.assert_called_once_with(0.1)
+
+    def test_it_stops_when_it_runs_out_of_time(
+        self, celery, db_session, factories, time
+    ):
+        celery.request.registry.settings["h.purge.batch_size"] = 2
+        celery.request.registry.settings["h.purge.time_budget"] = 60
+        time.time.side_effect = [1000, 1030, 1070]
+        factories.Annotation.create_batch(5, deleted=True, updated=datetime(2018, 1, 1))
+
+        purge_deleted_annotations()
+
+        assert db_session.query(Annotation).count() == 1
+
+    def test_it_counts_the_purged_annotations(self, celery, factories):
+        factories.Annotation.create_batch(3, deleted=True, updated=datetime(2018, 1, 1))
+
+        purge_deleted_annotations()
+
+        celery.request.stats.incr.assert_called_once_with(
+            "tasks.cleanup.purge_deleted_annotations.deleted", 3
+        )
+
 
 @pytest.mark.usefixtures("celery")
 class TestPurgeExpiredAuthTickets(object):
@@ -162,4 +200,12 @@ class TestPurgeRemovedFeatures(object):
 def celery(patch, db_session):
     cel = patch("h.tasks.cleanup.celery", autospec=False)
     cel.request.db = db_session
+    cel.request.registry.settings = {}
     return cel
+
+
+@pytest.fixture(autouse=True)
+def time(patch):
+    time = patch("h.tasks.cleanup.time")
+    time.time.return_value = 1000
+    return time
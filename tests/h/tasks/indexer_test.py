@@ -110,6 +110,54 @@ class TestAddAnnotation(object):
         return patch("h.tasks.indexer.add_annotation.delay")
 
 
+@pytest.mark.usefixtures("celery", "settings_service")
+class TestAddAnnotations(object):
+    def test_it_indexes_the_annotations(self, batch_indexer, factories, celery):
+        annotations = factories.Annotation.create_batch(2)
+        ids = [a.id for a in annotations]
+
+        indexer.add_annotations(ids)
+
+        batch_indexer.assert_called_once_with(
+            celery.request.db, celery.request.es, celery.request
+        )
+        batch_indexer.return_value.index.assert_called_once_with(ids)
+
+    def test_it_indexes_the_thread_roots_of_replies(self, batch_indexer, factories):
+        root = factories.Annotation()
+        reply = factories.Annotation(references=[root.id])
+
+        indexer.add_annotations([reply.id])
+
+        batch_indexer.return_value.index.assert_called_once_with([reply.id, root.id])
+
+    def test_it_does_nothing_without_annotations(self, batch_indexer):
+        indexer.add_annotations([])
+
+        assert not batch_indexer.called
+
+    def test_during_reindex_adds_to_new_index(
+        self, batch_indexer, factories, celery, settings_service
+    ):
+        settings_service.put("reindex.new_index", "hypothesis-xyz123")
+        annotation = factories.Annotation()
+
+        indexer.add_annotations([annotation.id])
+
+        batch_indexer.assert_any_call(
+            celery.request.db,
+            celery.request.es,
+            celery.request,
+            target_index="hypothesis-xyz123",
+        )
+
+    @pytest.fixture
+    def batch_indexer(self, patch):
+        batch_indexer = patch("h.tasks.indexer.BatchIndexer")
+        batch_indexer.return_value.index.return_value = set()
+        return batch_indexer
+
+
 @pytest.mark.usefixtures("celery", "delete", "settings_service")
 class TestDeleteAnnotation(object):
     def test_it_deletes_from_index(self, delete, celery):
@@ -145,6 +193,31 @@ class TestDeleteAnnotation(object):
         return patch("h.tasks.indexer.delete")
 
 
+@pytest.mark.usefixtures("celery", "settings_service")
+class TestDeleteAnnotations(object):
+    def test_it_deletes_from_index(self, delete_many, celery):
+        indexer.delete_annotations(["id-1", "id-2"])
+
+        delete_many.assert_any_call(celery.request.es, ["id-1", "id-2"])
+
+    def test_during_reindex_deletes_from_new_index(
+        self, delete_many, celery, settings_service
+    ):
+        settings_service.put("reindex.new_index", "hypothesis-xyz123")
+
+        indexer.delete_annotations(["id-1", "id-2"])
+
+        delete_many.assert_any_call(
+            celery.request.es, ["id-1", "id-2"], target_index="hypothesis-xyz123"
+        )
+
+    @pytest.fixture
+    def delete_many(self, patch):
+        delete_many = patch("h.tasks.indexer.delete_many")
+        delete_many.return_value = set()
+        return delete_many
+
+
 @pytest.mark.usefixtures("celery")
 class TestReindexUserAnnotations(object):
     def test_it_creates_batch_indexer(self, batch_indexer, annotation_ids, celery):
@@ -185,6 +258,59 @@ class TestReindexUserAnnotations(object):
         }
 
 
+@pytest.mark.usefixtures("settings_service")
+class TestUpdateUserNipsa(object):
+    def test_it_sets_the_nipsa_flag_of_flagged_users(
+        self, update_user_annotations, celery, nipsa_service
+    ):
+        nipsa_service.is_flagged.return_value = True
+
+        indexer.update_user_nipsa("acct:jeannie@example.com")
+
+        nipsa_service.is_flagged.assert_called_once_with("acct:jeannie@example.com")
+        update_user_annotations.assert_called_once_with(
+            celery.request.es, "acct:jeannie@example.com", {"nipsa": True}
+        )
+
+    def test_it_removes_the_nipsa_flag_of_unflagged_users(
+        self, update_user_annotations, celery, nipsa_service
+    ):
+        nipsa_service.is_flagged.return_value = False
+
+        indexer.update_user_nipsa("acct:jeannie@example.com")
+
+        update_user_annotations.assert_called_once_with(
+            celery.request.es, "acct:jeannie@example.com", {"nipsa": None}
+        )
+
+    def test_during_reindex_updates_the_new_index(
+        self, update_user_annotations, celery, nipsa_service, settings_service
+    ):
+        nipsa_service.is_flagged.return_value = True
+        settings_service.put("reindex.new_index", "hypothesis-xyz123")
+
+        indexer.update_user_nipsa("acct:jeannie@example.com")
+
+        update_user_annotations.assert_any_call(
+            celery.request.es,
+            "acct:jeannie@example.com",
+            {"nipsa": True},
+            target_index="hypothesis-xyz123",
+        )
+
+    @pytest.fixture
+    def update_user_annotations(self, patch):
+        update_user_annotations = patch("h.tasks.indexer.update_user_annotations")
+        update_user_annotations.return_value = (3, [])
+        return update_user_annotations
+
+    @pytest.fixture
+    def nipsa_service(self, pyramid_config):
+        service = mock.Mock(spec_set=["is_flagged"])
+        pyramid_config.register_service(service, name="nipsa")
+        return service
+
+
 @pytest.fixture
 def celery(patch, pyramid_request):
     cel = patch("h.tasks.indexer.celery")
@@ -1,92 +1,279 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
-from smtplib import SMTPServerDisconnected
+
+import email
+import smtplib
 
 import mock
 import pytest
+from pyramid_mailer.interfaces import IMailer
+from pyramid_mailer.mailer import DebugMailer, Mailer
+from repoze.sendmail.mailer import SMTPMailer
 
 from h.tasks import mailer
 
 
-@mock.patch("h.tasks.mailer.celery", autospec=True)
-@mock.patch("h.tasks.mailer.pyramid_mailer", autospec=True)
-def test_send_creates_email_message(pyramid_mailer, celery, pyramid_request):
-    celery.request = pyramid_request
+@pytest.mark.usefixtures("celery")
+class TestSend(object):
+    def test_it_sends_the_email(self, smtp_server):
+        mailer.send(
+            recipients=["foo@example.com"],
+            subject="My email subject",
+            body="Some text body",
+        )
 
-    mailer.send(
-        recipients=["foo@example.com"],
-        subject="My email subject",
-        body="Some text body",
-    )
+        ((fromaddr, toaddrs, message),) = smtp_server.sent
+        assert fromaddr == "noreply@example.com"
+        assert toaddrs == {"foo@example.com"}
+        assert message["Subject"] == "My email subject"
+        assert message.get_payload(decode=True) == b"Some text body"
 
-    pyramid_mailer.message.Message.assert_called_once_with(
-        subject="My email subject",
-        recipients=["foo@example.com"],
-        body="Some text body",
-        html=None,
-    )
+    def test_it_sends_the_html_body(self, smtp_server):
+        mailer.send(
+            recipients=["foo@example.com"],
+            subject="My email subject",
+            body="Some text body",
+            html="<p>An HTML body</p>",
+        )
 
+        (_, _, message), = smtp_server.sent
+        payloads = [part.get_payload(decode=True) for part in message.walk()]
+        assert b"<p>An HTML body</p>" in payloads
 
-@mock.patch("h.tasks.mailer.celery", autospec=True)
-@mock.patch("h.tasks.mailer.pyramid_mailer", autospec=True)
-def test_send_creates_email_message_with_html_body(
-    pyramid_mailer, celery, pyramid_request
-):
-    celery.request = pyramid_request
+    def test_it_reuses_the_connection(self, smtp_server):
+        for _ in range(3):
+            mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
 
-    mailer.send(
-        recipients=["foo@example.com"],
-        subject="My email subject",
-        body="Some text body",
-        html="<p>An HTML body</p>",
-    )
+        assert smtp_server.connections == 1
+        assert len(smtp_server.sent) == 3
 
-    pyramid_mailer.message.Message.assert_called_once_with(
-        subject="My email subject",
-        recipients=["foo@example.com"],
-        body="Some text body",
-        html="<p>An HTML body</p>",
-    )
+    def test_it_logs_in(self, smtp_server):
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
 
+        assert smtp_server.logins == [("user", "pass")]
 
-@mock.patch("h.tasks.mailer.celery", autospec=True)
-@mock.patch("h.tasks.mailer.pyramid_mailer", autospec=True)
-def test_send_dispatches_email_using_request_mailer(
-    pyramid_mailer, celery, pyramid_request
-):
-    celery.request = pyramid_request
-    request_mailer = pyramid_mailer.get_mailer.return_value
-    message = pyramid_mailer.message.Message.return_value
+    def test_it_starts_tls_if_the_server_supports_it(self, smtp_server):
+        smtp_server.tls = True
 
-    mailer.send(
-        recipients=["foo@example.com"],
-        subject="My email subject",
-        body="Some text body",
-    )
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
 
-    pyramid_mailer.get_mailer.assert_called_once_with(pyramid_request)
-    request_mailer.send_immediately.assert_called_once_with(message)
+        assert smtp_server.tls_started == 1
 
+    def test_it_closes_the_connection_if_the_handshake_fails(
+        self, connection, smtp_server
+    ):
+        connection.close = mock.Mock(wraps=connection.close)
+        smtp_server.mailer.force_tls = True
 
-@mock.patch("h.tasks.mailer.celery", autospec=True)
-@mock.patch("h.tasks.mailer.pyramid_mailer", autospec=True)
-def test_send_retries_if_mailing_fails(pyramid_mailer, celery, pyramid_request):
-    celery.request = pyramid_request
-    request_mailer = pyramid_mailer.get_mailer.return_value
-    request_mailer.send_immediately.side_effect = SMTPServerDisconnected()
-
-    mailer.send.retry = mock.Mock(spec_set=[])
-    mailer.send(
-        recipients=["foo@example.com"],
-        subject="My email subject",
-        body="Some text body",
+        with pytest.raises(RuntimeError):
+            mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert connection.close.called
+        assert smtp_server.sent == []
+
+    def test_it_reconnects_if_the_server_hung_up(self, smtp_server):
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+        smtp_server.errors.append(smtplib.SMTPServerDisconnected())
+
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert smtp_server.connections == 2
+        assert len(smtp_server.sent) == 2
+
+    def test_it_reconnects_if_the_connection_was_idle(self, smtp_server, time):
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+        time.now += mailer.MAX_IDLE_TIME + 1
+
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert smtp_server.connections == 2
+
+    def test_it_ignores_refused_recipients(self, smtp_server):
+        smtp_server.errors.append(smtplib.SMTPRecipientsRefused({}))
+        mailer.send.retry = mock.Mock(spec_set=[])
+
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert not mailer.send.retry.called
+
+    def test_it_retries_if_mailing_fails(self, smtp_server):
+        smtp_server.errors.extend([smtplib.SMTPServerDisconnected()] * 2)
+        mailer.send.retry = mock.Mock(spec_set=[])
+
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert mailer.send.retry.called
+
+    def test_it_reports_throughput(self, smtp_server, stats):
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        stats.incr.assert_any_call("tasks.mailer.send.sent", 1)
+        assert stats.timing.call_args[0][0] == "tasks.mailer.send.duration"
+
+    def test_it_uses_the_debug_mailer(self, pyramid_request, smtp_server):
+        pyramid_request.debug = True
+        debug_mailer = mock.create_autospec(DebugMailer, instance=True)
+        pyramid_request.registry.registerUtility(debug_mailer, IMailer)
+
+        mailer.send(recipients=["foo@example.com"], subject="Hi", body="Hi")
+
+        assert debug_mailer.send_immediately.called
+        assert smtp_server.sent == []
+
+
+@pytest.mark.usefixtures("celery")
+class TestSendBatch(object):
+    def test_it_sends_the_emails_over_one_connection(self, smtp_server):
+        mailer.send_batch(
+            [
+                (["foo@example.com"], "Subject 1", "Body 1", None),
+                (["bar@example.com"], "Subject 2", "Body 2", "<p>Body 2</p>"),
+            ]
+        )
+
+        assert [to for _, to, _ in smtp_server.sent] == [
+            {"foo@example.com"},
+            {"bar@example.com"},
+        ]
+        assert smtp_server.connections == 1
+
+    def test_it_carries_on_past_refused_recipients(self, smtp_server, stats):
+        smtp_server.errors.append(smtplib.SMTPRecipientsRefused({}))
+
+        mailer.send_batch([(["foo@example.com"], "Hi", "Hi")] * 2)
+
+        assert len(smtp_server.sent) == 1
+        stats.incr.assert_any_call("tasks.mailer.send_batch.sent", 1)
+        stats.incr.assert_any_call("tasks.mailer.send_batch.refused", 1)
+
+    def test_it_retries_the_unsent_emails_if_mailing_fails(self, smtp_server):
+        emails = [([addr], "Hi", "Hi") for addr in ["a@x.com", "b@x.com", "c@x.com"]]
+        smtp_server.errors.extend(
+            [None, smtplib.SMTPServerDisconnected(), smtplib.SMTPServerDisconnected()]
+        )
+        mailer.send_batch.retry = mock.Mock(spec_set=[])
+
+        mailer.send_batch(emails)
+
+        assert len(smtp_server.sent) == 1
+        assert mailer.send_batch.retry.call_args[1]["args"] == [emails[1:]]
+
+    def test_it_reports_throughput(self, smtp_server, stats):
+        mailer.send_batch([(["foo@example.com"], "Hi", "Hi")] * 3)
+
+        stats.incr.assert_any_call("tasks.mailer.send_batch.sent", 3)
+        stats.incr.assert_any_call("tasks.mailer.send_batch.unsent", 0)
+        assert stats.timing.call_args[0][0] == "tasks.mailer.send_batch.duration"
+
+
+class TestBatches(object):
+    def test_it_splits_emails_into_batches(self, monkeypatch):
+        monkeypatch.setattr("h.tasks.mailer.BATCH_SIZE", 2)
+
+        assert list(mailer.batches(range(5))) == [[0, 1], [2, 3], [4]]
+
+
+class FakeSMTPServer(object):
+    """
+    A stand-in for an SMTP server.
+
+    Each connection made to it is a :py:class:`FakeSMTP`. Exceptions (or
+    ``None``, for success) appended to ``errors`` are used up one per
+    ``sendmail``.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.tls = False
+        self.tls_started = 0
+        self.logins = []
+        self.sent = []
+        self.errors = []
+
+    def connect(self, host, port, timeout=None):
+        self.connections += 1
+        return FakeSMTP(self)
+
+
+class FakeSMTP(object):
+    does_esmtp = True
+
+    def __init__(self, server):
+        self.server = server
+
+    def set_debuglevel(self, level):
+        pass
+
+    def ehlo(self):
+        return (250, b"localhost")
+
+    def has_extn(self, name):
+        return name == "starttls" and self.server.tls
+
+    def starttls(self):
+        self.server.tls_started += 1
+
+    def login(self, username, password):
+        self.server.logins.append((username, password))
+
+    def sendmail(self, fromaddr, toaddrs, message):
+        if self.server.errors:
+            error = self.server.errors.pop(0)
+            if error is not None:
+                raise error
+        self.server.sent.append(
+            (fromaddr, toaddrs, email.message_from_string(message.decode("utf-8")))
+        )
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def smtp_server(pyramid_request):
+    server = FakeSMTPServer()
+    smtp_mailer = SMTPMailer(username="user", password="pass")
+    smtp_mailer.smtp = server.connect
+    server.mailer = smtp_mailer
+    pyramid_request.registry.registerUtility(
+        Mailer(smtp_mailer=smtp_mailer, default_sender="noreply@example.com"), IMailer
     )
+    return server
 
-    assert mailer.send.retry.called
+
+@pytest.fixture
+def celery(patch, pyramid_request):
+    celery = patch("h.tasks.mailer.celery")
+    celery.request = pyramid_request
+    return celery
+
+
+@pytest.fixture(autouse=True)
+def connection(monkeypatch):
+    connection = mailer._SMTPConnection()
+    monkeypatch.setattr("h.tasks.mailer.connection", connection)
+    return connection
 
 
 @pytest.fixture
-def pyramid_request(pyramid_request):
+def pyramid_request(pyramid_request, stats):
     pyramid_request.debug = False
+    pyramid_request.stats = stats
     return pyramid_request
+
+
+@pytest.fixture
+def stats():
+    return mock.Mock(spec_set=["incr", "timing"])
+
+
+@pytest.fixture(autouse=True)
+def time(patch):
+    time = patch("h.tasks.mailer.time")
+    time.now = 1000.0
+    time.time.side_effect = lambda: time.now
+    return time
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import mock
+import pytest
+import sqlalchemy as sa
+
+from h.models import PendingReplyNotification
+from h.tasks.notification import LOCK_KEY, send_reply_notifications
+
+
+@pytest.mark.usefixtures("celery", "emails", "get_notifications", "send_batch")
+class TestSendReplyNotifications(object):
+    def test_it_notifies_about_the_queued_replies(
+        self, factories, parent, get_notifications, celery, queue
+    ):
+        queued_reply = factories.Annotation(shared=True, references=[parent.id])
+        factories.Annotation(shared=True, references=[parent.id])
+        queue(queued_reply)
+
+        send_reply_notifications()
+
+        get_notifications.assert_called_once_with(celery.request, [queued_reply])
+
+    def test_it_leaves_deleted_and_private_replies(
+        self, factories, parent, get_notifications, queue
+    ):
+        queue(factories.Annotation(shared=True, deleted=True, references=[parent.id]))
+        queue(factories.Annotation(shared=False, references=[parent.id]))
+
+        send_reply_notifications()
+
+        assert get_notifications.call_args[0][1] == []
+
+    def test_it_removes_the_replies_from_the_queue(
+        self, db_session, factories, parent, queue
+    ):
+        queue(factories.Annotation(shared=True, references=[parent.id]))
+        queue(factories.Annotation(shared=False, references=[parent.id]))
+
+        send_reply_notifications()
+
+        assert not db_session.query(PendingReplyNotification).count()
+
+    def test_it_leaves_replies_beyond_the_page_size_for_the_next_run(
+        self, db_session, factories, parent, get_notifications, monkeypatch, queue
+    ):
+        monkeypatch.setattr("h.tasks.notification.PAGE_SIZE", 1)
+        replies = [
+            factories.Annotation(shared=True, references=[parent.id]) for _ in range(2)
+        ]
+        for reply in replies:
+            queue(reply)
+
+        send_reply_notifications()
+
+        assert get_notifications.call_args[0][1] == [replies[0]]
+        remaining = db_session.query(PendingReplyNotification).one()
+        assert remaining.annotation_id == replies[1].id
+
+    def test_it_does_nothing_while_another_run_holds_the_lock(
+        self, db_engine, factories, parent, get_notifications, queue
+    ):
+        queue(factories.Annotation(shared=True, references=[parent.id]))
+        conn = db_engine.connect()
+        conn.execute(sa.select([sa.func.pg_advisory_lock(LOCK_KEY)]))
+        try:
+            send_reply_notifications()
+        finally:
+            conn.execute(sa.select([sa.func.pg_advisory_unlock(LOCK_KEY)]))
+            conn.close()
+
+        assert not get_notifications.called
+
+    def test_it_does_nothing_when_no_replies_are_queued(self, get_notifications):
+        send_reply_notifications()
+
+        assert not get_notifications.called
+
+    @pytest.mark.usefixtures("queued_reply")
+    def test_it_sends_an_email_for_a_single_notification(
+        self, celery, emails, get_notifications, send_batch
+    ):
+        notification = mock.Mock()
+        get_notifications.return_value = [notification]
+
+        send_reply_notifications()
+
+        emails.reply_notification.generate.assert_called_once_with(
+            celery.request, notification
+        )
+        send_batch.delay.assert_called_once_with(
+            [("recipients", "subject", "text", "html")]
+        )
+
+    @pytest.mark.usefixtures("queued_reply")
+    def test_it_sends_a_digest_of_many_notifications_to_the_same_user(
+        self, celery, emails, get_notifications, send_batch
+    ):
+        user, other_user = mock.Mock(id=1), mock.Mock(id=2)
+        notifications = [
+            mock.Mock(parent_user=user),
+            mock.Mock(parent_user=other_user),
+            mock.Mock(parent_user=user),
+        ]
+        get_notifications.return_value = notifications
+
+        send_reply_notifications()
+
+        emails.reply_notification.generate_digest.assert_called_once_with(
+            celery.request, [notifications[0], notifications[2]]
+        )
+        emails.reply_notification.generate.assert_called_once_with(
+            celery.request, notifications[1]
+        )
+        send_batch.delay.assert_called_once_with(
+            [("recipients", "subject", "text", "html")] * 2
+        )
+
+    @pytest.mark.usefixtures("queued_reply")
+    def test_it_sends_the_emails_in_batches(
+        self, get_notifications, monkeypatch, send_batch
+    ):
+        monkeypatch.setattr("h.tasks.mailer.BATCH_SIZE", 2)
+        get_notifications.return_value = [
+            mock.Mock(parent_user=mock.Mock(id=i)) for i in range(3)
+        ]
+
+        send_reply_notifications()
+
+        assert [len(c[0][0]) for c in send_batch.delay.call_args_list] == [2, 1]
+
+    @pytest.fixture
+    def celery(self, patch, pyramid_request):
+        cel = patch("h.tasks.notification.celery")
+        cel.request = pyramid_request
+        return cel
+
+    @pytest.fixture
+    def emails(self, patch):
+        emails = patch("h.tasks.notification.emails")
+        for generate in [
+            emails.reply_notification.generate,
+            emails.reply_notification.generate_digest,
+        ]:
+            generate.return_value = ("recipients", "subject", "text", "html")
+        return emails
+
+    @pytest.fixture
+    def parent(self, factories):
+        return factories.Annotation(shared=True)
+
+    @pytest.fixture
+    def get_notifications(self, patch):
+        get_notifications = patch("h.tasks.notification.reply.get_notifications")
+        get_notifications.return_value = []
+        return get_notifications
+
+    @pytest.fixture
+    def send_batch(self, patch):
+        return patch("h.tasks.notification.mailer.send_batch")
+
+    @pytest.fixture
+    def queued_reply(self, factories, parent, queue):
+        reply = factories.Annotation(shared=True, references=[parent.id])
+        queue(reply)
+        return reply
+
+    @pytest.fixture
+    def queue(self, db_session):
+        def queue(reply):
+            db_session.add(PendingReplyNotification(annotation=reply))
+            db_session.flush()
+
+        return queue
@@ -8,6 +8,7 @@ from pyramid.authorization import ACLAuthorizationPolicy
 
 from h.auth import role
 from h.models import Organization
+from h.services.group_count import GroupCountService
 from h.services.group_links import GroupLinksService
 from h.traversal.contexts import AnnotationContext
 from h.traversal.contexts import GroupContext
@@ -269,6 +270,18 @@ class TestGroupContext(object):
 
         assert group_context.id == group.pubid  # NOT the group.id
 
+    def test_it_proxies_counts_to_svc(self, factories, pyramid_config, pyramid_request):
+        group_count_svc = mock.create_autospec(
+            GroupCountService, spec_set=True, instance=True
+        )
+        pyramid_config.register_service(group_count_svc, name="group_count")
+        group = factories.Group()
+
+        group_context = GroupContext(group, pyramid_request)
+
+        assert group_context.counts == group_count_svc.counts.return_value
+        group_count_svc.counts.assert_called_once_with(group)
+
     def test_organization_is_None_if_the_group_has_no_organization(
         self, factories, pyramid_request
     ):
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+import mock
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from h.models import Group, User
+from h.util.cache import (
+    StaleWhileRevalidateCache,
+    TTLCache,
+    VersionedCache,
+    clear_versioned_caches,
+    publish_on_change,
+    publish_version,
+)
+
+
+class TestTTLCache(object):
+    def test_get_returns_cached_values(self, cache):
+        cache.set("foo", "bar")
+
+        assert cache.get("foo") == "bar"
+
+    def test_get_returns_default_for_missing_keys(self, cache):
+        assert cache.get("foo") is None
+        assert cache.get("foo", "default") == "default"
+
+    def test_get_returns_default_for_expired_keys(self, cache, clock):
+        cache.set("foo", "bar")
+
+        clock.now += 60
+
+        assert cache.get("foo", "default") == "default"
+        assert not cache
+
+    def test_entries_never_expire_without_a_ttl(self, clock):
+        cache = TTLCache(maxsize=10, ttl=None, timer=clock)
+        cache.set("foo", "bar")
+
+        clock.now += 1000000
+
+        assert cache.get("foo") == "bar"
+
+    def test_set_evicts_the_least_recently_used_entry(self, clock):
+        cache = TTLCache(maxsize=2, ttl=60, timer=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_set_resets_the_expiry_time(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 30
+        cache.set("foo", "baz")
+        clock.now += 45
+
+        assert cache.get("foo") == "baz"
+
+    def test_invalidate_removes_the_entry(self, cache):
+        cache.set("foo", "bar")
+
+        cache.invalidate("foo")
+        cache.invalidate("missing")
+
+        assert cache.get("foo") is None
+
+    def test_clear_removes_all_entries(self, cache):
+        cache.set("foo", "bar")
+        cache.set("baz", "qux")
+
+        cache.clear()
+
+        assert not cache
+
+    @pytest.fixture
+    def cache(self, clock):
+        return TTLCache(maxsize=10, ttl=60, timer=clock)
+
+
+class TestStaleWhileRevalidateCache(object):
+    def test_lookup_asks_for_a_refresh_of_missing_keys(self, cache):
+        assert cache.lookup("foo") == (None, True)
+        assert cache.lookup("foo") == (None, True)
+
+    def test_lookup_returns_fresh_values(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 59
+
+        assert cache.lookup("foo") == ("bar", False)
+
+    def test_lookup_asks_one_caller_to_refresh_stale_values(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 60
+
+        assert cache.lookup("foo") == ("bar", True)
+        assert cache.lookup("foo") == ("bar", False)
+
+    def test_lookup_asks_again_if_a_refresh_is_abandoned(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 60
+        cache.lookup("foo")
+        clock.now += 60
+
+        assert cache.lookup("foo") == ("bar", True)
+
+    def test_set_stores_a_fresh_value(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 60
+        cache.lookup("foo")
+
+        cache.set("foo", "baz")
+
+        assert cache.lookup("foo") == ("baz", False)
+
+    def test_entries_expire_after_the_ttl(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 600
+
+        assert cache.lookup("foo") == (None, True)
+
+    def test_get_returns_stale_values(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 60
+
+        assert cache.get("foo") == "bar"
+        assert cache.get("missing", "default") == "default"
+
+    def test_invalidate_removes_the_entry(self, cache, clock):
+        cache.set("foo", "bar")
+        clock.now += 60
+        cache.lookup("foo")
+
+        cache.invalidate("foo")
+
+        assert cache.lookup("foo") == (None, True)
+
+    @pytest.fixture
+    def cache(self, clock):
+        return StaleWhileRevalidateCache(maxsize=10, ttl=600, fresh_ttl=60, timer=clock)
+
+
+class TestVersionedCache(object):
+    def test_check_version_keeps_entries_while_the_version_is_unchanged(
+        self, cache, session
+    ):
+        cache.check_version(session)
+        cache.set("foo", "bar")
+
+        cache.check_version(session)
+
+        assert cache.get("foo") == "bar"
+
+    def test_check_version_clears_the_cache_when_the_version_changes(
+        self, cache, clock, session
+    ):
+        cache.check_version(session)
+        cache.set("foo", "bar")
+        session.version = "v2"
+        clock.now += 5
+
+        cache.check_version(session)
+
+        assert cache.get("foo") is None
+
+    def test_check_version_reads_the_version_once_per_poll_interval(
+        self, cache, clock, session
+    ):
+        cache.check_version(session)
+        cache.check_version(session)
+        clock.now += 4
+        cache.check_version(session)
+
+        assert session.execute.call_count == 1
+
+        clock.now += 1
+        cache.check_version(session)
+
+        assert session.execute.call_count == 2
+
+    def test_check_version_reads_the_namespaces_version(self, cache, session):
+        cache.check_version(session)
+
+        params = session.execute.call_args[0][1]
+        assert params == {"key": "cache_version.test"}
+
+    @pytest.fixture
+    def cache(self, clock):
+        return VersionedCache("test", maxsize=10, ttl=60, poll_interval=5, timer=clock)
+
+
+class TestPublishVersion(object):
+    def test_it_writes_a_new_version(self, session):
+        publish_version(session, "test")
+        publish_version(session, "test")
+
+        (_, first), (_, second) = [c[0] for c in session.execute.call_args_list]
+        assert first["key"] == second["key"] == "cache_version.test"
+        assert first["value"] != second["value"]
+
+    def test_it_clears_local_caches_in_the_namespace(self, session):
+        cache = VersionedCache("test")
+        other_cache = VersionedCache("other")
+        cache.set("foo", "bar")
+        other_cache.set("foo", "bar")
+
+        publish_version(session, "test")
+
+        assert cache.get("foo") is None
+        assert other_cache.get("foo") == "bar"
+
+
+def test_clear_versioned_caches_clears_every_namespace():
+    cache = VersionedCache("test")
+    other_cache = VersionedCache("other")
+    cache.set("foo", "bar")
+    other_cache.set("foo", "bar")
+
+    clear_versioned_caches()
+
+    assert not cache
+    assert not other_cache
+
+
+class TestPublishOnChange(object):
+    def test_it_publishes_when_an_instance_is_modified(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User])
+
+        user.display_name = "Changed"
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "user")
+
+    def test_it_publishes_when_an_instance_is_deleted(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User])
+
+        db_session.delete(user)
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "user")
+
+    def test_it_does_not_publish_for_changes_to_ignored_attributes(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User], ignore=["last_login_date"])
+
+        user.last_login_date = datetime.datetime.utcnow()
+        db_session.flush()
+
+        assert not publish_version.called
+
+    def test_it_publishes_when_a_many_to_one_relationship_changes(
+        self, db_session, factories, publish_version
+    ):
+        group = factories.Group()
+        db_session.flush()
+        publish_on_change(db_session, "group", [Group])
+
+        group.creator = factories.User()
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "group")
+
+    def test_it_does_not_publish_for_new_instances(
+        self, db_session, factories, publish_version
+    ):
+        publish_on_change(db_session, "user", [User])
+
+        factories.User()
+        db_session.flush()
+
+        assert not publish_version.called
+
+    def test_it_does_not_publish_for_other_models(
+        self, db_session, factories, publish_version
+    ):
+        group = factories.Group()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User])
+
+        group.name = "Changed"
+        db_session.flush()
+
+        assert not publish_version.called
+
+    def test_it_only_listens_once_per_session(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User])
+        publish_on_change(db_session, "user", [User])
+
+        user.display_name = "Changed"
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "user")
+
+    def test_it_publishes_each_namespace_for_its_own_classes(
+        self, db_session, factories, publish_version
+    ):
+        group = factories.Group()
+        db_session.flush()
+        publish_on_change(db_session, "user", [User])
+        publish_on_change(db_session, "group", [Group])
+
+        group.name = "Changed"
+        db_session.flush()
+
+        publish_version.assert_called_once_with(db_session, "group")
+
+    def test_it_only_publishes_for_the_sessions_it_was_called_for(
+        self, db_session, factories, publish_version
+    ):
+        user = factories.User()
+        db_session.flush()
+        publish_on_change(sessionmaker(), "user", [User])
+
+        user.display_name = "Changed"
+        db_session.flush()
+
+        assert not publish_version.called
+
+    @pytest.fixture
+    def publish_version(self, patch):
+        return patch("h.util.cache.publish_version")
+
+
+@pytest.fixture
+def clock():
+    class Clock(object):
+        now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+    return Clock()
+
+
+@pytest.fixture
+def session():
+    session = mock.Mock(spec_set=["execute", "version"])
+    session.version = "v1"
+    session.execute.side_effect = lambda *args: mock.Mock(
+        **{"scalar.return_value": session.version}
+    )
+    return session
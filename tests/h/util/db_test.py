@@ -6,8 +6,10 @@ import random
 
 import mock
 import pytest
+import sqlalchemy
 
-from h.util.db import lru_cache_in_transaction, on_transaction_end
+from h.models import User
+from h.util.db import lru_cache_in_transaction, on_transaction_end, restore, snapshot
 
 
 class TestLRUCacheInTransaction(object):
@@ -95,6 +97,68 @@ class TestOnTransactionEnd(object):
         assert not spy.called
 
 
+class TestSnapshot(object):
+    def test_it_copies_column_values(self, db_session, factories):
+        user = factories.User(username="jacqui")
+        db_session.flush()
+
+        cls, values = snapshot(user)
+
+        assert cls == User
+        assert values["id"] == user.id
+        assert values["_username"] == "jacqui"
+        assert "groups" not in values
+
+
+class TestRestore(object):
+    def test_it_returns_a_persistent_object_without_querying(
+        self, db_session, user_snapshot, statements
+    ):
+        user = restore(db_session, user_snapshot)
+
+        assert isinstance(user, User)
+        assert user.username == "jacqui"
+        assert user in db_session
+        assert not db_session.is_modified(user)
+        assert statements == []
+
+    def test_it_returns_the_existing_object_if_already_loaded(
+        self, db_session, user_snapshot
+    ):
+        existing = db_session.query(User).filter_by(username="jacqui").one()
+
+        assert restore(db_session, user_snapshot) is existing
+
+    def test_changes_to_the_object_are_saved(self, db_session, user_snapshot):
+        user = restore(db_session, user_snapshot)
+
+        user.display_name = "Jacqui"
+        db_session.flush()
+        db_session.expire_all()
+
+        user = db_session.query(User).filter_by(username="jacqui").one()
+        assert user.display_name == "Jacqui"
+
+    @pytest.fixture
+    def user_snapshot(self, db_session, factories):
+        user = factories.User(username="jacqui")
+        db_session.flush()
+        user_snapshot = snapshot(user)
+        db_session.expunge_all()
+        return user_snapshot
+
+    @pytest.fixture
+    def statements(self, db_session, user_snapshot):
+        statements = []
+
+        @sqlalchemy.event.listens_for(db_session.bind, "before_cursor_execute")
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        yield statements
+        sqlalchemy.event.remove(db_session.bind, "before_cursor_execute", record)
+
+
 @pytest.fixture
 def mock_transaction(db_session):
     transaction = mock.Mock(spec=db_session.transaction)
@@ -46,6 +46,52 @@ class TestURLInScope(object):
         }
 
 
+class TestScopeIndex(object):
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://www.foo.com",
+            "http://www.foo.com/bar/qux.html",
+            "http://www.foo.com/bar/baz/qux.html",
+            "http://www.foo.com/bar.baz",
+            "https://www.foo.com/bar/baz",
+            "http://foo.com/",
+            "",
+        ],
+    )
+    def test_it_matches_the_same_scopes_as_url_in_scope(self, url, scopes):
+        index = scope_util.ScopeIndex((scope, scope) for scope in scopes)
+
+        expected = [scope for scope in scopes if scope_util.url_in_scope(url, [scope])]
+        assert sorted(index.match(url)) == sorted(expected)
+
+    def test_it_returns_the_values_of_every_matching_scope(self):
+        index = scope_util.ScopeIndex(
+            [
+                ("http://www.foo.com", 1),
+                ("http://www.foo.com", 2),
+                ("http://www.foo.com/bar/", 3),
+                ("http://www.foo.com/baz/", 4),
+            ]
+        )
+
+        assert sorted(index.match("http://www.foo.com/bar/qux.html")) == [1, 2, 3]
+
+    def test_it_returns_empty_list_if_no_scopes(self):
+        assert scope_util.ScopeIndex([]).match("http://www.foo.com") == []
+
+    @pytest.fixture
+    def scopes(self):
+        return [
+            "http://www.foo.com",
+            "https://www.foo.com",
+            "http://www.foo.com/bar/baz",
+            "http://www.foo.com/bar/qux",
+            "http://www.foo.com/bar/baz/qux",
+            "http://www.foo.com/bar/baz/qux.html",
+        ]
+
+
 class TestParseURLFromScope(object):
     @pytest.mark.parametrize(
         "url,expected_scope",
@@ -7,6 +7,13 @@ import pytest
 from h.util import markdown
 
 
+@pytest.fixture(autouse=True)
+def render_cache():
+    markdown.render_cache.clear()
+    yield markdown.render_cache
+    markdown.render_cache.clear()
+
+
 class TestRender(object):
     def test_it_renders_markdown(self):
         actual = markdown.render("_emphasis_ **bold**")
@@ -24,6 +31,20 @@ class TestRender(object):
         markdown.render("foobar")
         sanitize.assert_called_once_with(markdown_render.return_value)
 
+    def test_it_returns_None_for_None(self):
+        assert markdown.render(None) is None
+
+    def test_it_caches_the_rendered_text(self, markdown_render, sanitize):
+        first = markdown.render("foobar")
+        second = markdown.render("foobar")
+
+        assert first == second == sanitize.return_value
+        sanitize.assert_called_once_with(markdown_render.return_value)
+
+    def test_it_does_not_mix_up_different_texts(self):
+        assert markdown.render("_foo_") == "<p><em>foo</em></p>\n"
+        assert markdown.render("**foo**") == "<p><strong>foo</strong></p>\n"
+
     @pytest.fixture
     def markdown_render(self, patch):
         return patch("h.util.markdown.markdown")
@@ -33,6 +54,25 @@ class TestRender(object):
         return patch("h.util.markdown.sanitize")
 
 
+class TestRenderMany(object):
+    def test_it_renders_each_text(self):
+        actual = markdown.render_many(["_emphasis_", None, "**bold**"])
+
+        assert actual == [
+            "<p><em>emphasis</em></p>\n",
+            None,
+            "<p><strong>bold</strong></p>\n",
+        ]
+
+    def test_it_renders_duplicate_texts_once(self, patch):
+        render = patch("h.util.markdown.render")
+
+        actual = markdown.render_many(["foo", "bar", "foo"])
+
+        assert render.call_count == 2
+        assert actual == [render.return_value] * 3
+
+
 class TestSanitize(object):
     @pytest.mark.parametrize(
         "text,expected",
@@ -162,3 +162,34 @@ def test_normalize(url_in, url_out):
 @pytest.mark.parametrize("url,_", TEST_URLS)
 def test_normalize_returns_unicode(url, _):
     assert isinstance(uri.normalize(url), text_type)
+
+
+def test_normalize_caches_results(patch):
+    _normalize = patch("h.util.uri._normalize")
+    uri.normalize.cache_clear()
+
+    uri.normalize("http://example.com/cached")
+    uri.normalize("http://example.com/cached")
+
+    _normalize.assert_called_once_with("http://example.com/cached")
+    uri.normalize.cache_clear()
+
+
+def test_normalize_many():
+    urls_in = [url_in for url_in, _ in TEST_URLS]
+    urls_out = [url_out for _, url_out in TEST_URLS]
+
+    assert uri.normalize_many(urls_in) == urls_out
+
+
+def test_normalize_many_normalizes_each_distinct_uri_once(patch):
+    _normalize = patch("h.util.uri._normalize")
+
+    result = uri.normalize_many(["http://a.com", "http://b.com", "http://a.com"])
+
+    assert _normalize.call_count == 2
+    assert result == [
+        _normalize.return_value,
+        _normalize.return_value,
+        _normalize.return_value,
+    ]
@@ -12,6 +12,7 @@ from h.activity.query import ActivityResults
 from h.views import activity
 from h.models import Organization
 from h.services.annotation_stats import AnnotationStatsService
+from h.services.group_count import GroupCounts, GroupCountService
 
 
 GROUP_TYPE_OPTIONS = ("group", "open_group", "restricted_group")
@@ -107,11 +108,7 @@ class TestSearchController(object):
 
 
 @pytest.mark.usefixtures(
-    "annotation_stats_service",
-    "group_service",
-    "group_members_service",
-    "routes",
-    "search",
+    "group_count_service", "group_service", "group_members_service", "routes", "search"
 )
 class TestGroupSearchController(object):
 
@@ -615,19 +612,10 @@ class TestGroupSearchController(object):
         indirect=["test_group", "test_user"],
     )
     def test_search_passes_the_group_annotation_count_to_the_template(
-        self,
-        controller,
-        factories,
-        test_group,
-        test_user,
-        query,
-        annotation_stats_service,
-        pyramid_request,
+        self, controller, test_group, test_user, query, group_count_service
     ):
         result = controller.search()["stats"]
-        annotation_stats_service.group_annotation_count.assert_called_with(
-            test_group.pubid
-        )
+        group_count_service.counts.assert_called_with(test_group)
         assert result["annotation_count"] == 5
 
     @pytest.mark.parametrize(
@@ -636,26 +624,27 @@ class TestGroupSearchController(object):
         indirect=["test_group", "test_user"],
     )
     def test_search_reuses_group_annotation_count_if_able(
-        self,
-        controller,
-        factories,
-        test_group,
-        test_user,
-        query,
-        annotation_stats_service,
-        pyramid_request,
+        self, controller, test_group, test_user, query
     ):
         """
-        In cases where the annotation count returned from search is the same calc
-        as the annotation count that would be returned from the stats service,
-        re-use that value rather than executing another query inside the stats
-        service.
+        In cases where the annotation count returned from search is the same
+        calc as the group's shared annotation count, re-use that value.
         """
         controller.parsed_query_params = MultiDict({"group": test_group})
         result = controller.search()["stats"]
-        annotation_stats_service.group_annotation_count.assert_not_called()
         assert result["annotation_count"] == 200
 
+    @pytest.mark.parametrize(
+        "test_group,test_user",
+        [("group", "member"), ("open_group", "user")],
+        indirect=["test_group", "test_user"],
+    )
+    def test_search_passes_the_group_member_count_to_the_template(
+        self, controller, test_group, test_user
+    ):
+        result = controller.search()["stats"]
+        assert result["member_count"] == 3
+
     @pytest.mark.parametrize(
         "test_group, test_user, test_heading, test_subtitle, test_share_msg",
         [
@@ -1361,13 +1350,24 @@ def annotation_stats_service(pyramid_config):
     )
 
     ann_stat_svc.user_annotation_count.return_value = 6
-    ann_stat_svc.group_annotation_count.return_value = 5
 
     pyramid_config.register_service(ann_stat_svc, name="annotation_stats")
 
     return ann_stat_svc
 
 
+@pytest.fixture
+def group_count_service(pyramid_config):
+    group_count_service = mock.create_autospec(
+        GroupCountService, instance=True, spec_set=True
+    )
+    group_count_service.counts.return_value = GroupCounts(
+        member_count=3, annotation_count=8, shared_annotation_count=5
+    )
+    pyramid_config.register_service(group_count_service, name="group_count")
+    return group_count_service
+
+
 @pytest.fixture
 def search(patch):
     search = patch("h.views.activity.SearchController.search")
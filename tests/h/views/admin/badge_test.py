@@ -7,6 +7,7 @@ import pytest
 from pyramid import httpexceptions
 
 from h import models
+from h.models.blocklist import _matcher_cache
 from h.views.admin.badge import badge_add, badge_index, badge_remove
 
 
@@ -55,6 +56,15 @@ class TestBadgeAddRemove(object):
         assert isinstance(result, httpexceptions.HTTPSeeOther)
         assert result.location == "/adm/badge"
 
+    def test_add_reloads_blocklist_in_all_processes(
+        self, pyramid_request, publish_version
+    ):
+        pyramid_request.params = {"add": "test_uri"}
+
+        badge_add(pyramid_request)
+
+        publish_version.assert_called_once_with(pyramid_request.db, "blocklist")
+
     def test_remove_unblocks_uri(self, pyramid_request):
         pyramid_request.params = {"remove": "blocked2"}
 
@@ -62,6 +72,15 @@ class TestBadgeAddRemove(object):
 
         assert not models.Blocklist.is_blocked(pyramid_request.db, "blocked2")
 
+    def test_remove_reloads_blocklist_in_all_processes(
+        self, pyramid_request, publish_version
+    ):
+        pyramid_request.params = {"remove": "blocked2"}
+
+        badge_remove(pyramid_request)
+
+        publish_version.assert_called_once_with(pyramid_request.db, "blocklist")
+
     def test_remove_redirects_to_index(self, pyramid_request):
         pyramid_request.params = {"remove": "blocked1"}
 
@@ -78,6 +97,10 @@ class TestBadgeAddRemove(object):
         assert isinstance(result, httpexceptions.HTTPSeeOther)
         assert result.location == "/adm/badge"
 
+    @pytest.fixture
+    def publish_version(self, patch):
+        return patch("h.models.blocklist.publish_version")
+
 
 @pytest.fixture
 def blocked_uris(db_session):
@@ -92,6 +115,11 @@ def blocked_uris(db_session):
     return uris
 
 
+@pytest.fixture(autouse=True)
+def matcher_cache():
+    _matcher_cache.clear()
+
+
 @pytest.fixture
 def routes(pyramid_config):
     pyramid_config.add_route("admin.badge", "/adm/badge")
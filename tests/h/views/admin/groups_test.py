@@ -12,6 +12,7 @@ from h.services.user import UserService
 from h.services.group import GroupService
 from h.services.group_create import GroupCreateService
 from h.services.group_update import GroupUpdateService
+from h.services.group_count import GroupCounts, GroupCountService
 from h.services.group_members import GroupMembersService
 from h.services.delete_group import DeleteGroupService
 from h.services.annotation_delete import AnnotationDeleteService
@@ -192,6 +193,7 @@ class TestGroupCreateView(object):
     "group_create_svc",
     "group_update_svc",
     "group_members_svc",
+    "group_count_svc",
     "list_orgs_svc",
 )
 class TestGroupEditViews(object):
@@ -209,18 +211,20 @@ class TestGroupEditViews(object):
             organizations={default_org.pubid: default_org},
         )
 
-    def test_read_renders_form(self, pyramid_request, factories, group):
-        factories.Annotation(groupid=group.pubid)
-        factories.Annotation(groupid=group.pubid)
+    def test_read_renders_form(self, pyramid_request, group, group_count_svc):
+        group_count_svc.counts.return_value = GroupCounts(
+            member_count=3, annotation_count=2, shared_annotation_count=1
+        )
 
         view = GroupEditViews(group, pyramid_request)
 
         ctx = view.read()
 
+        group_count_svc.counts.assert_called_once_with(group)
         assert ctx["form"] == self._expected_form(group)
         assert ctx["pubid"] == group.pubid
         assert ctx["group_name"] == group.name
-        assert ctx["member_count"] == len(group.members)
+        assert ctx["member_count"] == 3
         assert ctx["annotation_count"] == 2
 
     def test_read_renders_form_if_group_has_no_creator(self, pyramid_request, group):
@@ -433,6 +437,14 @@ def group_members_svc(pyramid_config):
     return svc
 
 
+@pytest.fixture
+def group_count_svc(pyramid_config):
+    svc = mock.create_autospec(GroupCountService, spec_set=True, instance=True)
+    svc.counts.return_value = GroupCounts(0, 0, 0)
+    pyramid_config.register_service(svc, name="group_count")
+    return svc
+
+
 @pytest.fixture
 def delete_group_svc(pyramid_config, pyramid_request):
     service = mock.Mock(
@@ -26,6 +26,23 @@ class TestProfile(object):
         session_profile.assert_called_once_with(pyramid_request, "foo.com")
         assert result == session_profile.return_value
 
+    def test_profile_sets_an_etag(self, session_profile, pyramid_request):
+        views.profile(pyramid_request)
+
+        assert pyramid_request.response.etag
+        assert pyramid_request.response.conditional_response
+
+    def test_profile_etag_changes_with_the_profile(
+        self, session_profile, pyramid_request
+    ):
+        views.profile(pyramid_request)
+        first_etag = pyramid_request.response.etag
+
+        session_profile.return_value = {"userid": "acct:someone@example.com"}
+        views.profile(pyramid_request)
+
+        assert pyramid_request.response.etag != first_etag
+
 
 @pytest.mark.usefixtures("user_service", "session_profile")
 class TestUpdatePreferences(object):
@@ -142,4 +159,6 @@ def GroupsJSONPresenter(patch):
 
 @pytest.fixture
 def session_profile(patch):
-    return patch("h.session.profile")
+    session_profile = patch("h.session.profile")
+    session_profile.return_value = {"userid": None}
+    return session_profile
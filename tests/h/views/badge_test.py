@@ -6,62 +6,52 @@ import pytest
 import mock
 
 from pyramid import httpexceptions
-from webob.multidict import MultiDict
 
+from h.services.public_annotation_count import PublicAnnotationCountService
 from h.views.badge import badge
 
 
-badge_fixtures = pytest.mark.usefixtures("models", "search_lib")
+badge_fixtures = pytest.mark.usefixtures("models", "public_annotation_count")
 
 
 @badge_fixtures
-def test_badge_returns_number_from_search(
-    models, pyramid_request, search_run, mark_uri_as_annotated
+def test_badge_returns_public_annotation_count(
+    models, pyramid_request, public_annotation_count
 ):
-    mark_uri_as_annotated("http://example.com")
-
     pyramid_request.params["uri"] = "http://example.com"
     models.Blocklist.is_blocked.return_value = False
-    search_run.return_value = mock.Mock(total=29)
+    public_annotation_count.count.return_value = 29
 
     result = badge(pyramid_request)
 
-    search_run.assert_called_once_with(
-        MultiDict({"uri": "http://example.com", "limit": 0})
-    )
+    public_annotation_count.count.assert_called_once_with("http://example.com")
     assert result == {"total": 29}
 
 
 @badge_fixtures
-def test_badge_does_not_search_if_uri_never_annotated(
-    models, pyramid_request, search_run
+def test_badge_does_not_check_blocklist_if_uri_has_no_annotations(
+    models, pyramid_request, public_annotation_count
 ):
     pyramid_request.params["uri"] = "http://example.com"
-    models.Blocklist.is_blocked.return_value = False
+    public_annotation_count.count.return_value = 0
 
     result = badge(pyramid_request)
 
     assert result == {"total": 0}
     models.Blocklist.is_blocked.assert_not_called()
-    search_run.assert_not_called()
 
 
 @badge_fixtures
-def test_badge_returns_0_if_blocked(
-    models, pyramid_request, search_run, mark_uri_as_annotated
-):
-    mark_uri_as_annotated("http://blocked-domain.com")
-
+def test_badge_returns_0_if_blocked(models, pyramid_request, public_annotation_count):
     pyramid_request.params["uri"] = "http://blocked-domain.com"
     models.Blocklist.is_blocked.return_value = True
-    search_run.return_value = {"total": 29}
+    public_annotation_count.count.return_value = 29
 
     result = badge(pyramid_request)
 
     models.Blocklist.is_blocked.assert_called_with(
         mock.ANY, "http://blocked-domain.com"
     )
-    assert not search_run.called
     assert result == {"total": 0}
 
 
@@ -77,25 +67,9 @@ def models(patch):
 
 
 @pytest.fixture
-def search_lib(patch):
-    return patch("h.views.badge.search")
-
-
-@pytest.fixture
-def search_run(search_lib):
-    return search_lib.Search.return_value.run
-
-
-@pytest.fixture
-def mark_uri_as_annotated(factories, pyramid_request):
-    def mark(uri):
-        factories.DocumentURI(uri=uri)
-        pyramid_request.db.flush()
-
-    return mark
-
-
-@pytest.fixture
-def pyramid_request(pyramid_request):
-    pyramid_request.stats = mock.Mock()
-    return pyramid_request
+def public_annotation_count(pyramid_config):
+    svc = mock.create_autospec(
+        PublicAnnotationCountService, instance=True, spec_set=True
+    )
+    pyramid_config.register_service(svc, name="public_annotation_count")
+    return svc
@@ -2,66 +2,291 @@
 
 from __future__ import unicode_literals
 
+import datetime
+
 import mock
 import pytest
+from pyramid.response import Response
 
-from h.views.feeds import stream_atom, stream_rss
+from h.views import feeds
+from h.views.feeds import feed_cache, stream_atom, stream_rss
 
 
 @pytest.mark.usefixtures(
-    "fetch_ordered_annotations", "render_atom", "search_run", "routes"
+    "fetch_ordered_annotations", "atom_entries", "render_atom", "search_run", "routes"
 )
 class TestStreamAtom(object):
-    def test_renders_atom(self, pyramid_request, render_atom):
+    def test_renders_atom(self, pyramid_request, atom_entries, render_atom):
         stream_atom(pyramid_request)
 
+        assert atom_entries.call_args[0][0] == pyramid_request
         render_atom.assert_called_once_with(
             request=pyramid_request,
-            annotations=mock.sentinel.fetched_annotations,
+            entries=["<foo>", "<bar>"],
+            updated=datetime.datetime(2018, 1, 2),
             atom_url="http://example.com/thestream.atom",
             html_url="http://example.com/thestream",
             title="Some feed",
             subtitle="It contains stuff",
         )
 
-    def test_returns_rendered_atom(self, pyramid_request, render_atom):
+    def test_returns_rendered_atom(self, pyramid_request):
         result = stream_atom(pyramid_request)
 
-        assert result == render_atom.return_value
+        assert result.body == b"<feed/>"
+        assert result.content_type == "application/atom+xml"
 
 
 @pytest.mark.usefixtures(
-    "fetch_ordered_annotations", "render_rss", "search_run", "routes"
+    "fetch_ordered_annotations", "rss_entries", "render_rss", "search_run", "routes"
 )
 class TestStreamRSS(object):
-    def test_renders_rss(self, pyramid_request, render_rss):
+    def test_renders_rss(self, pyramid_request, rss_entries, render_rss):
         stream_rss(pyramid_request)
 
+        assert rss_entries.call_args[0][0] == pyramid_request
         render_rss.assert_called_once_with(
             request=pyramid_request,
-            annotations=mock.sentinel.fetched_annotations,
+            entries=["<foo>", "<bar>"],
+            updated=datetime.datetime(2018, 1, 2),
             rss_url="http://example.com/thestream.rss",
             html_url="http://example.com/thestream",
             title="Some feed",
             description="Stuff and things",
         )
 
-    def test_returns_rendered_rss(self, pyramid_request, render_rss):
+    def test_returns_rendered_rss(self, pyramid_request):
         result = stream_rss(pyramid_request)
 
-        assert result == render_rss.return_value
+        assert result.body == b"<rss/>"
+        assert result.content_type == "application/rss+xml"
+
+
+@pytest.mark.usefixtures(
+    "fetch_ordered_annotations", "atom_entries", "render_atom", "search_run", "routes"
+)
+class TestFeedCache(object):
+    def test_it_sets_the_etag_and_last_modified_headers(self, pyramid_request):
+        response = stream_atom(pyramid_request)
+
+        assert response.etag
+        assert response.last_modified.replace(tzinfo=None) == datetime.datetime(
+            2018, 1, 2
+        )
+        assert response.conditional_response
+
+    def test_it_serves_the_cached_feed_until_it_is_due_a_refresh(
+        self, pyramid_request, render_atom, search_run, clock
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL - 1
+
+        response = stream_atom(pyramid_request)
+
+        assert render_atom.call_count == 1
+        assert search_run.call_count == 1
+        assert response.body == b"<feed/>"
+
+    def test_it_caches_feeds_separately_for_each_query(
+        self, pyramid_request, render_atom
+    ):
+        stream_atom(pyramid_request)
+        pyramid_request.params["tag"] = "foo"
+
+        stream_atom(pyramid_request)
+
+        assert render_atom.call_count == 2
+
+    def test_it_does_not_cache_logged_in_users_feeds(
+        self, pyramid_config, pyramid_request, render_atom
+    ):
+        pyramid_config.testing_securitypolicy("acct:someone@example.com")
+
+        stream_atom(pyramid_request)
+        stream_atom(pyramid_request)
+
+        assert render_atom.call_count == 2
+
+    def test_it_searches_for_annotations_newer_than_the_feed(
+        self, pyramid_request, search_run, clock
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+
+        stream_atom(pyramid_request)
+
+        params = search_run.call_args_list[1][0][0]
+        assert params["sort"] == "updated"
+        assert params["order"] == "asc"
+        assert params["search_after"] == 1514851200000
+
+    def test_it_does_not_rerender_the_feed_if_nothing_is_new(
+        self, pyramid_request, render_atom, search_results, clock
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results([])
+
+        stream_atom(pyramid_request)
+
+        assert render_atom.call_count == 1
+
+    def test_it_puts_new_annotations_at_the_top_of_the_feed(
+        self, pyramid_request, render_atom, search_results, clock
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results(["bar", "new1", "new2"])
+
+        stream_atom(pyramid_request)
+
+        assert render_atom.call_args[1]["entries"] == [
+            "<new2>",
+            "<new1>",
+            "<bar>",
+            "<foo>",
+        ]
+
+    def test_it_only_fetches_and_renders_the_new_annotations(
+        self,
+        pyramid_request,
+        atom_entries,
+        fetch_ordered_annotations,
+        search_results,
+        search_run,
+        clock,
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results(["new"])
+
+        stream_atom(pyramid_request)
+
+        assert search_run.call_count == 2
+        fetch_ordered_annotations.assert_called_with(pyramid_request.db, ["new"])
+        assert [a.id for a in atom_entries.call_args[0][1]] == ["new"]
+
+    def test_it_updates_the_last_modified_header(
+        self, pyramid_request, search_results, clock
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results(["new"])
+
+        response = stream_atom(pyramid_request)
+
+        assert response.last_modified.replace(tzinfo=None) == datetime.datetime(
+            2018, 1, 3
+        )
+
+    def test_it_keeps_the_feed_to_the_requested_length(
+        self, pyramid_request, render_atom, search_results, clock
+    ):
+        pyramid_request.params["limit"] = "2"
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results(["new"])
+
+        stream_atom(pyramid_request)
+
+        assert render_atom.call_args[1]["entries"] == ["<new>", "<foo>"]
+
+    def test_it_rerenders_the_feed_from_scratch_if_it_is_all_new(
+        self, pyramid_request, fetch_ordered_annotations, search_results, clock
+    ):
+        pyramid_request.params["limit"] = "2"
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+        search_results(["new1", "new2"], ["new4", "new3"])
+
+        stream_atom(pyramid_request)
+
+        fetch_ordered_annotations.assert_called_with(
+            pyramid_request.db, ["new4", "new3"]
+        )
+
+    def test_it_rerenders_the_feed_from_scratch_periodically(
+        self,
+        pyramid_request,
+        render_atom,
+        fetch_ordered_annotations,
+        search_results,
+        clock,
+    ):
+        stream_atom(pyramid_request)
+        clock.now += feeds.REBUILD_INTERVAL
+        search_results(["foo", "baz"])
+
+        stream_atom(pyramid_request)
+
+        fetch_ordered_annotations.assert_called_with(pyramid_request.db, ["foo", "baz"])
+        assert render_atom.call_args[1]["entries"] == ["<foo>", "<baz>"]
+
+    def test_it_rerenders_reordered_feeds_from_scratch(
+        self, pyramid_request, render_atom, search_run, clock
+    ):
+        pyramid_request.params["sort"] = "created"
+        stream_atom(pyramid_request)
+        clock.now += feeds.REFRESH_INTERVAL
+
+        stream_atom(pyramid_request)
+
+        assert search_run.call_args[0][0]["sort"] == "created"
+        assert render_atom.call_count == 2
+
+    @pytest.fixture(autouse=True)
+    def clock(self, patch):
+        time = patch("h.views.feeds.time")
+        time.now = 1000.0
+        time.time.side_effect = lambda: time.now
+        return time
+
+
+@pytest.fixture(autouse=True)
+def clear_feed_cache():
+    feed_cache.clear()
 
 
 @pytest.fixture
 def fetch_ordered_annotations(patch):
+    updated = {
+        "foo": datetime.datetime(2018, 1, 2),
+        "bar": datetime.datetime(2018, 1, 1),
+    }
+
+    def fetch(session, ids):
+        return [
+            mock.Mock(id=id_, updated=updated.get(id_, datetime.datetime(2018, 1, 3)))
+            for id_ in ids
+        ]
+
     fetch_ordered_annotations = patch("h.views.feeds.fetch_ordered_annotations")
-    fetch_ordered_annotations.return_value = mock.sentinel.fetched_annotations
+    fetch_ordered_annotations.side_effect = fetch
     return fetch_ordered_annotations
 
 
+def _entries(request, annotations):
+    return ["<{}>".format(a.id) for a in annotations]
+
+
+@pytest.fixture
+def atom_entries(patch):
+    atom_entries = patch("h.views.feeds.atom_entries")
+    atom_entries.side_effect = _entries
+    return atom_entries
+
+
+@pytest.fixture
+def rss_entries(patch):
+    rss_entries = patch("h.views.feeds.rss_entries")
+    rss_entries.side_effect = _entries
+    return rss_entries
+
+
 @pytest.fixture
 def pyramid_request(pyramid_request):
     pyramid_request.stats = None
+    pyramid_request.matched_route.name = "stream_atom"
     return pyramid_request
 
 
@@ -81,12 +306,20 @@ def pyramid_settings(pyramid_settings):
 
 @pytest.fixture
 def render_atom(patch):
-    return patch("h.views.feeds.render_atom")
+    render_atom = patch("h.views.feeds.render_atom_entries")
+    render_atom.side_effect = lambda **kwargs: Response(
+        body=b"<feed/>", content_type="application/atom+xml"
+    )
+    return render_atom
 
 
 @pytest.fixture
 def render_rss(patch):
-    return patch("h.views.feeds.render_rss")
+    render_rss = patch("h.views.feeds.render_rss_entries")
+    render_rss.side_effect = lambda **kwargs: Response(
+        body=b"<rss/>", content_type="application/rss+xml"
+    )
+    return render_rss
 
 
 @pytest.fixture
@@ -111,3 +344,16 @@ def search_run(search):
     search_run = search.Search.return_value.run
     search_run.return_value = result
     return search_run
+
+
+@pytest.fixture
+def search_results(search_run):
+    """Set the annotation IDs returned by each of the following searches."""
+
+    def search_results(*ids):
+        search_run.side_effect = [
+            search_run.return_value._replace(annotation_ids=annotation_ids)
+            for annotation_ids in ids
+        ]
+
+    return search_results